@@ -1,21 +1,39 @@
+import asyncio
+import collections
+import concurrent.futures
 import logging
 import os
+import queue
 import threading
 import time
 
-import pyaudio
-from elevenlabs import generate, stream
-
+from VoiceProcessingToolkit.monitoring.CaptureMonitor import CaptureMonitor
+from VoiceProcessingToolkit.monitoring.Metrics import metrics, start_metrics_server
+from VoiceProcessingToolkit.monitoring.Profiler import SamplingProfiler, profile_settings_from_env
+from VoiceProcessingToolkit.monitoring.TurnTrace import TurnTrace, TurnTraceAggregator
 from VoiceProcessingToolkit.transcription.whisper import WhisperTranscriber
-from VoiceProcessingToolkit.wake_word_detector.AudioStreamManager import AudioStream
-from VoiceProcessingToolkit.wake_word_detector.WakeWordDetector import WakeWordDetector
 from VoiceProcessingToolkit.wake_word_detector.ActionManager import ActionManager
-from VoiceProcessingToolkit.voice_detection.Voicerecorder import AudioRecorder
-from VoiceProcessingToolkit.text_to_speech.elevenlabs_tts import ElevenLabsTextToSpeech, ElevenLabsConfig
-from VoiceProcessingToolkit.shared_resources import thread_manager
+from VoiceProcessingToolkit.text_to_speech.elevenlabs_tts import (ELEVENLABS_BASE_URL, ElevenLabsConfig,
+                                                                   ElevenLabsTextToSpeech)
+from VoiceProcessingToolkit.shared_resources import PA_INT16, WorkerPool, lazy_import, shutdown_flag, thread_manager
+
+elevenlabs = lazy_import('elevenlabs')
 
 logger = logging.getLogger(__name__)
 
+ENGINE_SAMPLE_RATE = 16000  # Porcupine and Cobra only accept 16 kHz mono audio
+
+_stream_request_seconds = metrics.summary('voice_processing_api_request_seconds',
+                                          'Latency of API requests in seconds.', {'api': 'elevenlabs_stream'})
+_stream_request_errors = metrics.counter('voice_processing_api_errors_total', 'API requests that failed.',
+                                         {'api': 'elevenlabs_stream'})
+_tts_client_hits = metrics.counter('voice_processing_tts_client_cache_hits_total',
+                                   'Speech requests that reused a cached ElevenLabs client and HTTP session.')
+_tts_client_misses = metrics.counter('voice_processing_tts_client_cache_misses_total',
+                                     'Speech requests that created a new ElevenLabs client.')
+_time_to_listening = metrics.gauge('voice_processing_time_to_listening_seconds',
+                                   'Seconds from setup to the wake word detector or recorder first listening.')
+
 def tts(text, voice_id=None, api_key=None):
     """
     Converts text to speech using the ElevenLabs API.
@@ -36,7 +54,7 @@ def tts(text, voice_id=None, api_key=None):
     tts = ElevenLabsTextToSpeech(config=config, voice_id=voice_id)
     return tts.synthesize_speech(text)
 
-def text_to_speech(text, config=None, output_dir=None, voice_id=None, api_key=None):
+def text_to_speech(text, config=None, output_dir=None, voice_id=None, api_key=None, trace=None):
     """
     Converts text to speech using the ElevenLabs API.
 
@@ -50,6 +68,7 @@ def text_to_speech(text, config=None, output_dir=None, voice_id=None, api_key=No
         output_dir (str, optional): Directory to save the output audio file. Defaults to 'audio_files'.
         voice_id (str, optional): Specific voice ID for speech synthesis.
         api_key (str, optional): API key for ElevenLabs, if not provided in config.
+        trace (TurnTrace, optional): Turn trace to mark when the audio was received and when playback ended.
 
     Returns:
         str or None: File path to the saved audio file, or None if synthesis fails.
@@ -57,27 +76,33 @@ def text_to_speech(text, config=None, output_dir=None, voice_id=None, api_key=No
     if config is None:
         config = ElevenLabsConfig(voice_id=voice_id, api_key=api_key or None)
     tts = ElevenLabsTextToSpeech(config=config, voice_id=voice_id)
-    return tts.synthesize_speech(text, output_dir)
+    return tts.synthesize_speech(text, output_dir, trace=trace)
 
 
-def text_to_speech_stream(text, config=None, voice_id=None, api_key=None):
+def text_to_speech_stream(text, config=None, voice_id=None, api_key=None, trace=None, client=None):
     """
     Streams synthesized speech from text using the ElevenLabs API.
 
     This function streams synthesized speech directly without saving it to a file. It's useful for real-time
-    applications where immediate audio playback is required.
+    applications where immediate audio playback is required. If the config points at another base URL than the
+    public API, e.g. a local mock server, the audio is requested from that server's streaming endpoint instead of
+    through the elevenlabs package. With playback disabled the audio is received and discarded.
 
     Args:
         text (str): Text to be converted into speech for streaming.
         config (ElevenLabsConfig, optional): Configuration for ElevenLabs API.
         voice_id (str, optional): The ID of the voice to use for speech synthesis.
         api_key (str, optional): API key for accessing ElevenLabs services.
+        trace (TurnTrace, optional): Turn trace to mark when the first audio chunk arrived and when playback
+            ended.
+        client (ElevenLabsTextToSpeech, optional): Client whose HTTP session the audio is requested with, so the
+            connection is reused across calls. Its config is used if config is omitted.
 
     Returns:
         None
     """
     if config is None:
-        config = ElevenLabsConfig(api_key=api_key or None)
+        config = client.config if client is not None else ElevenLabsConfig(api_key=api_key or None)
     if not text:
         logging.info("No text provided for synthesis.")
         return
@@ -89,28 +114,63 @@ def text_to_speech_stream(text, config=None, voice_id=None, api_key=None):
 
     try:
         # Generate the audio stream
-        audio_stream = generate(
-            text=text,
-            voice=voice_id or config.voice_id,
-            model=config.model_id,
-            api_key=config.elevenlabs_api_key,
-            stream=True  # Enable streaming
-        )
+        started = time.perf_counter()
+        if client is not None:
+            audio_stream = client.stream_speech(text, voice_id)
+        elif config.base_url == ELEVENLABS_BASE_URL:
+            audio_stream = elevenlabs.generate(
+                text=text,
+                voice=voice_id or config.voice_id,
+                model=config.model_id,
+                api_key=config.elevenlabs_api_key,
+                stream=True  # Enable streaming
+            )
+        else:
+            audio_stream = ElevenLabsTextToSpeech(config=config).stream_speech(text, voice_id)
+        audio_stream = _observe_first_chunk(audio_stream, started, trace)
 
         # Stream the audio if playback is enabled
         if config.playback_enabled:
-            stream(audio_stream)
+            elevenlabs.stream(audio_stream)
+            if trace is not None:
+                trace.mark('playback_end')
+        else:
+            for _ in audio_stream:
+                pass
     except Exception as e:
+        _stream_request_errors.inc()
         logging.exception(f"An error occurred during streaming text-to-speech: {e}")
 
 
 
+def _observe_first_chunk(chunks, started, trace=None):
+    """
+    Passes an audio stream through, recording the request latency up to the first chunk and marking
+    'tts_first_byte' on the trace, if any.
+    """
+    first = True
+    for chunk in chunks:
+        if first:
+            _stream_request_seconds.observe(time.perf_counter() - started)
+            if trace is not None:
+                trace.mark('tts_first_byte')
+            first = False
+        yield chunk
+
+
 class VoiceProcessingManager:
+    EAGER_ENGINES = ('porcupine', 'cobra', 'notification_sound')  # Engines eager_init can create during setup()
+
     def __init__(self, transcriber, action_manager, audio_stream_manager, wake_word='computer', sensitivity=0.75,
-                 output_directory='Wav_MP3', wake_word_output='wake_word_output',
-                 audio_format=pyaudio.paInt16, channels=1, rate=16000, frames_per_buffer=512,
+                 output_directory=None, wake_word_output='wake_word_output',
+                 audio_format=PA_INT16, channels=1, rate=16000, frames_per_buffer=512,
                  voice_threshold=0.8, silence_limit=2.0, inactivity_limit=2.0, min_recording_length=2.0, buffer_length=2.0,
-                 use_wake_word=True, save_wake_word_recordings=False, play_notification_sound=True):
+                 use_wake_word=True, save_wake_word_recordings=False, play_notification_sound=True,
+                 adaptive_endpointing=False, min_inactivity_limit=None, max_inactivity_limit=None,
+                 energy_gate=False, capture_block_size=None, noise_suppression=False, trace_turns=False,
+                 trace_callback=None, metrics_port=None, rtf_alert_threshold=0.8, backlog_alert_seconds=0.5,
+                 on_pipeline_alert=None, elevenlabs_base_url=None, tts_playback=True, profile_seconds=None,
+                 profile_directory=None, eager_init=False, archive_directory=None):
         """
         Manages the voice processing pipeline, including optional wake word detection, voice recording, transcription,
         and text-to-speech synthesis. It can be configured to handle different use cases:
@@ -129,10 +189,12 @@ class VoiceProcessingManager:
         Attributes:
             wake_word (str): Wake word for triggering voice recording.
             sensitivity (float): Sensitivity for wake word detection.
-            output_directory (str): Directory for saving recorded audio files.
+            output_directory (str, optional): Directory for saving recorded audio files. Defaults to the
+                Wav_MP3 directory of the voice_detection package.
             audio_format (int): Format of the audio stream (e.g., pyaudio.paInt16).
-            channels (int): Number of audio channels.
-            rate (int): Sample rate of the audio stream.
+            channels (int): Number of channels delivered by the microphone; more than one is downmixed to mono.
+            rate (int): Sample rate of the microphone, e.g. 44100 or 48000. Audio is resampled to the 16 kHz the
+            engines expect.
             frames_per_buffer (int): Number of audio frames per buffer.
             voice_threshold (float): Threshold for voice activity detection.
             silence_limit (int): Duration of silence before stopping the recording.
@@ -142,11 +204,48 @@ class VoiceProcessingManager:
             use_wake_word (bool): Flag to use wake word detection.
             save_wake_word_recordings (bool): If True, saves audio buffer that triggered the wake word detection.
             This can be useful for creating training data for wake word recognition models.
+            adaptive_endpointing (bool): If True, the inactivity limit adapts to how the speech ended, between
+            min_inactivity_limit and max_inactivity_limit.
+            energy_gate (bool): If True, a cheap energy gate skips Porcupine and Cobra calls on silent frames.
+            capture_block_size (int, optional): Number of samples read from the device at once. Larger blocks mean
+            fewer reads and loop iterations; they are split into frames of frames_per_buffer samples.
+            noise_suppression (bool): If True, Picovoice Koala removes background noise before wake word detection and
+            voice activity detection. It runs on its own thread so it cannot stall audio capture.
+            trace_turns (bool): If True, every turn records a TurnTrace with the timestamps of its stages; see
+            last_trace and trace_summary().
+            trace_callback (callable, optional): Called with the TurnTrace of every finished turn. Enables tracing.
+            metrics_port (int, optional): If given, the toolkit's metrics are served in the Prometheus text format
+            on http://127.0.0.1:<metrics_port>/metrics; see metrics_server and metrics_snapshot().
+            rtf_alert_threshold (float): Rolling real-time factor (processing time per second of audio) of the wake
+            word or recording loop that raises a pipeline alert.
+            backlog_alert_seconds (float): Audio waiting unread in a capture stream that raises a pipeline alert.
+            on_pipeline_alert (callable, optional): Called with a CaptureAlert when audio was dropped because a loop
+            fell behind, the capture backlog grows too large or a loop's real-time factor exceeds the threshold. It
+            runs on the capture thread and should return quickly; see capture_health_stats().
+            elevenlabs_base_url (str, optional): Base URL of the ElevenLabs API, e.g. a local mock server. Defaults
+            to the ELEVENLABS_BASE_URL environment variable or the public API.
+            tts_playback (bool): If False, synthesized speech is received but not played, e.g. for load tests.
+            profile_seconds (float, optional): If given, the capture, wake word and recorder threads are profiled
+            for this many seconds after startup; see start_profiling(). Defaults to the VOICE_PROCESSING_PROFILE
+            environment variable.
+            profile_directory (str, optional): Directory profiles are written to. Defaults to the
+            VOICE_PROCESSING_PROFILE_DIR environment variable or 'profiles'.
+            eager_init (bool or iterable): If True, setup() creates Porcupine, Cobra and the notification sound up
+            front, concurrently, so the first turn starts listening at once. Pass the names of the engines to create
+            to limit it to those, e.g. ('porcupine', 'notification_sound') for wake-word-only use with
+            run(transcription=False), which never needs Cobra. Engines the configuration does not use are skipped.
+            By default each is created on first use, and the recorder and the notification sound are never created
+            if they are not used, e.g. by run(transcription=False) or with play_notification_sound=False.
+            archive_directory (str, optional): If given, every saved recording and wake word snippet is appended
+            to a SegmentArchive in this directory, with its transcript and voice activity statistics; see archive.
+            Wake word snippets then no longer land in wake_word_output as separate files.
+            time_to_listening (float): Seconds from the start of setup() until the wake word detector (or the
+            recorder without wake word) first listened, or None until the first turn; see startup_stats().
 
         Dependencies:
             audio_stream_manager (AudioStream): Manages the audio stream.
             wake_word_detector (WakeWordDetector): Handles wake word detection.
-            voice_recorder (AudioRecorder): Manages audio recording.
+            voice_recorder (AudioRecorder): Manages audio recording. Created on first use.
             transcriber (WhisperTranscriber): Transcribes recorded audio.
             action_manager (ActionManager): Manages actions triggered by voice commands.
             recorded_file (str): Path to the last recorded audio file.
@@ -175,8 +274,14 @@ class VoiceProcessingManager:
             raise ValueError("Inactivity limit must be a positive number")
         if not (min_recording_length > 0.0):
             raise ValueError("Minimum recording length must be a positive number")
+        if not isinstance(eager_init, bool):
+            eager_init = tuple(eager_init)
+            if not set(eager_init) <= set(self.EAGER_ENGINES):
+                raise ValueError(f"Eager engines must be among {', '.join(self.EAGER_ENGINES)}")
         if not (buffer_length > 0.0):
             raise ValueError("Buffer length must be a positive number")
+        if capture_block_size is not None and not (isinstance(capture_block_size, int) and capture_block_size > 0):
+            raise ValueError("Capture block size must be a positive integer")
 
         self.wake_word = wake_word
         self.sensitivity = sensitivity
@@ -194,12 +299,47 @@ class VoiceProcessingManager:
         self.use_wake_word = use_wake_word
         self.save_wake_word_recordings = save_wake_word_recordings
         self.play_notification_sound = play_notification_sound
+        self.adaptive_endpointing = adaptive_endpointing
+        self.min_inactivity_limit = min_inactivity_limit
+        self.max_inactivity_limit = max_inactivity_limit
+        self.energy_gate = energy_gate
+        self.capture_block_size = capture_block_size
+        self.noise_suppression = noise_suppression
+        self.rtf_alert_threshold = rtf_alert_threshold
+        self.backlog_alert_seconds = backlog_alert_seconds
+        self.on_pipeline_alert = on_pipeline_alert
+        self.elevenlabs_base_url = elevenlabs_base_url
+        self.tts_playback = tts_playback
+        env_profile_seconds, env_profile_directory = profile_settings_from_env()
+        self.profile_seconds = profile_seconds if profile_seconds is not None else env_profile_seconds
+        self.profile_directory = profile_directory or env_profile_directory or 'profiles'
+        self.eager_init = eager_init
+        self.archive_directory = archive_directory
+        self.archive = None  # SegmentArchive of the recordings if archive_directory is set
 
         self.transcriber = transcriber
         self.action_manager = action_manager
         self.audio_stream_manager = audio_stream_manager
         self.wake_word_detector = None
-        self.voice_recorder = None
+        self._voice_recorder = None
+        self._setup_started = None  # time.monotonic() when setup() last started
+        self.setup_seconds = None
+        self.time_to_listening = None
+        self.last_wake_to_record_latency = None  # Seconds from the last wake word detection to recording start
+        self._turn_requested = None  # time.monotonic() when listen_forever() was asked for the next turn
+        self._turn_overheads = collections.deque(maxlen=1000)
+        self._tts_clients = {}  # ElevenLabsTextToSpeech instances reused across turns, by (api_key, voice_id)
+        self._recording_sequence = 0  # Numbers the recordings of listen_pipelined()
+        self._pipelined_stats = None
+        self._pipelined_stats_lock = threading.Lock()  # The counters are updated from several worker threads
+        self._trace_callback = trace_callback
+        self._trace_aggregator = TurnTraceAggregator() if trace_turns or trace_callback else None
+        self.last_trace = None  # TurnTrace of the most recent turn if tracing is enabled
+        self.metrics_port = metrics_port
+        self.metrics_server = None  # MetricsServer on metrics_port while the manager is set up
+        self.profiler = None  # SamplingProfiler of the current or last profiling run
+        # Set by close(); ends the conversation loops of this manager only, unlike the process-wide shutdown_flag
+        self._closed = threading.Event()
 
         try:
             self.setup()
@@ -208,13 +348,21 @@ class VoiceProcessingManager:
             raise
         finally:
             self.recorded_file = None
+        if self.profile_seconds:
+            self.start_profiling(self.profile_seconds)
 
     @classmethod
-    def create_default_instance(cls, wake_word='cumputer', sensitivity=0.75, output_directory='Wav_MP3',
-                                audio_format=pyaudio.paInt16, channels=1, rate=16000, frames_per_buffer=512,
+    def create_default_instance(cls, wake_word='cumputer', sensitivity=0.75, output_directory=None,
+                                audio_format=PA_INT16, channels=1, rate=16000, frames_per_buffer=512,
                                 voice_threshold=0.65, inactivity_limit=2.5, min_recording_length=3,
                                 buffer_length=2, use_wake_word=True, save_wake_word_recordings=False,
-                                play_notification_sound=True):
+                                play_notification_sound=True, adaptive_endpointing=False,
+                                min_inactivity_limit=None, max_inactivity_limit=None, energy_gate=False,
+                                capture_block_size=None, noise_suppression=False, trace_turns=False,
+                                trace_callback=None, metrics_port=None, rtf_alert_threshold=0.8,
+                                backlog_alert_seconds=0.5, on_pipeline_alert=None, openai_base_url=None,
+                                elevenlabs_base_url=None, tts_playback=True, profile_seconds=None,
+                                profile_directory=None, eager_init=False, archive_directory=None):
 
         """
         Factory method to create a default instance of VoiceProcessingManager with pre-configured dependencies.
@@ -225,10 +373,11 @@ class VoiceProcessingManager:
         Args:
             wake_word (str): Wake word for triggering voice recording.
             sensitivity (float): Sensitivity for wake word detection.
-            output_directory (str): Directory for saving recorded audio files.
+            output_directory (str, optional): Directory for saving recorded audio files. Defaults to the
+                Wav_MP3 directory of the voice_detection package.
             audio_format (int): Format of the audio stream (e.g., pyaudio.paInt16).
-            channels (int): Number of audio channels.
-            rate (int): Sample rate of the audio stream.
+            channels (int): Number of channels delivered by the microphone, downmixed to mono if more than one.
+            rate (int): Sample rate of the microphone; audio is resampled to 16 kHz for the engines.
             frames_per_buffer (int): Number of audio frames per buffer.
             voice_threshold (float): Threshold for voice activity detection.
             inactivity_limit (float): Duration of inactivity before stopping the recording.
@@ -236,22 +385,56 @@ class VoiceProcessingManager:
             buffer_length (float): Length of the audio buffer.
             use_wake_word (bool): Flag to use wake word detection.
             save_wake_word_recordings (bool): Flag to save the audio buffer that triggered the wake word detection.
+            adaptive_endpointing (bool): Flag to adapt the inactivity limit to how the speech ended.
+            min_inactivity_limit (float, optional): Shortest inactivity limit used with adaptive endpointing.
+            max_inactivity_limit (float, optional): Longest inactivity limit used with adaptive endpointing.
+            energy_gate (bool): Flag to skip wake word and voice activity engine calls on silent frames.
+            capture_block_size (int, optional): Number of samples read from the device at once, e.g. 2048.
+            noise_suppression (bool): Flag to remove background noise with Koala before the engines.
+            trace_turns (bool): Flag to record the stage timestamps of every turn (see trace_summary()).
+            trace_callback (callable, optional): Called with the TurnTrace of every finished turn.
+            metrics_port (int, optional): Local port to serve Prometheus metrics on.
+            rtf_alert_threshold (float): Real-time factor of a processing loop that raises a pipeline alert.
+            backlog_alert_seconds (float): Unread capture backlog in seconds that raises a pipeline alert.
+            on_pipeline_alert (callable, optional): Called with a CaptureAlert when the pipeline cannot keep up.
+            openai_base_url (str, optional): Base URL of the OpenAI API used for transcription, e.g. a mock server.
+            elevenlabs_base_url (str, optional): Base URL of the ElevenLabs API.
+            tts_playback (bool): Flag to play synthesized speech.
+            profile_seconds (float, optional): Seconds to profile the voice loops after startup.
+            profile_directory (str, optional): Directory profiles are written to.
+            eager_init (bool or iterable): Flag, or engine names, to create concurrently during setup instead of
+                on first use.
+            archive_directory (str, optional): Directory of an indexed archive of recordings and transcripts.
 
                                 play_notification_sound=True,
         Returns:
             VoiceProcessingManager: An instance of VoiceProcessingManager with default settings and dependencies.
         """
-        transcriber = WhisperTranscriber()
+        from VoiceProcessingToolkit.wake_word_detector.AudioStreamManager import AudioStream
+
+        transcriber = WhisperTranscriber(base_url=openai_base_url)
         action_manager = ActionManager()
         audio_stream_manager = AudioStream(rate=rate, channels=channels, _audio_format=audio_format,
-                                           frames_per_buffer=frames_per_buffer)
+                                           frames_per_buffer=frames_per_buffer, capture_block_size=capture_block_size,
+                                           output_rate=ENGINE_SAMPLE_RATE,
+                                           capture_monitor=CaptureMonitor(rate, 'wake_word',
+                                                                          backlog_alert_seconds=backlog_alert_seconds,
+                                                                          on_alert=on_pipeline_alert))
         return cls(transcriber=transcriber, action_manager=action_manager, audio_stream_manager=audio_stream_manager,
                    wake_word=wake_word, sensitivity=sensitivity, output_directory=output_directory,
                    audio_format=audio_format, channels=channels, rate=rate, frames_per_buffer=frames_per_buffer,
                    voice_threshold=voice_threshold, inactivity_limit=inactivity_limit,
                    min_recording_length=min_recording_length, buffer_length=buffer_length, use_wake_word=use_wake_word,
                    save_wake_word_recordings=save_wake_word_recordings or False,
-                   play_notification_sound=play_notification_sound)
+                   play_notification_sound=play_notification_sound, adaptive_endpointing=adaptive_endpointing,
+                   min_inactivity_limit=min_inactivity_limit, max_inactivity_limit=max_inactivity_limit,
+                   energy_gate=energy_gate, capture_block_size=capture_block_size,
+                   noise_suppression=noise_suppression, trace_turns=trace_turns, trace_callback=trace_callback,
+                   metrics_port=metrics_port, rtf_alert_threshold=rtf_alert_threshold,
+                   backlog_alert_seconds=backlog_alert_seconds, on_pipeline_alert=on_pipeline_alert,
+                   elevenlabs_base_url=elevenlabs_base_url, tts_playback=tts_playback,
+                   profile_seconds=profile_seconds, profile_directory=profile_directory, eager_init=eager_init,
+                   archive_directory=archive_directory)
 
     def _process_voice_command(self, streaming=False, tts=False, api_key=None, voice_id=None):
         """
@@ -268,27 +451,676 @@ class VoiceProcessingManager:
             str or None: The transcribed text of the voice command, or None if no valid recording was made.
         """
         logger.debug("Starting voice command processing.")
-        if self.use_wake_word:
-            # Start wake word detection and wait for it to finish
-            self.wake_word_detector.run_blocking()
-        # Once wake word is detected, start recording
-        self.voice_recorder.perform_recording()
-        # Wait for the recording to complete
-        if self.voice_recorder.recording_thread:
-            self.voice_recorder.recording_thread.join()
+        # Wait for the wake word if enabled, then record the command
+        self._listen_and_record()
         # If a recording was made, transcribe it
         if self.voice_recorder.last_saved_file is not None:
             transcription = self.transcriber.transcribe_audio(self.voice_recorder.last_saved_file)
             logger.info(f"Transcription: {transcription}")
             if transcription and tts:
                 if streaming:
-                    text_to_speech_stream(transcription, api_key=api_key, voice_id=voice_id)
+                    text_to_speech_stream(transcription, config=self._elevenlabs_config(api_key), voice_id=voice_id)
                 else:
-                    text_to_speech(transcription, api_key=api_key, voice_id=voice_id)
+                    text_to_speech(transcription, config=self._elevenlabs_config(api_key, voice_id),
+                                   voice_id=voice_id)
             return transcription
         logger.debug("Voice command processing completed.")
         return None
 
+    def _listen_and_record(self, keep_warm=False):
+        """
+        Waits for the wake word (if enabled) and records the command that follows.
+
+        The wake word stream is handed straight to the recorder, which starts with the audio captured after the
+        detection, so there is no pause or device reopen between the wake word and the command. The time from
+        the detection to the first recorded frame is stored in last_wake_to_record_latency.
+
+        Args:
+            keep_warm (bool): If True, Porcupine and the audio stream are kept for the next turn, and without a
+                wake word the recorder reads from the shared stream instead of opening its own.
+
+        Returns:
+            TurnTrace or None: The trace of the turn, still open for the transcription stages, or None if tracing
+            is disabled.
+        """
+        trace = self._start_trace()
+        audio_data_provider = self._begin_turn(keep_warm)
+        detected = False
+        try:
+            if self.use_wake_word:
+                detection_count = self.wake_word_detector.detection_count
+                self.wake_word_detector.run_blocking(cleanup=False)
+                detected = self.wake_word_detector.detection_count > detection_count
+                audio_data_provider = self.wake_word_detector.get_handoff_provider()
+            # Once wake word is detected, start recording
+            self.voice_recorder.perform_recording(audio_data_provider)
+            # Wait for the recording to complete
+            self.voice_recorder.wait_for_recording()
+        finally:
+            if self.use_wake_word and not keep_warm:
+                self.wake_word_detector.cleanup()
+        self._log_turn_stats(detected, trace)
+        return trace
+
+    def _begin_turn(self, keep_warm: bool):
+        """
+        Prepares a listen-and-record turn. For warm turns, drops the audio captured since the previous turn and
+        records how long the caller took to start the turn.
+
+        Returns:
+            SharedStreamDataProvider or None: The provider to record from without a wake word, or None to let the
+            recorder open its own stream.
+        """
+        from VoiceProcessingToolkit.voice_detection.Voicerecorder import SharedStreamDataProvider
+
+        if not keep_warm:
+            return None
+        self.audio_stream_manager.reopen()
+        self.audio_stream_manager.discard_pending()
+        if self.use_wake_word:
+            return None
+        return SharedStreamDataProvider(self.audio_stream_manager, frame_length=self.frames_per_buffer)
+
+    def _record_turn_overhead(self) -> None:
+        """
+        Records the time from the caller asking for the next turn to the detector or recorder listening again.
+        """
+        if self._turn_requested is None:
+            return
+        listener = self.wake_word_detector if self.use_wake_word else self.voice_recorder
+        if listener.listening_started is not None and listener.listening_started >= self._turn_requested:
+            overhead = listener.listening_started - self._turn_requested
+            self._turn_overheads.append(overhead)
+            logger.debug("Turn-to-turn overhead: %.2f ms", overhead * 1000)
+        self._turn_requested = None
+
+    def _record_time_to_listening(self) -> None:
+        """
+        Records the time from the start of setup() to the detector or recorder listening for the first time.
+        """
+        if self.time_to_listening is not None or self._setup_started is None:
+            return
+        listener = self.wake_word_detector if self.use_wake_word else self._voice_recorder
+        if listener is not None and listener.listening_started is not None:
+            self.time_to_listening = listener.listening_started - self._setup_started
+            _time_to_listening.set(self.time_to_listening)
+            logger.info("Listening %.1f ms after setup.", self.time_to_listening * 1000)
+
+    def startup_stats(self) -> dict:
+        """
+        Returns:
+            dict: Whether the engines were created eagerly, the seconds setup() took, the seconds the creation of
+            Porcupine and Cobra took (None if not created yet or without wake word) and time_to_listening.
+        """
+        detector, recorder = self.wake_word_detector, self._voice_recorder
+        return {
+            'eager_init': self.eager_init,
+            'setup_seconds': self.setup_seconds,
+            'wake_word_engine_seconds': detector.engine_init_seconds if detector else None,
+            'vad_engine_seconds': recorder.engine_init_seconds if recorder else None,
+            'time_to_listening': self.time_to_listening,
+        }
+
+    def turn_overhead_stats(self) -> dict:
+        """
+        Returns:
+            dict: Count, mean and maximum in seconds of the time between the caller of listen_forever() asking for
+            the next transcription and the pipeline listening again.
+        """
+        overheads = list(self._turn_overheads)
+        if not overheads:
+            return {'count': 0, 'mean': None, 'max': None}
+        return {'count': len(overheads), 'mean': sum(overheads) / len(overheads), 'max': max(overheads)}
+
+    def _start_trace(self):
+        """
+        Starts the trace of a new turn.
+
+        Returns:
+            TurnTrace or None: The trace, or None if tracing is disabled.
+        """
+        if self._trace_aggregator is None:
+            return None
+        self.last_trace = TurnTrace(self._trace_aggregator.next_turn())
+        return self.last_trace
+
+    def _mark_capture(self, trace: TurnTrace, detected: bool) -> None:
+        """
+        Copies the stage timestamps the detector and the recorder reported for this turn to its trace.
+        """
+        listener = self.wake_word_detector if self.use_wake_word else self.voice_recorder
+        trace.mark_since_start('listening', listener.listening_started)
+        if detected:
+            trace.mark_since_start('wake_word', self.wake_word_detector.last_detection_time)
+            trace.mark_since_start('notification_sound', self.wake_word_detector.last_notification_time)
+        recorder = self.voice_recorder
+        trace.mark_since_start('recording_start', recorder.record_start_time)
+        trace.mark_since_start('speech_start', recorder.speech_start_time)
+        trace.mark_since_start('speech_end', recorder.speech_end_time)
+        trace.mark_since_start('endpoint', recorder.endpoint_time)
+        trace.mark_since_start('wav_written', recorder.saved_time)
+
+    def _finish_trace(self, trace: TurnTrace) -> None:
+        """
+        Ends the trace of a turn, adds it to the summary and passes it to the trace callback.
+        """
+        if trace is None or trace.finished:
+            return
+        trace.mark('turn_end')
+        self._trace_aggregator.add(trace)
+        if self._trace_callback is not None:
+            try:
+                self._trace_callback(trace)
+            except Exception as e:
+                logger.exception("An error occurred in the turn trace callback.", exc_info=e)
+
+    def _abandon_trace(self, trace: TurnTrace) -> None:
+        """
+        Closes the trace of a turn that was dropped before it completed. It is counted in the summary, but its spans
+        are not, and it is not passed to the trace callback.
+        """
+        if trace is None or trace.finished:
+            return
+        trace.abandon()
+        self._trace_aggregator.add(trace)
+
+    def _end_spoken_trace(self, future: concurrent.futures.Future, trace: TurnTrace) -> None:
+        if future.cancelled():
+            self._abandon_trace(trace)  # Speech was still queued when the session stopped
+        else:
+            self._finish_trace(trace)
+
+    def trace_summary(self) -> dict:
+        """
+        Returns:
+            dict: The number of traced turns, the number of abandoned turns, and, per stage span (see SPANS in
+            monitoring.TurnTrace), count, mean, median, 90th and 99th percentile and maximum in seconds. None if
+            tracing is disabled.
+        """
+        if self._trace_aggregator is None:
+            return None
+        aggregator = self._trace_aggregator
+        return {'turns': aggregator.turns, 'abandoned': aggregator.abandoned, 'spans': aggregator.summary()}
+
+    def capture_health_stats(self) -> dict:
+        """
+        Returns:
+            dict: For the wake word detector (None without wake word) and the recorder, the overruns, dropped audio
+            and largest backlog of their capture streams and the real-time factor of their processing loops.
+        """
+        return {
+            'wake_word': self.wake_word_detector.capture_health_stats() if self.wake_word_detector else None,
+            'recorder': self._voice_recorder.capture_health_stats() if self._voice_recorder else None,
+        }
+
+    def start_profiling(self, duration=30.0, interval=0.01, output_directory=None) -> SamplingProfiler:
+        """
+        Starts sampling the stacks of the capture, wake word and recorder threads, while the manager keeps running.
+        When the window ends or stop_profiling() is called, flamegraph stacks (.folded) and a per-function summary
+        (.txt) are written to the profile directory. A profiling run already in progress is stopped first.
+
+        Args:
+            duration (float, optional): Seconds to profile; None profiles until stop_profiling().
+            interval (float): Seconds between samples.
+            output_directory (str, optional): Directory for the profile files. Defaults to profile_directory.
+
+        Returns:
+            SamplingProfiler: The running profiler; see its stats().
+        """
+        self.stop_profiling()
+        self.profiler = SamplingProfiler(output_directory or self.profile_directory, duration=duration,
+                                         interval=interval)
+        self.profiler.start()
+        return self.profiler
+
+    def stop_profiling(self) -> dict:
+        """
+        Stops the current profiling run early and writes its files.
+
+        Returns:
+            dict: Paths of the profile files of the last run, under 'folded' and 'summary', or None if profiling
+            never ran.
+        """
+        if self.profiler is None:
+            return None
+        return self.profiler.stop()
+
+    @staticmethod
+    def metrics_snapshot() -> dict:
+        """
+        Returns:
+            dict: The current value of every toolkit metric (frames captured, engine calls and time, recordings,
+            API latencies and errors, cache hits, queue lengths), keyed by Prometheus sample name.
+        """
+        return metrics.snapshot()
+
+    @staticmethod
+    def worker_pool_stats() -> list:
+        """
+        Returns:
+            list: Queue length, active workers and task latency of every worker pool of the toolkit (see
+            WorkerPool.stats()), the shared pool first.
+        """
+        return thread_manager.stats()
+
+    def _log_turn_stats(self, detected: bool, trace: TurnTrace = None) -> None:
+        """
+        Logs the latency and cost statistics of the last listen-and-record turn.
+
+        Args:
+            detected (bool): Whether the turn started with a wake word detection.
+            trace (TurnTrace, optional): Trace of the turn to add the capture timestamps to.
+        """
+        self._record_time_to_listening()
+        self._record_turn_overhead()
+        if trace is not None:
+            self._mark_capture(trace, detected)
+        if detected and self.voice_recorder.record_start_time is not None:
+            self.last_wake_to_record_latency = (self.voice_recorder.record_start_time -
+                                                self.wake_word_detector.last_detection_time)
+            logger.info("Wake word to recording start latency: %.1f ms", self.last_wake_to_record_latency * 1000)
+        logger.debug("Endpointing latency: %s", self.voice_recorder.endpointing_stats())
+        if self.noise_suppression:
+            logger.debug("Recorder frame pipeline: %s", self.voice_recorder.frame_pipeline_stats())
+        conversion_stats = self.audio_stream_manager.conversion_stats()
+        if conversion_stats:
+            logger.debug("Capture format conversion cost: %.4f s CPU per s of audio",
+                         conversion_stats['cost_per_audio_second'])
+
+    async def alisten(self, keep_warm=False):
+        """
+        Waits for the wake word (if enabled) and records the command that follows, without blocking the event loop.
+
+        Like the synchronous workflow, the wake word stream is handed straight to the recorder. Several managers can
+        listen concurrently on one event loop.
+
+        With tracing enabled, the trace of the turn is left open in last_trace for the caller's transcription
+        stages.
+
+        Args:
+            keep_warm (bool): If True, Porcupine and the audio stream are kept for the next turn.
+
+        Returns:
+            str or None: The path to the recorded audio file, or None if no valid recording was made.
+        """
+        trace = self._start_trace()
+        audio_data_provider = await asyncio.to_thread(self._begin_turn, keep_warm)
+        detected = False
+        try:
+            if self.use_wake_word:
+                detection = await self.wake_word_detector.arun(cleanup=False)
+                if detection is None:
+                    return None
+                detected = True
+                audio_data_provider = self.wake_word_detector.get_handoff_provider()
+            self.recorded_file = await self.voice_recorder.arecord(audio_data_provider)
+        finally:
+            if self.use_wake_word and not keep_warm:
+                await asyncio.to_thread(self.wake_word_detector.cleanup)
+        self._log_turn_stats(detected, trace)
+        return self.recorded_file
+
+    async def arun(self, tts=False, streaming=True, api_key=None, voice_id=None):
+        """
+        Coroutine version of run(): waits for the wake word, records, transcribes and optionally speaks the
+        transcription, without blocking the event loop.
+
+        Wake word detection and recording run on their own threads and resume the coroutine when they finish;
+        transcription and text-to-speech requests run in worker threads.
+
+        Args:
+            tts (bool): If True, perform text-to-speech on the transcription. Defaults to False.
+            streaming (bool): If True, use streaming text-to-speech. Only relevant if tts is True.
+            api_key (str, optional): API key for ElevenLabs, if not provided in config.
+            voice_id (str, optional): Specific voice ID for speech synthesis.
+
+        Returns:
+            str or None: The transcribed text of the voice command, or None if no valid recording was made.
+        """
+        logger.info("VoiceProcessingManager arun method called.")
+        recorded_file = await self.alisten()
+        trace = self.last_trace
+        try:
+            if not recorded_file:
+                logger.info("Recording was not made or was too short.")
+                return None
+            return await asyncio.to_thread(self._transcribe_and_speak, recorded_file, tts, streaming, api_key,
+                                           voice_id, trace)
+        finally:
+            self._finish_trace(trace)
+
+    def _transcribe_and_speak(self, recorded_file, tts, streaming, api_key, voice_id, trace=None):
+        """
+        Transcribes a recording and optionally speaks the transcription, reusing one ElevenLabs HTTP session.
+
+        Returns:
+            str or None: The transcription.
+        """
+        transcription = self._transcribe(recorded_file, trace, self.voice_recorder.last_archive_id)
+        logger.info(f"Transcription: {transcription}")
+        if transcription and tts:
+            self._speak(transcription, streaming, api_key, voice_id, trace)
+        return transcription
+
+    def _transcribe(self, recorded_file, trace=None, archive_id=None):
+        """
+        Transcribes a recording, marking the start and end of the request on the turn trace and storing the
+        transcription with the archived recording, if any.
+        """
+        if trace is None:
+            transcription = self.transcriber.transcribe_audio(recorded_file)
+        else:
+            trace.mark('transcription_start')
+            try:
+                transcription = self.transcriber.transcribe_audio(recorded_file)
+            finally:
+                trace.mark('transcription_end')
+        if archive_id is not None and transcription and self.archive is not None and not self.archive.closed:
+            self.archive.set_transcript(archive_id, transcription)
+        return transcription
+
+    def _speak(self, text, streaming, api_key, voice_id, trace=None):
+        """
+        Speaks a text with ElevenLabs, reusing one client (and HTTP session) per API key and voice for streamed and
+        non-streamed speech alike.
+        """
+        if trace is not None:
+            trace.mark('tts_start')
+        key = (api_key, voice_id)
+        if key in self._tts_clients:
+            _tts_client_hits.inc()
+        else:
+            _tts_client_misses.inc()
+            config = self._elevenlabs_config(api_key, voice_id)
+            self._tts_clients[key] = ElevenLabsTextToSpeech(config=config, voice_id=voice_id)
+        client = self._tts_clients[key]
+        if streaming:
+            text_to_speech_stream(text, voice_id=voice_id, trace=trace, client=client)
+        else:
+            client.synthesize_speech(text, trace=trace)
+
+    def _elevenlabs_config(self, api_key=None, voice_id=None) -> ElevenLabsConfig:
+        return ElevenLabsConfig(voice_id=voice_id, api_key=api_key or None, playback_enabled=self.tts_playback,
+                                base_url=self.elevenlabs_base_url)
+
+    def listen_forever(self, tts=False, streaming=True, api_key=None, voice_id=None):
+        """
+        Yields the transcription of every voice command until the generator is closed.
+
+        Unlike run(), which tears down Porcupine, the audio stream and background threads after every turn, the
+        pipeline stays warm: the stream stays open, the engines and HTTP clients are reused, and the next turn
+        starts listening as soon as the caller asks for the next transcription. Turns without a valid recording
+        or whose transcription fails are skipped, as in listen_pipelined(). Everything is released when the
+        generator is closed or garbage collected; see turn_overhead_stats() for the time spent between turns.
+
+        Example:
+            ```python
+            for text in vpm.listen_forever():
+                print(text)
+            ```
+
+        Args:
+            tts (bool): If True, perform text-to-speech on every transcription.
+            streaming (bool): If True, use streaming text-to-speech. Only relevant if tts is True.
+            api_key (str, optional): API key for ElevenLabs, if not provided in config.
+            voice_id (str, optional): Specific voice ID for speech synthesis.
+
+        Yields:
+            str: The transcription of a voice command.
+        """
+        try:
+            while not self._stopping():
+                trace = self._listen_and_record(keep_warm=True)
+                recorded_file = self.voice_recorder.last_saved_file
+                transcription = None
+                try:
+                    if recorded_file:
+                        transcription = self._transcribe_and_speak(recorded_file, tts, streaming, api_key, voice_id,
+                                                                   trace)
+                except Exception as e:
+                    logger.exception("Transcription failed, skipping the recording.", exc_info=e)
+                finally:
+                    self._finish_trace(trace)
+                if transcription:
+                    yield transcription
+                self._turn_requested = time.monotonic()
+        finally:
+            self.close()
+
+    async def alisten_forever(self, tts=False, streaming=True, api_key=None, voice_id=None):
+        """
+        Async iterator version of listen_forever() that never blocks the event loop.
+
+        Example:
+            ```python
+            async for text in vpm.alisten_forever():
+                print(text)
+            ```
+
+        Yields:
+            str: The transcription of a voice command.
+        """
+        try:
+            while not self._stopping():
+                recorded_file = await self.alisten(keep_warm=True)
+                trace = self.last_trace
+                transcription = None
+                try:
+                    if recorded_file:
+                        transcription = await asyncio.to_thread(self._transcribe_and_speak, recorded_file, tts,
+                                                                streaming, api_key, voice_id, trace)
+                finally:
+                    self._finish_trace(trace)
+                if transcription:
+                    yield transcription
+                self._turn_requested = time.monotonic()
+        finally:
+            await asyncio.to_thread(self.close)
+
+    def listen_pipelined(self, tts=False, streaming=True, api_key=None, voice_id=None, transcription_workers=2,
+                         max_pending=4):
+        """
+        Yields transcriptions like listen_forever(), but overlaps capture with transcription and speech synthesis.
+
+        A capture thread records utterance after utterance, re-arming as soon as a recording is saved. Every
+        recording is transcribed on a pool of worker threads while the next one is captured, and spoken
+        transcriptions are queued on a single speech thread. Transcriptions are yielded in the order they were
+        spoken. At most max_pending recordings wait for the caller; when that many are outstanding, capture pauses
+        until the caller catches up. Throughput is therefore bounded by the capture rate instead of the sum of the
+        stage latencies; see pipelined_stats().
+
+        Recordings are moved to a numbered file next to the recorder output and deleted once transcribed.
+
+        Args:
+            tts (bool): If True, speak every transcription.
+            streaming (bool): If True, use streaming text-to-speech. Only relevant if tts is True.
+            api_key (str, optional): API key for ElevenLabs, if not provided in config.
+            voice_id (str, optional): Specific voice ID for speech synthesis.
+            transcription_workers (int): Number of recordings transcribed concurrently.
+            max_pending (int): Maximum number of recordings captured ahead of the caller.
+
+        Yields:
+            str: The transcription of a voice command.
+        """
+        if not (isinstance(transcription_workers, int) and transcription_workers > 0):
+            raise ValueError("transcription_workers must be a positive integer")
+        if not (isinstance(max_pending, int) and max_pending > 0):
+            raise ValueError("max_pending must be a positive integer")
+        pending = queue.Queue(maxsize=max_pending)
+        stop = threading.Event()
+        transcribers = WorkerPool('VoiceProcessingManager-transcribe', max_workers=transcription_workers)
+        speaker = WorkerPool('VoiceProcessingManager-speak', max_workers=1)
+        capture_pool = WorkerPool('VoiceProcessingManager-capture', max_workers=1)
+        self._pipelined_stats = {'utterances': 0, 'started': time.monotonic(), 'capture_seconds': 0.0,
+                                 'captures': 0, 'transcription_seconds': 0.0, 'transcriptions': 0}
+        capture = capture_pool.submit(self._pipelined_capture_loop, pending, stop, transcribers)
+        try:
+            while True:
+                item = pending.get()
+                if item is None:
+                    break  # Capture ended, e.g. on shutdown
+                if isinstance(item, BaseException):
+                    raise RuntimeError("Capture failed in pipelined mode.") from item
+                try:
+                    transcription = item.result()
+                except Exception as e:
+                    logger.exception("Transcription failed, skipping the recording.", exc_info=e)
+                    self._finish_trace(item.trace)
+                    continue
+                if not transcription:
+                    self._finish_trace(item.trace)
+                    continue
+                self._count_pipelined(utterances=1)
+                if tts:
+                    spoken = speaker.submit(self._speak, transcription, streaming, api_key, voice_id, item.trace)
+                    spoken.add_done_callback(lambda future, trace=item.trace: self._end_spoken_trace(future, trace))
+                else:
+                    self._finish_trace(item.trace)
+                yield transcription
+        finally:
+            stop.set()
+            while not capture.done():
+                self._interrupt_listening()
+                self._discard_pending_recordings(pending)  # Unblocks a capture thread waiting for room
+                concurrent.futures.wait([capture], 0.05)
+            capture_pool.shutdown()
+            transcribers.shutdown(wait=True, cancel_futures=True)
+            self._discard_pending_recordings(pending)
+            speaker.shutdown(wait=True, cancel_futures=True)
+            self.close()
+
+    def _pipelined_capture_loop(self, pending, stop, transcribers):
+        """
+        Records utterances and submits them for transcription until stopped. Runs on the capture thread of
+        listen_pipelined().
+        """
+        end_marker = None
+        try:
+            while not stop.is_set() and not self._stopping():
+                started = time.monotonic()
+                trace = self._listen_and_record(keep_warm=True)
+                recorded_file = self.voice_recorder.last_saved_file
+                if stop.is_set():
+                    self._abandon_trace(trace)
+                    continue
+                if not recorded_file:
+                    self._finish_trace(trace)
+                    continue
+                self._count_pipelined(capture_seconds=time.monotonic() - started, captures=1)
+                self._recording_sequence += 1
+                base, extension = os.path.splitext(recorded_file)
+                recording_path = f"{base}_{self._recording_sequence:06d}{extension}"
+                # The recorder reuses its output file, so move the recording out of the way of the next one
+                os.replace(recorded_file, recording_path)
+                future = transcribers.submit(self._transcribe_recording, recording_path, trace,
+                                             self.voice_recorder.last_archive_id)
+                future.recording_path = recording_path
+                future.trace = trace
+                pending.put(future)  # Blocks while max_pending recordings wait for the caller
+        except Exception as e:
+            logger.exception("An error occurred while capturing in pipelined mode.", exc_info=e)
+            end_marker = e
+        finally:
+            if not stop.is_set():
+                pending.put(end_marker)
+
+    def _transcribe_recording(self, recording_path, trace=None, archive_id=None):
+        """
+        Transcribes a numbered recording of listen_pipelined() and deletes it.
+        """
+        started = time.monotonic()
+        try:
+            return self._transcribe(recording_path, trace, archive_id)
+        finally:
+            self._count_pipelined(transcription_seconds=time.monotonic() - started, transcriptions=1)
+            self._remove_recording(recording_path)
+
+    def _count_pipelined(self, **increments):
+        """
+        Adds to the counters of pipelined_stats().
+        """
+        with self._pipelined_stats_lock:
+            stats = self._pipelined_stats
+            for name, value in increments.items():
+                stats[name] += value
+
+    @staticmethod
+    def _remove_recording(recording_path):
+        try:
+            os.remove(recording_path)
+        except OSError:
+            logger.debug("Recording %s was already removed.", recording_path)
+
+    def _discard_pending_recordings(self, pending):
+        """
+        Empties the queue of listen_pipelined(), deleting recordings whose transcription never started and closing
+        the traces of the turns the caller will not receive.
+        """
+        while True:
+            try:
+                item = pending.get_nowait()
+            except queue.Empty:
+                return
+            if isinstance(item, concurrent.futures.Future):
+                if item.cancel():
+                    self._remove_recording(item.recording_path)
+                self._abandon_trace(item.trace)
+
+    def _interrupt_listening(self):
+        """
+        Ends wake word detection and recording early, from another thread.
+        """
+        if self.wake_word_detector is not None:
+            self.wake_word_detector.stop()
+        if self._voice_recorder is not None:
+            self._voice_recorder.interrupt()
+
+    def pipelined_stats(self) -> dict:
+        """
+        Returns:
+            dict: For the current or last listen_pipelined() session: the number of transcriptions delivered, the
+            throughput in utterances per minute, and the mean seconds per capture turn and per transcription.
+        """
+        with self._pipelined_stats_lock:
+            if self._pipelined_stats is None:
+                return None
+            stats = dict(self._pipelined_stats)
+        elapsed = time.monotonic() - stats['started']
+        return {
+            'utterances': stats['utterances'],
+            'utterances_per_minute': stats['utterances'] / elapsed * 60 if elapsed > 0 else 0.0,
+            'mean_capture_seconds': stats['capture_seconds'] / stats['captures'] if stats['captures'] else None,
+            'mean_transcription_seconds': (stats['transcription_seconds'] / stats['transcriptions']
+                                           if stats['transcriptions'] else None),
+        }
+
+    def close(self):
+        """
+        Releases the wake word engine, the audio streams, the background threads and the metrics endpoint. Call
+        setup() to use the manager again.
+        """
+        if self.wake_word_detector is not None:
+            self.wake_word_detector.cleanup()
+        if self._voice_recorder is not None:
+            self._voice_recorder.cleanup()
+        if self.archive is not None:
+            self.archive.close()
+        self.audio_stream_manager.cleanup()
+        self.action_manager.shutdown()
+        self._closed.set()
+        self.stop_profiling()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()  # Frees the port for another manager
+            self.metrics_server = None
+        logger.info("VoiceProcessingManager closed.")
+
+    def _stopping(self) -> bool:
+        """
+        Returns:
+            bool: True once this manager was closed or the whole process is shutting down.
+        """
+        return self._closed.is_set() or shutdown_flag.is_set()
+
     def monitor_active_threads(self):
         """
         Monitors and logs the status of active threads every second.
@@ -345,34 +1177,33 @@ class VoiceProcessingManager:
         logger.info("VoiceProcessingManager run method called.")
         if transcription is False and self.use_wake_word:
             self.wake_word_detector.run_blocking()
+            self._record_time_to_listening()
 
             return None
+        trace = None
         try:
             transcription = None
             self.reinitialize_stream()
-            if self.use_wake_word:
-                # Initiate wake word detection and block until it completes
-                self.wake_word_detector.run_blocking()
-
-            # Once wake word is detected, start recording
-            self.voice_recorder.perform_recording()
-
-            # Wait for the recording to complete
-            if self.voice_recorder.recording_thread:
-                self.voice_recorder.recording_thread.join()
+            # Wait for the wake word if enabled, then record the command
+            trace = self._listen_and_record()
 
             # Check if a recording was made
             if self.voice_recorder.last_saved_file:
                 # Transcribe the recording
-                transcription = self.transcriber.transcribe_audio(self.voice_recorder.last_saved_file)
+                transcription = self._transcribe(self.voice_recorder.last_saved_file, trace,
+                                                self.voice_recorder.last_archive_id)
                 logger.info(f"Transcription: {transcription}")
 
                 # If transcription is successful and text-to-speech is enabled, synthesize speech
                 if transcription and tts:
+                    if trace is not None:
+                        trace.mark('tts_start')
                     if streaming:
-                        text_to_speech_stream(transcription, api_key=api_key, voice_id=voice_id)
+                        text_to_speech_stream(transcription, config=self._elevenlabs_config(api_key),
+                                              voice_id=voice_id, trace=trace)
                     else:
-                        text_to_speech(transcription, api_key=api_key, voice_id=voice_id)
+                        text_to_speech(transcription, config=self._elevenlabs_config(api_key, voice_id),
+                                       voice_id=voice_id, trace=trace)
             else:
                 # If no recording was made or it was too short, log the information
                 logger.info("Recording was not made or was too short.")
@@ -389,14 +1220,43 @@ class VoiceProcessingManager:
 
 
         finally:
-            thread_manager.shutdown()
+            self._finish_trace(trace)
             logger.info("VoiceProcessingManager run method completed.")
 
+    def _create_frame_stages(self) -> list:
+        """
+        Creates the frame stages applied before the engines. Koala keeps state per stream, so the detector and the
+        recorder each get their own stages.
+        """
+        from VoiceProcessingToolkit.pipeline.FrameStages import NoiseSuppressionStage
+
+        stages = []
+        if self.noise_suppression:
+            stages.append(NoiseSuppressionStage(access_key=os.getenv('PICOVOICE_APIKEY')))
+        return stages
+
     def setup(self):
         """
-        Initializes the wake word detector and voice recorder components of the voice processing manager.
+        Initializes the wake word detector of the voice processing manager. The voice recorder is created on first
+        use, and the engines when they first listen, unless eager_init is set.
         """
+        # The capture components are imported on first use, so that importing this module for text_to_speech()
+        # or transcription alone does not load NumPy and the audio backends
+        from VoiceProcessingToolkit.wake_word_detector.WakeWordDetector import WakeWordDetector
+
         logger.info("Setting up VoiceProcessingManager components.")
+        self._closed.clear()
+        self._setup_started = time.monotonic()
+        self.time_to_listening = None
+        if self.metrics_port is not None and self.metrics_server is None:
+            self.metrics_server = start_metrics_server(self.metrics_port)
+        if self.archive_directory and (self.archive is None or self.archive.closed):
+            from VoiceProcessingToolkit.storage.SegmentArchive import SegmentArchive
+
+            self.archive = SegmentArchive(self.archive_directory)
+        capture_monitor = getattr(self.audio_stream_manager, 'capture_monitor', None)
+        if capture_monitor is not None and capture_monitor.on_alert is None:
+            capture_monitor.on_alert = self.on_pipeline_alert
 
         if self.use_wake_word:
             # Initialize WakeWordDetector
@@ -408,15 +1268,73 @@ class VoiceProcessingManager:
                 audio_stream_manager=self.audio_stream_manager,
                 play_notification_sound=self.play_notification_sound,
                 save_audio_directory=self.wake_word_output if self.save_wake_word_recordings else False,
+                energy_gate=self.energy_gate,
+                frame_stages=self._create_frame_stages(),
+                rtf_alert_threshold=self.rtf_alert_threshold,
+                on_pipeline_alert=self.on_pipeline_alert,
+                archive=self.archive,
             )
-        # Initialize VoiceRecorder
-        self.voice_recorder = AudioRecorder(output_directory=self.output_directory,
-                                            voice_threshold=self.voice_threshold,
-                                            inactivity_limit=self.inactivity_limit,
-                                            min_recording_length=self.min_recording_length,
-                                            buffer_length=self.buffer_length)
-        # Add the voice recorder's thread to the thread manager
-        thread_manager.add_thread(self.voice_recorder.recording_thread)
+        self._voice_recorder = None
+        if self.eager_init:
+            self._initialize_engines()
+        self.setup_seconds = time.monotonic() - self._setup_started
+        logger.debug("Setup took %.1f ms.", self.setup_seconds * 1000)
+
+    @property
+    def voice_recorder(self):
+        """The AudioRecorder, created on first use."""
+        if self._voice_recorder is None:
+            self._voice_recorder = self._create_voice_recorder()
+        return self._voice_recorder
+
+    @voice_recorder.setter
+    def voice_recorder(self, voice_recorder):
+        self._voice_recorder = voice_recorder
+
+    def _create_voice_recorder(self):
+        from VoiceProcessingToolkit.voice_detection.Voicerecorder import AudioRecorder
+
+        return AudioRecorder(output_directory=self.output_directory,
+                             voice_threshold=self.voice_threshold,
+                             inactivity_limit=self.inactivity_limit,
+                             min_recording_length=self.min_recording_length,
+                             buffer_length=self.buffer_length,
+                             adaptive_endpointing=self.adaptive_endpointing,
+                             min_inactivity_limit=self.min_inactivity_limit,
+                             max_inactivity_limit=self.max_inactivity_limit,
+                             energy_gate=self.energy_gate,
+                             capture_block_size=self.capture_block_size,
+                             device_rate=self.rate, device_channels=self.channels,
+                             frame_stages=self._create_frame_stages(),
+                             rtf_alert_threshold=self.rtf_alert_threshold,
+                             backlog_alert_seconds=self.backlog_alert_seconds,
+                             on_pipeline_alert=self.on_pipeline_alert,
+                             archive=self.archive,
+                             wake_word=self.wake_word if self.use_wake_word else None)
+
+    def _initialize_engines(self) -> None:
+        """
+        Creates the engines selected by eager_init concurrently. They are independent and their creation is mostly
+        spent in native code and file loading, so setup takes about as long as the slowest of them.
+        """
+        engines = self.EAGER_ENGINES if self.eager_init is True else self.eager_init
+        tasks = []
+        if 'cobra' in engines:
+            tasks.append(self.voice_recorder.initialize_vad)
+        if self.use_wake_word:
+            if 'porcupine' in engines:
+                tasks.append(self.wake_word_detector.initialize_porcupine)
+            if self.play_notification_sound and 'notification_sound' in engines:
+                tasks.append(self.wake_word_detector.initialize_notification_sound)
+        if not tasks:
+            return
+        pool = WorkerPool('VoiceProcessingManager-setup', max_workers=len(tasks))
+        try:
+            futures = [pool.submit(task) for task in tasks]
+            for future in futures:
+                future.result()  # Raises the error of a failed initialization
+        finally:
+            pool.shutdown()
 
     def process_voice_command(self):
         """
@@ -425,19 +1343,16 @@ class VoiceProcessingManager:
         Returns:
             str or None: The transcribed text of the voice command, or None if no valid recording was made.
         """
-        self.wake_word_detector.run_blocking()
-
-        # Once wake word is detected, start recording
-        self.voice_recorder.perform_recording()
-        # Wait for the recording to complete
-        if self.voice_recorder.recording_thread:
-            self.voice_recorder.recording_thread.join()
-
-        # If a recording was made, transcribe it
-        if self.voice_recorder.last_saved_file is not None:
-            # where the transcrition file recorded is stored
-            transcription = self.transcriber.transcribe_audio(self.voice_recorder.last_saved_file)
-            logger.info(f"Transcription: {transcription}")
-            return transcription
+        trace = self._listen_and_record()
+        try:
+            # If a recording was made, transcribe it
+            if self.voice_recorder.last_saved_file is not None:
+                # where the transcrition file recorded is stored
+                transcription = self._transcribe(self.voice_recorder.last_saved_file, trace,
+                                                self.voice_recorder.last_archive_id)
+                logger.info(f"Transcription: {transcription}")
+                return transcription
 
-        return None
+            return None
+        finally:
+            self._finish_trace(trace)
@@ -1,3 +1,46 @@
 """
 This __init__.py file makes VoiceProcessingToolkit a Python package.
+
+The public API is available from the package itself, e.g. `from VoiceProcessingToolkit import WhisperTranscriber`.
+Names are imported from their modules on first access, so a process only loads the backends it uses. The manager
+class is imported from its module: `from VoiceProcessingToolkit.VoiceProcessingManager import VoiceProcessingManager`.
 """
+
+import importlib
+
+# Public name -> module that defines it. The text_to_speech() function is not exported: the name belongs to the
+# text_to_speech subpackage, which replaces the attribute whenever it is imported
+_EXPORTS = {
+    'text_to_speech_stream': 'VoiceProcessingToolkit.VoiceProcessingManager',
+    'tts': 'VoiceProcessingToolkit.VoiceProcessingManager',
+    'WhisperTranscriber': 'VoiceProcessingToolkit.transcription.whisper',
+    'ElevenLabsConfig': 'VoiceProcessingToolkit.text_to_speech.elevenlabs_tts',
+    'ElevenLabsTextToSpeech': 'VoiceProcessingToolkit.text_to_speech.elevenlabs_tts',
+    'ActionManager': 'VoiceProcessingToolkit.wake_word_detector.ActionManager',
+    'AudioStream': 'VoiceProcessingToolkit.wake_word_detector.AudioStreamManager',
+    'MappedWavFile': 'VoiceProcessingToolkit.wake_word_detector.WavFileSource',
+    'WavFileStream': 'VoiceProcessingToolkit.wake_word_detector.WavFileSource',
+    'WavFileDataProvider': 'VoiceProcessingToolkit.wake_word_detector.WavFileSource',
+    'WakeWordDetector': 'VoiceProcessingToolkit.wake_word_detector.WakeWordDetector',
+    'AudioRecorder': 'VoiceProcessingToolkit.voice_detection.Voicerecorder',
+    'TurnTrace': 'VoiceProcessingToolkit.monitoring.TurnTrace',
+    'metrics': 'VoiceProcessingToolkit.monitoring.Metrics',
+    'start_metrics_server': 'VoiceProcessingToolkit.monitoring.Metrics',
+    'SamplingProfiler': 'VoiceProcessingToolkit.monitoring.Profiler',
+    'SegmentArchive': 'VoiceProcessingToolkit.storage.SegmentArchive',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value  # Later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
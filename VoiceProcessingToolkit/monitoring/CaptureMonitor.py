@@ -0,0 +1,241 @@
+"""
+CaptureMonitor
+------------------------
+
+Detects when audio processing cannot keep up with capture.
+
+The audio streams are read with exception_on_overflow=False, so when a processing loop falls behind, the device
+drops samples without any error. A CaptureMonitor compares, between two reads of a stream, the number of samples
+the device must have captured (elapsed time times sample rate) with the samples that arrived: those read plus the
+growth of the stream's read-available count. The shortfall is accumulated across reads, so timing jitter cancels out while samples dropped by a device
+buffer overrun add up until they exceed a tolerance. It also raises an alert when the backlog
+waiting to be read grows beyond a limit, which precedes an overrun.
+
+A RealTimeFactorMonitor tracks the rolling real-time factor of a processing loop: the time spent processing
+frames divided by the duration of the audio in them. A loop with a real-time factor of 1 or more cannot keep up.
+
+Both report through the toolkit metrics and call an alert callback with a CaptureAlert when a problem starts.
+"""
+
+import collections
+import logging
+import time
+
+from VoiceProcessingToolkit.monitoring.Metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CaptureAlert = collections.namedtuple('CaptureAlert', ['kind', 'source', 'value', 'timestamp'])
+CaptureAlert.__doc__ = """
+A problem reported by a CaptureMonitor or RealTimeFactorMonitor.
+
+Attributes:
+    kind (str): 'overrun' (samples were dropped; value is the number of samples), 'backlog' (audio waiting to be
+        read; value is in seconds) or 'real_time_factor' (value is the rolling real-time factor).
+    source (str): Name of the stream or processing loop.
+    value (float): Measured value, see kind.
+    timestamp (float): time.monotonic() when the problem was detected.
+"""
+
+_overruns = metrics.counter('voice_processing_capture_overruns_total',
+                            'Periods in which the device dropped samples because reads fell behind.')
+_dropped_samples = metrics.counter('voice_processing_capture_dropped_samples_total',
+                                   'Device samples lost to buffer overruns.')
+
+
+def _deliver(on_alert, alert: CaptureAlert) -> None:
+    if on_alert is None:
+        return
+    try:
+        on_alert(alert)
+    except Exception as e:
+        logger.exception("An error occurred in the capture alert callback.", exc_info=e)
+
+
+class CaptureMonitor:
+    """
+    Detects dropped samples and a growing backlog on one audio input stream.
+
+    The stream calls before_read() with its read-available count before every device read, and after_read() with
+    the number of samples read.
+    """
+
+    def __init__(self, sample_rate: int, name: str = 'capture', tolerance_samples: int = None,
+                 backlog_alert_seconds: float = 0.5, on_alert=None):
+        """
+        Args:
+            sample_rate (int): Sample rate of the device.
+            name (str): Name of the stream in alerts and metrics.
+            tolerance_samples (int, optional): Accumulated shortfall still treated as timing jitter. Defaults to
+                50 ms of audio.
+            backlog_alert_seconds (float): Audio waiting to be read that raises a 'backlog' alert.
+            on_alert (callable, optional): Called with a CaptureAlert when an overrun starts (at most once per
+                second while samples keep being dropped) or the backlog exceeds the limit. Called on the capture
+                thread, so it should return quickly.
+        """
+        self.name = name
+        self.on_alert = on_alert
+        self._sample_rate = sample_rate
+        self._tolerance = tolerance_samples if tolerance_samples is not None else sample_rate // 20
+        self._backlog_alert_samples = backlog_alert_seconds * sample_rate
+        self._backlog = metrics.gauge('voice_processing_capture_backlog_seconds',
+                                      'Audio waiting in the device buffer before the last read, in seconds.',
+                                      {'stream': name})
+        self._last_check = None
+        self._last_available = 0
+        self._read_since_check = 0
+        self._shortfall = 0.0
+        self._last_overrun = None
+        self._backlog_alerting = False
+        self.overruns = 0
+        self.dropped_samples = 0
+        self.max_backlog_samples = 0
+        self.backlog_alerts = 0
+
+    def reset(self) -> None:
+        """
+        Starts over, e.g. after the stream was reopened or pending audio was discarded on purpose.
+        """
+        self._last_check = None
+        self._read_since_check = 0
+        self._shortfall = 0.0
+        self._backlog_alerting = False
+
+    def before_read(self, available: int) -> None:
+        """
+        Checks the samples that arrived since the previous read.
+
+        Args:
+            available (int): The stream's read-available count right before the read.
+        """
+        now = time.monotonic()
+        if self._last_check is not None:
+            expected = (now - self._last_check) * self._sample_rate
+            arrived = available - self._last_available + self._read_since_check
+            # Positive when fewer samples arrived than the device captured; early arrivals offset later shortfalls
+            self._shortfall = max(self._shortfall + expected - arrived, -self._tolerance)
+            if self._shortfall > self._tolerance:
+                missing = int(self._shortfall)
+                self._shortfall = 0.0
+                self.dropped_samples += missing
+                _dropped_samples.inc(missing)
+                if self._last_overrun is None or now - self._last_overrun > 1.0:
+                    self.overruns += 1
+                    _overruns.inc()
+                    logger.warning("Audio capture on %s fell behind: about %.0f ms of audio was dropped.",
+                                   self.name, missing * 1000 / self._sample_rate)
+                    _deliver(self.on_alert, CaptureAlert('overrun', self.name, missing, now))
+                self._last_overrun = now
+        self._last_check = now
+        self._last_available = available
+        self._read_since_check = 0
+        if available > self.max_backlog_samples:
+            self.max_backlog_samples = available
+        self._backlog.value = available / self._sample_rate
+        if available > self._backlog_alert_samples:
+            if not self._backlog_alerting:
+                self._backlog_alerting = True
+                self.backlog_alerts += 1
+                logger.warning("Audio capture on %s is %.2f s behind.", self.name, available / self._sample_rate)
+                _deliver(self.on_alert, CaptureAlert('backlog', self.name, available / self._sample_rate, now))
+        elif available < self._backlog_alert_samples / 2:
+            self._backlog_alerting = False
+
+    def after_read(self, samples: int) -> None:
+        """
+        Args:
+            samples (int): Number of device frames the read returned.
+        """
+        self._read_since_check += samples
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Overrun periods detected, samples and seconds of audio dropped, the largest backlog in seconds and the
+            number of backlog alerts.
+        """
+        return {
+            'overruns': self.overruns,
+            'dropped_samples': self.dropped_samples,
+            'dropped_seconds': self.dropped_samples / self._sample_rate,
+            'max_backlog_seconds': self.max_backlog_samples / self._sample_rate,
+            'backlog_alerts': self.backlog_alerts,
+        }
+
+
+class RealTimeFactorMonitor:
+    """
+    Tracks the rolling real-time factor of a frame processing loop.
+    """
+
+    def __init__(self, name: str, frame_seconds: float, window_frames: int = 100, alert_threshold: float = 0.8,
+                 on_alert=None):
+        """
+        Args:
+            name (str): Name of the loop in alerts and metrics.
+            frame_seconds (float): Duration of the audio in one frame.
+            window_frames (int): Number of most recent frames the real-time factor is computed over.
+            alert_threshold (float): Real-time factor that raises a 'real_time_factor' alert. The alert fires again
+                only after the factor dropped below 90 % of the threshold.
+            on_alert (callable, optional): Called with a CaptureAlert, on the processing thread.
+        """
+        if window_frames < 1:
+            raise ValueError("window_frames must be at least 1")
+        self.name = name
+        self.on_alert = on_alert
+        self._frame_seconds = frame_seconds
+        self._window = collections.deque(maxlen=window_frames)
+        self._busy = 0.0
+        self._alert_threshold = alert_threshold
+        self._alerting = False
+        self._gauge = metrics.gauge('voice_processing_real_time_factor',
+                                    'Rolling processing time per second of audio of a processing loop.',
+                                    {'loop': name})
+        self.max_real_time_factor = 0.0
+        self.alerts = 0
+
+    def record(self, busy_seconds: float) -> None:
+        """
+        Records the time spent processing one frame, excluding the time spent waiting for it.
+        """
+        window = self._window
+        if len(window) == window.maxlen:
+            self._busy -= window[0]
+        window.append(busy_seconds)
+        self._busy += busy_seconds
+        if len(window) < window.maxlen:
+            return  # Wait for a full window before judging the loop
+        factor = self._busy / (window.maxlen * self._frame_seconds)
+        self._gauge.value = factor
+        if factor > self.max_real_time_factor:
+            self.max_real_time_factor = factor
+        if factor > self._alert_threshold:
+            if not self._alerting:
+                self._alerting = True
+                self.alerts += 1
+                logger.warning("Processing loop %s is close to falling behind: real-time factor %.2f.",
+                               self.name, factor)
+                _deliver(self.on_alert, CaptureAlert('real_time_factor', self.name, factor, time.monotonic()))
+        elif factor < self._alert_threshold * 0.9:
+            self._alerting = False
+
+    @property
+    def real_time_factor(self) -> float:
+        """The real-time factor over the frames recorded so far."""
+        return self._busy / (len(self._window) * self._frame_seconds) if self._window else 0.0
+
+    def reset(self) -> None:
+        self._window.clear()
+        self._busy = 0.0
+        self._alerting = False
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: The current and maximum rolling real-time factor and the number of alerts.
+        """
+        return {
+            'real_time_factor': self.real_time_factor,
+            'max_real_time_factor': self.max_real_time_factor,
+            'alerts': self.alerts,
+        }
@@ -0,0 +1,298 @@
+"""
+Metrics
+------------------------
+
+A small metrics registry for production monitoring, with counters, gauges and summaries (count and sum of
+observations), a programmatic snapshot and the Prometheus text exposition format.
+
+Metrics are shared by every detector, recorder and session of the process, so inc(), dec() and observe() take a
+lock of the metric; it is uncontended in the usual case of one thread updating a metric and costs well under a
+microsecond in the per-frame loops. set() is a plain assignment. Values that are already tracked elsewhere, such as
+queue lengths, are read by collectors only when a snapshot is taken.
+
+The toolkit records into the shared `metrics` registry. start_metrics_server() serves it over HTTP for Prometheus
+to scrape.
+
+Example:
+    ```python
+    from VoiceProcessingToolkit.monitoring.Metrics import metrics, start_metrics_server
+
+    server = start_metrics_server(port=9464)  # http://127.0.0.1:9464/metrics
+    print(metrics.snapshot())
+    server.stop()
+    ```
+"""
+
+import logging
+import threading
+
+from VoiceProcessingToolkit.shared_resources import lazy_import, thread_manager
+
+http_server = lazy_import('http.server')  # Only needed by the metrics endpoint; it loads ssl
+
+logger = logging.getLogger(__name__)
+
+
+class Counter:
+    """
+    A value that only goes up, e.g. the number of frames processed.
+    """
+    kind = 'counter'
+    __slots__ = ('name', 'labels', 'value', '_lock')
+
+    def __init__(self, name: str, labels: tuple = ()):
+        self.name = name
+        self.labels = labels
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def samples(self):
+        yield self.name, self.value
+
+
+class Gauge:
+    """
+    A value that goes up and down, e.g. a queue length.
+    """
+    kind = 'gauge'
+    __slots__ = ('name', 'labels', 'value', '_lock')
+
+    def __init__(self, name: str, labels: tuple = ()):
+        self.name = name
+        self.labels = labels
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def set(self, value) -> None:
+        self.value = value
+
+    def inc(self, amount=1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def samples(self):
+        yield self.name, self.value
+
+
+class Summary:
+    """
+    The number and the sum of observations, e.g. of request latencies in seconds.
+    """
+    kind = 'summary'
+    __slots__ = ('name', 'labels', 'count', 'sum', '_lock')
+
+    def __init__(self, name: str, labels: tuple = ()):
+        self.name = name
+        self.labels = labels
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.count += 1
+            self.sum += value
+
+    def samples(self):
+        with self._lock:  # The count and the sum of the same observations
+            count, total = self.count, self.sum
+        yield self.name + '_count', count
+        yield self.name + '_sum', total
+
+
+class MetricsRegistry:
+    """
+    Holds metrics by name and labels, and renders them as a snapshot or in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self._metrics = {}  # (name, labels) -> metric
+        self._descriptions = {}  # name -> (kind, help)
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _get(self, metric_class, name: str, help: str, labels: dict):
+        key = (name, tuple(sorted(labels.items())) if labels else ())
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    kind, _ = self._descriptions.setdefault(name, (metric_class.kind, help))
+                    if kind != metric_class.kind:
+                        raise ValueError(f"Metric {name} is already registered as a {kind}.")
+                    metric = self._metrics[key] = metric_class(name, key[1])
+        if not isinstance(metric, metric_class):
+            raise ValueError(f"Metric {name} is already registered as a {metric.kind}.")
+        return metric
+
+    def counter(self, name: str, help: str = '', labels: dict = None) -> Counter:
+        """
+        Returns the counter with the given name and labels, creating it on first use.
+
+        Args:
+            name (str): Metric name, e.g. 'voice_processing_frames_total'.
+            help (str): Description shown in the Prometheus output. Only the first registration's is kept.
+            labels (dict, optional): Label names and values, e.g. {'api': 'whisper'}.
+
+        Raises:
+            ValueError: If the name is already used by a metric of another kind.
+        """
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name: str, help: str = '', labels: dict = None) -> Gauge:
+        """
+        Returns the gauge with the given name and labels, creating it on first use. See counter().
+        """
+        return self._get(Gauge, name, help, labels)
+
+    def summary(self, name: str, help: str = '', labels: dict = None) -> Summary:
+        """
+        Returns the summary with the given name and labels, creating it on first use. See counter().
+        """
+        return self._get(Summary, name, help, labels)
+
+    def add_collector(self, collector) -> None:
+        """
+        Registers a function that is called with the registry before every snapshot, e.g. to set gauges from
+        values another component already tracks.
+
+        Args:
+            collector (callable): Called with the registry.
+        """
+        self._collectors.append(collector)
+
+    def _collect(self) -> list:
+        for collector in list(self._collectors):
+            try:
+                collector(self)
+            except Exception as e:
+                logger.exception("A metrics collector failed.", exc_info=e)
+        with self._lock:
+            return sorted(self._metrics.values(), key=lambda metric: (metric.name, metric.labels))
+
+    @staticmethod
+    def _sample_name(name: str, labels: tuple) -> str:
+        if not labels:
+            return name
+        rendered = ','.join(f'{label}="{_escape(str(value))}"' for label, value in labels)
+        return f"{name}{{{rendered}}}"
+
+    def snapshot(self) -> dict:
+        """
+        Returns:
+            dict: The current value of every sample, keyed by its name with labels as in the Prometheus output,
+            e.g. 'voice_processing_api_request_seconds_count{api="whisper"}'.
+        """
+        return {self._sample_name(name, metric.labels): value
+                for metric in self._collect() for name, value in metric.samples()}
+
+    def prometheus_text(self) -> str:
+        """
+        Returns:
+            str: All metrics in the Prometheus text exposition format (version 0.0.4).
+        """
+        lines = []
+        described = set()
+        for metric in self._collect():
+            if metric.name not in described:
+                described.add(metric.name)
+                kind, help = self._descriptions[metric.name]
+                if help:
+                    lines.append(f"# HELP {metric.name} {help}")
+                lines.append(f"# TYPE {metric.name} {kind}")
+            for name, value in metric.samples():
+                lines.append(f"{self._sample_name(name, metric.labels)} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# The registry the toolkit records into
+metrics = MetricsRegistry()
+
+
+def _collect_worker_pools(registry: MetricsRegistry) -> None:
+    for stats in thread_manager.stats():
+        labels = {'pool': stats['name']}
+        registry.gauge('voice_processing_worker_pool_queue_length', 'Tasks waiting for a worker thread.',
+                       labels).set(stats['queue_length'])
+        registry.gauge('voice_processing_worker_pool_active_workers', 'Worker threads running a task.',
+                       labels).set(stats['active_workers'])
+
+
+metrics.add_collector(_collect_worker_pools)
+
+
+class MetricsServer:
+    """
+    Serves a registry in the Prometheus text format on a local HTTP port, on a background thread.
+
+    Attributes:
+        host (str): The address the server listens on.
+        port (int): The port the server listens on.
+    """
+
+    def __init__(self, registry: MetricsRegistry = None, host: str = '127.0.0.1', port: int = 9464):
+        """
+        Args:
+            registry (MetricsRegistry, optional): The registry to serve. Defaults to the toolkit's registry.
+            host (str): Address to listen on. Defaults to localhost only.
+            port (int): Port to listen on; 0 picks a free port.
+        """
+        registry = registry or metrics
+
+        class Handler(http_server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug("Metrics request: " + format, *args)
+
+        self._server = http_server.ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.host, self.port = self._server.server_address[:2]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='MetricsServer', daemon=True)
+        self._thread.start()
+        logger.info("Serving metrics on http://%s:%d/metrics", self.host, self.port)
+
+    def stop(self) -> None:
+        """
+        Stops the server and closes its socket.
+        """
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+
+def start_metrics_server(port: int = 9464, host: str = '127.0.0.1', registry: MetricsRegistry = None) -> MetricsServer:
+    """
+    Starts serving the metrics over HTTP.
+
+    Args:
+        port (int): Port to listen on; 0 picks a free port.
+        host (str): Address to listen on. Defaults to localhost only.
+        registry (MetricsRegistry, optional): The registry to serve. Defaults to the toolkit's registry.
+
+    Returns:
+        MetricsServer: The running server; call stop() to shut it down.
+    """
+    return MetricsServer(registry, host, port)
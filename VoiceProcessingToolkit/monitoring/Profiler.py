@@ -0,0 +1,252 @@
+"""
+Profiler
+------------------------
+
+Opt-in sampling profiler for the voice loops.
+
+A SamplingProfiler takes a snapshot of the Python stacks of the capture, wake word and recorder threads at a fixed
+interval, from a background thread, for a bounded window. The profiled threads run unmodified, so the overhead is
+the sampling thread alone: a fraction of a percent of one core at the default 100 samples per second. Samples are
+wall-clock: a thread blocked reading the device is sampled in the read, so the profile shows where the loops spend
+their time, whether computing or waiting.
+
+When the window ends or the profiler is stopped, two files are written to the output directory:
+    - <name>.folded: one line per distinct stack, 'thread;outer frame;...;inner frame count', the input format of
+      flamegraph.pl, speedscope and inferno.
+    - <name>.txt: per function, the share of samples in which it was running (self) and on the stack (total).
+
+Profiling is enabled for a VoiceProcessingManager with the profile_seconds parameter or the
+VOICE_PROCESSING_PROFILE environment variable (seconds to profile after startup), and can be started and stopped
+at any time with start_profiling() and stop_profiling().
+
+Example:
+    ```bash
+    VOICE_PROCESSING_PROFILE=60 VOICE_PROCESSING_PROFILE_DIR=/tmp/profiles python my_assistant.py
+    flamegraph.pl /tmp/profiles/voice-loops-*.folded > flamegraph.svg
+    ```
+"""
+
+import collections
+import logging
+import os
+import sys
+import threading
+import time
+
+from VoiceProcessingToolkit.monitoring.Metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ENV = 'VOICE_PROCESSING_PROFILE'
+PROFILE_DIR_ENV = 'VOICE_PROCESSING_PROFILE_DIR'
+
+# Name prefixes of the threads that run the voice loops: the detector and recorder capture threads, the capture
+# thread of listen_pipelined() and the frame pipeline workers
+VOICE_LOOP_THREADS = ('WakeWordDetector-capture', 'AudioRecorder-capture', 'VoiceProcessingManager-capture',
+                      'wake-word', 'recorder')
+
+_samples = metrics.counter('voice_processing_profiler_samples_total', 'Thread stacks sampled by the profiler.')
+
+
+def profile_settings_from_env() -> tuple:
+    """
+    Reads the profiling switch from the environment.
+
+    Returns:
+        tuple: Seconds to profile (None if VOICE_PROCESSING_PROFILE is unset, empty, 0 or invalid) and the output
+        directory from VOICE_PROCESSING_PROFILE_DIR (None if unset).
+    """
+    value = os.getenv(PROFILE_ENV, '').strip()
+    seconds = None
+    if value:
+        try:
+            seconds = float(value)
+        except ValueError:
+            logger.warning("Ignoring %s=%r; it must be a number of seconds.", PROFILE_ENV, value)
+    return (seconds if seconds and seconds > 0 else None), os.getenv(PROFILE_DIR_ENV) or None
+
+
+def _frame_label(code) -> str:
+    label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    return label.replace(';', ':')  # ';' separates frames in the folded format
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of selected threads for a bounded window and writes flamegraph stacks and a per-function
+    summary when done.
+    """
+
+    def __init__(self, output_directory: str = 'profiles', duration: float = 30.0, interval: float = 0.01,
+                 thread_prefixes: tuple = VOICE_LOOP_THREADS, name: str = 'voice-loops', max_depth: int = 128):
+        """
+        Args:
+            output_directory (str): Directory the profile files are written to. Created if needed.
+            duration (float, optional): Maximum seconds to sample; None samples until stop() is called.
+            interval (float): Seconds between samples.
+            thread_prefixes (tuple, optional): Name prefixes of the threads to sample; None samples every thread
+                except the profiler's own.
+            name (str): Prefix of the output file names, followed by the start time.
+            max_depth (int): Innermost frames kept per stack.
+
+        Raises:
+            ValueError: If duration or interval is not positive.
+        """
+        if duration is not None and duration <= 0:
+            raise ValueError("duration must be positive")
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        self.output_directory = output_directory
+        self.duration = duration
+        self.interval = interval
+        self.thread_prefixes = tuple(thread_prefixes) if thread_prefixes is not None else None
+        self.name = name
+        self.max_depth = max_depth
+        self.last_output = None  # Paths of the files written by the last run, {'folded': ..., 'summary': ...}
+        self._stacks = collections.Counter()
+        self._threads = set()
+        self._sample_count = 0
+        self._sampling_seconds = 0.0
+        self._started = None
+        self._elapsed = 0.0
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """
+        Starts sampling on a background thread, discarding the samples of a previous run.
+
+        Raises:
+            RuntimeError: If the profiler is already running.
+        """
+        with self._lock:
+            if self.is_running:
+                raise RuntimeError("The profiler is already running.")
+            self._stacks.clear()
+            self._threads.clear()
+            self._sample_count = 0
+            self._sampling_seconds = 0.0
+            self._elapsed = 0.0
+            self._started = time.monotonic()
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='SamplingProfiler', daemon=True)
+            self._thread.start()
+        logger.info("Profiling %s for %s.", ', '.join(self.thread_prefixes) if self.thread_prefixes else 'all threads',
+                    f'{self.duration:g} s' if self.duration else 'until stopped')
+
+    def stop(self, timeout: float = None) -> dict:
+        """
+        Stops sampling early and waits for the profile files to be written.
+
+        Args:
+            timeout (float, optional): Maximum seconds to wait for the files.
+
+        Returns:
+            dict: Paths of the files written, under 'folded' and 'summary', or None if nothing was written yet.
+        """
+        thread = self._thread
+        self._stop_event.set()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+        return self.last_output
+
+    def _run(self) -> None:
+        deadline = self._started + self.duration if self.duration else None
+        try:
+            while not self._stop_event.wait(self.interval):
+                self._sample()
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+            self._elapsed = time.monotonic() - self._started
+            self.last_output = self._write()
+        except Exception as e:
+            logger.exception("An error occurred in the sampling profiler.", exc_info=e)
+
+    def _sample(self) -> None:
+        started = time.perf_counter()
+        own_ident = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        sampled = 0
+        for ident, frame in sys._current_frames().items():
+            name = names.get(ident)
+            if ident == own_ident or name is None:
+                continue
+            if self.thread_prefixes is not None and not name.startswith(self.thread_prefixes):
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.append(name)
+            stack.reverse()
+            self._stacks[tuple(stack)] += 1
+            self._threads.add(name)
+            sampled += 1
+        self._sample_count += 1
+        _samples.inc(sampled)
+        self._sampling_seconds += time.perf_counter() - started
+
+    def function_summary(self) -> list:
+        """
+        Returns:
+            list: Per function, as (function, self samples, total samples), ordered by self samples. Self samples
+            are those in which the function was the innermost frame; total samples those in which it was anywhere
+            on the stack.
+        """
+        own = collections.Counter()
+        total = collections.Counter()
+        for stack, count in self._stacks.copy().items():  # May be sampling concurrently
+            frames = stack[1:]  # The first entry is the thread name
+            if not frames:
+                continue
+            own[frames[-1]] += count
+            for function in set(frames):
+                total[function] += count
+        return sorted(((function, own[function], total[function]) for function in total),
+                      key=lambda item: (-item[1], -item[2], item[0]))
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Whether the profiler is running, the seconds sampled, the number of sampling ticks and of thread
+            stacks collected, the names of the sampled threads and the share of one core spent sampling.
+        """
+        elapsed = time.monotonic() - self._started if self.is_running else self._elapsed
+        return {
+            'running': self.is_running,
+            'seconds': elapsed,
+            'ticks': self._sample_count,
+            'stacks': sum(self._stacks.copy().values()),
+            'threads': sorted(self._threads),
+            'overhead': self._sampling_seconds / elapsed if elapsed > 0 else 0.0,
+        }
+
+    def _write(self) -> dict:
+        os.makedirs(self.output_directory, exist_ok=True)
+        base = os.path.join(self.output_directory,
+                            f"{self.name}-{time.strftime('%Y%m%d-%H%M%S', time.localtime())}-{os.getpid()}")
+        paths = {'folded': base + '.folded', 'summary': base + '.txt'}
+        with open(paths['folded'], 'w') as f:
+            for stack, count in sorted(self._stacks.items()):
+                f.write(f"{';'.join(stack)} {count}\n")
+
+        stats = self.stats()
+        samples = max(stats['stacks'], 1)
+        lines = [
+            f"{stats['stacks']} stacks of {len(stats['threads'])} thread(s) sampled every {self.interval * 1000:g} ms "
+            f"over {stats['seconds']:.1f} s; sampling used {stats['overhead']:.2%} of one core.",
+            f"Threads: {', '.join(stats['threads']) or 'none'}",
+            '',
+            f"{'self':>7} {'total':>7}  function",
+        ]
+        for function, own, total in self.function_summary():
+            lines.append(f"{own / samples:>7.1%} {total / samples:>7.1%}  {function}")
+        with open(paths['summary'], 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        logger.info("Profile written to %s and %s.", paths['folded'], paths['summary'])
+        return paths
@@ -0,0 +1,189 @@
+"""
+TurnTrace
+------------------------
+
+Per-stage latency tracing of voice turns.
+
+A TurnTrace holds time.monotonic() timestamps of the stage boundaries of one turn: listening, wake word
+detection, notification sound, recording start, speech start and end, endpoint, WAV write, transcription, the
+first byte of synthesized speech and the end of playback. Spans between boundaries (see SPANS) are derived from
+the timestamps, so a slow turn shows which stage its time went to. A TurnTraceAggregator collects the spans of
+many turns and reports percentiles per span. Turns that were dropped before they completed, e.g. recordings
+still waiting for transcription when a session stops, are abandoned: they are closed and counted, but their spans
+are left out of the percentiles.
+
+Tracing only records a handful of timestamps per turn, never per audio frame; when it is disabled no trace is
+created at all.
+
+Example:
+    ```python
+    vpm = VoiceProcessingManager.create_default_instance(trace_callback=lambda trace: print(trace.to_dict()))
+    vpm.run()
+    print(vpm.trace_summary())
+    ```
+"""
+
+import collections
+import itertools
+import threading
+import time
+
+# Stage boundaries in the order they occur in a turn
+STAGES = ('turn_start', 'listening', 'wake_word', 'notification_sound', 'recording_start', 'speech_start',
+          'speech_end', 'endpoint', 'wav_written', 'transcription_start', 'transcription_end', 'tts_start',
+          'tts_first_byte', 'playback_end', 'turn_end')
+
+# (span name, start boundary, end boundary)
+SPANS = (
+    ('startup', 'turn_start', 'listening'),
+    ('wake_word', 'listening', 'wake_word'),
+    ('notification_sound', 'wake_word', 'notification_sound'),
+    ('handoff', 'wake_word', 'recording_start'),
+    ('speech_onset', 'recording_start', 'speech_start'),
+    ('speech', 'speech_start', 'speech_end'),
+    ('endpointing_tail', 'speech_end', 'endpoint'),
+    ('wav_write', 'endpoint', 'wav_written'),
+    ('transcription', 'transcription_start', 'transcription_end'),
+    ('tts_first_byte', 'tts_start', 'tts_first_byte'),
+    ('playback', 'tts_first_byte', 'playback_end'),
+    ('response', 'endpoint', 'tts_first_byte'),
+    ('total', 'turn_start', 'turn_end'),
+)
+
+
+class TurnTrace:
+    """
+    Timestamps of the stage boundaries of one voice turn.
+
+    Attributes:
+        turn (int): Sequence number of the turn.
+        marks (dict): time.monotonic() timestamp per stage boundary reached so far (see STAGES).
+        abandoned (bool): True if the turn was dropped before it completed.
+    """
+
+    def __init__(self, turn: int, started: float = None):
+        """
+        Args:
+            turn (int): Sequence number of the turn.
+            started (float, optional): time.monotonic() at which the turn started. Defaults to now.
+        """
+        self.turn = turn
+        self.marks = {}
+        self.abandoned = False
+        self.mark('turn_start', started)
+
+    def mark(self, stage: str, when: float = None) -> None:
+        """
+        Records the time a stage boundary was reached.
+
+        Args:
+            stage (str): Name of the boundary, usually one of STAGES.
+            when (float, optional): time.monotonic() timestamp. Defaults to now.
+        """
+        self.marks[stage] = time.monotonic() if when is None else when
+
+    def mark_since_start(self, stage: str, when: float) -> None:
+        """
+        Records a timestamp reported by a component, unless it is missing or older than the turn, i.e. left over
+        from a previous turn.
+        """
+        if when is not None and when >= self.marks['turn_start']:
+            self.marks[stage] = when
+
+    @property
+    def finished(self) -> bool:
+        return 'turn_end' in self.marks
+
+    def abandon(self) -> None:
+        """
+        Closes the trace of a turn that was dropped before it completed.
+        """
+        self.abandoned = True
+        self.mark('turn_end')
+
+    def durations(self) -> dict:
+        """
+        Returns:
+            dict: Seconds per span of SPANS whose start and end boundaries were both reached.
+        """
+        marks = self.marks
+        return {name: marks[end] - marks[start] for name, start, end in SPANS if start in marks and end in marks}
+
+    def to_dict(self) -> dict:
+        """
+        Returns:
+            dict: The turn number, whether the turn was abandoned, the boundaries reached in seconds since the
+            start of the turn, and the span durations in seconds.
+        """
+        started = self.marks['turn_start']
+        marks = sorted(self.marks.items(), key=lambda item: item[1])
+        return {
+            'turn': self.turn,
+            'abandoned': self.abandoned,
+            'marks': {stage: when - started for stage, when in marks},
+            'durations': self.durations(),
+        }
+
+
+class TurnTraceAggregator:
+    """
+    Collects the span durations of finished turns and reports percentiles per span. It also hands out the turn
+    numbers. Turns may be numbered, finished and summarized from different threads.
+    """
+
+    def __init__(self, max_turns: int = 1000):
+        """
+        Args:
+            max_turns (int): Number of most recent turns the percentiles are computed over.
+        """
+        self.turns = 0
+        self.abandoned = 0
+        self._numbers = itertools.count(1)
+        self._lock = threading.Lock()
+        self._durations = collections.defaultdict(lambda: collections.deque(maxlen=max_turns))
+
+    def next_turn(self) -> int:
+        """
+        Returns:
+            int: The sequence number of a new turn; never the same for two turns, even if they overlap.
+        """
+        return next(self._numbers)
+
+    def add(self, trace: TurnTrace) -> None:
+        with self._lock:
+            if trace.abandoned:
+                self.abandoned += 1
+                return
+            self.turns += 1
+            for name, seconds in trace.durations().items():
+                self._durations[name].append(seconds)
+
+    def summary(self) -> dict:
+        """
+        Returns:
+            dict: Per span, in the order of SPANS: count, mean, median, 90th and 99th percentile and maximum in
+            seconds over the most recent turns.
+        """
+        summary = {}
+        with self._lock:
+            durations_by_span = {name: list(durations) for name, durations in self._durations.items()}
+        for name, _, _ in SPANS:
+            durations = sorted(durations_by_span.get(name, ()))
+            if not durations:
+                continue
+            last = len(durations) - 1
+            summary[name] = {
+                'count': len(durations),
+                'mean': sum(durations) / len(durations),
+                'p50': durations[int(0.5 * last)],
+                'p90': durations[int(0.9 * last)],
+                'p99': durations[int(0.99 * last)],
+                'max': durations[-1],
+            }
+        return summary
+
+    def reset(self) -> None:
+        with self._lock:
+            self.turns = self.abandoned = 0
+            self._numbers = itertools.count(1)
+            self._durations.clear()
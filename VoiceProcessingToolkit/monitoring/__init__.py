@@ -0,0 +1 @@
+# This __init__.py file makes monitoring a subpackage of VoiceProcessingToolkit.
@@ -0,0 +1,430 @@
+"""
+FramePipeline
+------------------------
+
+A declarative chain of frame-processing stages: a frame source, DSP stages such as gain or noise suppression,
+voice activity or wake word stages, and sinks.
+
+The source always runs on its own capture thread. Every other stage runs inline on the thread of the stage before
+it, or on its own worker thread when created with threaded=True. The threads belong to a WorkerPool of the
+pipeline and are reused when the pipeline is stopped and started again. Threads are connected by bounded queues.
+When a queue is full, the thread feeding it waits for room, so no audio is lost on its way to the engines and the
+recorder; only a stage created with drop_oldest=True, for which losing audio is acceptable (e.g. a monitoring
+stage), drops the oldest queued frame instead so it never holds up the thread before it. Processed frames are
+passed to the sinks and handed to the consumer through read(), whose queue always applies backpressure. Once the
+pipeline is stopping, full queues drop their oldest frames so the threads can finish.
+
+Every stage reports the frames it processed, the frames dropped from its input queue, its processing time, and
+its queue depth, so a slow stage can be moved to its own thread or removed.
+
+Example:
+    ```python
+    pipeline = FramePipeline(audio_stream.read, [GainStage(6.0), NoiseSuppressionStage()])
+    pipeline.start()
+    frame = pipeline.read()
+    print(pipeline.stats())
+    pipeline.stop()
+    ```
+"""
+
+import concurrent.futures
+import logging
+import queue
+import threading
+import time
+
+import numpy as np
+
+from VoiceProcessingToolkit.monitoring.Metrics import metrics
+from VoiceProcessingToolkit.shared_resources import WorkerPool
+
+logger = logging.getLogger(__name__)
+
+_dropped_frames = metrics.counter('voice_processing_pipeline_dropped_frames_total',
+                                  'Frames dropped from full frame pipeline queues.')
+
+_END = object()  # Marks the end of the frame stream in the queues
+
+
+class FrameStage:
+    """
+    A step of a FramePipeline. Subclasses override process() and, if they hold resources, start() and close().
+
+    Frames are read-only NumPy arrays of 16-bit samples; a stage that changes the audio returns a new array.
+    """
+
+    def __init__(self, name: str = None, threaded: bool = False, queue_size: int = 32, drop_oldest: bool = False):
+        """
+        Args:
+            name (str, optional): Name used in thread names and statistics. Defaults to the class name.
+            threaded (bool): If True, the stage runs on its own worker thread behind a bounded queue.
+            queue_size (int): Capacity in frames of the input queue of a threaded stage.
+            drop_oldest (bool): If True, the oldest frame is dropped when the input queue of the threaded stage is
+                full. Otherwise the thread before the stage waits for room, so no audio is lost.
+        """
+        if queue_size < 1:
+            raise ValueError("queue_size must be at least 1")
+        self.name = name or type(self).__name__
+        self.threaded = threaded
+        self.queue_size = queue_size
+        self.drop_oldest = drop_oldest
+
+    def start(self) -> None:
+        """
+        Prepares the stage, e.g. by creating an engine or resetting its state. Called every time the pipeline
+        starts.
+        """
+
+    def process(self, frame: np.ndarray):
+        """
+        Processes one frame.
+
+        Args:
+            frame (numpy.ndarray): One frame of 16-bit samples.
+
+        Returns:
+            numpy.ndarray: The processed frame, or None to drop the frame.
+        """
+        return frame
+
+    def close(self) -> None:
+        """
+        Releases the resources held by the stage.
+        """
+
+
+class FunctionStage(FrameStage):
+    """
+    Runs a plain function on every frame.
+    """
+
+    def __init__(self, function, name: str = None, threaded: bool = False, queue_size: int = 32,
+                 drop_oldest: bool = False):
+        """
+        Args:
+            function (callable): Called with each frame; returns the processed frame or None to drop it.
+            name (str, optional): Name of the stage. Defaults to the function name.
+            threaded (bool): If True, the stage runs on its own worker thread.
+            queue_size (int): Capacity in frames of the input queue of a threaded stage.
+            drop_oldest (bool): If True, the oldest frame is dropped when the input queue of the threaded stage is
+                full.
+        """
+        super().__init__(name or getattr(function, '__name__', None), threaded, queue_size, drop_oldest)
+        self._function = function
+
+    def process(self, frame: np.ndarray):
+        return self._function(frame)
+
+
+class StageStats:
+    """
+    Counters and timings of one pipeline stage.
+    """
+
+    def __init__(self, name: str, threaded: bool = False):
+        self.name = name
+        self.threaded = threaded
+        self.frames = 0
+        self.dropped = 0
+        self.busy_seconds = 0.0
+        self.max_seconds = 0.0
+        self.max_queue_depth = 0
+        self.blocked_seconds = 0.0  # Time the thread before the stage waited for room in its queue
+        self.drop_oldest = False
+        self.queue = None  # Input queue of a threaded stage
+
+    def record(self, seconds: float) -> None:
+        self.frames += 1
+        self.busy_seconds += seconds
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+
+    def to_dict(self) -> dict:
+        """
+        Returns:
+            dict: Frames processed and dropped, mean and maximum time per frame in seconds, the current and maximum
+            input queue depth (None for inline stages), and the seconds the thread before the stage waited for room
+            in the queue.
+        """
+        return {
+            'name': self.name,
+            'threaded': self.threaded,
+            'frames': self.frames,
+            'dropped': self.dropped,
+            'mean_latency_seconds': self.busy_seconds / self.frames if self.frames else 0.0,
+            'max_latency_seconds': self.max_seconds,
+            'queue_depth': self.queue.qsize() if self.queue is not None else None,
+            'max_queue_depth': self.max_queue_depth if self.queue is not None else None,
+            'blocked_seconds': self.blocked_seconds,
+        }
+
+
+class FramePipeline:
+    """
+    Runs frames from a source through a chain of stages on one or more threads.
+    """
+
+    def __init__(self, source, stages=(), sinks=(), output_queue_size: int = 32, name: str = 'frame-pipeline'):
+        """
+        Args:
+            source (callable): Returns the next frame of 16-bit audio as bytes, e.g. AudioStream.read. It is called
+                on the capture thread and may block. Returning None ends the input, e.g. at the end of a file.
+            stages (list): FrameStage instances, in processing order.
+            sinks (list): Callables that receive every processed frame as a NumPy array, on the thread of the last
+                stage.
+            output_queue_size (int): Capacity in frames of the queue read() takes frames from. Use 0 if the
+                pipeline only feeds sinks.
+            name (str): Name used for the threads and in log messages.
+        """
+        self._source = source
+        self._stages = list(stages)
+        self._sinks = list(sinks)
+        self._output_queue_size = output_queue_size
+        self.name = name
+        self._stop_event = threading.Event()
+        self._pool = None
+        self._futures = []
+        self._queues = []
+        self._output = None
+        self._error = None
+        self._capture_stats = StageStats('capture')
+        self._stage_stats = []
+        self._output_stats = StageStats('output')
+        self._latency_stats = StageStats('end_to_end')
+        # Source frames up to and including the last frame returned by read(), counting frames dropped on the way
+        self.last_source_frame = 0
+        self.is_running = False
+
+    @property
+    def stages(self) -> list:
+        return list(self._stages)
+
+    @property
+    def pending_frames(self) -> int:
+        """The number of captured frames waiting in the queues of the pipeline."""
+        return sum(q.qsize() for q in self._queues)
+
+    def start(self) -> None:
+        """
+        Starts the stages and the pipeline threads.
+        """
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self._error = None
+        self.last_source_frame = 0
+        for stage in self._stages:
+            stage.start()
+
+        # Split the chain into segments; every threaded stage starts a new segment with its own input queue
+        self._capture_stats = StageStats('capture')
+        self._stage_stats = []
+        segments = [[]]
+        queues = [None]
+        for stage in self._stages:
+            stats = StageStats(stage.name, stage.threaded)
+            self._stage_stats.append(stats)
+            if stage.threaded:
+                stats.queue = queue.Queue(maxsize=stage.queue_size)
+                stats.drop_oldest = stage.drop_oldest
+                segments.append([])
+                queues.append(stats.queue)
+            segments[-1].append((stage, stats))
+        self._output_stats = StageStats('output')
+        self._latency_stats = StageStats('end_to_end')
+        self._output = queue.Queue(maxsize=self._output_queue_size) if self._output_queue_size else None
+        self._output_stats.queue = self._output
+        self._queues = queues[1:] + ([self._output] if self._output is not None else [])
+
+        if self._pool is None or self._pool.max_workers != len(segments):
+            self._pool = WorkerPool(self.name, max_workers=len(segments))
+        self.is_running = True
+        self._futures = []
+        for index, segment in enumerate(segments):
+            if index + 1 < len(segments):
+                downstream = (queues[index + 1], segments[index + 1][0][1])
+            else:
+                downstream = None  # Last segment: deliver to the sinks and the output queue
+            if index == 0:
+                future = self._pool.submit(self._capture_loop, segment, downstream)
+            else:
+                future = self._pool.submit(self._worker_loop, queues[index], segment, downstream)
+            self._futures.append(future)
+        logger.debug("Frame pipeline '%s' started with %d thread(s).", self.name, len(self._futures))
+
+    def _capture_loop(self, segment: list, downstream) -> None:
+        source = self._source
+        stats = self._capture_stats
+        index = 0
+        try:
+            while not self._stop_event.is_set():
+                started = time.perf_counter()
+                data = source()
+                if data is None:
+                    break  # The source has no more audio; read() returns None once the queued frames are taken
+                captured = time.perf_counter()
+                stats.record(captured - started)
+                index += 1
+                self._forward(segment, downstream, np.frombuffer(data, dtype=np.int16), (captured, index))
+        except Exception as e:
+            self._fail(e)
+        finally:
+            self._end(downstream)
+
+    def _worker_loop(self, input_queue: queue.Queue, segment: list, downstream) -> None:
+        try:
+            while True:
+                item = input_queue.get()
+                if item is _END:
+                    break
+                origin, frame = item
+                self._forward(segment, downstream, frame, origin)
+        except Exception as e:
+            self._fail(e)
+        finally:
+            self._end(downstream)
+
+    def _forward(self, segment: list, downstream, frame: np.ndarray, origin: tuple) -> None:
+        """
+        Runs the stages of one segment on a frame and passes the result on, together with its capture time and
+        source frame number.
+        """
+        for stage, stats in segment:
+            started = time.perf_counter()
+            frame = stage.process(frame)
+            stats.record(time.perf_counter() - started)
+            if frame is None:
+                return
+        if downstream is not None:
+            self._put(downstream[0], downstream[1], (origin, frame))
+            return
+        for sink in self._sinks:
+            sink(frame)
+        if self._output is not None:
+            self._put(self._output, self._output_stats, (origin, frame))
+
+    def _put(self, target: queue.Queue, stats: StageStats, item) -> None:
+        """
+        Adds an item to a bounded queue. If the queue is full, waits for room, or drops the oldest queued frame if
+        the stage allows it or the pipeline is stopping.
+        """
+        if not stats.drop_oldest:
+            try:
+                target.put_nowait(item)
+            except queue.Full:
+                started = time.perf_counter()
+                while not self._stop_event.is_set():
+                    try:
+                        target.put(item, timeout=0.05)
+                        break
+                    except queue.Full:
+                        pass
+                else:
+                    self._drop_into(target, stats, item)
+                stats.blocked_seconds += time.perf_counter() - started
+        else:
+            self._drop_into(target, stats, item)
+        self._record_depth(target, stats)
+
+    @staticmethod
+    def _drop_into(target: queue.Queue, stats: StageStats, item) -> None:
+        """
+        Adds an item to a bounded queue, dropping the oldest queued frames until it fits.
+        """
+        while True:
+            try:
+                target.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    target.get_nowait()
+                    stats.dropped += 1
+                    _dropped_frames.inc()
+                except queue.Empty:
+                    pass
+
+    @staticmethod
+    def _record_depth(target: queue.Queue, stats: StageStats) -> None:
+        depth = target.qsize()
+        if depth > stats.max_queue_depth:
+            stats.max_queue_depth = depth
+
+    def _end(self, downstream) -> None:
+        if downstream is not None:
+            self._put(downstream[0], downstream[1], _END)
+        elif self._output is not None:
+            self._put(self._output, self._output_stats, _END)
+
+    def _fail(self, error: Exception) -> None:
+        logger.exception("Frame pipeline '%s' stopped after an error.", self.name, exc_info=error)
+        if self._error is None:
+            self._error = error
+        self._stop_event.set()
+
+    def read(self, timeout: float = None):
+        """
+        Returns the next processed frame.
+
+        Args:
+            timeout (float, optional): Maximum number of seconds to wait. Waits indefinitely if omitted.
+
+        Returns:
+            bytes: The frame as 16-bit PCM, or None if the timeout expired or the pipeline has stopped.
+
+        Raises:
+            RuntimeError: If the pipeline has no output queue, or stopped because a stage or the source failed.
+        """
+        if self._output is None:
+            raise RuntimeError(f"Frame pipeline '{self.name}' was not started or has no output queue.")
+        try:
+            item = self._output.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if item is _END:
+            self._output.put_nowait(_END)  # Keep the marker so later reads return immediately as well
+            if self._error is not None:
+                raise RuntimeError(f"Frame pipeline '{self.name}' failed.") from self._error
+            return None
+        (captured, self.last_source_frame), frame = item
+        self._output_stats.frames += 1
+        self._latency_stats.record(time.perf_counter() - captured)
+        return frame.tobytes()
+
+    def stop(self, timeout: float = 1.0) -> None:
+        """
+        Stops capturing and waits for the threads to finish the frames already captured. The stages are kept
+        and can be started again.
+
+        Args:
+            timeout (float): Maximum number of seconds to wait for each thread.
+        """
+        self._stop_event.set()
+        if self._futures and not self._pool.in_worker():
+            _, not_done = concurrent.futures.wait(self._futures, timeout * len(self._futures))
+            if not_done:
+                logger.warning("%d thread(s) of frame pipeline '%s' did not stop within %.1f s.",
+                               len(not_done), self.name, timeout)
+        self._futures = []
+        self.is_running = False
+
+    def close(self) -> None:
+        """
+        Stops the pipeline and closes all stages.
+        """
+        self.stop()
+        for stage in self._stages:
+            stage.close()
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Statistics of the capture thread (time spent waiting for the source), of every stage (see
+            StageStats.to_dict()), of the output queue, and the end-to-end latency from capture to read().
+        """
+        return {
+            'capture': self._capture_stats.to_dict(),
+            'stages': [stats.to_dict() for stats in self._stage_stats],
+            'output': self._output_stats.to_dict(),
+            'end_to_end': self._latency_stats.to_dict(),
+            'pending_frames': self.pending_frames,
+        }
@@ -0,0 +1,141 @@
+"""
+FrameStages
+------------------------
+
+Ready-made stages for FramePipeline: gain, noise suppression with Picovoice Koala, and wake word and voice
+activity stages that report engine results to a callback while passing the frames on unchanged.
+"""
+
+import os
+
+import numpy as np
+
+from VoiceProcessingToolkit.pipeline.FramePipeline import FrameStage
+from VoiceProcessingToolkit.shared_resources import lazy_import
+
+pvkoala = lazy_import('pvkoala')
+
+
+class GainStage(FrameStage):
+    """
+    Amplifies or attenuates every frame by a fixed gain, clipping to the 16-bit range.
+    """
+
+    def __init__(self, gain_db: float, name: str = None, threaded: bool = False, queue_size: int = 32,
+                 drop_oldest: bool = False):
+        """
+        Args:
+            gain_db (float): Gain in decibels; negative values attenuate.
+            name (str, optional): Name of the stage.
+            threaded (bool): If True, the stage runs on its own worker thread.
+            queue_size (int): Capacity in frames of the input queue of a threaded stage.
+            drop_oldest (bool): If True, the oldest frame is dropped when the input queue of the threaded stage is
+                full.
+        """
+        super().__init__(name, threaded, queue_size, drop_oldest)
+        self.gain = 10 ** (gain_db / 20)
+
+    def process(self, frame: np.ndarray):
+        return np.clip(frame * self.gain, -32768, 32767).astype(np.int16)
+
+
+class NoiseSuppressionStage(FrameStage):
+    """
+    Suppresses background noise with Picovoice Koala.
+
+    Koala processes frames of koala.frame_length samples, so pipeline frames must be a multiple of that length, and
+    it delays the audio by delay_samples. It is the most expensive stage, so it runs on its own thread by default.
+    """
+
+    def __init__(self, access_key: str = None, name: str = None, threaded: bool = True, queue_size: int = 32,
+                 drop_oldest: bool = False):
+        """
+        Args:
+            access_key (str, optional): Picovoice access key. Defaults to the PICOVOICE_APIKEY environment variable.
+            name (str, optional): Name of the stage.
+            threaded (bool): If True, the stage runs on its own worker thread.
+            queue_size (int): Capacity in frames of the input queue of a threaded stage.
+            drop_oldest (bool): If True, the oldest frame is dropped when the input queue of the threaded stage is
+                full.
+        """
+        super().__init__(name, threaded, queue_size, drop_oldest)
+        self._access_key = access_key or os.getenv('PICOVOICE_APIKEY')
+        self._koala = None
+
+    @property
+    def delay_samples(self) -> int:
+        """The number of samples Koala delays the audio by."""
+        return self._koala.delay_sample if self._koala else 0
+
+    def start(self) -> None:
+        if self._koala is None:
+            self._koala = pvkoala.create(access_key=self._access_key)
+        else:
+            self._koala.reset()
+
+    def process(self, frame: np.ndarray):
+        step = self._koala.frame_length
+        if len(frame) % step:
+            raise ValueError(f"Frames of {len(frame)} samples are not a multiple of the Koala frame length {step}.")
+        process = self._koala.process
+        return np.concatenate([np.asarray(process(frame[i:i + step]), dtype=np.int16)
+                               for i in range(0, len(frame), step)])
+
+    def close(self) -> None:
+        if self._koala is not None:
+            self._koala.delete()
+            self._koala = None
+
+
+class WakeWordStage(FrameStage):
+    """
+    Runs Porcupine on every frame and reports detections to a callback.
+    """
+
+    def __init__(self, porcupine, on_detection, name: str = None, threaded: bool = False, queue_size: int = 32,
+                 drop_oldest: bool = False):
+        """
+        Args:
+            porcupine: The Porcupine handle. The stage does not delete it.
+            on_detection (callable): Called with the keyword index of every detection.
+            name (str, optional): Name of the stage.
+            threaded (bool): If True, the stage runs on its own worker thread.
+            queue_size (int): Capacity in frames of the input queue of a threaded stage.
+            drop_oldest (bool): If True, the oldest frame is dropped when the input queue of the threaded stage is
+                full.
+        """
+        super().__init__(name, threaded, queue_size, drop_oldest)
+        self._porcupine = porcupine
+        self._on_detection = on_detection
+
+    def process(self, frame: np.ndarray):
+        keyword_index = self._porcupine.process(frame)
+        if keyword_index >= 0:
+            self._on_detection(keyword_index)
+        return frame
+
+
+class VoiceActivityStage(FrameStage):
+    """
+    Runs Cobra on every frame and reports the voice probability to a callback.
+    """
+
+    def __init__(self, cobra, on_probability, name: str = None, threaded: bool = False, queue_size: int = 32,
+                 drop_oldest: bool = False):
+        """
+        Args:
+            cobra: The Cobra handle. The stage does not delete it.
+            on_probability (callable): Called with the voice probability of every frame.
+            name (str, optional): Name of the stage.
+            threaded (bool): If True, the stage runs on its own worker thread.
+            queue_size (int): Capacity in frames of the input queue of a threaded stage.
+            drop_oldest (bool): If True, the oldest frame is dropped when the input queue of the threaded stage is
+                full.
+        """
+        super().__init__(name, threaded, queue_size, drop_oldest)
+        self._cobra = cobra
+        self._on_probability = on_probability
+
+    def process(self, frame: np.ndarray):
+        self._on_probability(self._cobra.process(frame))
+        return frame
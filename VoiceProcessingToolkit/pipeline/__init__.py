@@ -0,0 +1 @@
+# This __init__.py file makes pipeline a subpackage of VoiceProcessingToolkit.
@@ -1,14 +1,290 @@
+import concurrent.futures
+import importlib
 import logging
+import queue
+import sys
 import threading
+import time
+import weakref
 
 shutdown_flag = threading.Event()
 
 logger = logging.getLogger(__name__)
 
+PA_INT16 = 8  # pyaudio.paInt16, for default arguments that should not import PyAudio
+
+
+class LazyModule:
+    """
+    Stands in for a third-party module and imports it on the first attribute access, so importing the toolkit
+    does not load backends (audio I/O, engines, API clients) a process never uses. Every attribute access goes to
+    the real module, so monkeypatching it still takes effect.
+    """
+
+    def __init__(self, name: str):
+        object.__setattr__(self, '_name', name)
+        object.__setattr__(self, '_module', None)
+
+    def _load(self):
+        module = self._module
+        if module is None:
+            module = importlib.import_module(self._name)  # Thread-safe; raises ImportError if missing
+            object.__setattr__(self, '_module', module)
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name: str):
+    """
+    Returns a module that is imported on first use, or the module itself if it has been imported already.
+
+    Args:
+        name (str): Absolute name of the module, e.g. 'pyaudio'.
+
+    Returns:
+        module or LazyModule: The module or a stand-in that imports it on the first attribute access. A missing
+        module raises ImportError on that access instead of at import time.
+    """
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
+
+
+def resolve_future_threadsafe(loop, future, result=None, error=None):
+    """
+    Completes an asyncio future from another thread, unless it was cancelled or completed in the meantime.
+
+    Args:
+        loop (asyncio.AbstractEventLoop): The loop the future belongs to.
+        future (asyncio.Future): The future to complete.
+        result: The result to set.
+        error (BaseException, optional): If given, set as the exception of the future instead of the result.
+    """
+    def resolve():
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    try:
+        loop.call_soon_threadsafe(resolve)
+    except RuntimeError:
+        logger.debug("Event loop closed before a background result could be delivered.")
+
+
+_pools = weakref.WeakSet()  # Every live WorkerPool, for ThreadManager.stats()
+
+
+class WorkerPool(concurrent.futures.Executor):
+    """
+    A bounded pool of named worker threads that are reused across tasks.
+
+    Workers are started on demand up to max_workers and exit after idle_timeout seconds without work, so bursts of
+    tasks neither start a thread per task nor keep threads alive forever. A pool with max_workers=1 serves as the
+    dedicated capture thread of a component: its real-time loops always run on the same long-lived thread instead
+    of competing with other work.
+
+    Attributes:
+        name (str): Prefix of the worker thread names and name in statistics.
+        max_workers (int): Maximum number of worker threads.
+    """
+
+    def __init__(self, name: str, max_workers: int = 4, idle_timeout: float = 30.0, max_queued_tasks: int = None):
+        """
+        Args:
+            name (str): Prefix of the worker thread names.
+            max_workers (int): Maximum number of worker threads.
+            idle_timeout (float): Seconds after which an idle worker thread exits.
+            max_queued_tasks (int, optional): Maximum number of tasks waiting for a worker. Unbounded if omitted.
+        """
+        if not (isinstance(max_workers, int) and max_workers > 0):
+            raise ValueError("max_workers must be a positive integer")
+        self.name = name
+        self.max_workers = max_workers
+        self._idle_timeout = idle_timeout
+        self._max_queued_tasks = max_queued_tasks
+        self._tasks = queue.Queue()
+        self._lock = threading.Lock()
+        self._workers = set()
+        self._idle_workers = 0
+        self._worker_count = 0
+        self._active_workers = 0
+        self._shutdown = False
+        self.tasks_submitted = 0
+        self.tasks_completed = 0
+        self.tasks_failed = 0
+        self.tasks_rejected = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+        self._run_seconds = 0.0
+        self._max_run_seconds = 0.0
+        _pools.add(self)
+
+    def submit(self, fn, /, *args, **kwargs) -> concurrent.futures.Future:
+        """
+        Schedules fn(*args, **kwargs) on a worker thread.
+
+        Returns:
+            concurrent.futures.Future: The result of the call.
+
+        Raises:
+            RuntimeError: If the pool was shut down or its queue is full.
+        """
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError(f"Worker pool '{self.name}' has been shut down.")
+            if self._max_queued_tasks is not None and self._tasks.qsize() >= self._max_queued_tasks:
+                self.tasks_rejected += 1
+                raise RuntimeError(f"Worker pool '{self.name}' has {self._max_queued_tasks} queued tasks.")
+            future = concurrent.futures.Future()
+            self._tasks.put((future, fn, args, kwargs, time.perf_counter()))
+            self.tasks_submitted += 1
+            # Start a worker unless an idle one can take the task or the bound is reached
+            if self._tasks.qsize() > self._idle_workers and len(self._workers) < self.max_workers:
+                self._worker_count += 1
+                worker = threading.Thread(target=self._work, name=f"{self.name}-{self._worker_count}", daemon=True)
+                self._workers.add(worker)
+                worker.start()
+        return future
+
+    def _work(self) -> None:
+        while True:
+            with self._lock:
+                self._idle_workers += 1
+            try:
+                item = self._tasks.get(timeout=self._idle_timeout)
+            except queue.Empty:
+                with self._lock:
+                    self._idle_workers -= 1
+                    # Exit unless a task was queued while the wait timed out
+                    if self._tasks.empty():
+                        self._workers.discard(threading.current_thread())
+                        return
+                continue
+            with self._lock:
+                self._idle_workers -= 1
+                if item is None:
+                    self._workers.discard(threading.current_thread())
+                    return
+            future, fn, args, kwargs, submitted = item
+            if future.set_running_or_notify_cancel():
+                self._run(future, fn, args, kwargs, submitted)
+            del item, future, fn, args, kwargs
+
+    def _run(self, future, fn, args, kwargs, submitted: float) -> None:
+        started = time.perf_counter()
+        with self._lock:
+            self._active_workers += 1
+        failed = False
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            failed = True
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        finally:
+            finished = time.perf_counter()
+            with self._lock:
+                self._active_workers -= 1
+                self.tasks_completed += 1
+                self.tasks_failed += failed
+                self._wait_seconds += started - submitted
+                self._max_wait_seconds = max(self._max_wait_seconds, started - submitted)
+                self._run_seconds += finished - started
+                self._max_run_seconds = max(self._max_run_seconds, finished - started)
+
+    def in_worker(self) -> bool:
+        """
+        Returns:
+            bool: True if called from one of the worker threads of this pool.
+        """
+        return threading.current_thread() in self._workers
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        """
+        Stops the worker threads once the queued tasks are done. No tasks can be submitted afterwards.
+
+        Args:
+            wait (bool): If True, waits for the worker threads to exit.
+            cancel_futures (bool): If True, cancels the tasks that have not started yet.
+        """
+        with self._lock:
+            self._shutdown = True
+            if cancel_futures:
+                while True:
+                    try:
+                        item = self._tasks.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not None:
+                        item[0].cancel()
+            workers = list(self._workers)
+            for _ in workers:
+                self._tasks.put(None)
+        if wait:
+            for worker in workers:
+                if worker is not threading.current_thread():
+                    worker.join()
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: The number of worker threads and of those running a task, the number of queued tasks, task
+            counters, and the mean and maximum time in seconds tasks waited in the queue and ran.
+        """
+        with self._lock:
+            completed = self.tasks_completed
+            return {
+                'name': self.name,
+                'max_workers': self.max_workers,
+                'workers': len(self._workers),
+                'active_workers': self._active_workers,
+                'queue_length': self._tasks.qsize(),
+                'tasks_submitted': self.tasks_submitted,
+                'tasks_completed': completed,
+                'tasks_failed': self.tasks_failed,
+                'tasks_rejected': self.tasks_rejected,
+                'mean_wait_seconds': self._wait_seconds / completed if completed else 0.0,
+                'max_wait_seconds': self._max_wait_seconds,
+                'mean_run_seconds': self._run_seconds / completed if completed else 0.0,
+                'max_run_seconds': self._max_run_seconds,
+            }
+
+
 class ThreadManager:
-    def __init__(self):
+    def __init__(self, max_workers: int = 8):
         self.threads = []
         self.shutdown_requested = False
+        # Shared pool for short tasks of all components, e.g. synchronous wake word actions
+        self.worker_pool = WorkerPool('VoiceProcessingToolkit-worker', max_workers=max_workers)
+
+    def submit(self, fn, /, *args, **kwargs) -> concurrent.futures.Future:
+        """
+        Runs a function on the shared worker pool.
+
+        Returns:
+            concurrent.futures.Future: The result of the call.
+        """
+        return self.worker_pool.submit(fn, *args, **kwargs)
+
+    def stats(self) -> list:
+        """
+        Returns:
+            list: Statistics of every live worker pool (see WorkerPool.stats()), the shared pool first.
+        """
+        pools = sorted(_pools, key=lambda pool: (pool is not self.worker_pool, pool.name))
+        return [pool.stats() for pool in pools]
 
     def add_thread(self, thread):
         if thread and isinstance(thread, threading.Thread):
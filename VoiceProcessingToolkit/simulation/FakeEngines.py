@@ -0,0 +1,117 @@
+"""
+FakeEngines
+------------------------
+
+Stand-ins for the Picovoice engines, so the toolkit can run without access keys or engine libraries, e.g. in
+benchmarks and load tests. FakePorcupine and FakeCobra spend a configurable amount of CPU time per call, like the
+real engines do. patch_engines() makes pvporcupine.create() and pvcobra.create() return them.
+
+Example:
+    ```python
+    with patch_engines(cobra_cost=0.0002):
+        recorder = AudioRecorder(access_key='unused')
+    ```
+"""
+
+import contextlib
+import time
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+FRAME_LENGTH = 512
+
+
+def busy_wait(seconds: float) -> None:
+    """
+    Spends the given time on the CPU, like an engine call does; sleeping would release the GIL.
+    """
+    if seconds <= 0:
+        return
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+class FakePorcupine:
+    """
+    Mimics a Porcupine handle. Reports the wake word every detect_every calls, or never if it is 0.
+    """
+
+    def __init__(self, cost: float = 0.0, detect_every: int = 0, frame_length: int = FRAME_LENGTH,
+                 sample_rate: int = SAMPLE_RATE):
+        self.frame_length = frame_length
+        self.sample_rate = sample_rate
+        self.calls = 0
+        self._cost = cost
+        self._detect_every = detect_every
+
+    def process(self, pcm) -> int:
+        self.calls += 1
+        busy_wait(self._cost)
+        if self._detect_every and self.calls % self._detect_every == 0:
+            return 0
+        return -1
+
+    def delete(self) -> None:
+        pass
+
+
+class FakeCobra:
+    """
+    Mimics a Cobra handle. The voice probability follows the frame's mean absolute amplitude, so speech in
+    synthetic or recorded audio is detected.
+    """
+
+    def __init__(self, cost: float = 0.0, voice_level: float = 500.0, frame_length: int = FRAME_LENGTH,
+                 sample_rate: int = SAMPLE_RATE):
+        self.frame_length = frame_length
+        self.sample_rate = sample_rate
+        self.calls = 0
+        self._cost = cost
+        self._voice_level = voice_level
+
+    def process(self, pcm) -> float:
+        self.calls += 1
+        busy_wait(self._cost)
+        level = np.abs(np.asarray(pcm, dtype=np.int16)).mean()
+        return 0.95 if level >= self._voice_level else 0.05
+
+    def delete(self) -> None:
+        pass
+
+
+@contextlib.contextmanager
+def patch_engines(porcupine_cost: float = 0.0, cobra_cost: float = 0.0, detect_every: int = 0):
+    """
+    Makes pvporcupine.create() and pvcobra.create() return fake engines while the context is active.
+
+    Args:
+        porcupine_cost (float): CPU seconds spent per Porcupine call.
+        cobra_cost (float): CPU seconds spent per Cobra call.
+        detect_every (int): Report the wake word every this many Porcupine calls; 0 never does.
+
+    Yields:
+        dict: The engines created so far, under 'porcupine' and 'cobra' (lists).
+    """
+    import pvcobra
+    import pvporcupine
+
+    created = {'porcupine': [], 'cobra': []}
+    original = pvporcupine.create, pvcobra.create
+
+    def create_porcupine(**kwargs):
+        engine = FakePorcupine(porcupine_cost, detect_every)
+        created['porcupine'].append(engine)
+        return engine
+
+    def create_cobra(**kwargs):
+        engine = FakeCobra(cobra_cost)
+        created['cobra'].append(engine)
+        return engine
+
+    pvporcupine.create, pvcobra.create = create_porcupine, create_cobra
+    try:
+        yield created
+    finally:
+        pvporcupine.create, pvcobra.create = original
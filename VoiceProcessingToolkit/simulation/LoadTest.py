@@ -0,0 +1,243 @@
+"""
+LoadTest
+------------------------
+
+Replays concurrent simulated voice sessions through VoiceProcessingManager against the mock APIs, to find out how
+many sessions a machine sustains and where the latency of a turn goes under load.
+
+Every session is a VoiceProcessingManager of its own, listening without a wake word to simulated audio paced in
+real time (see SimulatedAudio), with fake Cobra engines and with transcription and text-to-speech requests sent to
+a MockAPIServer. Sessions run listen_forever() on their own threads until each has delivered the requested number
+of transcriptions. The report gives the throughput in turns per second, the number of failed turns and, per stage
+span of the turn traces (see monitoring.TurnTrace), the 50th, 90th and 99th percentile latency.
+
+Usage:
+    python -m VoiceProcessingToolkit.simulation.LoadTest --sessions 8 --turns 5 \\
+        --transcription-latency lognormal:0.4,0.3 --speech-latency uniform:0.1,0.3 --error-rate 0.02 --json load.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from VoiceProcessingToolkit.monitoring.TurnTrace import TurnTraceAggregator
+from VoiceProcessingToolkit.simulation.FakeEngines import patch_engines
+from VoiceProcessingToolkit.simulation.MockServer import LatencyDistribution, MockAPIServer
+from VoiceProcessingToolkit.simulation.SimulatedAudio import SimulatedAudioStream, load_wav
+
+logger = logging.getLogger(__name__)
+
+# Spans shown by format_report(), in this order
+REPORTED_SPANS = ('speech_onset', 'endpointing_tail', 'wav_write', 'transcription', 'tts_first_byte', 'response',
+                  'total')
+
+
+class _Session:
+    """
+    One simulated user: a manager, the thread driving it and what it delivered.
+    """
+
+    def __init__(self, index: int, manager):
+        self.index = index
+        self.manager = manager
+        self.completed = 0
+        self.error = None
+        self.generator = None
+        self.thread = None
+
+    def run(self, turns: int, start_delay: float, tts: bool, streaming: bool) -> None:
+        time.sleep(start_delay)
+        try:
+            # The generator is closed by run_load_test() once all sessions are done, because closing a manager
+            # also stops the shared background threads the other sessions still use.
+            self.generator = self.manager.listen_forever(tts=tts, streaming=streaming, api_key='load-test')
+            for _ in self.generator:
+                self.completed += 1
+                if self.completed >= turns:
+                    break
+        except Exception as e:
+            logger.exception("Session %d failed.", self.index, exc_info=e)
+            self.error = e
+
+
+def run_load_test(sessions: int = 4, turns: int = 5, server: MockAPIServer = None, base_url: str = None,
+                  audio=None, tts: bool = True, streaming: bool = True, ramp_up: float = 2.0,
+                  cobra_cost: float = 0.0, inactivity_limit: float = 0.5, min_recording_length: float = 1.0) -> dict:
+    """
+    Runs concurrent simulated sessions until each has delivered the given number of transcriptions.
+
+    Args:
+        sessions (int): Number of concurrent sessions.
+        turns (int): Transcriptions each session delivers; turns whose requests fail are repeated.
+        server (MockAPIServer, optional): Server to send the requests to. If neither server nor base_url is given,
+            a MockAPIServer without latency or errors is started for the run.
+        base_url (str, optional): Base URL of an already running mock server, e.g. 'http://127.0.0.1:8080'.
+        audio (np.ndarray, optional): 16 kHz mono clip every session replays. Defaults to synthetic speech.
+        tts (bool): If True, every transcription is also synthesized, without playback.
+        streaming (bool): If True, use the streaming text-to-speech endpoint. Only relevant if tts is True.
+        ramp_up (float): Seconds over which the session starts are spread, so their requests do not all arrive
+            at once.
+        cobra_cost (float): CPU seconds the fake Cobra engine spends per frame.
+        inactivity_limit (float): Seconds of silence that end a recording.
+        min_recording_length (float): Minimum length of a recording in seconds.
+
+    Returns:
+        dict: The parameters, elapsed seconds, the number of turns, of turns that produced a recording, of
+        completed turns and of recorded turns that failed, throughput in completed turns per second, session
+        errors, the server's request and error counts (unless base_url was given) and the span percentiles of all
+        turns.
+
+    Raises:
+        ValueError: If sessions or turns is not a positive integer.
+    """
+    if not (isinstance(sessions, int) and sessions > 0):
+        raise ValueError("sessions must be a positive integer")
+    if not (isinstance(turns, int) and turns > 0):
+        raise ValueError("turns must be a positive integer")
+    # Imported here so that the mock server and simulated audio can be used without the manager's dependencies
+    from VoiceProcessingToolkit.VoiceProcessingManager import VoiceProcessingManager
+    from VoiceProcessingToolkit.transcription.whisper import WhisperTranscriber
+    from VoiceProcessingToolkit.wake_word_detector.ActionManager import ActionManager
+
+    own_server = server is None and base_url is None
+    if own_server:
+        server = MockAPIServer()
+    api_url = (base_url or server.url).rstrip('/') + '/v1'
+    aggregator = TurnTraceAggregator(max_turns=max(1000, 4 * sessions * turns))
+    recorded = []  # Turns that produced a recording
+    lock = threading.Lock()
+
+    def collect(trace):
+        with lock:
+            aggregator.add(trace)
+            if 'wav_written' in trace.marks:
+                recorded.append(trace.turn)
+
+    runs = []
+    try:
+        with tempfile.TemporaryDirectory() as output_root, patch_engines(cobra_cost=cobra_cost):
+            for index in range(sessions):
+                manager = VoiceProcessingManager(
+                    transcriber=WhisperTranscriber(base_url=api_url, api_key='load-test'),
+                    action_manager=ActionManager(),
+                    audio_stream_manager=SimulatedAudioStream(audio, real_time=True),
+                    use_wake_word=False,
+                    output_directory=os.path.join(output_root, f'session_{index}'),
+                    inactivity_limit=inactivity_limit,
+                    min_recording_length=min_recording_length,
+                    trace_callback=collect,
+                    elevenlabs_base_url=api_url,
+                    tts_playback=False,
+                )
+                runs.append(_Session(index, manager))
+
+            started = time.monotonic()
+            for session in runs:
+                start_delay = ramp_up * session.index / sessions
+                session.thread = threading.Thread(target=session.run, args=(turns, start_delay, tts, streaming),
+                                                  name=f'LoadTest-session-{session.index}', daemon=True)
+                session.thread.start()
+            for session in runs:
+                session.thread.join()
+            elapsed = time.monotonic() - started
+            for session in runs:
+                if session.generator is not None:
+                    session.generator.close()
+    finally:
+        if own_server:
+            server.stop()
+
+    completed = sum(session.completed for session in runs)
+    report = {
+        'parameters': {'sessions': sessions, 'turns': turns, 'tts': tts, 'streaming': streaming,
+                       'ramp_up': ramp_up, 'cobra_cost': cobra_cost, 'inactivity_limit': inactivity_limit,
+                       'min_recording_length': min_recording_length, 'api_url': api_url},
+        'elapsed_seconds': elapsed,
+        'turns': aggregator.turns,
+        'recorded_turns': len(recorded),
+        'completed_turns': completed,
+        'failed_turns': max(0, len(recorded) - completed),
+        'turns_per_second': completed / elapsed if elapsed > 0 else 0.0,
+        'session_errors': [f'session {session.index}: {session.error!r}' for session in runs if session.error],
+        'spans': aggregator.summary(),
+    }
+    if server is not None:
+        report['server'] = {'requests': server.requests, 'errors': server.errors}
+    return report
+
+
+def format_report(report: dict) -> str:
+    """
+    Returns:
+        str: A report of run_load_test() as a human-readable table, latencies in milliseconds.
+    """
+    lines = [
+        f"{report['parameters']['sessions']} sessions, {report['completed_turns']} of {report['recorded_turns']} "
+        f"recorded turns completed in {report['elapsed_seconds']:.1f} s: {report['turns_per_second']:.2f} turns/s, "
+        f"{report['failed_turns']} failed",
+    ]
+    if 'server' in report:
+        lines.append(f"Server: {report['server']['requests']} requests, {report['server']['errors']} injected errors")
+    lines.extend(report['session_errors'])
+    lines.append(f"{'span':<18}{'count':>7}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}")
+    for name in REPORTED_SPANS:
+        span = report['spans'].get(name)
+        if span is None:
+            continue
+        lines.append(f"{name:<18}{span['count']:>7}" + ''.join(f"{span[key] * 1000:>10.1f}"
+                                                            for key in ('p50', 'p90', 'p99', 'max')))
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replays concurrent simulated voice sessions against mock "
+                                                 "transcription and text-to-speech APIs.")
+    parser.add_argument('--sessions', type=int, default=4, help="Number of concurrent sessions")
+    parser.add_argument('--turns', type=int, default=5, help="Transcriptions per session")
+    parser.add_argument('--base-url', help="Use an already running mock server instead of starting one")
+    parser.add_argument('--transcription-latency', default='0', help="e.g. 0.5, uniform:0.2,0.8, lognormal:0.4,0.3")
+    parser.add_argument('--speech-latency', default='0', help="Delay until the first byte of speech")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of requests answered with an error")
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--audio-bytes', type=int, default=32000, help="Size of every speech response")
+    parser.add_argument('--chunk-interval', type=float, default=0.0, help="Seconds between streamed speech chunks")
+    parser.add_argument('--seed', type=int, help="Seed for latencies and errors")
+    parser.add_argument('--no-tts', action='store_true', help="Only transcribe")
+    parser.add_argument('--no-streaming', action='store_true', help="Use the non-streaming speech endpoint")
+    parser.add_argument('--ramp-up', type=float, default=2.0, help="Seconds over which sessions start")
+    parser.add_argument('--cobra-cost-us', type=float, default=0.0, help="CPU time of the fake Cobra per frame")
+    parser.add_argument('--inactivity-limit', type=float, default=0.5)
+    parser.add_argument('--wav', help="16 kHz mono WAV file to replay instead of synthetic speech")
+    parser.add_argument('--json', help="Write the report to this file")
+    args = parser.parse_args()
+    if not 0.0 <= args.error_rate < 1.0:
+        parser.error("--error-rate must be at least 0 and below 1")
+    logging.basicConfig(level=logging.WARNING)
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')  # No sound device is needed
+
+    server = None
+    if args.base_url is None:
+        server = MockAPIServer(transcription_latency=LatencyDistribution.parse(args.transcription_latency, args.seed),
+                               speech_latency=LatencyDistribution.parse(args.speech_latency, args.seed),
+                               error_rate=args.error_rate, error_status=args.error_status,
+                               audio_bytes=args.audio_bytes, chunk_interval=args.chunk_interval, seed=args.seed)
+    try:
+        report = run_load_test(args.sessions, args.turns, server=server, base_url=args.base_url,
+                               audio=load_wav(args.wav) if args.wav else None, tts=not args.no_tts,
+                               streaming=not args.no_streaming, ramp_up=args.ramp_up,
+                               cobra_cost=args.cobra_cost_us / 1e6, inactivity_limit=args.inactivity_limit)
+    finally:
+        if server is not None:
+            server.stop()
+    print(format_report(report))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,255 @@
+"""
+MockServer
+------------------------
+
+A local stand-in for the OpenAI transcription and ElevenLabs text-to-speech APIs, for load tests, benchmarks and
+offline development. Point the toolkit at it with the base URL parameters (or the OPENAI_BASE_URL and
+ELEVENLABS_BASE_URL environment variables):
+
+    - POST {url}/v1/audio/translations and /v1/audio/transcriptions return {"text": ...} like the Whisper API.
+    - POST {url}/v1/text-to-speech/<voice_id> returns audio/mpeg bytes like ElevenLabs, and
+      /v1/text-to-speech/<voice_id>/stream sends them in chunks.
+
+Every response is delayed by a latency drawn from a LatencyDistribution, and a configurable share of requests
+fails with an error status, so clients see the same spread of response times and errors as in production.
+
+Example:
+    ```python
+    with MockAPIServer(transcription_latency=LatencyDistribution.parse('lognormal:0.4,0.3'), error_rate=0.01) as server:
+        vpm = VoiceProcessingManager.create_default_instance(openai_base_url=server.url + '/v1',
+                                                              elevenlabs_base_url=server.url + '/v1')
+    ```
+
+Run `python -m VoiceProcessingToolkit.simulation.MockServer --port 8080` to serve it on its own.
+"""
+
+import argparse
+import http.server
+import json
+import logging
+import random
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_TRANSCRIPTION_PATH = re.compile(r'/v1/audio/(translations|transcriptions)')
+_SPEECH_PATH = re.compile(r'/v1/text-to-speech/[^/]+')
+_SPEECH_STREAM_PATH = re.compile(r'/v1/text-to-speech/[^/]+/stream')
+
+
+class LatencyDistribution:
+    """
+    Random response latencies in seconds.
+
+    Kinds and their parameters:
+        'fixed': (seconds,)
+        'uniform': (low, high)
+        'normal': (mean, standard deviation), truncated at 0
+        'lognormal': (median, sigma of the underlying normal distribution), for the long tails of real APIs
+    """
+
+    KINDS = {'fixed': 1, 'uniform': 2, 'normal': 2, 'lognormal': 2}
+
+    def __init__(self, kind: str = 'fixed', *params: float, seed: int = None):
+        """
+        Raises:
+            ValueError: If the kind is unknown or has the wrong number of parameters.
+        """
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution {kind!r}; use one of {', '.join(self.KINDS)}.")
+        if len(params) != self.KINDS[kind]:
+            raise ValueError(f"A {kind} latency distribution takes {self.KINDS[kind]} parameter(s).")
+        self.kind = kind
+        self.params = params
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, spec: str, seed: int = None) -> 'LatencyDistribution':
+        """
+        Creates a distribution from a 'kind:param,param' string, e.g. 'lognormal:0.4,0.3'. A plain number is a
+        fixed latency.
+        """
+        kind, _, params = spec.partition(':')
+        try:
+            if not params:
+                return cls('fixed', float(kind), seed=seed)
+            return cls(kind, *(float(param) for param in params.split(',')), seed=seed)
+        except ValueError as e:
+            raise ValueError(f"Invalid latency distribution {spec!r}: {e}") from e
+
+    def sample(self) -> float:
+        params = self.params
+        with self._lock:  # random.Random is not safe to share between the server threads
+            if self.kind == 'fixed':
+                return params[0]
+            if self.kind == 'uniform':
+                return self._random.uniform(*params)
+            if self.kind == 'normal':
+                return max(0.0, self._random.gauss(*params))
+            return params[0] * self._random.lognormvariate(0.0, params[1])
+
+    def __repr__(self):
+        return f"{self.kind}:{','.join(str(param) for param in self.params)}"
+
+
+class MockAPIServer:
+    """
+    Serves the mock transcription and text-to-speech APIs on a local port, on background threads.
+
+    Attributes:
+        url (str): Base URL of the server without the API version, e.g. 'http://127.0.0.1:50123'.
+        requests (int): Number of requests answered.
+        errors (int): Number of requests answered with an injected error.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, transcription_latency: LatencyDistribution = None,
+                 speech_latency: LatencyDistribution = None, error_rate: float = 0.0, error_status: int = 503,
+                 audio_bytes: int = 32000, chunk_size: int = 4096, chunk_interval: float = 0.0,
+                 text: str = 'This is a simulated transcription.', seed: int = None):
+        """
+        Args:
+            host (str): Address to listen on. Defaults to localhost only.
+            port (int): Port to listen on; 0 picks a free port.
+            transcription_latency (LatencyDistribution, optional): Delay of transcription responses. Defaults to
+                none.
+            speech_latency (LatencyDistribution, optional): Delay until the first byte of speech. Defaults to
+                none.
+            error_rate (float): Share of requests, between 0 and 1, answered with error_status instead.
+            error_status (int): HTTP status of injected errors, e.g. 429 or 503.
+            audio_bytes (int): Size of every synthesized speech response.
+            chunk_size (int): Size of the chunks of streamed speech.
+            chunk_interval (float): Delay between streamed chunks in seconds.
+            text (str): Text of every transcription.
+            seed (int, optional): Seed for latencies and error injection, for repeatable runs.
+        """
+        self.transcription_latency = transcription_latency or LatencyDistribution('fixed', 0.0)
+        self.speech_latency = speech_latency or LatencyDistribution('fixed', 0.0)
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        audio = bytes(random.Random(seed).getrandbits(8) for _ in range(audio_bytes))
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive, as the real APIs
+            disable_nagle_algorithm = True  # Headers and body are separate writes
+
+            def do_POST(self):
+                self._read_body()
+                path = self.path.split('?')[0]
+                if _TRANSCRIPTION_PATH.fullmatch(path):
+                    latency = server.transcription_latency
+                elif _SPEECH_PATH.fullmatch(path) or _SPEECH_STREAM_PATH.fullmatch(path):
+                    latency = server.speech_latency
+                else:
+                    self._send(404, 'application/json', b'{"detail": "Not found"}')
+                    return
+                failed = server._count_request()
+                time.sleep(latency.sample())
+                if failed:
+                    body = json.dumps({'error': {'message': 'Injected error', 'code': error_status}})
+                    self._send(error_status, 'application/json', body.encode('utf-8'))
+                elif latency is server.transcription_latency:
+                    self._send(200, 'application/json', json.dumps({'text': text}).encode('utf-8'))
+                elif path.endswith('/stream'):
+                    self._send_chunked(audio)
+                else:
+                    self._send(200, 'audio/mpeg', audio)
+
+            def _read_body(self):
+                if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+                    while True:
+                        size = int(self.rfile.readline().split(b';')[0], 16)
+                        self.rfile.read(size + 2)
+                        if size == 0:
+                            return
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+            def _send(self, status, content_type, body):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_chunked(self, body):
+                self.send_response(200)
+                self.send_header('Content-Type', 'audio/mpeg')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                for i in range(0, len(body), chunk_size):
+                    if i:
+                        time.sleep(chunk_interval)
+                    chunk = body[i:i + chunk_size]
+                    self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+                    self.wfile.flush()
+                self.wfile.write(b'0\r\n\r\n')
+
+            def log_message(self, format, *args):
+                logger.debug("Mock API request: " + format, *args)
+
+        self._server = http.server.ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.url = 'http://%s:%d' % self._server.server_address[:2]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='MockAPIServer', daemon=True)
+        self._thread.start()
+        logger.info("Serving the mock APIs on %s", self.url)
+
+    def _count_request(self) -> bool:
+        """
+        Counts a request and decides whether it gets an injected error.
+        """
+        with self._lock:
+            self.requests += 1
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+            return failed
+
+    def stop(self) -> None:
+        """
+        Stops the server and closes its socket.
+        """
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serves mock OpenAI transcription and ElevenLabs text-to-speech "
+                                                 "APIs on a local port.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--transcription-latency', default='0', help="e.g. 0.5, uniform:0.2,0.8, lognormal:0.4,0.3")
+    parser.add_argument('--speech-latency', default='0', help="Delay until the first byte of speech")
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--audio-bytes', type=int, default=32000)
+    parser.add_argument('--chunk-interval', type=float, default=0.0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    server = MockAPIServer(args.host, args.port, LatencyDistribution.parse(args.transcription_latency),
+                           LatencyDistribution.parse(args.speech_latency), args.error_rate, args.error_status,
+                           args.audio_bytes, chunk_interval=args.chunk_interval)
+    print(f"OPENAI_BASE_URL={server.url}/v1 ELEVENLABS_BASE_URL={server.url}/v1")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
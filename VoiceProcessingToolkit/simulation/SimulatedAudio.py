@@ -0,0 +1,163 @@
+"""
+SimulatedAudio
+------------------------
+
+Synthetic or file-based 16 kHz mono audio served like a microphone, so the toolkit can run headless.
+
+SimulatedAudioStream stands in for AudioStream and can be passed to VoiceProcessingManager or WakeWordDetector as
+the audio stream manager; SimulatedAudioDataProvider stands in for the recorder's AudioDataProvider. Both replay a
+clip in a loop, either as fast as they are read or paced in real time like a device.
+"""
+
+import time
+import wave
+
+import numpy as np
+
+from VoiceProcessingToolkit.wake_word_detector.AudioStreamManager import AudioRingBuffer
+
+SAMPLE_RATE = 16000
+FRAME_LENGTH = 512
+
+
+def synthetic_speech(silence_before: float = 0.5, speech: float = 2.0, silence_after: float = 1.5,
+                     seed: int = 0) -> np.ndarray:
+    """
+    Returns 16 kHz mono audio: low background noise around a burst of loud, syllable-modulated tones.
+    """
+    rng = np.random.default_rng(seed)
+    total = int((silence_before + speech + silence_after) * SAMPLE_RATE)
+    audio = rng.normal(0, 30, total)
+    start, length = int(silence_before * SAMPLE_RATE), int(speech * SAMPLE_RATE)
+    t = np.arange(length) / SAMPLE_RATE
+    syllables = 0.6 + 0.4 * np.sin(2 * np.pi * 4 * t)
+    audio[start:start + length] += 4000 * syllables * (np.sin(2 * np.pi * 180 * t) + 0.5 * np.sin(2 * np.pi * 360 * t))
+    return np.clip(audio, -32768, 32767).astype(np.int16)
+
+
+def load_wav(path: str) -> np.ndarray:
+    """
+    Loads a 16-bit, 16 kHz mono WAV file.
+
+    Raises:
+        ValueError: If the file has another format.
+    """
+    with wave.open(path, 'rb') as wf:
+        if wf.getsampwidth() != 2 or wf.getnchannels() != 1 or wf.getframerate() != SAMPLE_RATE:
+            raise ValueError(f"{path} must be 16-bit mono audio at {SAMPLE_RATE} Hz.")
+        return np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+
+
+def split_frames(audio: np.ndarray, frame_length: int = FRAME_LENGTH) -> list:
+    """
+    Returns the complete frames of an audio clip as bytes.
+    """
+    usable = len(audio) - len(audio) % frame_length
+    data = audio[:usable].tobytes()
+    frame_bytes = frame_length * 2
+    return [data[i:i + frame_bytes] for i in range(0, len(data), frame_bytes)]
+
+
+class _FrameClock:
+    """
+    Hands out the frames of an audio clip in order, starting over at the end. When real_time is set, a frame is
+    only returned once a device would have captured it.
+    """
+
+    def __init__(self, audio: np.ndarray, frame_length: int, real_time: bool):
+        self.frames = split_frames(audio, frame_length)
+        self.served = 0
+        self._frame_seconds = frame_length / SAMPLE_RATE
+        self._real_time = real_time
+        self._started = None
+        self._served_at_start = 0
+
+    def restart(self) -> None:
+        """Starts pacing from now, as if the audio captured while nobody was reading had been discarded."""
+        self._started = None
+
+    def next(self) -> bytes:
+        if self._real_time:
+            if self._started is None:
+                self._started, self._served_at_start = time.monotonic(), self.served
+            due = self._started + (self.served - self._served_at_start + 1) * self._frame_seconds
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        frame = self.frames[self.served % len(self.frames)]
+        self.served += 1
+        return frame
+
+
+class SimulatedAudioStream:
+    """
+    Serves audio in place of AudioStream, updating a rolling buffer on every read as AudioStream does.
+    """
+
+    def __init__(self, audio: np.ndarray = None, frame_length: int = FRAME_LENGTH, real_time: bool = False,
+                 buffer_seconds: float = 5.0):
+        """
+        Args:
+            audio (np.ndarray, optional): 16 kHz mono clip to replay in a loop. Defaults to synthetic_speech().
+            frame_length (int): Number of samples per frame returned by read().
+            real_time (bool): If True, reads block until a device would have captured the frame.
+            buffer_seconds (float): Duration of the rolling buffer.
+        """
+        self.frame_length = frame_length
+        self.sample_rate = SAMPLE_RATE
+        self.rolling_buffer = AudioRingBuffer(int(buffer_seconds * SAMPLE_RATE))
+        self._clock = _FrameClock(synthetic_speech() if audio is None else audio, frame_length, real_time)
+
+    @property
+    def frames_read(self) -> int:
+        return self._clock.served
+
+    @property
+    def position(self) -> int:
+        return self.rolling_buffer.position
+
+    def read(self) -> bytes:
+        frame = self._clock.next()
+        self.rolling_buffer.write(frame)
+        return frame
+
+    def get_audio_since(self, position: int) -> bytes:
+        return self.rolling_buffer.read(position, self.position).tobytes()
+
+    def conversion_stats(self) -> dict:
+        return None
+
+    def reopen(self) -> None:
+        pass
+
+    def discard_pending(self) -> int:
+        self._clock.restart()
+        return 0
+
+    def is_stream_closed(self) -> bool:
+        return False
+
+    def cleanup(self) -> None:
+        self._clock.restart()
+
+
+class SimulatedAudioDataProvider:
+    """
+    Serves audio to AudioRecorder in place of AudioDataProvider.
+    """
+
+    def __init__(self, audio: np.ndarray = None, frame_length: int = FRAME_LENGTH, real_time: bool = False):
+        self._clock = _FrameClock(synthetic_speech() if audio is None else audio, frame_length, real_time)
+
+    @property
+    def frames_read(self) -> int:
+        return self._clock.served
+
+    def start_stream(self) -> None:
+        self._clock.restart()
+
+    def get_next_frame(self) -> bytes:
+        return self._clock.next()
+
+    def stop_stream(self) -> None:
+        pass
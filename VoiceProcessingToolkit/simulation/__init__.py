@@ -0,0 +1 @@
+# This __init__.py file makes simulation a subpackage of VoiceProcessingToolkit.
@@ -0,0 +1,576 @@
+"""
+SegmentArchive
+------------------------
+
+Archive of recorded commands, wake word snippets and their transcripts in a few large files.
+
+Audio is appended as 16-bit mono PCM to segment files of up to segment_bytes each, and every utterance gets a row
+in an SQLite index with its segment, offset and size, kind, start time, duration, sample rate, wake word,
+voice activity statistics, transcript and free-form metadata. Any utterance can be looked up and exported as a
+WAV file without scanning directories of small files.
+
+The voice loops only pay for a non-blocking queue put: appends, index updates and transcripts are applied in
+order on a single writer thread, and an utterance id is returned at once so the transcript can be attached
+later. A full segment is sealed and handed to a compaction thread, which rewrites it with every utterance
+compressed on its own (zlib), drops deleted utterances and then removes the original file. Sealed segments in
+which deleted utterances take up most of the space are rewritten by compact().
+
+Layout of the archive directory:
+    - index.sqlite3: The index.
+    - segments/<number>.seg: The segment files.
+
+Example:
+    ```python
+    archive = SegmentArchive('voice_archive')
+    utterance_id = archive.add(pcm_bytes, kind='command', vad_stats=recorder.vad_stats())
+    archive.set_transcript(utterance_id, 'turn on the lights')
+    for utterance in archive.find(text='lights', limit=10):
+        archive.export_wav(utterance['id'], f"{utterance['id']}.wav")
+    ```
+
+Run `python -m VoiceProcessingToolkit.storage.SegmentArchive voice_archive list --text lights` to search an archive
+from the command line, and `... export 12 13 --output exported` to write utterances as WAV files.
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import wave
+import zlib
+
+from VoiceProcessingToolkit.monitoring.Metrics import metrics
+from VoiceProcessingToolkit.shared_resources import WorkerPool
+
+logger = logging.getLogger(__name__)
+
+_utterances_archived = metrics.counter('voice_processing_archive_utterances_total',
+                                       'Utterances appended to the segment archive.')
+_utterances_dropped = metrics.counter('voice_processing_archive_dropped_total',
+                                      'Utterances not archived because the archive writer queue was full.')
+_segments_compacted = metrics.counter('voice_processing_archive_segments_compacted_total',
+                                      'Archive segments rewritten by compaction.')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    sealed INTEGER NOT NULL DEFAULT 0,
+    compacted INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS utterances (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    created REAL NOT NULL,
+    segment INTEGER NOT NULL,
+    data_offset INTEGER NOT NULL,
+    data_size INTEGER NOT NULL,
+    codec TEXT NOT NULL,
+    sample_rate INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    wake_word TEXT,
+    transcript TEXT,
+    vad_frames INTEGER,
+    voiced_frames INTEGER,
+    mean_voice_probability REAL,
+    max_voice_probability REAL,
+    metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS utterances_created ON utterances (created);
+CREATE INDEX IF NOT EXISTS utterances_segment ON utterances (segment, data_offset);
+"""
+
+# Columns returned by get() and find(); the storage location is internal
+_COLUMNS = ('id', 'kind', 'created', 'duration', 'sample_rate', 'wake_word', 'transcript', 'vad_frames',
+            'voiced_frames', 'mean_voice_probability', 'max_voice_probability', 'metadata')
+
+
+class SegmentArchive:
+    """
+    Appends utterances to large segment files indexed in SQLite, with background compaction and compression.
+
+    Attributes:
+        directory (str): The archive directory.
+        dropped (int): Number of utterances not archived because the writer queue was full.
+        closed (bool): Whether close() was called. A closed archive cannot be read from or written to.
+    """
+
+    INDEX_NAME = 'index.sqlite3'
+    SEGMENT_DIRECTORY = 'segments'
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 2 ** 20, compress: bool = True,
+                 compression_level: int = 6, garbage_ratio: float = 0.5, max_queued_writes: int = 256):
+        """
+        Opens an archive, creating it if needed. Audio appended to the open segment after the last index update
+        that reached the disk, e.g. before a crash, is truncated.
+
+        Args:
+            directory (str): Directory of the index and the segment files.
+            segment_bytes (int): Size at which a segment is sealed and a new one is started.
+            compress (bool): If True, sealed segments are rewritten with every utterance compressed with zlib.
+            compression_level (int): zlib compression level, from 1 (fastest) to 9 (smallest).
+            garbage_ratio (float): Share of a sealed segment taken up by deleted utterances at which compact()
+                rewrites it.
+            max_queued_writes (int): Maximum number of writes waiting for the writer thread; utterances added while
+                the queue is full are dropped.
+
+        Raises:
+            ValueError: If segment_bytes is not positive or compression_level is out of range.
+        """
+        if not (isinstance(segment_bytes, int) and segment_bytes > 0):
+            raise ValueError("segment_bytes must be a positive integer")
+        if not 1 <= compression_level <= 9:
+            raise ValueError("compression_level must be between 1 and 9")
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.compress = compress
+        self.compression_level = compression_level
+        self.garbage_ratio = garbage_ratio
+        self.dropped = 0
+        self._segment_directory = os.path.join(directory, self.SEGMENT_DIRECTORY)
+        os.makedirs(self._segment_directory, exist_ok=True)
+        # One connection shared by the caller, writer and compaction threads, serialized by the lock
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(os.path.join(directory, self.INDEX_NAME), check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(_SCHEMA)
+        self._id_lock = threading.Lock()
+        self._next_id = (self._db.execute('SELECT MAX(id) FROM utterances').fetchone()[0] or 0) + 1
+        self._segment = None  # Number of the open segment
+        self._segment_file = None
+        self._segment_size = 0
+        self._recover()
+        self._writer = WorkerPool('SegmentArchive-writer', max_workers=1, max_queued_tasks=max_queued_writes)
+        self._compactor = WorkerPool('SegmentArchive-compaction', max_workers=1)
+        self.closed = False
+        for segment in self._segments_to_compact():
+            self._compactor.submit(self._compact_segment, segment)
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self._segment_directory, f'{segment:06d}.seg')
+
+    def _recover(self) -> None:
+        """
+        Removes segments left without utterances, e.g. by an interrupted compaction, and reopens the open segment,
+        truncated to the end of its last indexed utterance.
+        """
+        with self._lock:
+            empty = [segment for segment, in self._db.execute(
+                'SELECT id FROM segments WHERE sealed = 1 AND id NOT IN (SELECT DISTINCT segment FROM utterances)')]
+            for segment in empty:
+                self._remove_segment(segment)
+            self._db.commit()
+            row = self._db.execute('SELECT id FROM segments WHERE sealed = 0 ORDER BY id DESC LIMIT 1').fetchone()
+            if row is None:
+                return
+            self._segment = row[0]
+            end = self._db.execute('SELECT MAX(data_offset + data_size) FROM utterances WHERE segment = ?',
+                                   (self._segment,)).fetchone()[0] or 0
+            path = self._segment_path(self._segment)
+            self._segment_file = open(path, 'ab')
+            if self._segment_file.tell() > end:
+                logger.warning("Truncating %d unindexed bytes from archive segment %s.",
+                               self._segment_file.tell() - end, path)
+                self._segment_file.truncate(end)
+            self._segment_size = end
+
+    def _remove_segment(self, segment: int) -> None:
+        self._db.execute('DELETE FROM segments WHERE id = ?', (segment,))
+        try:
+            os.remove(self._segment_path(segment))
+        except FileNotFoundError:
+            pass
+
+    def add(self, audio: bytes, kind: str = 'command', sample_rate: int = 16000, created: float = None,
+            wake_word: str = None, transcript: str = None, vad_stats: dict = None, metadata: dict = None) -> int:
+        """
+        Queues an utterance for archiving. Never blocks; the utterance is dropped if the writer queue is full.
+
+        Args:
+            audio (bytes): 16-bit mono PCM audio.
+            kind (str): Kind of utterance, e.g. 'command' or 'wake_word'.
+            sample_rate (int): Sample rate of the audio.
+            created (float, optional): Unix time at which the audio starts. Defaults to now minus its duration.
+            wake_word (str, optional): Wake word that preceded the command or was detected in the snippet.
+            transcript (str, optional): Transcript, if already known; see set_transcript().
+            vad_stats (dict, optional): Voice activity statistics with 'frames', 'voiced_frames',
+                'mean_voice_probability' and 'max_voice_probability', see AudioRecorder.vad_stats().
+            metadata (dict, optional): Additional JSON-serializable information.
+
+        Returns:
+            int: The id of the utterance, or None if it was dropped.
+
+        Raises:
+            RuntimeError: If the archive is closed.
+        """
+        if self.closed:
+            raise RuntimeError("The archive is closed.")
+        duration = len(audio) / 2 / sample_rate
+        vad_stats = vad_stats or {}
+        with self._id_lock:
+            utterance_id = self._next_id
+            self._next_id += 1
+        row = (utterance_id, kind, created if created is not None else time.time() - duration, sample_rate,
+               duration, wake_word, transcript, vad_stats.get('frames'), vad_stats.get('voiced_frames'),
+               vad_stats.get('mean_voice_probability'), vad_stats.get('max_voice_probability'),
+               json.dumps(metadata) if metadata else None)
+        try:
+            self._writer.submit(self._append, row, audio)
+        except RuntimeError:
+            self.dropped += 1
+            _utterances_dropped.inc()
+            logger.warning("Archive writer queue is full, dropping utterance %d.", utterance_id)
+            return None
+        return utterance_id
+
+    def set_transcript(self, utterance_id: int, transcript: str) -> None:
+        """
+        Queues the transcript of an utterance. It is applied after the utterance itself has been written.
+        """
+        self._submit(self._execute, 'UPDATE utterances SET transcript = ? WHERE id = ?', (transcript, utterance_id))
+
+    def delete(self, utterance_id: int) -> None:
+        """
+        Queues the removal of an utterance from the index. Its audio is reclaimed when its segment is compacted.
+        """
+        self._submit(self._execute, 'DELETE FROM utterances WHERE id = ?', (utterance_id,))
+
+    def _submit(self, fn, *args) -> None:
+        if self.closed:
+            raise RuntimeError("The archive is closed.")
+        try:
+            self._writer.submit(fn, *args)
+        except RuntimeError as e:
+            logger.warning("Archive writer queue is full: %s", e)
+
+    def _execute(self, sql: str, parameters: tuple) -> None:
+        with self._lock:
+            self._db.execute(sql, parameters)
+            self._db.commit()
+
+    def _append(self, row: tuple, audio: bytes) -> None:
+        """
+        Appends the audio of an utterance to the open segment and indexes it. Runs on the writer thread.
+        """
+        sealed = None
+        with self._lock:
+            if self._segment_size and self._segment_size + len(audio) > self.segment_bytes:
+                sealed = self._seal_segment()
+            if self._segment is None:
+                self._segment = self._db.execute('INSERT INTO segments (sealed) VALUES (0)').lastrowid
+                self._segment_file = open(self._segment_path(self._segment), 'ab')
+                self._segment_size = 0
+            offset = self._segment_size
+            self._segment_file.write(audio)
+            self._segment_file.flush()  # Before the index refers to it
+            self._segment_size += len(audio)
+            self._db.execute('INSERT INTO utterances (id, kind, created, sample_rate, duration, wake_word, transcript, '
+                             'vad_frames, voiced_frames, mean_voice_probability, max_voice_probability, metadata, '
+                             'segment, data_offset, data_size, codec) '
+                             'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                             row + (self._segment, offset, len(audio), 'pcm'))
+            self._db.commit()
+        _utterances_archived.inc()
+        if sealed is not None and self.compress:
+            self._compactor.submit(self._compact_segment, sealed)
+
+    def _seal_segment(self) -> int:
+        """
+        Closes the open segment to further appends. Called with the lock held.
+
+        Returns:
+            int: The number of the sealed segment.
+        """
+        sealed = self._segment
+        self._segment_file.close()
+        self._db.execute('UPDATE segments SET sealed = 1 WHERE id = ?', (sealed,))
+        self._segment, self._segment_file, self._segment_size = None, None, 0
+        return sealed
+
+    def _needs_compaction(self, segment: int, compacted: int, live_bytes: int) -> bool:
+        """
+        Returns:
+            bool: True for a sealed segment not compacted yet (if compression is enabled) or in which deleted
+            utterances take up at least garbage_ratio of the file.
+        """
+        if self.compress and not compacted:
+            return True
+        try:
+            size = os.path.getsize(self._segment_path(segment))
+        except OSError:
+            return False
+        return size > 0 and 1 - live_bytes / size >= self.garbage_ratio
+
+    def _segments_to_compact(self, segment: int = None) -> list:
+        """
+        Returns:
+            list: The sealed segments that need compaction, among all or only the given one.
+        """
+        sql = ('SELECT segments.id, segments.compacted, COALESCE(SUM(utterances.data_size), 0) FROM segments '
+               'LEFT JOIN utterances ON utterances.segment = segments.id WHERE segments.sealed = 1')
+        parameters = ()
+        if segment is not None:
+            sql += ' AND segments.id = ?'
+            parameters = (segment,)
+        with self._lock:
+            rows = self._db.execute(sql + ' GROUP BY segments.id', parameters).fetchall()
+        return [segment for segment, compacted, live_bytes in rows
+                if self._needs_compaction(segment, compacted, live_bytes)]
+
+    def compact(self):
+        """
+        Waits for the queued writes, seals the open segment and schedules the compaction of every sealed segment
+        that needs it.
+
+        Returns:
+            concurrent.futures.Future: Completes when the scheduled compactions are done.
+        """
+        self.flush()  # Queued appends and deletes decide what is sealed and what is garbage
+        sealed = None
+        with self._lock:
+            if self._segment is not None and self._segment_size:
+                sealed = self._seal_segment()
+                self._db.commit()
+        segments = self._segments_to_compact()
+        if sealed is not None and sealed not in segments:
+            segments.append(sealed)
+        for segment in segments:
+            self._compactor.submit(self._compact_segment, segment)
+        return self._compactor.submit(lambda: None)  # Runs after the compactions queued before it
+
+    def _compact_segment(self, segment: int) -> None:
+        """
+        Rewrites a sealed segment without its deleted utterances, compressing those stored uncompressed, and removes
+        the original. Runs on the compaction thread; the lock is only held while the index is read and updated, so
+        writes continue meanwhile.
+        """
+        with self._lock:
+            # Checked again, as the segment may have been compacted since it was scheduled
+            if not self._segments_to_compact(segment):
+                return
+            utterances = self._db.execute('SELECT id, data_offset, data_size, codec FROM utterances '
+                                          'WHERE segment = ? ORDER BY data_offset', (segment,)).fetchall()
+            if not utterances:
+                self._remove_segment(segment)
+                self._db.commit()
+                return
+            target = self._db.execute('INSERT INTO segments (sealed, compacted) VALUES (1, 1)').lastrowid
+            self._db.commit()
+        started = time.perf_counter()
+        moves = []
+        with open(self._segment_path(segment), 'rb') as source, open(self._segment_path(target), 'wb') as target_file:
+            for utterance_id, offset, size, codec in utterances:
+                source.seek(offset)
+                data = source.read(size)
+                if codec == 'pcm' and self.compress:
+                    data, codec = zlib.compress(data, self.compression_level), 'zlib'
+                moves.append((target, target_file.tell(), len(data), codec, utterance_id, segment))
+                target_file.write(data)
+            target_file.flush()
+            os.fsync(target_file.fileno())  # The original is removed once the index points here
+            compacted_bytes = target_file.tell()
+        with self._lock:
+            self._db.executemany('UPDATE utterances SET segment = ?, data_offset = ?, data_size = ?, codec = ? '
+                                 'WHERE id = ? AND segment = ?', moves)
+            self._remove_segment(segment)
+            self._db.commit()
+        _segments_compacted.inc()
+        logger.debug("Compacted archive segment %d into %d: %d to %d bytes in %.1f ms.", segment, target,
+                     sum(size for _, _, size, _ in utterances), compacted_bytes, (time.perf_counter() - started) * 1000)
+
+    def flush(self, timeout: float = None) -> None:
+        """
+        Waits until the writes queued so far are in the index.
+
+        Args:
+            timeout (float, optional): Maximum number of seconds to wait.
+
+        Raises:
+            RuntimeError: If the archive is closed.
+        """
+        if self.closed:
+            raise RuntimeError("The archive is closed.")
+        if not self._writer.in_worker():
+            self._writer.submit(lambda: None).result(timeout)
+
+    def get(self, utterance_id: int) -> dict:
+        """
+        Returns:
+            dict: The index entry of an utterance (see find()), or None if there is none.
+        """
+        self.flush()
+        with self._lock:
+            row = self._db.execute(f"SELECT {', '.join(_COLUMNS)} FROM utterances WHERE id = ?",
+                                   (utterance_id,)).fetchone()
+        return self._entry(row) if row else None
+
+    def find(self, kind: str = None, since: float = None, until: float = None, text: str = None,
+             limit: int = 100) -> list:
+        """
+        Looks up utterances in the index, newest first.
+
+        Args:
+            kind (str, optional): Only utterances of this kind, e.g. 'command'.
+            since (float, optional): Only utterances starting at or after this Unix time.
+            until (float, optional): Only utterances starting before this Unix time.
+            text (str, optional): Only utterances whose transcript contains this text, ignoring case.
+            limit (int, optional): Maximum number of entries; None returns all.
+
+        Returns:
+            list: Index entries as dicts with id, kind, created, duration, sample_rate, wake_word, transcript,
+            vad_frames, voiced_frames, mean_voice_probability, max_voice_probability and metadata.
+        """
+        conditions, parameters = [], []
+        for condition, value in (('kind = ?', kind), ('created >= ?', since), ('created < ?', until),
+                                 ("transcript LIKE ? ESCAPE '\\'", text)):
+            if value is not None:
+                if condition.startswith('transcript'):
+                    value = '%' + value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+                conditions.append(condition)
+                parameters.append(value)
+        sql = f"SELECT {', '.join(_COLUMNS)} FROM utterances"
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY created DESC, id DESC'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            parameters.append(limit)
+        self.flush()
+        with self._lock:
+            rows = self._db.execute(sql, parameters).fetchall()
+        return [self._entry(row) for row in rows]
+
+    @staticmethod
+    def _entry(row: tuple) -> dict:
+        entry = dict(zip(_COLUMNS, row))
+        entry['metadata'] = json.loads(entry['metadata']) if entry['metadata'] else {}
+        return entry
+
+    def read_audio(self, utterance_id: int) -> bytes:
+        """
+        Returns:
+            bytes: The 16-bit mono PCM audio of an utterance.
+
+        Raises:
+            KeyError: If the archive has no such utterance.
+        """
+        self.flush()
+        with self._lock:  # Compaction cannot move the audio while it is read
+            row = self._db.execute('SELECT segment, data_offset, data_size, codec FROM utterances WHERE id = ?',
+                                   (utterance_id,)).fetchone()
+            if row is None:
+                raise KeyError(utterance_id)
+            segment, offset, size, codec = row
+            with open(self._segment_path(segment), 'rb') as f:
+                f.seek(offset)
+                data = f.read(size)
+        return zlib.decompress(data) if codec == 'zlib' else data
+
+    def export_wav(self, utterance_id: int, path: str) -> str:
+        """
+        Writes an utterance to a WAV file.
+
+        Returns:
+            str: The path of the WAV file.
+
+        Raises:
+            KeyError: If the archive has no such utterance.
+        """
+        audio = self.read_audio(utterance_id)
+        sample_rate = self.get(utterance_id)['sample_rate']
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with wave.open(path, 'wb') as wave_file:
+            wave_file.setnchannels(1)
+            wave_file.setsampwidth(2)
+            wave_file.setframerate(sample_rate)
+            wave_file.writeframes(audio)
+        return path
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: The number of utterances and their total duration in seconds, the number of segments, the bytes
+            stored on disk and the ratio of stored to uncompressed audio bytes, the writes waiting for the writer
+            thread and the number of dropped utterances.
+        """
+        self.flush()
+        with self._lock:
+            count, duration, raw_bytes = self._db.execute(
+                'SELECT COUNT(*), COALESCE(SUM(duration), 0), COALESCE(SUM(duration * sample_rate * 2), 0) '
+                'FROM utterances').fetchone()
+            segments = [segment for segment, in self._db.execute('SELECT id FROM segments')]
+        stored_bytes = sum(os.path.getsize(self._segment_path(segment)) for segment in segments
+                           if os.path.exists(self._segment_path(segment)))
+        return {
+            'utterances': count,
+            'duration': duration,
+            'segments': len(segments),
+            'stored_bytes': stored_bytes,
+            'compression_ratio': stored_bytes / raw_bytes if raw_bytes else None,
+            'queued_writes': self._writer.stats()['queue_length'],
+            'dropped': self.dropped,
+        }
+
+    def close(self) -> None:
+        """
+        Writes the queued utterances, waits for running compactions and closes the index. Queued compactions of
+        sealed segments are resumed when the archive is opened again.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self._writer.shutdown(wait=True)
+        self._compactor.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            if self._segment_file is not None:
+                self._segment_file.close()
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Searches, exports and compacts a segment archive of recordings.")
+    parser.add_argument('directory', help="The archive directory")
+    commands = parser.add_subparsers(dest='command', required=True)
+    list_parser = commands.add_parser('list', help="List utterances, newest first")
+    list_parser.add_argument('--kind', help="e.g. command or wake_word")
+    list_parser.add_argument('--text', help="Text the transcript contains")
+    list_parser.add_argument('--since', type=float, help="Unix time")
+    list_parser.add_argument('--until', type=float, help="Unix time")
+    list_parser.add_argument('--limit', type=int, default=50)
+    export_parser = commands.add_parser('export', help="Write utterances as WAV files")
+    export_parser.add_argument('ids', type=int, nargs='+')
+    export_parser.add_argument('--output', default='.', help="Directory for the WAV files")
+    commands.add_parser('compact', help="Compact the sealed segments now")
+    commands.add_parser('stats', help="Print the archive statistics")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    with SegmentArchive(args.directory) as archive:
+        if args.command == 'list':
+            for entry in archive.find(args.kind, args.since, args.until, args.text, args.limit):
+                created = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry['created']))
+                print(f"{entry['id']:>8}  {created}  {entry['kind']:<10} {entry['duration']:6.2f} s  "
+                      f"{entry['transcript'] or ''}")
+        elif args.command == 'export':
+            for utterance_id in args.ids:
+                print(archive.export_wav(utterance_id, os.path.join(args.output, f'utterance_{utterance_id}.wav')))
+        elif args.command == 'compact':
+            archive.compact().result()
+            print(json.dumps(archive.stats(), indent=2))
+        else:
+            print(json.dumps(archive.stats(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1 @@
+# This __init__.py file makes storage a subpackage of VoiceProcessingToolkit.
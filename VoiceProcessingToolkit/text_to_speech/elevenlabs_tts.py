@@ -5,21 +5,33 @@ from dotenv import load_dotenv
 import tempfile
 import time
 
-import pygame
-import requests
+from VoiceProcessingToolkit.monitoring.Metrics import metrics
+from VoiceProcessingToolkit.shared_resources import lazy_import
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')  # pygame prints a banner when imported
+pygame = lazy_import('pygame')
+requests = lazy_import('requests')
 
 # Constants
-ELEVENLABS_API_URL = 'https://api.elevenlabs.io/v1/text-to-speech/'
+ELEVENLABS_BASE_URL = 'https://api.elevenlabs.io/v1'
+ELEVENLABS_API_URL = ELEVENLABS_BASE_URL + '/text-to-speech/'
 ELEVENLABS_MODEL_ID = 'eleven_monolingual_v1'
 
+_request_seconds = metrics.summary('voice_processing_api_request_seconds', 'Latency of API requests in seconds.',
+                                   {'api': 'elevenlabs'})
+_request_errors = metrics.counter('voice_processing_api_errors_total', 'API requests that failed.',
+                                  {'api': 'elevenlabs'})
+
 
 # Configuration class
 class ElevenLabsConfig:
     # The API key forElevenLabs can be provided as an argument or set as an environment variable 'ELEVENLABS_API_KEY'.
-    def __init__(self, api_key=None, voice_id=None, model_id=None, playback_enabled=True):
+    # The base URL can be overridden, e.g. to point at a local mock server, with 'ELEVENLABS_BASE_URL'.
+    def __init__(self, api_key=None, voice_id=None, model_id=None, playback_enabled=True, base_url=None):
         self.elevenlabs_api_key = os.getenv('ELEVENLABS_API_KEY', api_key) or api_key
         self.voice_id = voice_id or "eqI1AF0IrvwU3tgfmt0B"
         self.model_id = model_id or ELEVENLABS_MODEL_ID
+        self.base_url = (base_url or os.getenv('ELEVENLABS_BASE_URL') or ELEVENLABS_BASE_URL).rstrip('/')
         self.enable_text_to_speech = True
         self.playback_enabled = playback_enabled
 
@@ -37,18 +49,71 @@ class ElevenLabsConfig:
 
 
 class ElevenLabsTextToSpeech:
-    def __init__(self, config=None, voice_id=None):
+    def __init__(self, config=None, voice_id=None, session=None):
+        """
+        Args:
+            config (ElevenLabsConfig, optional): Configuration for the ElevenLabs API.
+            voice_id (str, optional): Voice used if no config is given.
+            session (requests.Session, optional): HTTP session to send requests with. Reusing one instance keeps
+                the connection to the API alive between requests.
+        """
         self.mixer_initialized = None
         self.temp_dir = None
         self.config = config or ElevenLabsConfig(voice_id=voice_id)
+        self._session = session or requests.Session()
+
+    def _request(self, text, voice_id, stream=False):
+        """
+        Sends a text-to-speech request to the configured API.
 
-    def synthesize_speech(self, text, output_dir=None):
+        Returns:
+            requests.Response: The response; with stream=True its body has not been read yet.
+        """
+        config = self.config
+        headers = {
+            'Accept': 'audio/mpeg',
+            'xi-api-key': config.elevenlabs_api_key,
+            'Content-Type': 'application/json'
+        }
+        data = {
+            'text': text,
+            'model_id': ELEVENLABS_MODEL_ID,
+            'voice_settings': {
+                'stability': 0.85,
+                'similarity_boost': 0.85
+            }
+        }
+        url = f"{config.base_url}/text-to-speech/{voice_id}" + ('/stream' if stream else '')
+        return self._session.post(url, headers=headers, json=data, stream=stream)
+
+    def stream_speech(self, text, voice_id=None):
+        """
+        Requests speech from the streaming endpoint and yields the audio as it arrives.
+
+        Args:
+            text (str): The text to convert to speech.
+            voice_id (str, optional): Voice to use. Defaults to the configured voice.
+
+        Yields:
+            bytes: Chunks of MPEG audio.
+
+        Raises:
+            requests.HTTPError: If the API returns an error status.
+        """
+        with self._request(text, voice_id or self.config.voice_id, stream=True) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=None):
+                if chunk:
+                    yield chunk
+
+    def synthesize_speech(self, text, output_dir=None, trace=None):
         """
         Converts text to speech using ElevenLabs API.
 
         Args:
             text (str): The text to convert to speech.
             output_dir (str, optional): The directory to save the audio file. Defaults to None.
+            trace (TurnTrace, optional): Turn trace to mark when the audio was received and when playback ended.
 
         Returns:
             str: Path to the audio file if successful, None otherwise.
@@ -64,19 +129,6 @@ class ElevenLabsTextToSpeech:
         text = text.replace('*', '').replace('#', '')
 
         voice_id = config.voice_id or 'default_voice_id'
-        headers = {
-            'Accept': 'audio/mpeg',
-            'xi-api-key': config.elevenlabs_api_key,
-            'Content-Type': 'application/json'
-        }
-        data = {
-            'text': text,
-            'model_id': ELEVENLABS_MODEL_ID,
-            'voice_settings': {
-                'stability': 0.85,
-                'similarity_boost': 0.85
-            }
-        }
 
         # Check if output_dir is provided or not
         use_temp_dir = output_dir is None
@@ -90,8 +142,17 @@ class ElevenLabsTextToSpeech:
 
         try:
             logging.debug("Sending request to ElevenLabs API for text-to-speech synthesis")
-            response = requests.post(ELEVENLABS_API_URL + voice_id, headers=headers, json=data)
+            started = time.perf_counter()
+            try:
+                response = self._request(text, voice_id)
+            except Exception:
+                _request_errors.inc()
+                raise
+            finally:
+                _request_seconds.observe(time.perf_counter() - started)
             logging.debug("Received response from ElevenLabs API with status code: %s", response.status_code)
+            if trace is not None:
+                trace.mark('tts_first_byte')
             if response.status_code == 200:
                 # Define the output file path
                 output_file = os.path.join(output_dir, 'output.mp3')
@@ -116,6 +177,8 @@ class ElevenLabsTextToSpeech:
 
                     pygame.mixer.quit()
                     self.mixer_initialized = False
+                    if trace is not None:
+                        trace.mark('playback_end')
 
                     # If using a temporary directory, the file will be deleted upon exiting the context
                     if output_dir is None:
@@ -125,6 +188,7 @@ class ElevenLabsTextToSpeech:
                         return None
                 return output_file if not use_temp_dir else None
             else:
+                _request_errors.inc()
                 error_message = f"API Error: Status code {response.status_code}. Response: {response.text}"
                 if response.status_code == 401:
                     logging.error(f"Authentication failed: {error_message}")
@@ -1,20 +1,37 @@
 import logging
 import os
+import time
+
 from dotenv import load_dotenv
-from openai import OpenAI
+
+from VoiceProcessingToolkit.monitoring.Metrics import metrics
+from VoiceProcessingToolkit.shared_resources import lazy_import
+
+openai = lazy_import('openai')
 
 logger = logging.getLogger(__name__)
 
+_request_seconds = metrics.summary('voice_processing_api_request_seconds', 'Latency of API requests in seconds.',
+                                   {'api': 'whisper'})
+_request_errors = metrics.counter('voice_processing_api_errors_total', 'API requests that failed.',
+                                  {'api': 'whisper'})
+
 
 class WhisperTranscriber:
     """
     WhisperTranscriber handles transcription using OpenAI's Whisper ASR system.
     """
 
-    def __init__(self):
+    def __init__(self, base_url: str = None, api_key: str = None):
+        """
+        Args:
+            base_url (str, optional): Base URL of the OpenAI-compatible API, e.g. 'http://127.0.0.1:8080/v1' for a
+                local mock server. Defaults to the OPENAI_BASE_URL environment variable or the public API.
+            api_key (str, optional): API key. Defaults to the OPENAI_API_KEY environment variable.
+        """
         # The API key for OpenAI's Whisper ASR system can be set as an environment variable 'OPENAI_API_KEY'.
         load_dotenv()
-        self.client = OpenAI()
+        self.client = openai.OpenAI(base_url=base_url, api_key=api_key)
 
     def transcribe_audio(self, audio_filepath):
         """
@@ -34,6 +51,7 @@ class WhisperTranscriber:
             logger.exception("File not found: %s", e)
             raise
 
+        started = time.perf_counter()
         try:
             with open(audio_filepath, "rb") as audio_file:
                 logging.debug("Sending audio file to Whisper API for transcription")
@@ -44,9 +62,12 @@ class WhisperTranscriber:
                 )
                 logging.debug("Received transcription response from Whisper API")
         except Exception as e:
+            _request_seconds.observe(time.perf_counter() - started)
+            _request_errors.inc()
             logging.exception("An error occurred during the transcription process: %s", e)
             raise
         else:
+            _request_seconds.observe(time.perf_counter() - started)
             # Access the translated and transcribed text
             transcription_text = getattr(transcript, "text", None)
             if transcription_text is not None:
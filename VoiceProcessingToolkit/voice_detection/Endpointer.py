@@ -0,0 +1,136 @@
+"""
+Endpointer
+------------------------
+
+Decides how much trailing silence ends a recording.
+
+With adaptive endpointing enabled, the silence timeout follows the Cobra voice probability history. The timeout
+is shortened to the minimum when an utterance looks complete: a long run of speech followed by a sharp drop in
+voice probability. It is lengthened to the maximum during hesitations: short bursts of speech, or probabilities
+hovering just below the voice threshold. Otherwise the base timeout (the recorder's inactivity limit) is used.
+
+Every endpoint is recorded so endpointing latency, the trailing silence waited before a recording was finalized,
+can be reported.
+"""
+
+import collections
+
+
+class AdaptiveEndpointer:
+    """
+    Tracks voice activity during a recording and provides the current silence timeout.
+    """
+
+    def __init__(self, base_timeout: float, min_timeout: float = None, max_timeout: float = None,
+                 adaptive: bool = False, voice_threshold: float = 0.8, frame_seconds: float = 512 / 16000,
+                 long_speech_seconds: float = 1.0, short_speech_seconds: float = 0.3, sharp_drop: float = 0.5,
+                 hesitation_probability: float = 0.3, history_frames: int = 8, max_recorded_endpoints: int = 1000):
+        """
+        Args:
+            base_timeout (float): Silence timeout in seconds when the utterance state is unclear.
+            min_timeout (float, optional): Timeout after an utterance that looks complete. Defaults to a quarter of
+                the base timeout.
+            max_timeout (float, optional): Timeout during hesitations. Defaults to 1.5 times the base timeout.
+            adaptive (bool): If False, the base timeout is always used and only the statistics are collected.
+            voice_threshold (float): Voice probability above which a frame counts as speech.
+            frame_seconds (float): Duration of one VAD frame.
+            long_speech_seconds (float): Minimum speech run for an utterance to be considered complete.
+            short_speech_seconds (float): Speech runs shorter than this are treated as hesitation sounds.
+            sharp_drop (float): Minimum fall in voice probability at the end of speech to count as a sharp drop.
+            hesitation_probability (float): Recent mean probabilities between this and the voice threshold
+                indicate a hesitation.
+            history_frames (int): Number of recent probabilities kept.
+            max_recorded_endpoints (int): Number of endpoint latencies kept for statistics.
+        """
+        self.base_timeout = base_timeout
+        self.min_timeout = min_timeout if min_timeout is not None else base_timeout / 4
+        self.max_timeout = max_timeout if max_timeout is not None else base_timeout * 1.5
+        if not (0.0 < self.min_timeout <= self.max_timeout):
+            raise ValueError("Endpointing timeouts must satisfy 0 < min_timeout <= max_timeout")
+        self.adaptive = adaptive
+        self.voice_threshold = voice_threshold
+        self._frame_seconds = frame_seconds
+        self._long_speech_frames = long_speech_seconds / frame_seconds
+        self._short_speech_frames = short_speech_seconds / frame_seconds
+        self._sharp_drop = sharp_drop
+        self._hesitation_probability = hesitation_probability
+        self._history = collections.deque(maxlen=history_frames)
+        self._silence_history = collections.deque(maxlen=4)  # Probabilities since the last speech frame
+        self._endpoint_latencies = collections.deque(maxlen=max_recorded_endpoints)
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Clears the per-recording state. Call at the start of every recording.
+        """
+        self._history.clear()
+        self._silence_history.clear()
+        self._speech_run = 0
+        self._last_speech_run = 0
+        self._sharp_end = False
+        self.has_speech = False
+
+    def update(self, probability: float, voice_detected: bool) -> None:
+        """
+        Adds the VAD result of one frame.
+
+        Args:
+            probability (float): Voice probability reported by the VAD engine.
+            voice_detected (bool): Whether the frame was classified as speech.
+        """
+        if voice_detected:
+            self._speech_run += 1
+            self._silence_history.clear()
+            self.has_speech = True
+        else:
+            if self._speech_run:
+                # First silent frame after speech: remember how the speech run ended
+                self._last_speech_run = self._speech_run
+                self._speech_run = 0
+                peak = max(self._history) if self._history else probability
+                self._sharp_end = peak - probability >= self._sharp_drop
+            self._silence_history.append(probability)
+        self._history.append(probability)
+
+    def timeout(self) -> float:
+        """
+        Returns:
+            float: The number of seconds of silence after which the recording should be finalized.
+        """
+        if not self.adaptive or not self.has_speech:
+            return self.base_timeout
+        recent = self._silence_history
+        if len(recent) == recent.maxlen and (self._hesitation_probability <= sum(recent) / len(recent)
+                                             < self.voice_threshold):
+            return self.max_timeout
+        if self._last_speech_run < self._short_speech_frames:
+            return self.max_timeout
+        if self._last_speech_run >= self._long_speech_frames and self._sharp_end:
+            return self.min_timeout
+        return min(max(self.base_timeout, self.min_timeout), self.max_timeout)
+
+    def record_endpoint(self, silence_seconds: float) -> None:
+        """
+        Records the trailing silence that was waited before a recording was finalized.
+
+        Args:
+            silence_seconds (float): Endpointing latency of the recording.
+        """
+        self._endpoint_latencies.append(silence_seconds)
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Count, mean, median, 90th percentile and maximum of the recorded endpointing latencies in
+            seconds.
+        """
+        latencies = sorted(self._endpoint_latencies)
+        if not latencies:
+            return {'count': 0, 'mean': None, 'p50': None, 'p90': None, 'max': None}
+        return {
+            'count': len(latencies),
+            'mean': sum(latencies) / len(latencies),
+            'p50': latencies[int(0.5 * (len(latencies) - 1))],
+            'p90': latencies[int(0.9 * (len(latencies) - 1))],
+            'max': latencies[-1],
+        }
@@ -0,0 +1,175 @@
+"""
+EnergyGate
+------------------------
+
+A cheap RMS and zero-crossing gate that skips Cobra and Porcupine calls on clearly silent frames.
+
+The gate keeps an adaptive estimate of the noise floor. A frame opens the gate when its RMS is well above the
+floor, or when it has a high zero-crossing rate (fricatives) and is somewhat above the floor. While the gate is
+closed, the last few frames are kept as look-back; on an onset they are replayed into the engine before the
+current frame, so the engine sees the start of the sound. After the last active frame the gate stays open for a
+hangover period so the engine also sees the tail of the sound.
+
+Example:
+    ```python
+    porcupine = GatedEngine(pvporcupine.create(...), EnergyGate(), silent_result=-1)
+    keyword_index = porcupine.process(np.frombuffer(frame_bytes, dtype=np.int16))
+    print(porcupine.gate.stats())
+    ```
+"""
+
+import collections
+import time
+
+import numpy as np
+
+
+class EnergyGate:
+    """
+    Decides which frames need to be passed to the speech engines.
+    """
+
+    def __init__(self, lookback_frames: int = 8, hangover_frames: int = 16, floor_margin: float = 3.0,
+                 zcr_threshold: float = 0.25, zcr_margin: float = 1.5, min_rms: float = 30.0,
+                 floor_adaptation: float = 0.05):
+        """
+        Args:
+            lookback_frames (int): Number of gated frames replayed into the engine on an onset.
+            hangover_frames (int): Number of frames passed after the last active frame.
+            floor_margin (float): RMS ratio above the noise floor that opens the gate.
+            zcr_threshold (float): Zero-crossing rate (crossings per sample) that marks noise-like speech sounds.
+            zcr_margin (float): RMS ratio above the noise floor that opens the gate for high zero-crossing frames.
+            min_rms (float): RMS below which a frame never opens the gate.
+            floor_adaptation (float): Rate at which the noise floor follows the level of silent frames.
+        """
+        self._lookback = collections.deque(maxlen=lookback_frames)
+        self._hangover_frames = hangover_frames
+        self._floor_margin = floor_margin
+        self._zcr_threshold = zcr_threshold
+        self._zcr_margin = zcr_margin
+        self._min_rms = min_rms
+        self._floor_adaptation = floor_adaptation
+        self._noise_floor = None
+        self._hangover = 0
+        self.frames = 0
+        self.engine_calls = 0
+        self.engine_seconds = 0.0
+
+    @property
+    def noise_floor(self) -> float:
+        return self._noise_floor or 0.0
+
+    def _is_active(self, samples: np.ndarray) -> bool:
+        as_float = samples.astype(np.float32)
+        rms = float(np.sqrt(np.dot(as_float, as_float) / len(as_float)))
+        if self._noise_floor is None:
+            self._noise_floor = rms
+        if rms < self._min_rms:
+            active = False
+        elif rms > self._noise_floor * self._floor_margin:
+            active = True
+        else:
+            signs = np.signbit(samples)
+            zcr = np.count_nonzero(signs[1:] != signs[:-1]) / len(samples)
+            active = zcr > self._zcr_threshold and rms > self._noise_floor * self._zcr_margin
+        if not active:
+            # Follow a falling noise level quickly and a rising one slowly
+            rate = 0.5 if rms < self._noise_floor else self._floor_adaptation
+            self._noise_floor += rate * (rms - self._noise_floor)
+        return active
+
+    def admit(self, samples: np.ndarray) -> list:
+        """
+        Classifies a frame and returns the frames the engine should process now.
+
+        Args:
+            samples (numpy.ndarray): One engine frame of 16-bit samples.
+
+        Returns:
+            list: Empty if the frame is skipped, the frame itself while the gate is open, or the look-back frames
+            followed by the frame on an onset.
+        """
+        self.frames += 1
+        if self._is_active(samples):
+            open_before = self._hangover > 0
+            self._hangover = self._hangover_frames
+            if open_before:
+                return [samples]
+            frames = list(self._lookback)
+            self._lookback.clear()
+            frames.append(samples)
+            return frames
+        if self._hangover > 0:
+            self._hangover -= 1
+            return [samples]
+        self._lookback.append(samples)
+        return []
+
+    def record_engine_time(self, seconds: float, calls: int) -> None:
+        self.engine_seconds += seconds
+        self.engine_calls += calls
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Frames seen, engine calls made and skipped, and the estimated engine CPU time saved in seconds,
+            based on the measured mean cost of an engine call.
+        """
+        skipped = max(self.frames - self.engine_calls, 0)
+        mean_call = self.engine_seconds / self.engine_calls if self.engine_calls else 0.0
+        return {
+            'frames': self.frames,
+            'engine_calls': self.engine_calls,
+            'engine_calls_skipped': skipped,
+            'skip_ratio': skipped / self.frames if self.frames else 0.0,
+            'mean_engine_call_seconds': mean_call,
+            'cpu_seconds_saved': skipped * mean_call,
+            'noise_floor': self.noise_floor,
+        }
+
+
+def first_detection(results: list):
+    """Combines Porcupine results: the first keyword index found, or -1."""
+    for result in results:
+        if result >= 0:
+            return result
+    return -1
+
+
+def last_result(results: list):
+    """Combines Cobra results: the voice probability of the newest frame."""
+    return results[-1]
+
+
+class GatedEngine:
+    """
+    Wraps a Porcupine or Cobra handle so process() is only called on frames admitted by an EnergyGate.
+    """
+
+    def __init__(self, engine, gate: EnergyGate = None, silent_result=-1, combine=first_detection):
+        """
+        Args:
+            engine: The Porcupine or Cobra handle.
+            gate (EnergyGate, optional): The gate to use. A gate with default settings is created if omitted.
+            silent_result: Value returned for skipped frames (-1 for Porcupine, 0.0 for Cobra).
+            combine (callable): Reduces the results of the frames processed in one call to a single result.
+        """
+        self._engine = engine
+        self.gate = gate or EnergyGate()
+        self._silent_result = silent_result
+        self._combine = combine
+        self.frame_length = engine.frame_length
+        self.sample_rate = getattr(engine, 'sample_rate', 16000)
+
+    def process(self, pcm: np.ndarray):
+        frames = self.gate.admit(pcm)
+        if not frames:
+            return self._silent_result
+        process = self._engine.process
+        started = time.perf_counter()
+        results = [process(frame) for frame in frames]
+        self.gate.record_engine_time(time.perf_counter() - started, len(frames))
+        return self._combine(results)
+
+    def delete(self) -> None:
+        self._engine.delete()
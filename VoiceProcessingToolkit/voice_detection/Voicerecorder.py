@@ -1,40 +1,93 @@
 #!/usr/bin/env python3
+import asyncio
 import collections
+import concurrent.futures
 import logging
 import os
 from dotenv import load_dotenv
 import wave
 import time
 import threading
+import warnings
 import numpy as np
-import pyaudio
-import pvcobra
+
+from VoiceProcessingToolkit.monitoring.CaptureMonitor import CaptureMonitor, RealTimeFactorMonitor
+from VoiceProcessingToolkit.monitoring.Metrics import metrics
+from VoiceProcessingToolkit.pipeline.FramePipeline import FramePipeline
+from VoiceProcessingToolkit.shared_resources import PA_INT16, WorkerPool, lazy_import, resolve_future_threadsafe
+from VoiceProcessingToolkit.voice_detection.EnergyGate import EnergyGate, GatedEngine, last_result
+from VoiceProcessingToolkit.voice_detection.Endpointer import AdaptiveEndpointer
+from VoiceProcessingToolkit.wake_word_detector.AudioConverter import AudioConverter
+from VoiceProcessingToolkit.wake_word_detector.AudioStreamManager import AudioReframer, AudioRingBuffer
+
+pyaudio = lazy_import('pyaudio')
+pvcobra = lazy_import('pvcobra')
 
 logger = logging.getLogger(__name__)
 
+# Cobra's fixed frame format, known before the engine is created
+COBRA_FRAME_LENGTH = 512
+COBRA_SAMPLE_RATE = 16000
+
+_vad_calls = metrics.counter('voice_processing_vad_frames_total', 'Frames passed to voice activity detection.')
+_vad_seconds = metrics.counter('voice_processing_vad_seconds_total',
+                               'Time spent in voice activity detection, in seconds.')
+_recordings_saved = metrics.counter('voice_processing_recordings_saved_total', 'Recordings saved to a WAV file.')
+_recordings_discarded = metrics.counter('voice_processing_recordings_discarded_total',
+                                        'Recordings discarded for being shorter than the minimum length.')
+
 
 # Audio Data Provider Class
 class AudioDataProvider:
-    def __init__(self, audio_format=pyaudio.paInt16, channels=1, rate=16000, frames_per_buffer=512):
+    def __init__(self, audio_format=PA_INT16, channels=1, rate=16000, frames_per_buffer=512,
+                 capture_block_size=None, output_rate=None, capture_monitor=None):
         self._audio_format = audio_format
         self._channels = channels
         self._rate = rate
         self._frames_per_buffer = frames_per_buffer
+        output_rate = output_rate or rate
+        self._converter = AudioConverter(rate, channels, output_rate)
+        if self._converter.is_passthrough:
+            self._converter = None
+        default_block_size = -(-frames_per_buffer * rate // output_rate)  # One engine frame of device audio
+        self._capture_block_size = capture_block_size or default_block_size
+        self._reframer = None
+        if self._capture_block_size != frames_per_buffer or self._converter is not None:
+            # Read larger blocks from the device and hand them out as engine-sized frames
+            self._reframer = AudioReframer(self._read_block, frames_per_buffer)
         self._stream = None
+        # Detects audio the device dropped because the record loop fell behind
+        self.capture_monitor = capture_monitor or CaptureMonitor(rate, 'recorder')
         self._py_audio = pyaudio.PyAudio()
         self.recording_finished_event = threading.Event()  # New event to signal recording completion
 
     def start_stream(self):
+        if self._reframer is not None:
+            self._reframer.reset()
+        if self._converter is not None:
+            self._converter.reset()
+        self.capture_monitor.reset()
         self._stream = self._py_audio.open(
             format=self._audio_format,
             channels=self._channels,
             rate=self._rate,
             input=True,
-            frames_per_buffer=self._frames_per_buffer
+            frames_per_buffer=self._capture_block_size
         )
 
     def get_next_frame(self):
-        return self._stream.read(self._frames_per_buffer, exception_on_overflow=False)
+        if self._reframer is not None:
+            return self._reframer.next_frame()
+        return self._read_block()
+
+    def _read_block(self):
+        stream, monitor = self._stream, self.capture_monitor
+        monitor.before_read(stream.get_read_available())
+        data = stream.read(self._capture_block_size, exception_on_overflow=False)
+        monitor.after_read(self._capture_block_size)
+        if self._converter is not None:
+            data = self._converter.convert(data)
+        return data
 
     def stop_stream(self):
         if self._stream:
@@ -43,107 +96,376 @@ class AudioDataProvider:
             self._py_audio.terminate()
 
 
+class SharedStreamDataProvider:
+    """
+    Audio data provider that reads from an already open AudioStream, such as the one used by the wake word detector.
+
+    Frames captured before the recorder took over (carry-over audio) are returned first, so nothing said between
+    the wake word and the start of the recording is lost. The shared stream is left open when the provider stops.
+    """
+
+    def __init__(self, audio_stream, carry_over: bytes = b'', frame_length: int = 512,
+                 carry_over_processed: bool = False):
+        """
+        Args:
+            audio_stream (AudioStream): The open stream to read from.
+            carry_over (bytes): Audio already captured that should be returned before reading from the stream.
+            frame_length (int): Number of samples per frame, used to split the carry-over audio.
+            carry_over_processed (bool): True if the carry-over audio already went through frame stages such as
+                noise suppression, so a recorder with its own stages must not process it again.
+        """
+        self._audio_stream = audio_stream
+        frame_bytes = frame_length * 2  # 16-bit samples
+        usable = len(carry_over) - len(carry_over) % frame_bytes
+        self._carry_over = collections.deque(carry_over[i:i + frame_bytes] for i in range(0, usable, frame_bytes))
+        self.carry_over_processed = carry_over_processed
+        self.recording_finished_event = threading.Event()
+
+    def take_carry_over(self) -> list:
+        """
+        Removes and returns the carry-over frames that were not read yet, so they can bypass a frame pipeline.
+        """
+        frames = list(self._carry_over)
+        self._carry_over.clear()
+        return frames
+
+    def start_stream(self):
+        self._audio_stream.reopen()
+
+    def get_next_frame(self):
+        if self._carry_over:
+            return self._carry_over.popleft()
+        return self._audio_stream.read()
+
+    def stop_stream(self):
+        self._carry_over.clear()
+
+
+class _RecordLoopHandle:
+    """
+    Stands in for the recording thread of earlier versions of AudioRecorder.
+    """
+
+    def __init__(self, recorder, future):
+        self._recorder = recorder
+        self._future = future
+
+    def join(self, timeout: float = None) -> None:
+        if not self._recorder._capture_pool.in_worker():
+            concurrent.futures.wait([self._future], timeout)
+
+    def is_alive(self) -> bool:
+        return not self._future.done()
+
+
 class AudioRecorder:
     def __init__(self, output_directory=None, access_key=None, voice_threshold=0.8, inactivity_limit=2,
-                 min_recording_length=3, buffer_length=2):
+                 min_recording_length=3, buffer_length=2, adaptive_endpointing=False, min_inactivity_limit=None,
+                 max_inactivity_limit=None, energy_gate=False, capture_block_size=None, device_rate=16000,
+                 device_channels=1, frame_stages=None, rtf_alert_threshold=0.8, backlog_alert_seconds=0.5,
+                 on_pipeline_alert=None, archive=None, wake_word=None, speech_timeout=5.0):
         """
         Initializes the audio recorder with the given parameters.
         Args:
-            output_directory (str): The directory where recordings will be saved.
+            output_directory (str, optional): The directory where recordings will be saved. Defaults to the
+                Wav_MP3 directory next to this module.
             access_key (str): The access key for the Cobra VAD engine.
             voice_threshold (float): The threshold for voice detection.
             inactivity_limit (float): The number of seconds of inactivity before stopping the recording.
             min_recording_length (float): The minimum length of a valid recording.
-            buffer_length (float): The length of the audio buffer.
+            buffer_length (float): Seconds of audio kept as pre-roll before voice is detected.
+            adaptive_endpointing (bool): If True, the inactivity limit adapts to the voice probability history,
+                shrinking after a clearly finished utterance and growing during hesitations.
+            min_inactivity_limit (float, optional): Shortest silence that ends a recording with adaptive endpointing.
+            max_inactivity_limit (float, optional): Longest silence waited for with adaptive endpointing.
+            energy_gate (bool): If True, Cobra is not called on frames an EnergyGate considers silent; such frames
+                get a voice probability of 0.
+            capture_block_size (int, optional): Number of samples read from the device at once when the recorder
+                opens its own stream. Blocks are split into VAD frames.
+            device_rate (int): Sample rate of the microphone when the recorder opens its own stream. Audio is
+                resampled to the Cobra sample rate if it differs.
+            device_channels (int): Number of channels of the microphone; multichannel audio is downmixed to mono.
+            frame_stages (list, optional): FrameStage instances, e.g. noise suppression, applied to the audio before
+                voice activity detection and saving. They run in a FramePipeline fed by the audio data provider.
+            rtf_alert_threshold (float): Rolling real-time factor of the record loop that raises an alert.
+            backlog_alert_seconds (float): Audio waiting unread in the recorder's own stream that raises an alert.
+            on_pipeline_alert (callable, optional): Called with a CaptureAlert when the record loop cannot keep up
+                with capture.
+            archive (SegmentArchive, optional): Archive every saved recording is also appended to, with its voice
+                activity statistics; see last_archive_id.
+            wake_word (str, optional): Wake word recorded with the archived recordings.
+            speech_timeout (float, optional): Seconds to wait for speech before giving up without a recording. The
+                silence before speech does not count towards the inactivity limit. None waits until the recording
+                is stopped.
+
+        The Cobra engine is created when the first recording starts, or earlier with initialize_vad().
         """
         self.SILENCE_LIMIT = None
         self.last_saved_file = None
         self._logger = logger  # Logger is now private
-        self._py_audio = pyaudio.PyAudio()
         self._access_key = access_key or os.environ.get('PICOVOICE_APIKEY')  # Access key is now private
-        self._vad_engine = self._cobra_handle = pvcobra.create(
-            access_key=self._access_key)  # VAD engine and Cobra handle are now private
+        self._vad_engine = self._cobra_handle = None  # VAD engine and Cobra handle are now private
+        self._use_energy_gate = energy_gate
+        self.engine_init_seconds = None  # Seconds the creation of the Cobra engine took
         self._output_directory = output_directory or os.path.join(os.path.dirname(__file__),
                                                                   'Wav_MP3')  # Output directory is now private
         self.VOICE_THRESHOLD = voice_threshold
         self.INACTIVITY_LIMIT = inactivity_limit
+        self.SPEECH_TIMEOUT = speech_timeout
         self.MIN_RECORDING_LENGTH = min_recording_length
         self.BUFFER_LENGTH = buffer_length
-        self._audio_buffer = collections.deque(maxlen=int(self.BUFFER_LENGTH * self._cobra_handle.sample_rate))
+        # Pre-roll of exactly BUFFER_LENGTH seconds of samples, preallocated once
+        self._audio_buffer = AudioRingBuffer(int(self.BUFFER_LENGTH * COBRA_SAMPLE_RATE))
+        self._logger.debug("Pre-roll buffer holds %.2f s in %d bytes.", self.BUFFER_LENGTH, self.pre_roll_nbytes)
         self._inactivity_frames = 0  # Inactivity frames counter is now private
+        self._voice_probability = 0.0  # Voice probability of the last processed frame
+        self.endpointer = AdaptiveEndpointer(inactivity_limit, min_timeout=min_inactivity_limit,
+                                             max_timeout=max_inactivity_limit, adaptive=adaptive_endpointing,
+                                             voice_threshold=voice_threshold,
+                                             frame_seconds=COBRA_FRAME_LENGTH / COBRA_SAMPLE_RATE)
         self._is_recording = False  # Recording state is now private
         self._recording = False  # Recording state is now private
         self._frames_to_save = []  # Frames to save are now private
         self._frames = []  # Frames are now private
         self._lock = threading.Lock()  # Lock for thread safety is now private
-        self.recording_thread = None  # Recording thread is now private
+        # Long-lived thread every recording's record loop runs on
+        self._capture_pool = WorkerPool('AudioRecorder-capture', max_workers=1)
+        self._recording_future = None  # Completes when the record loop of the current recording ends
         self._audio_data_provider = None  # Audio data provider is now private
+        self._capture_block_size = capture_block_size
+        self._device_rate = device_rate
+        self._device_channels = device_channels
+        self._frame_stages = list(frame_stages or [])
+        self._pipeline = None
+        frame_seconds = COBRA_FRAME_LENGTH / COBRA_SAMPLE_RATE
+        self.real_time_monitor = RealTimeFactorMonitor('recorder', frame_seconds, alert_threshold=rtf_alert_threshold,
+                                                       on_alert=on_pipeline_alert)
+        # Shared by the streams the recorder opens, so overruns are counted across recordings
+        self.capture_monitor = CaptureMonitor(device_rate, 'recorder', backlog_alert_seconds=backlog_alert_seconds,
+                                              on_alert=on_pipeline_alert)
+        self._recording_finished = threading.Event()  # Set when the record loop ends
+        self._on_recording_finished = None  # Called on the recording thread when the record loop ends
+        self.record_start_time = None  # time.monotonic() when the first frame of the last recording was processed
+        self.listening_started = None  # time.monotonic() when the record loop last started
+        # time.monotonic() of the stage boundaries of the last recording, for turn tracing
+        self.speech_start_time = None
+        self.speech_end_time = None
+        self.endpoint_time = None
+        self.saved_time = None
+        self._last_voice_time = None  # time.monotonic() when the last voiced frame was processed
+        self._archive = archive
+        self._wake_word = wake_word
+        self.last_archive_id = None  # Archive id of the last saved recording
+        # Voice activity statistics of the current recording
+        self._vad_frames = self._voiced_frames = 0
+        self._probability_sum = self._max_probability = 0.0
+
+    def initialize_vad(self) -> None:
+        """
+        Initializes the Cobra voice activity engine, unless it already exists.
+        """
+        if self._cobra_handle is not None:
+            return
+        started = time.perf_counter()
+        cobra_handle = pvcobra.create(access_key=self._access_key)
+        self._vad_engine = cobra_handle
+        if self._use_energy_gate:
+            self._vad_engine = GatedEngine(cobra_handle, EnergyGate(), silent_result=0.0, combine=last_result)
+        self._cobra_handle = cobra_handle
+        self.engine_init_seconds = time.perf_counter() - started
+        self._logger.debug("Cobra created in %.1f ms.", self.engine_init_seconds * 1000)
 
     def cleanup(self):
         """
         Cleans up the resources used by the audio recorder.
         """
-        if self.recording_thread and self.recording_thread.is_alive():
-            self.recording_thread.join()
+        self.wait_for_recording()
         if self._audio_data_provider:
             self._audio_data_provider.stop_stream()
+        for stage in self._frame_stages:
+            stage.close()
 
-    def perform_recording(self) -> str:
+    def perform_recording(self, audio_data_provider=None) -> str:
         """
         Starts the recording process, handles KeyboardInterrupt, and ensures cleanup.
+        Args:
+            audio_data_provider (optional): Provider to record from, e.g. WakeWordDetector.get_handoff_provider().
+                A new AudioDataProvider opening its own stream is used if omitted.
         Returns:
             str: The path to the recorded audio file.
         """
-        self._audio_data_provider = AudioDataProvider()
-        self.recording_thread = threading.Thread(target=self.start_recording, args=(self._audio_data_provider,))
-        self.recording_thread.start()
+        self._audio_data_provider = audio_data_provider or self._create_audio_data_provider()
         try:
-            while self._is_recording:
-                time.sleep(0.1)
+            self.start_recording(self._audio_data_provider)
+            self._recording_finished.wait()
         except KeyboardInterrupt:
             self._logger.info("Recording interrupted by user.")
         finally:
             self.stop_recording()
             return self.last_saved_file if self.last_saved_file else None
 
+    async def arecord(self, audio_data_provider=None) -> str:
+        """
+        Records one utterance without blocking the event loop.
+
+        The stream is opened in a worker thread and the coroutine is resumed through the event loop when the
+        record loop ends, instead of polling the recording state. Cancelling the coroutine stops the recording.
+
+        Args:
+            audio_data_provider (optional): Provider to record from, e.g. WakeWordDetector.get_handoff_provider().
+                A new AudioDataProvider opening its own stream is used if omitted.
+
+        Returns:
+            str: The path to the recorded audio file, or None if no valid recording was made.
+        """
+        loop = asyncio.get_running_loop()
+        finished = loop.create_future()
+        self._on_recording_finished = lambda: resolve_future_threadsafe(loop, finished)
+        self._audio_data_provider = audio_data_provider or self._create_audio_data_provider()
+        try:
+            await asyncio.to_thread(self.start_recording, self._audio_data_provider)
+            await finished
+        finally:
+            self._on_recording_finished = None
+            await asyncio.to_thread(self.stop_recording)
+        return self.last_saved_file if self.last_saved_file else None
+
+    def _create_audio_data_provider(self) -> AudioDataProvider:
+        return AudioDataProvider(
+            channels=self._device_channels, rate=self._device_rate, frames_per_buffer=COBRA_FRAME_LENGTH,
+            capture_block_size=self._capture_block_size, output_rate=COBRA_SAMPLE_RATE,
+            capture_monitor=self.capture_monitor)
+
     def start_recording(self, audio_data_provider: AudioDataProvider) -> None:
         """
         Starts the audio recording process using the provided audio data provider.
         Args:
             audio_data_provider (AudioDataProvider): The provider of audio data frames.
         """
+        self.initialize_vad()
         self._audio_data_provider = audio_data_provider
+        self._recording_finished.clear()
+        self.last_saved_file = None
         self._audio_data_provider.start_stream()
+        self.record_start_time = None
+        self.speech_start_time = self.speech_end_time = self.endpoint_time = self.saved_time = None
+        self._last_voice_time = None
+        self._inactivity_frames = 0
+        self._vad_frames = self._voiced_frames = 0
+        self._probability_sum = self._max_probability = 0.0
+        self.last_archive_id = None
+        self.endpointer.reset()
         self._is_recording = True
-        self.recording_thread = threading.Thread(target=self.record_loop, args=(audio_data_provider,))
-        self.recording_thread.start()
+        self._recording_future = self._capture_pool.submit(self.record_loop, audio_data_provider)
         self._logger.info("Recording started.")
 
+    @property
+    def recording_thread(self):
+        """
+        Deprecated: recordings no longer start a thread of their own; use wait_for_recording() instead.
+
+        Returns:
+            A handle to the current record loop with the join() and is_alive() methods of the thread earlier
+            versions started, or None if no recording was started.
+        """
+        warnings.warn("AudioRecorder.recording_thread is deprecated; use wait_for_recording() instead.",
+                      DeprecationWarning, stacklevel=2)
+        if self._recording_future is None:
+            return None
+        return _RecordLoopHandle(self, self._recording_future)
+
+    def wait_for_recording(self, timeout: float = None) -> None:
+        """
+        Waits for the record loop of the current recording to end. Returns immediately when called from the record
+        loop itself.
+
+        Args:
+            timeout (float, optional): Maximum number of seconds to wait. Waits indefinitely if omitted.
+        """
+        future = self._recording_future
+        if future is not None and not self._capture_pool.in_worker():
+            concurrent.futures.wait([future], timeout)
+
     def record_loop(self, audio_data_provider: AudioDataProvider) -> None:
         """
         The main loop for recording audio, processing frames, and managing recording state.
         Args:
             audio_data_provider (AudioDataProvider): The provider of audio data frames.
         """
-        silent_frames = 0
+        self.listening_started = time.monotonic()
+        next_frame = audio_data_provider.get_next_frame
+        if self._frame_stages:
+            processed_frames = []
+            if getattr(audio_data_provider, 'carry_over_processed', False):
+                # Taken before the pipeline starts reading, so the processed carry-over skips the stages
+                processed_frames = audio_data_provider.take_carry_over()
+            if self._pipeline is None:
+                # Kept across recordings so the pipeline threads are reused; it reads the current provider
+                self._pipeline = FramePipeline(lambda: self._audio_data_provider.get_next_frame(),
+                                               self._frame_stages, name='recorder')
+            self._pipeline.start()
+            next_frame = self._pipeline.read
+            if processed_frames:
+                next_frame = self._prepend_frames(processed_frames, next_frame)
+        try:
+            self._record_frames(next_frame)
+        except Exception as e:
+            self._logger.exception("An error occurred while recording.", exc_info=e)
+            raise
+        finally:
+            if self._pipeline is not None:
+                self._pipeline.stop()
+            self._recording_finished.set()
+            if self._on_recording_finished is not None:
+                self._on_recording_finished()
+
+    @staticmethod
+    def _prepend_frames(frames: list, next_frame):
+        """
+        Returns a frame reader that returns the given frames before those of next_frame.
+        """
+        frames = collections.deque(frames)
+
+        def read():
+            return frames.popleft() if frames else next_frame()
+
+        return read
+
+    def _record_frames(self, next_frame) -> None:
+        """
+        Processes frames until the recording is finalized or stopped.
+        Args:
+            next_frame (callable): Returns the next frame, or None when no more frames will arrive.
+        """
+        silent_frames = waiting_frames = 0
+        frame_seconds = COBRA_FRAME_LENGTH / COBRA_SAMPLE_RATE
+        clock = time.perf_counter
+        real_time_monitor = self.real_time_monitor
         while self._is_recording:
             try:
-                frame = audio_data_provider.get_next_frame()
+                frame = next_frame()
+                if frame is None:
+                    break  # The frame pipeline has stopped
+                started = clock()  # Processing time only, not the wait for the frame
+                if self.record_start_time is None:
+                    self.record_start_time = time.monotonic()
                 self.process_frame(frame)
                 if not self._recording:
+                    # Still waiting for speech: the frame becomes pre-roll
                     self.buffer_audio_frame(frame)
-                else:
-                    voice_activity_detected = self.detect_voice_activity(frame)
-                    if voice_activity_detected:
-                        self._inactivity_frames = 0  # Inactivity frames counter is now private
-                        self._frames_to_save.append(frame)
-                    else:
-                        self._inactivity_frames += 1
-                        silent_frames += 1
-
-                        if self.should_finalize_recording(silent_frames):
-                            self._logger.info("Inactivity limit exceeded. Finalizing recording...")
-                            return
+                    waiting_frames += 1
+                    if self.SPEECH_TIMEOUT is not None and waiting_frames * frame_seconds > self.SPEECH_TIMEOUT:
+                        self._logger.info("No speech detected. Ending recording...")
+                        self.finalize_recording()
+                        return
+                elif self._voice_probability <= self.VOICE_THRESHOLD:
+                    # process_frame() already ran voice activity detection, saved the frame and counted it as
+                    # inactive; only the end of the recording is checked here
+                    silent_frames += 1
+                    if self.should_finalize_recording(silent_frames):
+                        self._logger.info("Inactivity limit exceeded. Finalizing recording...")
+                        return
+                real_time_monitor.record(clock() - started)
             except Exception as e:
                 self._logger.error(f"An error occurred during recording: {e}")
                 break
@@ -156,13 +478,12 @@ class AudioRecorder:
         Returns:
             bool: True if the recording should be finalized, False otherwise.
         """
-        if (self._inactivity_frames * self._cobra_handle.frame_length / self._cobra_handle.sample_rate > self.
-                INACTIVITY_LIMIT):
+        if self._inactivity_exceeded():
             self._logger.info("No voice detected for a while. Finalizing recording...")
             self.finalize_recording()
             return True
-        if (silent_frames * self._cobra_handle.frame_length / self._cobra_handle.sample_rate > self.
-                SILENCE_LIMIT):
+        if (self.SILENCE_LIMIT is not None and
+                silent_frames * COBRA_FRAME_LENGTH / COBRA_SAMPLE_RATE > self.SILENCE_LIMIT):
             self._logger.info("Exceeded silence limit. Finalizing recording...")
             self.finalize_recording()
             return True
@@ -187,8 +508,71 @@ class AudioRecorder:
             bool: True if voice activity is detected, False otherwise.
         """
         audio_frame = np.frombuffer(frame, dtype=np.int16)
-        voice_probability = self._vad_engine.process(audio_frame)
-        return voice_probability > self.VOICE_THRESHOLD
+        started = time.perf_counter()
+        self._voice_probability = self._vad_engine.process(audio_frame)
+        _vad_seconds.inc(time.perf_counter() - started)
+        _vad_calls.inc()
+        return self._voice_probability > self.VOICE_THRESHOLD
+
+    def _inactivity_seconds(self) -> float:
+        return self._inactivity_frames * COBRA_FRAME_LENGTH / COBRA_SAMPLE_RATE
+
+    def _inactivity_exceeded(self) -> bool:
+        """
+        Checks whether the current run of silence is longer than the endpointer's timeout.
+        """
+        return self._inactivity_seconds() > self.endpointer.timeout()
+
+    def _finalize_on_inactivity(self) -> None:
+        if self.endpointer.has_speech:
+            self.endpointer.record_endpoint(self._inactivity_seconds())
+        self.finalize_recording()
+
+    def energy_gate_stats(self) -> dict:
+        """
+        Returns:
+            dict: Statistics of the energy gate in front of Cobra (see EnergyGate.stats()), or None if the gate
+            is disabled.
+        """
+        return self._vad_engine.gate.stats() if isinstance(self._vad_engine, GatedEngine) else None
+
+    def frame_pipeline_stats(self) -> dict:
+        """
+        Returns:
+            dict: Statistics of the frame stages of the current or last recording (see FramePipeline.stats()), or
+            None if no frame stages are configured.
+        """
+        return self._pipeline.stats() if self._pipeline else None
+
+    def capture_health_stats(self) -> dict:
+        """
+        Returns:
+            dict: Overruns and backlog of the streams the recorder opened itself (see CaptureMonitor.stats()) and
+            the real-time factor of the record loop (see RealTimeFactorMonitor.stats()).
+        """
+        return {'capture': self.capture_monitor.stats(), 'processing': self.real_time_monitor.stats()}
+
+    def vad_stats(self) -> dict:
+        """
+        Returns:
+            dict: For the current or last recording, the number of frames passed to voice activity detection, the
+            number of them with voice, and the mean and maximum voice probability.
+        """
+        frames = self._vad_frames
+        return {
+            'frames': frames,
+            'voiced_frames': self._voiced_frames,
+            'mean_voice_probability': self._probability_sum / frames if frames else None,
+            'max_voice_probability': self._max_probability if frames else None,
+        }
+
+    def endpointing_stats(self) -> dict:
+        """
+        Returns:
+            dict: Statistics of the trailing silence waited before recordings were finalized, see
+            AdaptiveEndpointer.stats().
+        """
+        return self.endpointer.stats()
 
     def manage_recording_state(self, frame: bytes, voice_activity_detected: bool) -> None:
         """
@@ -198,27 +582,35 @@ class AudioRecorder:
             voice_activity_detected (bool): Whether voice activity was detected in the frame.
         """
         with self._lock:
+            probability = self._voice_probability
+            self.endpointer.update(probability, voice_activity_detected)
+            self._vad_frames += 1
+            self._voiced_frames += voice_activity_detected
+            self._probability_sum += probability
+            if probability > self._max_probability:
+                self._max_probability = probability
             if voice_activity_detected:
                 self._inactivity_frames = 0  # Inactivity frames counter is now private
-                if not self._is_recording:
+                if not self._recording:
                     self.start_new_recording()
+                self._last_voice_time = time.monotonic()
                 self._frames_to_save.append(frame)
-            else:
-                self.buffer_audio_frame(frame)
+            elif self._recording:
+                # Only silence after speech started counts towards the inactivity limit; earlier frames are pre-roll
                 self._inactivity_frames += 1
-                if self._is_recording:
-                    self._frames_to_save.append(frame)
-                    if (
-                            self._inactivity_frames * self._cobra_handle.frame_length / self._cobra_handle.sample_rate >
-                            self.INACTIVITY_LIMIT):
-                        self.finalize_recording()
+                self._frames_to_save.append(frame)
+                if self._inactivity_exceeded():
+                    self._finalize_on_inactivity()
 
     def start_new_recording(self) -> None:
         """
         Starts a new recording, saving the buffered audio frames.
         """
         self._recording = True
-        self._frames_to_save = list(self._audio_buffer)  # Collect buffered audio when voice is detected
+        self.speech_start_time = time.monotonic()
+        # Collect the buffered audio when voice is detected: one contiguous copy of at most BUFFER_LENGTH seconds
+        pre_roll = self._audio_buffer.latest(self._audio_buffer.capacity)
+        self._frames_to_save = [pre_roll.tobytes()] if len(pre_roll) else []
         self._logger.info("Voice Detected - Starting Recording")
 
     def buffer_audio_frame(self, frame: bytes) -> None:
@@ -227,18 +619,25 @@ class AudioRecorder:
         Args:
             frame (bytes): A frame of audio data.
         """
-        if len(self._audio_buffer) == self._audio_buffer.maxlen:
-            self._audio_buffer.popleft()
-        self._audio_buffer.append(frame)
+        self._audio_buffer.write(frame)
+
+    @property
+    def pre_roll_nbytes(self) -> int:
+        """The memory used by the pre-roll buffer in bytes."""
+        return self._audio_buffer.nbytes
+
+    def _frames_duration(self, frames: list) -> float:
+        """
+        Returns the duration in seconds of a list of 16-bit audio chunks, which need not be frame-sized.
+        """
+        return sum(len(frame) for frame in frames) / 2 / COBRA_SAMPLE_RATE
 
     def check_inactivity_duration(self) -> None:
         """
         Checks the duration of inactivity and finalizes the recording if necessary.
         """
-        if (
-                self._inactivity_frames * self._cobra_handle.frame_length / self._cobra_handle.sample_rate >
-                self.INACTIVITY_LIMIT):
-            self.finalize_recording()
+        if self._inactivity_exceeded():
+            self._finalize_on_inactivity()
 
     def finalize_recording(self) -> str:
         """
@@ -247,20 +646,30 @@ class AudioRecorder:
             str or bool: The path to the saved recording file, or False if the recording was not saved.
         """
         saved_file_path = None
+        self.endpoint_time = time.monotonic()
+        if self.speech_start_time is not None:
+            # The trailing silence was waited after the last voiced frame
+            self.speech_end_time = self._last_voice_time
         if self._frames_to_save:
-            recording_length = len(
-                self._frames_to_save) * self._cobra_handle.frame_length / self._cobra_handle.sample_rate
+            recording_length = self._frames_duration(self._frames_to_save)
             if recording_length >= self.MIN_RECORDING_LENGTH:
                 saved_file_path = self.save_to_wav_file(self._frames_to_save)
+                self.saved_time = time.monotonic()
+                _recordings_saved.inc()
+                if self._archive is not None:
+                    self.last_archive_id = self._archive.add(b''.join(self._frames_to_save), kind='command',
+                                                             sample_rate=COBRA_SAMPLE_RATE, wake_word=self._wake_word,
+                                                             vad_stats=self.vad_stats())
                 self._logger.info(f"Recording of {recording_length:.2f} seconds saved.")
             else:
+                _recordings_discarded.inc()
                 self._logger.info(
                     f"Recording of {recording_length:.2f} seconds is under the minimum length. Discarded.")
             self._recording = False  # Ensure recording state is reset
             self._frames_to_save = []  # Clear the frames to save
             self._is_recording = False  # Ensure is_recording state is reset
-            if self.recording_thread:
-                self.recording_thread = None  # Reset the recording thread
+            if self._recording_future:
+                self._recording_future = None  # Reset the recording future
         self._recording = False  # Recording state is now private
         self._frames_to_save = []  # Frames to save are now private
         self._is_recording = False  # Recording state is now private
@@ -275,11 +684,11 @@ class AudioRecorder:
         Returns:
             str or bool: The path to the saved WAV file, or False if the recording was not saved.
         """
-        duration = len(frames) * self._cobra_handle.frame_length / self._cobra_handle.sample_rate
+        duration = self._frames_duration(frames)
         if duration < self.MIN_RECORDING_LENGTH:
             return False
 
-        recordings_dir = os.path.join(os.path.dirname(__file__), 'Wav_MP3')
+        recordings_dir = self._output_directory
 
         # Check if the directory exists, if not, create it
         if not os.path.exists(recordings_dir):
@@ -289,20 +698,25 @@ class AudioRecorder:
 
         with wave.open(filename, 'wb') as wf:
             wf.setnchannels(1)
-            wf.setsampwidth(self._py_audio.get_sample_size(pyaudio.paInt16))
-            wf.setframerate(self._cobra_handle.sample_rate)
+            wf.setsampwidth(2)  # 16-bit samples
+            wf.setframerate(COBRA_SAMPLE_RATE)
             wf.writeframes(b''.join(frames))
         logger.info(f"Saved to {filename}")
         return os.path.abspath(filename)
 
+    def interrupt(self) -> None:
+        """
+        Ends the current recording from another thread; the record loop stops after its current frame.
+        """
+        self._is_recording = False
+
     def stop_recording(self) -> None:
         """
-        Stops the recording process and joins the recording thread.
+        Stops the recording process and waits for the record loop to end.
         """
         self._is_recording = False  # Recording state is now private
-        if self.recording_thread:
-            self.recording_thread.join()
-            self._py_audio.terminate()
+        if self._recording_future:
+            self.wait_for_recording()
         self._logger.info("Recording stopped.")
 
 
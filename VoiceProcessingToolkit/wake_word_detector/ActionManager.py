@@ -1,50 +1,272 @@
 import asyncio
+import bisect
 import logging
-from VoiceProcessingToolkit.shared_resources import shutdown_flag
+import threading
+import time
+import warnings
+
+from VoiceProcessingToolkit.shared_resources import WorkerPool, shutdown_flag, thread_manager
+
+# Upper bounds in seconds of the execution time histogram buckets
+DEFAULT_HISTOGRAM_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+# Workers of the pool synchronous actions with a timeout run on
+DEFAULT_TIMED_ACTION_WORKERS = 4
+
+
+class ExecutionHistogram:
+    """
+    Histogram of the execution times of one action. Executions may be recorded from several event loops.
+
+    Attributes:
+        bounds (tuple): Upper bounds in seconds of the buckets.
+        counts (list): Number of executions per bucket; the last bucket counts executions above the largest bound.
+    """
+
+    def __init__(self, bounds=DEFAULT_HISTOGRAM_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.errors = 0
+        self.timeouts = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, error: bool = False, timeout: bool = False) -> None:
+        with self._lock:
+            self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+            self.count += 1
+            self.total_seconds += seconds
+            if seconds > self.max_seconds:
+                self.max_seconds = seconds
+            self.errors += error
+            self.timeouts += timeout
+
+    def to_dict(self) -> dict:
+        """
+        Returns:
+            dict: Executions, errors and timeouts, mean and maximum execution time in seconds, and the bucket
+            bounds and counts.
+        """
+        with self._lock:
+            return {
+                'count': self.count,
+                'errors': self.errors,
+                'timeouts': self.timeouts,
+                'mean_seconds': self.total_seconds / self.count if self.count else 0.0,
+                'max_seconds': self.max_seconds,
+                'bucket_bounds': list(self.bounds),
+                'bucket_counts': list(self.counts),
+            }
 
 
 class ActionManager:
     """
     Manages a list of actions (functions) to be executed.
 
+    Actions are dispatched on a long-lived event loop thread, and synchronous actions run on the shared worker pool
+    of the toolkit, so triggering them only costs scheduling a coroutine. The loop is started on first use and
+    stopped by shutdown().
+
+    A synchronous action cannot be interrupted: when it times out it keeps running on its worker until it returns.
+    Synchronous actions with a timeout therefore run on a small pool of the manager's own, so abandoned actions
+    never hold workers of the shared pool; at most that many abandoned actions run at a time, and later ones wait
+    for a free worker.
+
     Attributes:
-        __actions (list): A list of action functions to be executed.
+        __actions (list): (action function, timeout, histogram) entries to be executed.
         __logger (logging.Logger): Logger for the ActionManager class.
     """
 
-    def __init__(self):
+    def __init__(self, worker_pool: WorkerPool = None, default_timeout: float = None,
+                 histogram_buckets=DEFAULT_HISTOGRAM_BUCKETS, max_workers: int = None):
         """
         Initializes a new instance of ActionManager with an empty list of actions.
+
+        Args:
+            worker_pool (WorkerPool, optional): Pool synchronous actions run on, including those with a timeout.
+                Defaults to the shared pool of thread_manager, which bounds the number of actions running at the
+                same time, and a private pool of DEFAULT_TIMED_ACTION_WORKERS workers for actions with a timeout.
+            default_timeout (float, optional): Seconds after which an action without its own timeout is abandoned.
+                Actions may run indefinitely if omitted.
+            histogram_buckets (tuple): Upper bounds in seconds of the execution time histogram buckets.
+            max_workers (int, optional): Deprecated; pass a worker_pool instead. Runs synchronous actions on a
+                private pool of this many workers. An int passed as the first positional argument, as in earlier
+                versions, is treated the same way.
         """
+        if isinstance(worker_pool, int):
+            worker_pool, max_workers = None, worker_pool
+        if max_workers is not None:
+            warnings.warn("ActionManager(max_workers=...) is deprecated; pass a WorkerPool as worker_pool instead.",
+                          DeprecationWarning, stacklevel=2)
+            if not (isinstance(max_workers, int) and max_workers > 0):
+                raise ValueError("max_workers must be a positive integer")
+            if worker_pool is None:
+                worker_pool = WorkerPool('ActionManager-worker', max_workers=max_workers)
         self.__actions = []
         self.__logger = logging.getLogger(__name__)
+        self._worker_pool = worker_pool or thread_manager.worker_pool
+        self._timed_pool = worker_pool  # Created on first use unless a pool was passed
+        self._default_timeout = default_timeout
+        self._histogram_buckets = histogram_buckets
+        self._histograms = {}  # Histogram per unique action name, guarded by _lock
+        self._lock = threading.Lock()
+        self._loop = None
+        self._loop_thread = None
 
-    def register_action(self, action_function):
+    def register_action(self, action_function, timeout: float = None):
         """
         Registers a new action function to the list of actions.
 
         Args:
             action_function (callable): The function to be added to the actions list.
+            timeout (float, optional): Seconds after which the action is abandoned. Defaults to the manager's
+                default timeout. A synchronous action cannot be interrupted and keeps its worker until it returns.
+
+        Returns:
+            callable: The action function, so the method can also be used as a decorator.
         """
-        self.__actions.append(action_function)
+        histogram = ExecutionHistogram(self._histogram_buckets)
+        with self._lock:
+            # Every registration has its own statistics, e.g. of two lambdas, which share their qualified name
+            name = base_name = self._action_name(action_function)
+            number = 1
+            while name in self._histograms:
+                number += 1
+                name = f"{base_name} #{number}"
+            self._histograms[name] = histogram
+            self.__actions.append((action_function, timeout, histogram))
+        return action_function
+
+    @staticmethod
+    def _action_name(action_function) -> str:
+        return getattr(action_function, '__qualname__', None) or repr(action_function)
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                ready = threading.Event()
+                self._loop_thread = threading.Thread(target=self._run_loop, args=(self._loop, ready),
+                                                     name='ActionManager-loop', daemon=True)
+                self._loop_thread.start()
+                ready.wait()
+            return self._loop
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop, ready: threading.Event) -> None:
+        asyncio.set_event_loop(loop)
+        loop.call_soon(ready.set)
+        try:
+            loop.run_forever()
+            # Let actions that were still running handle their cancellation before the loop closes
+            pending = asyncio.all_tasks(loop)
+            for task in pending:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        finally:
+            loop.close()
+
+    def trigger(self, wait: bool = False, timeout: float = None):
+        """
+        Dispatches all registered actions on the persistent event loop.
+
+        Args:
+            wait (bool): If True, blocks until all actions have finished. Otherwise returns immediately
+                (fire-and-forget).
+            timeout (float, optional): Maximum number of seconds to wait if wait is True.
+
+        Returns:
+            concurrent.futures.Future: Completes when all actions have finished, or None if there was nothing to
+            dispatch.
+
+        Raises:
+            concurrent.futures.TimeoutError: If wait is True and the actions did not finish within the timeout.
+        """
+        if not self.__actions or shutdown_flag.is_set():
+            return None
+        future = asyncio.run_coroutine_threadsafe(self.execute_actions(), self._ensure_loop())
+        if wait:
+            future.result(timeout)
+        return future
 
     async def execute_actions(self):
         """
-        Executes all registered action functions concurrently.
+        Executes all registered action functions concurrently on the running event loop.
         """
         if not shutdown_flag.is_set():
-            # Ensure that each action is a coroutine before gathering
-            coroutines = [action() if asyncio.iscoroutinefunction(action) else asyncio.to_thread(action) for action in
-                          self.__actions]
+            coroutines = [self._run_action(*entry) for entry in self.__actions]
             results = await asyncio.gather(*coroutines, return_exceptions=True)
             for result in results:
                 if isinstance(result, Exception):
                     self.__logger.exception("An exception occurred while executing an action: %s", result, exc_info=result)
 
+    async def _run_action(self, action, timeout: float, histogram: ExecutionHistogram):
+        """
+        Runs one action with its timeout and records its execution time. Synchronous actions run on the worker pool,
+        or on the pool for timed actions if they have a timeout.
+        """
+        timeout = timeout if timeout is not None else self._default_timeout
+        started = time.perf_counter()
+        error = timed_out = False
+        try:
+            if asyncio.iscoroutinefunction(action):
+                awaitable = action()
+            else:
+                pool = self._worker_pool if timeout is None else self._get_timed_pool()
+                awaitable = asyncio.get_running_loop().run_in_executor(pool, action)
+            return await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError:
+            timed_out = True
+            self.__logger.warning("Action %s did not finish within %.2f s and was abandoned.",
+                                  self._action_name(action), timeout)
+        except Exception:
+            error = True
+            raise
+        finally:
+            histogram.record(time.perf_counter() - started, error=error, timeout=timed_out)
+
+    def _get_timed_pool(self) -> WorkerPool:
+        with self._lock:
+            if self._timed_pool is None:
+                self._timed_pool = WorkerPool('ActionManager-timed', max_workers=DEFAULT_TIMED_ACTION_WORKERS)
+            return self._timed_pool
+
+    def action_stats(self) -> dict:
+        """
+        Returns:
+            dict: Execution statistics and histogram per action name (see ExecutionHistogram.to_dict()).
+        """
+        with self._lock:
+            histograms = dict(self._histograms)
+        return {name: histogram.to_dict() for name, histogram in histograms.items()}
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stops the event loop thread and the pool for timed actions. Both are started again when actions are next
+        triggered. Synchronous actions that are still running keep their worker until they return. When called
+        from an action running on the loop, the loop stops once the action returns control to it.
+
+        Args:
+            wait (bool): If True, waits for the event loop thread to exit, unless called from that thread.
+        """
+        with self._lock:
+            loop, loop_thread = self._loop, self._loop_thread
+            self._loop = self._loop_thread = None
+            timed_pool = None
+            if self._timed_pool is not self._worker_pool:  # Only a pool the manager created itself
+                timed_pool, self._timed_pool = self._timed_pool, None
+        if timed_pool is not None:
+            timed_pool.shutdown(wait=False)  # Abandoned actions finish on their own
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+            if wait and threading.current_thread() is not loop_thread:
+                loop_thread.join()
+
 
-def register_action_decorator(action_manager):
+def register_action_decorator(action_manager, timeout=None):
     def decorator(action_function):
-        action_manager.register_action(action_function)
+        action_manager.register_action(action_function, timeout=timeout)
         return action_function
 
     return decorator
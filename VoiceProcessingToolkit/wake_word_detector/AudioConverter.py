@@ -0,0 +1,145 @@
+"""
+AudioConverter
+------------------------
+
+Converts capture blocks from the device format to the 16 kHz mono audio the engines expect.
+
+Many USB and array microphones only deliver 44.1 or 48 kHz, often in stereo. The converter downmixes the
+channels and resamples with a polyphase windowed-sinc filter, one whole block at a time in NumPy. The filter
+history and phase are carried from block to block, so the output is identical to converting the whole signal at
+once and there are no artifacts at block edges.
+"""
+
+import math
+import time
+
+import numpy as np
+
+
+def design_polyphase_filter(up: int, down: int, taps_per_phase: int = None, beta: float = 8.0,
+                            zero_crossings: int = 24) -> np.ndarray:
+    """
+    Designs a low-pass Kaiser-windowed sinc filter for rational resampling, split into its polyphase components.
+
+    The filter passes up to 90% of the lower Nyquist frequency. With the default length and window, audio above that
+    Nyquist frequency, which would otherwise alias into the engine band, is attenuated by at least 60 dB, and by at
+    least 80 dB from 500 Hz above it.
+
+    Args:
+        up (int): Interpolation factor.
+        down (int): Decimation factor.
+        taps_per_phase (int, optional): Filter length per phase; longer filters give a steeper cutoff. By default
+            the filter spans zero_crossings sinc zero crossings on each side, so the transition band has the same
+            width relative to the output rate whatever the resampling ratio.
+        beta (float): Kaiser window shape parameter.
+        zero_crossings (int): Zero crossings of the sinc on each side of the centre when taps_per_phase is omitted.
+
+    Returns:
+        numpy.ndarray: Array of shape (up, taps_per_phase) where row p holds the taps used for output phase p.
+    """
+    if taps_per_phase is None:
+        taps_per_phase = math.ceil(2 * zero_crossings * max(up, down) / up)
+    length = up * taps_per_phase
+    cutoff = 0.5 / max(up, down) * 0.9  # Cycles per sample at the upsampled rate, with a guard band
+    centre = (length - 1) / 2
+    taps = 2 * cutoff * np.sinc(2 * cutoff * (np.arange(length) - centre)) * np.kaiser(length, beta)
+    taps *= up / taps.sum()  # Unity DC gain after zero stuffing
+    return taps.reshape(taps_per_phase, up).T.astype(np.float32)
+
+
+class AudioConverter:
+    """
+    Streaming downmix and resampling of 16-bit PCM blocks.
+    """
+
+    def __init__(self, input_rate: int, input_channels: int = 1, output_rate: int = 16000,
+                 taps_per_phase: int = None):
+        """
+        Args:
+            input_rate (int): Sample rate delivered by the device.
+            input_channels (int): Number of interleaved channels delivered by the device.
+            output_rate (int): Sample rate required by the engines.
+            taps_per_phase (int, optional): Resampling filter length per phase. Derived from the resampling ratio
+                if omitted, see design_polyphase_filter().
+        """
+        self.input_rate = input_rate
+        self.input_channels = input_channels
+        self.output_rate = output_rate
+        divisor = math.gcd(input_rate, output_rate)
+        self._up = output_rate // divisor
+        self._down = input_rate // divisor
+        self._resample = self._up != self._down
+        self._filter = design_polyphase_filter(self._up, self._down, taps_per_phase) if self._resample else None
+        self._taps = self._filter.shape[1] if self._resample else 1
+        self._history = np.zeros(self._taps - 1, dtype=np.float32)
+        self._consumed = 0  # Input samples consumed so far
+        self._next_output = 0  # Index of the next output sample
+        self.input_seconds = 0.0
+        self.processing_seconds = 0.0
+
+    @property
+    def is_passthrough(self) -> bool:
+        """True if the device format already matches the output format."""
+        return not self._resample and self.input_channels == 1
+
+    def convert(self, data) -> bytes:
+        """
+        Converts one block of device audio.
+
+        Args:
+            data (bytes): Interleaved 16-bit PCM at the input rate and channel count.
+
+        Returns:
+            bytes: 16-bit mono PCM at the output rate. The length varies slightly from block to block.
+        """
+        if self.is_passthrough:
+            return data
+        started = time.perf_counter()
+        samples = np.frombuffer(data, dtype=np.int16)
+        if self.input_channels > 1:
+            samples = samples[:len(samples) - len(samples) % self.input_channels]
+            mono = samples.reshape(-1, self.input_channels).mean(axis=1, dtype=np.float32)
+        else:
+            mono = samples.astype(np.float32)
+        self.input_seconds += len(mono) / self.input_rate
+        output = self._resample_block(mono) if self._resample else mono
+        result = np.clip(np.rint(output), -32768, 32767).astype(np.int16).tobytes()
+        self.processing_seconds += time.perf_counter() - started
+        return result
+
+    def _resample_block(self, block: np.ndarray) -> np.ndarray:
+        buffer = np.concatenate((self._history, block))
+        last_input = self._consumed + len(block)  # One past the last input index available
+        # Output n uses input index (n * down) // up, which must already be available
+        end = (last_input * self._up + self._down - 1) // self._down
+        outputs = np.arange(self._next_output, end, dtype=np.int64)
+        upsampled = outputs * self._down
+        input_index = upsampled // self._up
+        phase = upsampled % self._up
+        # Position of each output's newest input sample in the buffer, then the preceding taps
+        local = input_index - self._consumed + self._taps - 1
+        gather = local[:, None] - np.arange(self._taps)[None, :]
+        result = np.einsum('ij,ij->i', buffer[gather], self._filter[phase])
+
+        self._history = buffer[len(buffer) - (self._taps - 1):].copy()
+        self._consumed = last_input
+        self._next_output = end
+        return result
+
+    def reset(self) -> None:
+        """Clears the filter state, e.g. after the device was reopened."""
+        self._history[:] = 0
+        self._consumed = 0
+        self._next_output = 0
+
+    def stats(self) -> dict:
+        """
+        Returns:
+            dict: Seconds of input audio converted, seconds spent converting, and the conversion cost in seconds
+            of CPU per second of audio.
+        """
+        return {
+            'input_seconds': self.input_seconds,
+            'processing_seconds': self.processing_seconds,
+            'cost_per_audio_second': (self.processing_seconds / self.input_seconds) if self.input_seconds else 0.0,
+        }
@@ -1,19 +1,226 @@
 import logging
-import pyaudio
+import threading
+
+import numpy as np
+
+from VoiceProcessingToolkit.monitoring.CaptureMonitor import CaptureMonitor
+from VoiceProcessingToolkit.monitoring.Metrics import metrics
+from VoiceProcessingToolkit.shared_resources import lazy_import
+from VoiceProcessingToolkit.wake_word_detector.AudioConverter import AudioConverter
+
+pyaudio = lazy_import('pyaudio')
 
 logger = logging.getLogger(__name__)
 
+_captured_blocks = metrics.counter('voice_processing_capture_blocks_total', 'Blocks read from the audio device.')
+_captured_samples = metrics.counter('voice_processing_capture_samples_total',
+                                    'Samples captured, after conversion to the engine format.')
+_capture_overflows = metrics.counter('voice_processing_capture_overflows_total',
+                                     'Reads that failed because the device input buffer overflowed.')
+
+
+class AudioRingBuffer:
+    """
+    Fixed-size ring buffer of 16-bit samples, addressed by absolute sample position.
+
+    The storage is preallocated once. Writes copy only the new samples, and any range that is still held can be
+    read back by its absolute position, which lets consumers on other threads take windows around an event
+    (such as a wake word detection) after more audio has arrived.
+    """
+
+    def __init__(self, capacity: int):
+        """
+        Args:
+            capacity (int): Number of samples the buffer holds.
+        """
+        if capacity <= 0:
+            raise ValueError("Ring buffer capacity must be a positive integer")
+        self._buffer = np.zeros(capacity, dtype=np.int16)
+        self._capacity = capacity
+        self._position = 0  # Total number of samples written
+        self._advanced = threading.Condition()
+        self._waiters = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def position(self) -> int:
+        """The total number of samples written, i.e. the absolute position one past the newest sample."""
+        return self._position
+
+    @property
+    def nbytes(self) -> int:
+        """The memory used by the sample storage in bytes."""
+        return self._buffer.nbytes
+
+    def write(self, data) -> None:
+        """
+        Appends samples to the buffer, overwriting the oldest ones once it is full.
+
+        Args:
+            data (bytes or numpy.ndarray): 16-bit PCM samples.
+        """
+        samples = data if isinstance(data, np.ndarray) else np.frombuffer(data, dtype=np.int16)
+        count = len(samples)
+        if count == 0:
+            return
+        if count > self._capacity:
+            samples = samples[-self._capacity:]
+        written = len(samples)
+        index = (self._position + count - written) % self._capacity
+        first = min(written, self._capacity - index)
+        self._buffer[index:index + first] = samples[:first]
+        if first < written:
+            self._buffer[:written - first] = samples[first:]
+        self._position += count
+        if self._waiters:
+            with self._advanced:
+                self._advanced.notify_all()
+
+    def wait_for(self, position: int, timeout: float = None) -> bool:
+        """
+        Waits until the buffer has been written up to an absolute position.
+
+        Args:
+            position (int): Absolute position one past the last sample needed.
+            timeout (float, optional): Maximum number of seconds to wait.
+
+        Returns:
+            bool: True if the position was reached, False if the timeout expired first.
+        """
+        with self._advanced:
+            self._waiters += 1
+            try:
+                return self._advanced.wait_for(lambda: self._position >= position, timeout)
+            finally:
+                self._waiters -= 1
+
+    def read(self, start: int, end: int) -> np.ndarray:
+        """
+        Copies the samples between two absolute positions. The range is clamped to the samples still held.
+
+        Args:
+            start (int): Absolute position of the first sample.
+            end (int): Absolute position one past the last sample.
+
+        Returns:
+            numpy.ndarray: The samples in the range.
+        """
+        start = max(start, self._position - self._capacity, 0)
+        end = min(end, self._position)
+        count = end - start
+        if count <= 0:
+            return np.empty(0, dtype=np.int16)
+        index = start % self._capacity
+        first = min(count, self._capacity - index)
+        if first == count:
+            return self._buffer[index:index + count].copy()
+        return np.concatenate((self._buffer[index:], self._buffer[:count - first]))
+
+    def latest(self, count: int) -> np.ndarray:
+        """
+        Copies the most recent samples.
+
+        Args:
+            count (int): Number of samples to return, at most the buffer capacity.
+
+        Returns:
+            numpy.ndarray: The newest samples, oldest first.
+        """
+        return self.read(self._position - count, self._position)
+
+
+class AudioReframer:
+    """
+    Splits large capture blocks into engine-sized frames.
+
+    Reading a few thousand samples per device read instead of one engine frame cuts the number of blocking reads,
+    GIL handoffs and loop iterations per second. Frames are returned as zero-copy memoryview slices of the block.
+    Samples left over when the block size is not a multiple of the frame length are carried into the next frame,
+    which is the only case where data is copied.
+    """
+
+    def __init__(self, read_block, frame_length: int, sample_width: int = 2):
+        """
+        Args:
+            read_block (callable): Returns the next capture block as bytes.
+            frame_length (int): Number of samples per engine frame.
+            sample_width (int): Bytes per sample.
+        """
+        self._read_block = read_block
+        self._frame_bytes = frame_length * sample_width
+        self._sample_width = sample_width
+        self._block = memoryview(b'')
+        self._offset = 0
+
+    @property
+    def pending_samples(self) -> int:
+        """The number of samples read from the device but not yet returned as frames."""
+        return (len(self._block) - self._offset) // self._sample_width
+
+    def reset(self) -> None:
+        """Discards any pending samples, e.g. after the device was reopened."""
+        self._block = memoryview(b'')
+        self._offset = 0
+
+    def next_frame(self) -> memoryview:
+        """
+        Returns:
+            memoryview: The next engine frame.
+        """
+        if len(self._block) - self._offset < self._frame_bytes:
+            block = self._block[self._offset:].tobytes()
+            while len(block) < self._frame_bytes:
+                block = block + self._read_block() if block else self._read_block()
+            self._block = memoryview(block)
+            self._offset = 0
+        frame = self._block[self._offset:self._offset + self._frame_bytes]
+        self._offset += self._frame_bytes
+        return frame
+
 
 class AudioStream:
-    def __init__(self, rate: int, channels: int, _audio_format: int, frames_per_buffer: int):
+    def __init__(self, rate: int, channels: int, _audio_format: int, frames_per_buffer: int,
+                 capture_block_size: int = None, output_rate: int = None, capture_monitor: CaptureMonitor = None):
+        """
+        Args:
+            rate (int): Sample rate of the audio device.
+            channels (int): Number of audio channels delivered by the device.
+            _audio_format (int): Format of the audio stream.
+            frames_per_buffer (int): Number of samples per frame returned by read(), i.e. the engine frame length.
+            capture_block_size (int, optional): Number of device frames read at once. Blocks are split into frames
+                of frames_per_buffer samples. Defaults to one engine frame's worth of device audio.
+            output_rate (int, optional): Sample rate of the audio returned by read(). If it differs from rate, or
+                the device has more than one channel, every block is resampled and downmixed to mono. Defaults to
+                rate.
+            capture_monitor (CaptureMonitor, optional): Detects audio the device dropped because reads fell behind.
+                Defaults to a monitor with default limits and no alert callback.
+        """
         self._py_audio = pyaudio.PyAudio()
+        self._device_rate = rate
+        self._rate = output_rate or rate
+        self._channels = channels
+        self._audio_format = _audio_format
         self._frames_per_buffer = frames_per_buffer
+        self._converter = AudioConverter(rate, channels, self._rate)
+        if self._converter.is_passthrough:
+            self._converter = None
+        default_block_size = -(-frames_per_buffer * rate // self._rate)  # One engine frame of device audio
+        self._capture_block_size = capture_block_size or default_block_size
+        self._reframer = None
+        if self._capture_block_size != frames_per_buffer or self._converter is not None:
+            self._reframer = AudioReframer(self._read_block, frames_per_buffer)
         self._pre_buffer_seconds = 1.5  # Duration to keep before wake word
         self._post_buffer_seconds = 1.5  # Duration to keep after wake word
-        # Calculate the buffer size based on the duration and sample rate
-        self._buffer_size = int(rate * (self._pre_buffer_seconds + self._post_buffer_seconds))
-        self._rolling_buffer = bytearray(self._buffer_size)
-        self._stream = self._initialize_stream(rate, channels, _audio_format, frames_per_buffer)
+        self._buffer_margin_seconds = 2.0  # Extra history so background readers can lag behind capture
+        # Calculate the buffer size in samples based on the duration and sample rate
+        self._buffer_size = int(self._rate * (self._pre_buffer_seconds + self._post_buffer_seconds +
+                                        self._buffer_margin_seconds))
+        self._rolling_buffer = AudioRingBuffer(self._buffer_size)
+        self.capture_monitor = capture_monitor or CaptureMonitor(rate, 'wake_word')
+        self._stream = self._initialize_stream(rate, channels, _audio_format, self._capture_block_size)
 
     def update_rolling_buffer(self, data: bytes) -> None:
         """
@@ -22,8 +229,51 @@ class AudioStream:
         Args:
             data (bytes): The audio data to add to the rolling buffer.
         """
-        # Ensure the rolling buffer contains the correct duration of audio data
-        self._rolling_buffer = (self._rolling_buffer[-(self._buffer_size - len(data)):] + data)
+        self._rolling_buffer.write(data)
+
+    @property
+    def rolling_buffer(self) -> AudioRingBuffer:
+        """The ring buffer holding the most recent audio read from the stream."""
+        return self._rolling_buffer
+
+    @property
+    def sample_rate(self) -> int:
+        """The sample rate of the audio returned by read()."""
+        return self._rate
+
+    def conversion_stats(self) -> dict:
+        """
+        Returns:
+            dict: Cost of resampling and downmixing (see AudioConverter.stats()), or None if the device format
+            needs no conversion.
+        """
+        return self._converter.stats() if self._converter else None
+
+    @property
+    def frame_length(self) -> int:
+        """The number of samples in every frame returned by read()."""
+        return self._frames_per_buffer
+
+    @property
+    def position(self) -> int:
+        """
+        The total number of samples returned by read(), usable as a marker for get_audio_since().
+        """
+        if self._reframer is not None:
+            return self._rolling_buffer.position - self._reframer.pending_samples
+        return self._rolling_buffer.position
+
+    def get_audio_since(self, position: int) -> bytes:
+        """
+        Retrieves the audio read after the given stream position, as far as the rolling buffer still holds it.
+
+        Args:
+            position (int): A value previously returned by the position property.
+
+        Returns:
+            bytes: The audio data read since the position.
+        """
+        return self._rolling_buffer.read(position, self.position).tobytes()
 
     def get_rolling_buffer(self) -> bytes:
         """
@@ -32,7 +282,7 @@ class AudioStream:
         Returns:
             bytes: The current audio data in the rolling buffer.
         """
-        return bytes(self._rolling_buffer)
+        return self._rolling_buffer.latest(self._rolling_buffer.capacity).tobytes()
 
     def _initialize_stream(self, rate: int, channels: int, _audio_format: int, frames_per_buffer: int):
         """
@@ -57,25 +307,64 @@ class AudioStream:
 
     def read(self) -> bytes:
         """
-        Reads audio data from the stream and updates the rolling buffer.
+        Reads one frame of audio data from the stream and updates the rolling buffer.
 
         Returns:
-            bytes: The audio data read from the stream.
+            bytes: The audio data read from the stream. With a capture block size larger than the frame length
+            this is a memoryview slice of the capture block.
+        """
+        if self._reframer is not None:
+            return self._reframer.next_frame()
+        return self._read_block()
+
+    def _read_block(self) -> bytes:
         """
-        data = bytearray()
+        Reads one capture block from the device and adds it to the rolling buffer.
+        """
+        data = b''
+        stream, monitor = self._stream, self.capture_monitor
         try:
-            data.extend(self._stream.read(self._frames_per_buffer, exception_on_overflow=False))
+            # The stream does not report overflows when reading, so the monitor checks the samples that arrive
+            monitor.before_read(stream.get_read_available())
+            data = stream.read(self._capture_block_size, exception_on_overflow=False)
+            monitor.after_read(self._capture_block_size)
         except IOError as e:
             # Handle input overflow error if it occurs
             if e.errno == pyaudio.paInputOverflowed:
+                _capture_overflows.inc()
                 logger.warning("Input overflow occurred while reading audio stream.")
             else:
                 raise
 
+        if self._converter is not None:
+            data = self._converter.convert(data)
         self.update_rolling_buffer(data)
+        _captured_blocks.inc()
+        _captured_samples.inc(len(data) // 2)
         return data
 
 
+    def discard_pending(self) -> int:
+        """
+        Drops the audio the device captured while nobody was reading, e.g. during speech playback between turns,
+        so the next read returns current audio.
+
+        Returns:
+            int: The number of device frames discarded.
+        """
+        if self.is_stream_closed():
+            return 0
+        available = self._stream.get_read_available()
+        if available:
+            self._stream.read(available, exception_on_overflow=False)
+        # Samples held back by the reframer and the resampler belong to the discarded audio as well
+        if self._reframer is not None:
+            self._reframer.reset()
+        if self._converter is not None:
+            self._converter.reset()
+        self.capture_monitor.reset()
+        return available
+
     def is_stream_closed(self):
         """
         Checks if the audio stream is closed.
@@ -96,7 +385,21 @@ class AudioStream:
             frames_per_buffer (int): Number of audio frames per buffer.
         """
         self.cleanup()  # Ensure any existing stream is cleaned up before initializing a new one
-        self._initialize_stream(rate, channels, _audio_format, frames_per_buffer)
+        self._device_rate, self._channels, self._audio_format = rate, channels, _audio_format
+        self._frames_per_buffer = frames_per_buffer
+        if self._reframer is not None:
+            self._reframer.reset()
+        if self._converter is not None:
+            self._converter.reset()
+        self.capture_monitor.reset()
+        self._stream = self._initialize_stream(rate, channels, _audio_format, self._capture_block_size)
+
+    def reopen(self) -> None:
+        """
+        Reopens the audio stream with the parameters it was created with, if it has been closed.
+        """
+        if self.is_stream_closed():
+            self.initialize_stream(self._device_rate, self._channels, self._audio_format, self._frames_per_buffer)
 
     def cleanup(self):
         # Check if the stream has been initialized and is open before attempting to stop and close
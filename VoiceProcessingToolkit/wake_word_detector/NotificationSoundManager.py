@@ -2,7 +2,10 @@ import contextlib
 import logging
 import os
 
-import pygame
+from VoiceProcessingToolkit.shared_resources import lazy_import
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')  # pygame prints a banner when imported
+pygame = lazy_import('pygame')
 
 logger = logging.getLogger(__name__)
 
@@ -0,0 +1,203 @@
+"""
+SnippetWriter
+------------------------
+
+Writes wake word audio snippets for dataset collection on a single background thread.
+
+Detections are queued with the stream position at which they happened. The writer waits on the stream's ring
+buffer until the audio after the detection has been captured, takes the pre- and post-detection window from the stream's ring buffer, writes
+it to a uniquely named WAV file in a per-day shard directory and appends an entry to a JSONL manifest in batches.
+With a SegmentArchive, snippets are appended to the archive instead of written as files. The detection loop only
+pays for a non-blocking queue put.
+"""
+
+import concurrent.futures
+import json
+import logging
+import os
+import threading
+import time
+import wave
+
+from VoiceProcessingToolkit.shared_resources import WorkerPool
+
+logger = logging.getLogger(__name__)
+
+
+class WakeWordSnippetWriter:
+    """
+    Background writer for wake word snippets taken from an AudioStream ring buffer.
+
+    Attributes:
+        written (int): Number of snippets written.
+        dropped (int): Number of detections dropped because the queue was full.
+    """
+
+    MANIFEST_NAME = 'manifest.jsonl'
+
+    def __init__(self, audio_stream, output_directory: str, pre_seconds: float = 1.0, post_seconds: float = 1.5,
+                 wake_word: str = None, max_queue_size: int = 64, manifest_batch_size: int = 20, archive=None):
+        """
+        Args:
+            audio_stream (AudioStream): The stream whose ring buffer holds the audio around detections.
+            output_directory (str): Directory for the snippet shards and the manifest.
+            pre_seconds (float): Seconds of audio to keep before the detection.
+            post_seconds (float): Seconds of audio to keep after the detection.
+            wake_word (str, optional): Wake word recorded in the manifest entries.
+            max_queue_size (int): Maximum number of detections waiting to be written.
+            manifest_batch_size (int): Number of manifest entries buffered before they are appended to the file.
+                Pending entries are also flushed whenever the queue runs empty.
+            archive (SegmentArchive, optional): Archive the snippets are appended to, with the detection offset in
+                their metadata. No files or manifest are written to output_directory then.
+        """
+        self._audio_stream = audio_stream
+        self._output_directory = output_directory
+        self._pre_seconds = pre_seconds
+        self._post_seconds = post_seconds
+        self._wake_word = wake_word
+        self._manifest_batch_size = manifest_batch_size
+        self._max_queue_size = max_queue_size
+        self._manifest_entries = []  # Only used on the writer thread, or after it stopped
+        self._lock = threading.Lock()  # Guards the pool, the counters and the capture end
+        self._pool = None
+        self._pending = 0
+        self._sequence = 0
+        self._capture_end = 0
+        self.written = 0
+        self.dropped = 0
+        self._archive = archive
+        if archive is None:
+            os.makedirs(self._output_directory, exist_ok=True)
+
+    @property
+    def capture_end(self) -> int:
+        """The stream position up to which the audio of the queued snippets has to be captured."""
+        with self._lock:
+            return self._capture_end
+
+    def start(self) -> None:
+        """
+        Creates the writer pool if it is not already running. Its thread starts with the first snippet.
+        """
+        with self._lock:
+            self._start()
+
+    def _start(self) -> WorkerPool:
+        if self._pool is None:
+            self._pool = WorkerPool('WakeWordSnippetWriter', max_workers=1)
+        return self._pool
+
+    def submit(self, position: int) -> bool:
+        """
+        Queues a snippet around a detection. Never blocks; the detection is dropped if the queue is full.
+
+        Args:
+            position (int): Stream position (in samples) at which the wake word was detected.
+
+        Returns:
+            bool: True if the snippet was queued, False if it was dropped.
+        """
+        with self._lock:
+            if self._pending >= self._max_queue_size:
+                self.dropped += 1
+                logger.warning("Wake word snippet queue is full, dropping snippet.")
+                return False
+            self._pending += 1
+            end = position + int(self._post_seconds * self._audio_stream.sample_rate)
+            self._capture_end = max(self._capture_end, end)
+            self._start().submit(self._run, position, time.time(), time.monotonic())
+            return True
+
+    def stop(self, timeout: float = None) -> None:
+        """
+        Writes the queued snippets, flushes the manifest and stops the writer thread. The writer starts again on
+        the next submit().
+
+        Args:
+            timeout (float, optional): Maximum number of seconds to wait for the writer to finish.
+        """
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is None:
+            return
+        flushed = pool.submit(self._flush_manifest)  # Runs after the queued snippets
+        pool.shutdown(wait=False)
+        concurrent.futures.wait([flushed], timeout)
+
+    def _run(self, position: int, wall_time: float, submitted: float) -> None:
+        try:
+            self._write_snippet(position, wall_time, submitted)
+        except Exception as e:
+            logger.exception("Failed to write wake word snippet.", exc_info=e)
+        with self._lock:
+            self._pending -= 1
+            idle = self._pending == 0
+        if idle or len(self._manifest_entries) >= self._manifest_batch_size:
+            self._flush_manifest()
+
+    def _wait_for_post_window(self, end: int, submitted: float) -> None:
+        """
+        Waits until the audio up to the end of the post-detection window has been captured. Gives up shortly after
+        the window should have been complete, e.g. when nothing is reading from the stream any more.
+        """
+        remaining = submitted + self._post_seconds + 1.0 - time.monotonic()
+        if remaining > 0 and not self._audio_stream.is_stream_closed():
+            self._audio_stream.rolling_buffer.wait_for(end, remaining)
+
+    def _write_snippet(self, position: int, wall_time: float, submitted: float) -> None:
+        sample_rate = self._audio_stream.sample_rate
+        start = position - int(self._pre_seconds * sample_rate)
+        end = position + int(self._post_seconds * sample_rate)
+        self._wait_for_post_window(end, submitted)
+
+        ring = self._audio_stream.rolling_buffer
+        first_held = max(ring.position - ring.capacity, 0)
+        samples = ring.read(start, end)
+        if len(samples) == 0:
+            logger.warning("Wake word snippet audio is no longer in the buffer, skipping.")
+            return
+
+        detection_offset = (position - max(start, first_held)) / sample_rate
+        if self._archive is not None:
+            self._archive.add(samples.tobytes(), kind='wake_word', sample_rate=sample_rate,
+                              created=wall_time - detection_offset, wake_word=self._wake_word,
+                              metadata={'detection_offset': detection_offset})
+            with self._lock:
+                self.written += 1
+            return
+
+        with self._lock:
+            self._sequence += 1
+            sequence = self._sequence
+        timestamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(wall_time))
+        shard = timestamp[:8]
+        filename = f"wake_word_{timestamp}_{int(wall_time * 1000) % 1000:03d}_{sequence:06d}.wav"
+        relative_path = os.path.join(shard, filename)
+        filepath = os.path.join(self._output_directory, relative_path)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+        with wave.open(filepath, 'wb') as wave_file:
+            wave_file.setnchannels(1)
+            wave_file.setsampwidth(2)
+            wave_file.setframerate(sample_rate)
+            wave_file.writeframes(samples.tobytes())
+        with self._lock:
+            self.written += 1
+        logger.info("Saved wake word audio snippet to %s", filepath)
+
+        self._manifest_entries.append({
+            'file': relative_path,
+            'timestamp': wall_time,
+            'wake_word': self._wake_word,
+            'sample_rate': sample_rate,
+            'duration': len(samples) / sample_rate,
+            'detection_offset': detection_offset,
+        })
+
+    def _flush_manifest(self) -> None:
+        if not self._manifest_entries:
+            return
+        lines = ''.join(json.dumps(entry) + '\n' for entry in self._manifest_entries)
+        with open(os.path.join(self._output_directory, self.MANIFEST_NAME), 'a', encoding='utf-8') as manifest:
+            manifest.write(lines)
+        self._manifest_entries = []
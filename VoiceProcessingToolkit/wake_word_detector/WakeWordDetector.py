@@ -9,6 +9,7 @@ Before using, set the PICOVOICE_APIKEY environment variable with your Porcupine
 
 Classes:
     WakeWordDetector: Detects specified wake words and manages actions upon detection.
+    WakeWordDetection: A single detection reported by the detector in continuous mode.
     AudioStreamManager: Manages audio stream from the microphone.
     NotificationSoundManager: Plays notification sounds.
     ActionManager: Manages and executes actions based on wake word detection.
@@ -28,30 +29,67 @@ Example:
         play_notification_sound=True
     )
     detector.run()
+
+    # Or keep the engine and stream alive and handle every detection as it happens
+    for detection in detector.detections():
+        print(detection.timestamp)
     ```
 """
 
 import asyncio
+import collections
+import concurrent.futures
+import functools
 import logging
 import os
+import queue
 from importlib import resources
 
 import struct
 import threading
 import time
-import wave
 
-import pvporcupine
-import pyaudio
+import numpy as np
 from dotenv import load_dotenv
 
+from VoiceProcessingToolkit.monitoring.CaptureMonitor import RealTimeFactorMonitor
+from VoiceProcessingToolkit.monitoring.Metrics import metrics
+from VoiceProcessingToolkit.pipeline.FramePipeline import FramePipeline
+from VoiceProcessingToolkit.voice_detection.EnergyGate import EnergyGate, GatedEngine
 from VoiceProcessingToolkit.wake_word_detector.ActionManager import ActionManager
 from VoiceProcessingToolkit.wake_word_detector.AudioStreamManager import AudioStream
 from VoiceProcessingToolkit.wake_word_detector.NotificationSoundManager import NotificationSoundManager
-from VoiceProcessingToolkit.shared_resources import shutdown_flag
+from VoiceProcessingToolkit.wake_word_detector.SnippetWriter import WakeWordSnippetWriter
+from VoiceProcessingToolkit.shared_resources import WorkerPool, lazy_import, shutdown_flag
+
+pvporcupine = lazy_import('pvporcupine')
+pyaudio = lazy_import('pyaudio')
 
 logger = logging.getLogger(__name__)
 
+# Porcupine's fixed frame format, known before the engine is created
+PORCUPINE_FRAME_LENGTH = 512
+PORCUPINE_SAMPLE_RATE = 16000
+
+# Detections waiting for the continuous mode callback before further ones are dropped
+MAX_QUEUED_CALLBACKS = 100
+
+_engine_calls = metrics.counter('voice_processing_wake_word_frames_total',
+                                'Frames passed to wake word detection, including frames the energy gate skips.')
+_engine_seconds = metrics.counter('voice_processing_wake_word_seconds_total',
+                                  'Time spent in wake word detection, in seconds.')
+_detections = metrics.counter('voice_processing_wake_word_detections_total', 'Wake word detections.')
+
+WakeWordDetection = collections.namedtuple('WakeWordDetection', ['keyword_index', 'timestamp', 'frame_index'])
+WakeWordDetection.__doc__ = """
+A wake word detection reported in continuous mode.
+
+Attributes:
+    keyword_index (int): Index of the detected keyword as returned by Porcupine.
+    timestamp (float): time.monotonic() timestamp of the detection.
+    frame_index (int): Number of frames processed by the detector when the wake word was detected.
+"""
+
 
 class WakeWordDetector:
     """
@@ -65,7 +103,8 @@ class WakeWordDetector:
         _action_manager (ActionManager): Manages the actions to be executed when the wake word is detected.
         _play_notification_sound (bool): Indicates whether to play a notification sound upon detection.
         _stop_event (threading.Event): An event to signal the detection loop to stop.
-        _porcupine (pvporcupine.Porcupine): The Porcupine wake word engine instance.
+        _porcupine (pvporcupine.Porcupine): The Porcupine wake word engine instance, created on first use.
+        engine_init_seconds (float): Seconds the last creation of the Porcupine engine took, or None.
 
     Methods:
         __init__(self, access_key, wake_word, sensitivity, action_manager, audio_stream_manager, play_notification_sound):
@@ -74,11 +113,26 @@ class WakeWordDetector:
         initialize_porcupine(self):
             Initializes the Porcupine engine.
 
+        initialize_notification_sound(self):
+            Loads the notification sound, if enabled.
+
         voice_loop(self):
             Listens for the wake word and triggers actions upon detection.
 
         run(self):
-            Starts the wake word detection in a separate thread.
+            Starts the wake word detection on the detector's capture thread.
+
+        start_continuous(self, callback):
+            Starts detecting in the background without tearing down the engine after each detection.
+
+        detections(self):
+            Yields detections as they occur in continuous mode.
+
+        stop(self):
+            Stops continuous detection while keeping the engine and stream alive.
+
+        arun(self):
+            Coroutine that waits for the wake word without blocking the event loop.
 
         cleanup(self):
             Cleans up resources.
@@ -89,7 +143,8 @@ class WakeWordDetector:
     def __init__(self, access_key: str, wake_word: str, sensitivity: float,
                  action_manager: ActionManager, audio_stream_manager: AudioStream,
                  play_notification_sound: bool = True, save_audio_directory: str = None,
-                 snippet_length: float = 3.0) -> None:
+                 snippet_length: float = 3.0, energy_gate: bool = False, frame_stages: list = None,
+                 rtf_alert_threshold: float = 0.8, on_pipeline_alert=None, archive=None) -> None:
         """
                 Initializes the WakeWordDetector with the specified parameters.
         Args:
@@ -99,19 +154,31 @@ class WakeWordDetector:
             action_manager (ActionManager): Manages actions to execute on detection.
             audio_stream_manager (AudioStreamManager): Manages audio stream.
             play_notification_sound (bool): Flag to play a sound on detection.
-            save_audio_directory (str): Directory to save audio snippets upon detection.
+            save_audio_directory (str): Directory to save audio snippets upon detection. Snippets are written in
+                the background to per-day subdirectories and listed in a manifest.jsonl file.
             snippet_length (float): Length of the audio snippet to save after wake word detection in seconds.
+            energy_gate (bool): If True, Porcupine is not called on frames an EnergyGate considers silent.
+            frame_stages (list, optional): FrameStage instances, e.g. noise suppression, applied to the audio before
+                Porcupine. They run in a FramePipeline whose capture thread keeps reading the stream while the
+                stages work.
+            rtf_alert_threshold (float): Rolling real-time factor of the detection loop that raises an alert.
+            on_pipeline_alert (callable, optional): Called with a CaptureAlert when the detection loop cannot keep
+                up with capture.
+            archive (SegmentArchive, optional): Archive the snippets saved with save_audio_directory are appended
+                to instead of written as WAV files.
+
+        The Porcupine engine and the notification sound are created when the detector first starts listening,
+        or earlier with initialize_porcupine() and initialize_notification_sound(). The sound, and with it pygame's
+        mixer, is never loaded if play_notification_sound is False.
 
         Raises:
             ValueError: If any initialization parameter is invalid.
         """
         self._snippet_frame_count = None
         self.notification_sound_path = str(resources.files('VoiceProcessingToolkit.wake_word_detector.Wav_MP3').joinpath('notification.wav'))
-        if not os.path.exists(self.notification_sound_path):
-            raise FileNotFoundError("Notification sound file not found at expected path.")
         self._pre_buffer_time = 1  # Time in seconds to save before wake word
         self._post_buffer_time = 1.5  # Time in seconds to save after wake word
-        self._notification_sound_manager = NotificationSoundManager(str(self.notification_sound_path))
+        self._notification_sound_manager = None
 
         self._action_manager = action_manager
         self._play_notification_sound = play_notification_sound
@@ -121,113 +188,466 @@ class WakeWordDetector:
         self._audio_stream_manager = audio_stream_manager
         self._stop_event = threading.Event()
         self._porcupine = None
-        self._py_audio = None
+        self._pcm_struct = None
+        self._use_energy_gate = energy_gate
+        self._gated_porcupine = None
+        self._frame_stages = list(frame_stages or [])
+        self._pipeline = None
+        self._pipeline_start_position = 0
         self._snippet_length = snippet_length
-        self.initialize_porcupine()
+        self._continuous = False
+        self._detection_callback = None
+        self._detection_queue = None
+        self._capture_pool = self._callback_pool = None
+        self._create_pools()
+        self._detection_future = None
+        self._frame_index = 0
+        self.detection_count = 0
+        self.last_detection_time = None  # time.monotonic() of the most recent detection
+        self.last_keyword_index = None
+        self.last_notification_time = None  # time.monotonic() when the last notification sound was started
+        self.listening_started = None  # time.monotonic() when the detection loop last started reading frames
+        self._action_loop = None  # Event loop actions are scheduled on while arun() is waiting
+        self.last_detection_position = None  # Audio stream position right after the most recent detection
+        self.engine_init_seconds = None
+        stream_frame_length = getattr(audio_stream_manager, 'frame_length', PORCUPINE_FRAME_LENGTH)
+        if stream_frame_length != PORCUPINE_FRAME_LENGTH:
+            raise ValueError(f"Audio stream frames of {stream_frame_length} samples do not match the Porcupine frame "
+                             f"length of {PORCUPINE_FRAME_LENGTH}; set frames_per_buffer to "
+                             f"{PORCUPINE_FRAME_LENGTH} and use capture_block_size for larger device reads.")
         self.is_running = False  # New attribute
+        self.real_time_monitor = RealTimeFactorMonitor(
+            'wake_word', PORCUPINE_FRAME_LENGTH / PORCUPINE_SAMPLE_RATE,
+            alert_threshold=rtf_alert_threshold, on_alert=on_pipeline_alert)
         self._save_audio_directory = save_audio_directory
-        if self._save_audio_directory and not os.path.exists(self._save_audio_directory):
-            os.makedirs(self._save_audio_directory)
+        self._snippet_writer = None
+        if self._save_audio_directory:
+            self._snippet_writer = WakeWordSnippetWriter(self._audio_stream_manager, self._save_audio_directory,
+                                                         pre_seconds=self._pre_buffer_time,
+                                                         post_seconds=self._post_buffer_time,
+                                                         wake_word=self._wake_word, archive=archive)
+
+    def _create_pools(self) -> None:
+        # Long-lived thread the detection loop runs on in continuous, run() and arun() modes
+        self._capture_pool = WorkerPool('WakeWordDetector-capture', max_workers=1)
+        # Long-lived thread continuous mode callbacks run on, in detection order, so they never stall the loop
+        self._callback_pool = WorkerPool('WakeWordDetector-callbacks', max_workers=1,
+                                         max_queued_tasks=MAX_QUEUED_CALLBACKS)
 
     def initialize_porcupine(self) -> None:
         """
-        Initializes the Porcupine wake word engine.
+        Initializes the Porcupine wake word engine, unless it already exists.
         """
         try:
             if self._porcupine is None:
+                started = time.perf_counter()
                 self._porcupine = pvporcupine.create(access_key=self._access_key, keywords=[self._wake_word],
                                                      sensitivities=[self._sensitivity])
+                self.engine_init_seconds = time.perf_counter() - started
+                logger.debug("Porcupine created in %.1f ms.", self.engine_init_seconds * 1000)
                 self._snippet_frame_count = int(self._porcupine.sample_rate * self._snippet_length)
+                self._pcm_struct = struct.Struct("h" * self._porcupine.frame_length)
+                if self._use_energy_gate:
+                    self._gated_porcupine = GatedEngine(self._porcupine, EnergyGate(), silent_result=-1)
         except pvporcupine.PorcupineError as e:
             logger.exception("Failed to initialize Porcupine with the given parameters.", exc_info=e)
             raise
 
+    def initialize_notification_sound(self) -> None:
+        """
+        Loads the notification sound, unless it is disabled or already loaded.
+
+        Raises:
+            FileNotFoundError: If the notification sound file is missing.
+        """
+        if not self._play_notification_sound or self._notification_sound_manager is not None:
+            return
+        if not os.path.exists(self.notification_sound_path):
+            raise FileNotFoundError("Notification sound file not found at expected path.")
+        self._notification_sound_manager = NotificationSoundManager(self.notification_sound_path)
+
     def voice_loop(self):
         """
         The main loop that listens for the wake word and triggers the action function.
         """
         self.is_running = True
+        # Bind the per-frame calls once so the loop does no attribute lookups or format parsing per frame
+        read = self._audio_stream_manager.read
+        if self._frame_stages:
+            if self._pipeline is None:
+                # Kept across runs so the pipeline threads are reused
+                self._pipeline = FramePipeline(read, self._frame_stages, name='wake-word')
+            read = self._pipeline.read
+        if self._gated_porcupine is not None:
+            # The gate works on NumPy frames and only passes frames with sound on to Porcupine
+            unpack = functools.partial(np.frombuffer, dtype=np.int16)
+            process = self._gated_porcupine.process
+        else:
+            unpack = self._pcm_struct.unpack_from
+            process = self._porcupine.process
+        clock = time.perf_counter
+        engine_calls, engine_seconds = _engine_calls, _engine_seconds
+        record_busy = self.real_time_monitor.record
         try:
+            if self._pipeline is not None:
+                # The capture thread reads ahead of detection, so detections are located from this position
+                self._pipeline_start_position = self._audio_stream_manager.position
+                self._pipeline.start()
+            self.listening_started = time.monotonic()
             while not self._stop_event.is_set() and not shutdown_flag.is_set():
-                pcm = self._audio_stream_manager.read()
-                pcm = struct.unpack_from("h" * self._porcupine.frame_length, pcm)
-                if self._porcupine.process(pcm) >= 0:
-                    self.handle_wake_word_detection()
+                frame = read()
+                if frame is None:
+                    break  # The frame pipeline has stopped
+                started = clock()
+                keyword_index = process(unpack(frame))
+                engine_seconds.inc(clock() - started)
+                engine_calls.inc()
+                self._frame_index += 1
+                if keyword_index >= 0:
+                    self.handle_wake_word_detection(keyword_index)
+                record_busy(clock() - started)
 
         except Exception as e:
             logger.exception("An error occurred during wake word detection.", exc_info=e)
             raise RuntimeError("Wake word detection error.") from e
         finally:
+            if self._pipeline is not None:
+                self._pipeline.stop()
             self.is_running = False
 
-    def handle_wake_word_detection(self):
+    def frame_pipeline_stats(self) -> dict:
+        """
+        Returns:
+            dict: Statistics of the frame stages of the current or last run (see FramePipeline.stats()), or None if
+            no frame stages are configured.
+        """
+        return self._pipeline.stats() if self._pipeline else None
+
+    def energy_gate_stats(self) -> dict:
+        """
+        Returns:
+            dict: Statistics of the energy gate in front of Porcupine (see EnergyGate.stats()), or None if the
+            gate is disabled.
+        """
+        return self._gated_porcupine.gate.stats() if self._gated_porcupine else None
+
+    def capture_health_stats(self) -> dict:
+        """
+        Returns:
+            dict: Overruns and backlog of the audio stream (see CaptureMonitor.stats()), or None if the stream has no
+            capture monitor, and the real-time factor of the detection loop (see RealTimeFactorMonitor.stats()).
+        """
+        monitor = getattr(self._audio_stream_manager, 'capture_monitor', None)
+        return {'capture': monitor.stats() if monitor else None, 'processing': self.real_time_monitor.stats()}
+
+    def handle_wake_word_detection(self, keyword_index: int = 0):
         """
         Handle the detection of the wake word, play the notification sound, trigger actions, and then stop.
+
+        In continuous mode the detection is reported to the callback and the detection queue instead, and the loop
+        keeps running.
+
+        Args:
+            keyword_index (int): Index of the detected keyword as returned by Porcupine.
         """
-        if self._save_audio_directory:
-            pre_detection_frames = int(self._porcupine.sample_rate * self._pre_buffer_time)
-            post_detection_frames = int(self._porcupine.sample_rate * self._post_buffer_time)
-            save_thread = threading.Thread(target=self.save_audio_snippet,
-                                           args=(pre_detection_frames, post_detection_frames))
-            save_thread.start()
-        action_thread = threading.Thread(target=lambda: asyncio.run(self._action_manager.execute_actions()))
-        action_thread.start()
-        # Play the notification sound in a non-blocking manner
+        self.last_detection_time = time.monotonic()
+        self.last_keyword_index = keyword_index
+        if self._pipeline is not None:
+            # The stream has already been read past the detected frame by the pipeline's capture thread
+            self.last_detection_position = (self._pipeline_start_position
+                                             + self._pipeline.last_source_frame * PORCUPINE_FRAME_LENGTH)
+        else:
+            self.last_detection_position = self._audio_stream_manager.position
+        self.detection_count += 1
+        _detections.inc()
+        if self._snippet_writer:
+            # The writer collects the pre- and post-detection audio from the ring buffer in the background
+            self._snippet_writer.submit(self.last_detection_position)
+        if self._action_loop is not None:
+            # Run the actions on the caller's event loop while arun() is waiting
+            asyncio.run_coroutine_threadsafe(self._action_manager.execute_actions(), self._action_loop)
+        else:
+            self._action_manager.trigger()
+        # pygame plays the sound asynchronously, so this call returns immediately
         if self._play_notification_sound:
-            sound_thread = threading.Thread(target=self._notification_sound_manager.play)
-            sound_thread.start()
-            sound_thread.join()  # Wait for the notification sound to finish playing
-            self._stop_event.set()  # Signal to stop the detection loop
+            self._notification_sound_manager.play()
+            self.last_notification_time = time.monotonic()
+        if self._continuous:
+            self._report_detection(WakeWordDetection(keyword_index, self.last_detection_time, self._frame_index))
         else:
-            self._stop_event.set()
+            self._stop_event.set()  # Signal to stop the detection loop
+
+    def _report_detection(self, detection: WakeWordDetection) -> None:
+        """
+        Delivers a detection to the continuous mode callback and detection queue.
+
+        The callback is scheduled on the detector's callback thread. If the queue is full the oldest detection is
+        dropped, so a slow consumer never stalls the detection loop.
+        """
+        if self._detection_callback:
+            try:
+                self._callback_pool.submit(self._run_detection_callback, self._detection_callback, detection)
+            except RuntimeError:
+                logger.warning("Wake word detection callback is falling behind, dropping a detection.")
+        while True:
+            try:
+                self._detection_queue.put_nowait(detection)
+                return
+            except queue.Full:
+                try:
+                    self._detection_queue.get_nowait()
+                    logger.warning("Wake word detection queue is full, dropping the oldest detection.")
+                except queue.Empty:
+                    pass
+
+    @staticmethod
+    def _run_detection_callback(callback, detection: WakeWordDetection) -> None:
+        try:
+            callback(detection)
+        except Exception as e:
+            logger.exception("An error occurred in the wake word detection callback.", exc_info=e)
+
+    def _prepare(self) -> None:
+        """
+        Creates the Porcupine engine and the notification sound on the first run, and recreates the engine and
+        reopens the stream if a previous run cleaned them up. The stop event is cleared by the callers before the
+        loop is handed to another thread, so a stop requested in the meantime is not lost.
+        """
+        self.initialize_porcupine()
+        self.initialize_notification_sound()
+        self._audio_stream_manager.reopen()
+
+    def start_continuous(self, callback=None, max_queued_detections: int = 100) -> None:
+        """
+        Starts wake word detection in continuous mode on a background thread.
+
+        The Porcupine engine and the audio stream stay alive between detections and the loop re-arms immediately
+        after each one. Detections are delivered to the callback and to a bounded queue read by detections(). The
+        callback runs on one long-lived callback thread, in detection order, so a slow callback does not delay
+        detection.
+
+        Args:
+            callback (callable, optional): Called with a WakeWordDetection for every detection.
+            max_queued_detections (int): Maximum number of detections kept for detections() consumers.
+        """
+        if self._detection_future and not self._detection_future.done():
+            raise RuntimeError("Continuous wake word detection is already running.")
+        self._stop_event.clear()
+        self._prepare()
+        self._continuous = True
+        self._detection_callback = callback
+        self._detection_queue = queue.Queue(maxsize=max_queued_detections)
+        self._detection_future = self._capture_pool.submit(self._continuous_loop)
+
+    def _continuous_loop(self) -> None:
+        try:
+            self.voice_loop()
+        finally:
+            self._continuous = False
+
+    def detections(self, timeout: float = None):
+        """
+        Yields wake word detections as they occur, starting continuous mode if it is not already running.
 
+        Args:
+            timeout (float, optional): Stop iterating if no detection arrives within this many seconds.
 
-    def save_audio_snippet(self, pre_detection_frames: int, post_detection_frames: int):
+        Yields:
+            WakeWordDetection: The next detection.
+        """
+        if not (self._detection_future and not self._detection_future.done()):
+            self.start_continuous()
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            try:
+                # Wake up periodically so the iterator ends once the loop has stopped
+                detection = self._detection_queue.get(timeout=0.1)
+            except queue.Empty:
+                future = self._detection_future
+                if (future is None or future.done()) and self._detection_queue.empty():
+                    return
+                if deadline is not None and time.monotonic() >= deadline:
+                    return
+                continue
+            yield detection
+            if timeout is not None:
+                deadline = time.monotonic() + timeout
+
+    def run_continuous(self, callback) -> None:
         """
-        Saves a snippet of audio from the buffer to the specified directory.
+        Runs continuous wake word detection on the calling thread until stop() is called or shutdown is requested.
+
+        Args:
+            callback (callable): Called with a WakeWordDetection for every detection.
         """
-        timestamp = time.strftime("%Y%m%d-%H%M%S")
-        filename = f"wake_word_{timestamp}.wav"
-        filepath = os.path.join(self._save_audio_directory, filename)
-        buffer = self._audio_stream_manager.get_rolling_buffer()
+        self._stop_event.clear()
+        self._prepare()
+        self._continuous = True
+        self._detection_callback = callback
+        self._detection_queue = queue.Queue(maxsize=1)
+        try:
+            self.voice_loop()
+        finally:
+            self._continuous = False
 
-        # Calculate the start and end indices for the snippet
-        end_index = len(buffer)
-        start_index = max(end_index - (pre_detection_frames + post_detection_frames + self._porcupine.frame_length) * 2,
-                          0)  # 2 bytes per frame (16-bit audio)
-        snippet_buffer = buffer[start_index:end_index]
+    def stop(self, timeout: float = None) -> None:
+        """
+        Stops continuous detection. The engine and stream are kept so detection can be restarted cheaply; call
+        cleanup() to release them.
 
-        with wave.open(filepath, 'wb') as wave_file:
-            wave_file.setnchannels(1)
-            wave_file.setsampwidth(self._py_audio.get_sample_size(pyaudio.paInt16) if self._py_audio else 2)
-            wave_file.setframerate(self._porcupine.sample_rate)
-            wave_file.writeframes(snippet_buffer)
-            logger.info(f"Saved wake word audio snippet to {filepath}")
+        Args:
+            timeout (float, optional): Maximum number of seconds to wait for the detection thread to finish.
+        """
+        self._stop_event.set()
+        if self._detection_future and not self._capture_pool.in_worker():
+            concurrent.futures.wait([self._detection_future], timeout)
+        self._detection_future = None
 
     def run(self) -> None:
         """
         Starts the wake word detection loop.
         """
-        detection_thread = threading.Thread(target=self.voice_loop)
-        detection_thread.start()
-        detection_thread.join()  # Wait for the thread to finish
-        self.cleanup()  # Cleanup resources after the thread has finished
+        self._stop_event.clear()
+        self._prepare()
+        try:
+            self._capture_pool.submit(self.voice_loop).result()  # Wait for the loop to finish
+        finally:
+            self.cleanup()  # Cleanup resources after the loop has finished
 
-    def run_blocking(self) -> None:
+    def run_blocking(self, cleanup: bool = True) -> None:
         """
         Starts the wake word detection loop and waits for it to finish before returning.
         This method is intended to be used when the detection should block the calling thread.
+
+        Args:
+            cleanup (bool): If True, releases Porcupine and the audio stream after the detection. Pass False to
+                return immediately with the stream still open, e.g. to hand it over to the recorder with
+                get_handoff_provider().
         """
+        self._stop_event.clear()
+        self._run_once(cleanup)
+
+    def _run_once(self, cleanup: bool) -> None:
+        self._prepare()
         self.voice_loop()
-        time.sleep(0.5)
+        if cleanup:
+            self.cleanup()
+
+    async def arun(self, cleanup: bool = True):
+        """
+        Waits for the wake word without blocking the event loop.
+
+        The detection loop runs on the detector's capture thread, which resumes the coroutine through the event
+        loop when it ends, so no executor thread is tied up and nothing is polled. Registered actions are scheduled on the
+        running loop. Cancelling the coroutine stops the detection loop and waits for the capture thread to leave
+        it, so the engine and the stream can be released safely afterwards.
+
+        Args:
+            cleanup (bool): If True, releases Porcupine and the audio stream afterwards. Pass False to hand the
+                stream over to the recorder with get_handoff_provider().
+
+        Returns:
+            WakeWordDetection: The detection, or None if detection stopped without one, e.g. on shutdown.
+        """
+        detection_count = self.detection_count
+        self._action_loop = asyncio.get_running_loop()
+        # Cleared here rather than on the capture thread, so a cancellation before the loop starts still stops it
+        self._stop_event.clear()
+        future = self._capture_pool.submit(self._run_once, cleanup=False)
+        self._detection_future = future  # Lets stop() and cleanup() wait for the loop as well
+        try:
+            await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            self._stop_event.set()
+            try:
+                await asyncio.shield(asyncio.wrap_future(future))
+            except Exception as e:
+                logger.debug("Wake word detection ended with an error after cancellation: %s", e)
+            raise
+        finally:
+            self._action_loop = None
+            if self._detection_future is future and future.done():
+                self._detection_future = None
+            if cleanup:
+                await asyncio.to_thread(self._wait_and_cleanup, future)
+        if self.detection_count == detection_count:
+            return None
+        return WakeWordDetection(self.last_keyword_index, self.last_detection_time, self._frame_index)
+
+    def _wait_and_cleanup(self, future: concurrent.futures.Future) -> None:
+        concurrent.futures.wait([future])
         self.cleanup()
 
+    def get_handoff_provider(self):
+        """
+        Creates an audio data provider that continues reading from this detector's stream, starting with the audio
+        already captured after the last detection. Recording from it needs no device reopen and loses no audio
+        between the wake word and the command. If the detector has frame stages, the carry-over audio is run through
+        them, so it is noise suppressed like the rest of the recording.
+
+        Returns:
+            SharedStreamDataProvider: A provider for AudioRecorder.perform_recording().
+        """
+        from VoiceProcessingToolkit.voice_detection.Voicerecorder import SharedStreamDataProvider
+
+        carry_over = b''
+        if self.last_detection_position is not None:
+            carry_over = self._audio_stream_manager.get_audio_since(self.last_detection_position)
+        processed = bool(self._frame_stages and carry_over)
+        if processed:
+            carry_over = self._process_carry_over(carry_over)
+        return SharedStreamDataProvider(self._audio_stream_manager, carry_over=carry_over,
+                                        frame_length=PORCUPINE_FRAME_LENGTH, carry_over_processed=processed)
+
+    def _process_carry_over(self, audio: bytes) -> bytes:
+        """
+        Runs raw captured audio through the frame stages of the detector. The stages are still warm from listening,
+        so stateful stages such as Koala continue from the audio they last processed.
+        """
+        frame_bytes = PORCUPINE_FRAME_LENGTH * 2  # 16-bit samples
+        processed = []
+        for start in range(0, len(audio) - len(audio) % frame_bytes, frame_bytes):
+            frame = np.frombuffer(audio, dtype=np.int16, count=PORCUPINE_FRAME_LENGTH, offset=start)
+            for stage in self._frame_stages:
+                frame = stage.process(frame)
+                if frame is None:
+                    break
+            else:
+                processed.append(frame.tobytes())
+        return b''.join(processed)
+
+    def _capture_snippet_audio(self) -> None:
+        """
+        Keeps reading the stream until the audio after the last detection has been captured for its snippet, so
+        cleaning up right after a detection, e.g. in run(transcription=False), does not cut the snippet short.
+        """
+        stream = self._audio_stream_manager
+        end = self._snippet_writer.capture_end
+        while stream.position < end and not stream.is_stream_closed() and not shutdown_flag.is_set():
+            if stream.read() is None:
+                break  # The end of a file source
+
     def cleanup(self) -> None:
         """
-        Cleans up the resources used by the wake word detector.
+        Cleans up the resources used by the wake word detector: the audio stream, the engine and the capture and
+        callback threads. Callbacks already queued still run. The next run starts new threads.
         """
+        self.stop()
+        capture_pool, callback_pool = self._capture_pool, self._callback_pool
+        self._create_pools()
+        capture_pool.shutdown()
+        callback_pool.shutdown()
+        if self._snippet_writer:
+            self._capture_snippet_audio()
         self._audio_stream_manager.cleanup()
-        self._porcupine.delete()
+        if self._snippet_writer:
+            self._snippet_writer.stop()  # Writes the queued snippets from the audio captured so far
+        for stage in self._frame_stages:
+            stage.close()
+        if self._porcupine is not None:
+            self._porcupine.delete()
+            self._porcupine = None
+            self._gated_porcupine = None
 
 
 def main():
@@ -0,0 +1,415 @@
+"""
+WakeWordEvaluator
+------------------------
+
+Offline evaluation of Porcupine wake word detection over a corpus of recorded WAV files, for tuning the
+sensitivity used by WakeWordDetector.
+
+The corpus consists of positive files (each containing the wake word) and negative files (background audio that
+should not trigger). Files are split into chunks that are processed on a pool of worker processes, as fast as the
+CPU allows. Files are memory-mapped, so a worker reads its chunk straight from the page cache without decoding or
+copying it, and every chunk is fed to one Porcupine instance per sensitivity, so a whole sensitivity sweep costs a
+single pass over the audio.
+
+Each chunk starts with fresh engines, so no detection state carries over from one file or chunk to another. A
+chunk also processes the overlap_seconds of audio before it, so a wake word crossing a chunk boundary is seen
+whole; a wake word detected by both neighbouring chunks is counted once.
+
+For every sensitivity the report contains the detection rate on positives and the false alarms per hour on
+negatives, together with the throughput in audio hours per wall-clock minute.
+
+verify_energy_gate() runs the same corpus with and without the EnergyGate in front of the engines and reports any
+file whose detections differ, together with the share of engine calls the gate skipped.
+
+Example:
+    ```
+    python -m VoiceProcessingToolkit.wake_word_detector.WakeWordEvaluator --wake-word computer \
+        --positive data/positive --negative data/negative --sensitivities 0.3 0.5 0.7 0.9
+    ```
+"""
+
+import argparse
+import functools
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from VoiceProcessingToolkit.shared_resources import lazy_import
+from VoiceProcessingToolkit.voice_detection.EnergyGate import EnergyGate, GatedEngine
+from VoiceProcessingToolkit.wake_word_detector.WavFileSource import MappedWavFile
+
+pvporcupine = lazy_import('pvporcupine')
+
+logger = logging.getLogger(__name__)
+
+# Detections of neighbouring chunks closer than this are the same wake word, detected by both
+DUPLICATE_WINDOW_SECONDS = 0.5
+
+# Engine settings of the worker process: (engine factory, sensitivities, energy gate)
+_worker_settings = None
+
+
+def _create_porcupine(access_key: str, wake_word: str, sensitivity: float):
+    return pvporcupine.create(access_key=access_key, keywords=[wake_word], sensitivities=[sensitivity])
+
+
+def _init_worker(engine_factory, sensitivities, energy_gate=False) -> None:
+    global _worker_settings
+    _worker_settings = (engine_factory, sensitivities, energy_gate)
+
+
+def _create_engines(engine_factory, sensitivities, energy_gate=False) -> list:
+    """
+    Creates one engine per sensitivity. Engines are created for every chunk, as Porcupine keeps state from the
+    audio it has seen and has no reset, so a detection could otherwise carry over from one file into the next.
+    """
+    engines = [engine_factory(sensitivity) for sensitivity in sensitivities]
+    if energy_gate:
+        engines = [GatedEngine(engine, EnergyGate(), silent_result=-1) for engine in engines]
+    return engines
+
+
+def list_wav_files(directory: str) -> list:
+    """
+    Lists the WAV files below a directory, sorted by path.
+
+    Args:
+        directory (str): Directory to search recursively.
+
+    Returns:
+        list: Paths of the WAV files.
+    """
+    paths = []
+    for root, _, files in os.walk(directory):
+        paths.extend(os.path.join(root, name) for name in files if name.lower().endswith('.wav'))
+    return sorted(paths)
+
+
+def read_wav_samples(path: str, start: int = 0, count: int = None, sample_rate: int = 16000) -> np.ndarray:
+    """
+    Decodes a range of a 16-bit mono PCM WAV file.
+
+    Args:
+        path (str): Path to the WAV file.
+        start (int): Index of the first sample to read.
+        count (int, optional): Number of samples to read. Reads to the end of the file if omitted.
+        sample_rate (int): Sample rate the file must have.
+
+    Returns:
+        numpy.ndarray: The decoded samples.
+
+    Raises:
+        ValueError: If the file is not 16-bit mono PCM at the expected sample rate.
+    """
+    with MappedWavFile(path, sample_rate=sample_rate) as wav_file:
+        end = None if count is None else start + count
+        return wav_file.samples[start:end].copy()
+
+
+def _find_detections(samples: np.ndarray, engines: list, offset: int = 0) -> list:
+    """
+    Feeds every complete frame of the samples to all engines.
+
+    Args:
+        samples (numpy.ndarray): The audio.
+        engines (list): Engines with process() and frame_length.
+        offset (int): Position of the first sample in the file.
+
+    Returns:
+        list: For every engine, the positions in the file of the end of the frames it detected the wake word in.
+    """
+    frame_length = engines[0].frame_length
+    usable = len(samples) - len(samples) % frame_length
+    frames = samples[:usable].reshape(-1, frame_length)  # A view; no samples are copied
+    detections = [[] for _ in engines]
+    processors = [engine.process for engine in engines]
+    for frame_index, frame in enumerate(frames):
+        for index, process in enumerate(processors):
+            if process(frame) >= 0:
+                detections[index].append(offset + (frame_index + 1) * frame_length)
+    return detections
+
+
+def _gate_totals(engines) -> tuple:
+    gates = [engine.gate for engine in engines if isinstance(engine, GatedEngine)]
+    return sum(gate.frames for gate in gates), sum(gate.engine_calls for gate in gates)
+
+
+def _evaluate_chunk(job) -> tuple:
+    """
+    Evaluates the samples of a file from start to start + count, reading from `overlap` samples earlier so a wake
+    word that began in the previous chunk is seen whole. Only detections ending after start belong to the chunk.
+    """
+    path, start, count, overlap = job
+    read_start = max(start - overlap, 0)
+    engines = _create_engines(*_worker_settings)
+    try:
+        with MappedWavFile(path) as wav_file:
+            samples = wav_file.samples[read_start:start + count]
+            detections = _find_detections(samples, engines, read_start)
+            del samples  # Release the view so the file can be unmapped
+    finally:
+        for engine in engines:
+            engine.delete()
+    detections = [[position for position in positions if position > start or start == 0]
+                  for positions in detections]
+    return path, start, count, detections, _gate_totals(engines)
+
+
+def merge_detections(chunk_detections: list, window: int) -> list:
+    """
+    Merges the detections of the chunks of one file, for one engine.
+
+    A wake word near a chunk boundary can be detected by both chunks, a few frames apart. A detection from another
+    chunk than the previous detection and within `window` samples of it is dropped as a duplicate.
+
+    Args:
+        chunk_detections (list): (chunk start, detection positions) per chunk.
+        window (int): Samples within which detections of neighbouring chunks are the same wake word.
+
+    Returns:
+        list: The sorted positions of the distinct detections.
+    """
+    merged = []
+    previous_chunk = None
+    for position, chunk in sorted((position, chunk) for chunk, positions in chunk_detections
+                                  for position in positions):
+        if merged and chunk != previous_chunk and position - merged[-1] <= window:
+            continue
+        merged.append(position)
+        previous_chunk = chunk
+    return merged
+
+
+class EvaluationReport:
+    """
+    Results of an evaluation run.
+
+    Attributes:
+        rows (list): One dict per sensitivity with detection_rate, detections, false_alarms and
+            false_alarms_per_hour.
+        positive_files (int): Number of positive files evaluated.
+        positive_hours (float): Hours of positive audio.
+        negative_hours (float): Hours of negative audio.
+        wall_seconds (float): Wall-clock duration of the run.
+        detections_per_file (dict): Detection counts per file, one per sensitivity.
+        gate_frames (int): Frames seen by energy gates, if enabled.
+        gate_engine_calls (int): Engine calls made behind energy gates, if enabled.
+    """
+
+    def __init__(self, rows, positive_files, positive_hours, negative_hours, wall_seconds,
+                 detections_per_file=None, gate_frames=0, gate_engine_calls=0):
+        self.rows = rows
+        self.positive_files = positive_files
+        self.positive_hours = positive_hours
+        self.negative_hours = negative_hours
+        self.wall_seconds = wall_seconds
+        self.detections_per_file = detections_per_file or {}
+        self.gate_frames = gate_frames
+        self.gate_engine_calls = gate_engine_calls
+
+    @property
+    def audio_hours_per_minute(self) -> float:
+        """Throughput in hours of audio processed per wall-clock minute."""
+        total_hours = self.positive_hours + self.negative_hours
+        return total_hours / (self.wall_seconds / 60) if self.wall_seconds > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            'rows': self.rows,
+            'positive_files': self.positive_files,
+            'positive_hours': self.positive_hours,
+            'negative_hours': self.negative_hours,
+            'wall_seconds': self.wall_seconds,
+            'audio_hours_per_minute': self.audio_hours_per_minute,
+        }
+
+    def format_table(self) -> str:
+        """
+        Formats the report as a plain text ROC-style table.
+        """
+        lines = [f"{'sensitivity':>11}  {'detection rate':>14}  {'false alarms':>12}  {'FA/hour':>8}"]
+        for row in self.rows:
+            lines.append(f"{row['sensitivity']:>11.2f}  {row['detection_rate']:>14.3f}  "
+                         f"{row['false_alarms']:>12d}  {row['false_alarms_per_hour']:>8.2f}")
+        lines.append(f"{self.positive_files} positive files ({self.positive_hours:.2f} h), "
+                     f"{self.negative_hours:.2f} h negative audio, {self.wall_seconds:.1f} s wall clock, "
+                     f"{self.audio_hours_per_minute:.2f} audio hours/minute")
+        return '\n'.join(lines)
+
+
+class WakeWordEvaluator:
+    """
+    Streams a corpus of WAV files through wake word engines on a process pool and sweeps sensitivities.
+    """
+
+    def __init__(self, wake_word: str = 'computer', sensitivities=(0.5,), access_key: str = None,
+                 workers: int = None, chunk_seconds: float = 600.0, overlap_seconds: float = 2.0,
+                 sample_rate: int = 16000, engine_factory=None, energy_gate: bool = False):
+        """
+        Args:
+            wake_word (str): Built-in Porcupine keyword to evaluate.
+            sensitivities (iterable): Sensitivities to evaluate in the same pass.
+            access_key (str, optional): Picovoice access key, read from PICOVOICE_APIKEY if omitted.
+            workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+            chunk_seconds (float): Long files are split into chunks of this length to spread them over workers.
+            overlap_seconds (float): Audio before each chunk that is processed with it, so a wake word crossing a
+                chunk boundary is detected. Should be at least the length of the wake word.
+            sample_rate (int): Sample rate of the corpus.
+            engine_factory (callable, optional): Picklable callable taking a sensitivity and returning an engine
+                with process() and frame_length, used instead of Porcupine.
+            energy_gate (bool): If True, the engines are put behind an EnergyGate.
+        """
+        self.sensitivities = [float(sensitivity) for sensitivity in sensitivities]
+        if not self.sensitivities:
+            raise ValueError("At least one sensitivity is required")
+        self.workers = workers or os.cpu_count() or 1
+        self.sample_rate = sample_rate
+        self.chunk_samples = int(chunk_seconds * sample_rate)
+        self.overlap_samples = int(overlap_seconds * sample_rate)
+        if engine_factory is None:
+            engine_factory = functools.partial(_create_porcupine, access_key or os.getenv('PICOVOICE_APIKEY'),
+                                               wake_word)
+        self._engine_factory = engine_factory
+        self.energy_gate = energy_gate
+
+    def _chunk_jobs(self, paths: list) -> list:
+        jobs = []
+        for path in paths:
+            with MappedWavFile(path, sample_rate=self.sample_rate) as wav_file:
+                total = len(wav_file)
+            for start in range(0, max(total, 1), self.chunk_samples):
+                jobs.append((path, start, min(self.chunk_samples, total - start), self.overlap_samples))
+        return jobs
+
+    def evaluate(self, positive_paths: list, negative_paths: list) -> EvaluationReport:
+        """
+        Evaluates the engines on the given files.
+
+        Args:
+            positive_paths (list): WAV files that each contain the wake word.
+            negative_paths (list): WAV files that should not trigger the wake word.
+
+        Returns:
+            EvaluationReport: Detection rate and false alarm rate for each sensitivity.
+        """
+        positives = set(positive_paths)
+        jobs = self._chunk_jobs(list(positive_paths) + list(negative_paths))
+        samples_per_file = {}
+        chunk_detections = {}
+        gate_frames = gate_engine_calls = 0
+
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self._engine_factory, self.sensitivities, self.energy_gate)) as executor:
+            for path, start, samples, detections, (frames, engine_calls) in executor.map(_evaluate_chunk, jobs):
+                samples_per_file[path] = samples_per_file.get(path, 0) + samples
+                gate_frames += frames
+                gate_engine_calls += engine_calls
+                chunk_detections.setdefault(path, []).append((start, detections))
+        wall_seconds = time.perf_counter() - started
+        detections_per_file = {
+            path: [len(merge_detections([(start, detections[index]) for start, detections in chunks],
+                                        int(DUPLICATE_WINDOW_SECONDS * self.sample_rate)))
+                   for index in range(len(self.sensitivities))]
+            for path, chunks in chunk_detections.items()
+        }
+
+        positive_hours = sum(samples_per_file.get(path, 0) for path in positives) / self.sample_rate / 3600
+        negative_hours = (sum(samples_per_file.values()) / self.sample_rate / 3600) - positive_hours
+        rows = []
+        for index, sensitivity in enumerate(self.sensitivities):
+            detected = sum(1 for path in positives if detections_per_file.get(path, [0])[index] > 0)
+            false_alarms = sum(counts[index] for path, counts in detections_per_file.items()
+                               if path not in positives)
+            rows.append({
+                'sensitivity': sensitivity,
+                'detections': detected,
+                'detection_rate': detected / len(positives) if positives else 0.0,
+                'false_alarms': false_alarms,
+                'false_alarms_per_hour': false_alarms / negative_hours if negative_hours > 0 else 0.0,
+            })
+        return EvaluationReport(rows, len(positives), positive_hours, negative_hours, wall_seconds,
+                                detections_per_file, gate_frames, gate_engine_calls)
+
+    def verify_energy_gate(self, positive_paths: list, negative_paths: list) -> dict:
+        """
+        Checks that the EnergyGate does not change detection results on the given files.
+
+        The corpus is evaluated once without and once with the gate, and the detection counts are compared per
+        file and sensitivity.
+
+        Args:
+            positive_paths (list): WAV files that each contain the wake word.
+            negative_paths (list): WAV files that should not trigger the wake word.
+
+        Returns:
+            dict: 'equivalent' (bool), 'mismatches' (list of (path, ungated counts, gated counts)),
+            'engine_calls_skipped' and 'skip_ratio' of the gated run.
+        """
+        gate_setting = self.energy_gate
+        try:
+            self.energy_gate = False
+            ungated = self.evaluate(positive_paths, negative_paths)
+            self.energy_gate = True
+            gated = self.evaluate(positive_paths, negative_paths)
+        finally:
+            self.energy_gate = gate_setting
+        mismatches = [(path, counts, gated.detections_per_file.get(path))
+                      for path, counts in ungated.detections_per_file.items()
+                      if gated.detections_per_file.get(path) != counts]
+        skipped = gated.gate_frames - gated.gate_engine_calls
+        return {
+            'equivalent': not mismatches,
+            'mismatches': mismatches,
+            'engine_calls_skipped': skipped,
+            'skip_ratio': skipped / gated.gate_frames if gated.gate_frames else 0.0,
+        }
+
+
+def main():
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Evaluate wake word detection on recorded WAV files.")
+    parser.add_argument('--wake-word', default='computer')
+    parser.add_argument('--positive', action='append', default=[], help="Directory of WAV files with the wake word")
+    parser.add_argument('--negative', action='append', default=[], help="Directory of WAV files without it")
+    parser.add_argument('--sensitivities', type=float, nargs='+', default=[0.5])
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-seconds', type=float, default=600.0)
+    parser.add_argument('--overlap-seconds', type=float, default=2.0,
+                        help="Audio before each chunk processed with it; at least the length of the wake word")
+    parser.add_argument('--json', dest='json_path', help="Write the report as JSON to this file")
+    parser.add_argument('--energy-gate', action='store_true', help="Put the engines behind an EnergyGate")
+    parser.add_argument('--verify-energy-gate', action='store_true',
+                        help="Check that the EnergyGate does not change any detection")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    positive_paths = [path for directory in args.positive for path in list_wav_files(directory)]
+    negative_paths = [path for directory in args.negative for path in list_wav_files(directory)]
+    evaluator = WakeWordEvaluator(wake_word=args.wake_word, sensitivities=args.sensitivities,
+                                  workers=args.workers, chunk_seconds=args.chunk_seconds,
+                                  overlap_seconds=args.overlap_seconds,
+                                  energy_gate=args.energy_gate)
+    if args.verify_energy_gate:
+        result = evaluator.verify_energy_gate(positive_paths, negative_paths)
+        print(f"Energy gate equivalent: {result['equivalent']}, "
+              f"{result['engine_calls_skipped']} engine calls skipped ({result['skip_ratio']:.1%})")
+        for path, ungated, gated in result['mismatches']:
+            print(f"  {path}: {ungated} without gate, {gated} with gate")
+        return
+    report = evaluator.evaluate(positive_paths, negative_paths)
+    print(report.format_table())
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(report.to_dict(), f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,398 @@
+"""
+WavFileSource
+------------------------
+
+Memory-mapped PCM WAV files as audio sources, for batch work over long recordings such as dataset creation,
+sensitivity tuning and reprocessing.
+
+MappedWavFile maps the data chunk of a 16-bit mono WAV file read-only and exposes it as a NumPy array backed by the
+file, so any range of samples is available without reading the file into memory. Pages are read by the kernel on
+first access; pages that have been processed can be released again, which keeps the resident memory of a pass over
+a multi-hour file constant.
+
+WavFileStream stands in for AudioStream and can be passed to WakeWordDetector or VoiceProcessingManager as the
+audio stream manager; WavFileDataProvider stands in for the recorder's AudioDataProvider. Both return every frame
+as a zero-copy view of the mapping, run as fast as they are read, can seek to any time in the file and return None
+once the end of the file is reached, which ends the detector and recorder loops.
+
+Example:
+    ```
+    with WavFileStream('night.wav', start_seconds=3600) as stream:
+        detector = WakeWordDetector(..., audio_stream_manager=stream)
+        detector.run()
+    ```
+"""
+
+import logging
+import mmap
+import os
+import struct
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+SAMPLE_WIDTH = 2
+
+
+def _parse_wav_header(file, file_size: int) -> tuple:
+    """
+    Walks the RIFF chunks of a WAV file.
+
+    Returns:
+        tuple: Format tag, channels, sample rate and bits per sample from the fmt chunk, and the byte offset and
+        size of the data chunk. The size is clamped to the file, so files whose header was never finalized (e.g.
+        after a crash while recording) can still be read.
+    """
+    header = file.read(12)
+    if len(header) < 12 or header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+        raise ValueError("not a RIFF/WAVE file")
+    audio_format = None
+    offset = 12
+    while offset + 8 <= file_size:
+        file.seek(offset)
+        chunk_id, chunk_size = struct.unpack('<4sI', file.read(8))
+        if chunk_id == b'fmt ':
+            fmt = file.read(min(chunk_size, 40))
+            if len(fmt) < 16:
+                raise ValueError("truncated fmt chunk")
+            tag, channels, sample_rate, _, _, bits = struct.unpack_from('<HHIIHH', fmt)
+            if tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+                tag = struct.unpack_from('<H', fmt, 24)[0]  # First two bytes of the sub-format GUID
+            audio_format = (tag, channels, sample_rate, bits)
+        elif chunk_id == b'data':
+            if audio_format is None:
+                raise ValueError("data chunk before fmt chunk")
+            data_offset = offset + 8
+            return audio_format + (data_offset, min(chunk_size, file_size - data_offset))
+        offset += 8 + chunk_size + (chunk_size & 1)  # Chunks are padded to an even size
+    raise ValueError("no data chunk")
+
+
+class MappedWavFile:
+    """
+    Read-only memory mapping of the samples of a 16-bit mono PCM WAV file.
+
+    The samples attribute is an int16 array backed by the file; slicing it never copies. The mapping stays valid
+    until close() is called, and views taken from it must not be used afterwards.
+    """
+
+    def __init__(self, path: str, sample_rate: int = None, sequential: bool = True):
+        """
+        Args:
+            path (str): Path to the WAV file.
+            sample_rate (int, optional): Sample rate the file must have.
+            sequential (bool): If True, the kernel is told the file will be read front to back, so it reads ahead
+                more aggressively and drops pages behind the reader sooner.
+
+        Raises:
+            ValueError: If the file is not 16-bit mono PCM, or not at the expected sample rate.
+        """
+        self.path = path
+        with open(path, 'rb') as file:
+            file_size = os.fstat(file.fileno()).st_size
+            try:
+                audio_format, channels, rate, bits, data_offset, data_size = _parse_wav_header(file, file_size)
+            except (ValueError, struct.error) as e:
+                raise ValueError(f"{path} is not a valid WAV file: {e}") from e
+            if audio_format != WAVE_FORMAT_PCM or channels != 1 or bits != SAMPLE_WIDTH * 8:
+                raise ValueError(f"{path} must be 16-bit mono PCM audio")
+            if sample_rate is not None and rate != sample_rate:
+                raise ValueError(f"{path} must be 16-bit mono PCM at {sample_rate} Hz")
+            # The whole file is mapped so the mapping offset needs no alignment; only the data chunk is viewed
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.sample_rate = rate
+        self._data_offset = data_offset
+        self.samples = np.frombuffer(self._mmap, dtype='<i2', count=data_size // SAMPLE_WIDTH, offset=data_offset)
+        if sequential:
+            self._advise('MADV_SEQUENTIAL', 0, len(self.samples))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    @property
+    def closed(self) -> bool:
+        return self._mmap.closed
+
+    @property
+    def duration(self) -> float:
+        """The duration of the audio in seconds."""
+        return len(self.samples) / self.sample_rate
+
+    def sample_index(self, seconds: float) -> int:
+        """
+        Converts a time in the file to a sample index, clamped to the file.
+
+        Args:
+            seconds (float): Time from the start of the file.
+
+        Returns:
+            int: Index of the sample at that time.
+        """
+        return min(max(int(round(seconds * self.sample_rate)), 0), len(self.samples))
+
+    def slice(self, start_seconds: float = 0.0, end_seconds: float = None) -> np.ndarray:
+        """
+        Returns:
+            numpy.ndarray: A zero-copy view of the samples between two times. The end defaults to the end of the
+            file.
+        """
+        end = len(self.samples) if end_seconds is None else self.sample_index(end_seconds)
+        return self.samples[self.sample_index(start_seconds):end]
+
+    def frames(self, frame_length: int, start: int = 0, end: int = None) -> np.ndarray:
+        """
+        Returns the complete frames between two sample indices as a two-dimensional zero-copy view.
+
+        Args:
+            frame_length (int): Number of samples per frame.
+            start (int): Index of the first sample.
+            end (int, optional): Index one past the last sample. Defaults to the end of the file.
+
+        Returns:
+            numpy.ndarray: One row per frame. Samples after the last complete frame are left out.
+        """
+        samples = self.samples[start:end]
+        usable = len(samples) - len(samples) % frame_length
+        return samples[:usable].reshape(-1, frame_length)
+
+    def release(self, start: int, end: int) -> None:
+        """
+        Drops the pages holding the samples between two indices from the process's resident memory. They are read
+        back from the page cache or the disk if they are accessed again, so this is always safe to call.
+
+        Args:
+            start (int): Index of the first sample.
+            end (int): Index one past the last sample.
+        """
+        self._advise('MADV_DONTNEED', start, end)
+
+    def _advise(self, option: str, start: int, end: int) -> None:
+        if self._mmap.closed or not hasattr(self._mmap, 'madvise') or not hasattr(mmap, option):
+            return  # madvise is not available on every platform
+        # madvise works on whole pages; only the pages entirely inside the range are advised
+        first = -(-(self._data_offset + start * SAMPLE_WIDTH) // mmap.PAGESIZE) * mmap.PAGESIZE
+        last = (self._data_offset + end * SAMPLE_WIDTH) // mmap.PAGESIZE * mmap.PAGESIZE
+        if last > first:
+            self._mmap.madvise(getattr(mmap, option), first, last - first)
+
+    def close(self) -> None:
+        """
+        Unmaps the file. If views of the samples are still referenced elsewhere, the mapping is released once the
+        last of them is garbage collected instead.
+        """
+        if self._mmap.closed:
+            return
+        self.samples = np.empty(0, dtype=np.int16)
+        try:
+            self._mmap.close()
+        except BufferError:
+            logger.debug("Views of %s are still in use; the mapping is released when they are.", self.path)
+
+
+class _MappedHistory:
+    """
+    The part of a mapped file up to the read position, exposed like the AudioRingBuffer of AudioStream so the
+    SnippetWriter can take windows around detections. Reads are served from the mapping, so no samples are
+    buffered.
+    """
+
+    def __init__(self, source):
+        self._source = source
+        self._advanced = threading.Condition()
+        self._waiters = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self._source.file)
+
+    @property
+    def position(self) -> int:
+        return self._source.position
+
+    @property
+    def nbytes(self) -> int:
+        return 0
+
+    def read(self, start: int, end: int) -> np.ndarray:
+        start, end = max(start, 0), min(end, self._source.position)
+        if end <= start:
+            return np.empty(0, dtype=np.int16)
+        return self._source.file.samples[start:end].copy()
+
+    def latest(self, count: int) -> np.ndarray:
+        return self.read(self.position - count, self.position)
+
+    def wait_for(self, position: int, timeout: float = None) -> bool:
+        with self._advanced:
+            self._waiters += 1
+            try:
+                return self._advanced.wait_for(lambda: self._source.position >= position, timeout)
+            finally:
+                self._waiters -= 1
+
+    def advanced(self) -> None:
+        """Wakes the threads waiting in wait_for() after the read position moved."""
+        if self._waiters:
+            with self._advanced:
+                self._advanced.notify_all()
+
+
+class _MappedFrameSource:
+    """
+    Hands out the frames of a mapped WAV file from a movable read position.
+    """
+
+    def __init__(self, source, frame_length: int, start_seconds: float, sample_rate: int, release_seconds: float):
+        if isinstance(source, MappedWavFile):
+            self.file, self._owns_file = source, False
+        else:
+            self.file, self._owns_file = MappedWavFile(source, sample_rate=sample_rate), True
+        self.frame_length = frame_length
+        self.sample_rate = self.file.sample_rate
+        self.frames_read = 0
+        self._position = self.file.sample_index(start_seconds)
+        self._release_samples = int(release_seconds * self.sample_rate) if release_seconds else 0
+        self._released_to = self._position
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def position(self) -> int:
+        """The index of the next sample to be read, which is also the number of samples before it in the file."""
+        return self._position
+
+    @property
+    def at_end(self) -> bool:
+        """True once no complete frame is left."""
+        return len(self.file) - self._position < self.frame_length
+
+    def seek(self, seconds: float) -> None:
+        """
+        Moves the read position to a time in the file.
+
+        Args:
+            seconds (float): Time from the start of the file, clamped to the file.
+        """
+        self._position = self.file.sample_index(seconds)
+        self._released_to = min(self._released_to, self._position)
+
+    def tell(self) -> float:
+        """
+        Returns:
+            float: The time of the read position in seconds.
+        """
+        return self._position / self.sample_rate
+
+    def next_frame(self):
+        """
+        Returns:
+            numpy.ndarray: A zero-copy view of the next frame, or None at the end of the file.
+        """
+        start = self._position
+        end = start + self.frame_length
+        if end > len(self.file):
+            return None
+        self._position = end
+        self.frames_read += 1
+        if self._release_samples and end - self._released_to >= 2 * self._release_samples:
+            # Keep the most recent window resident for carry-over audio and snippets
+            self.file.release(self._released_to, end - self._release_samples)
+            self._released_to = end - self._release_samples
+        return self.file.samples[start:end]
+
+    def close(self) -> None:
+        """Unmaps the file, unless it was passed in already mapped."""
+        if self._owns_file:
+            self.file.close()
+
+
+class WavFileStream(_MappedFrameSource):
+    """
+    Serves a WAV file in place of AudioStream, one zero-copy frame per read().
+    """
+
+    def __init__(self, source, frame_length: int = 512, start_seconds: float = 0.0, sample_rate: int = 16000,
+                 release_seconds: float = 10.0):
+        """
+        Args:
+            source (str or MappedWavFile): Path of the WAV file, or a file mapped already and shared with other
+                sources. A mapping passed in is not closed with the stream.
+            frame_length (int): Number of samples per frame returned by read().
+            start_seconds (float): Time in the file to start reading at.
+            sample_rate (int, optional): Sample rate the file must have, checked when a path is given.
+            release_seconds (float, optional): Seconds of audio kept resident behind the read position; older pages
+                are released. None keeps every page that was read.
+
+        Raises:
+            ValueError: If the file is not 16-bit mono PCM, or not at the expected sample rate.
+        """
+        super().__init__(source, frame_length, start_seconds, sample_rate, release_seconds)
+        self.rolling_buffer = _MappedHistory(self)
+
+    def read(self):
+        """
+        Returns:
+            numpy.ndarray: The next frame as a view of the file, or None at the end of the file.
+        """
+        frame = self.next_frame()
+        self.rolling_buffer.advanced()
+        return frame
+
+    def get_audio_since(self, position: int) -> bytes:
+        return self.rolling_buffer.read(position, self._position).tobytes()
+
+    def conversion_stats(self) -> dict:
+        return None
+
+    def reopen(self) -> None:
+        pass
+
+    def discard_pending(self) -> int:
+        return 0
+
+    def is_stream_closed(self) -> bool:
+        return self.file.closed
+
+    def cleanup(self) -> None:
+        pass  # The file stays mapped between runs; close() unmaps it
+
+
+class WavFileDataProvider(_MappedFrameSource):
+    """
+    Serves a WAV file to AudioRecorder in place of AudioDataProvider.
+    """
+
+    def __init__(self, source, frame_length: int = 512, start_seconds: float = 0.0, sample_rate: int = 16000,
+                 release_seconds: float = 10.0):
+        """
+        Args:
+            source (str or MappedWavFile): Path of the WAV file, or a file mapped already.
+            frame_length (int): Number of samples per frame.
+            start_seconds (float): Time in the file to start reading at.
+            sample_rate (int, optional): Sample rate the file must have, checked when a path is given.
+            release_seconds (float, optional): Seconds of audio kept resident behind the read position.
+        """
+        super().__init__(source, frame_length, start_seconds, sample_rate, release_seconds)
+
+    def start_stream(self) -> None:
+        pass
+
+    def get_next_frame(self):
+        return self.next_frame()
+
+    def stop_stream(self) -> None:
+        pass
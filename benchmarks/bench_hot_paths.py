@@ -0,0 +1,329 @@
+"""
+Benchmarks the hot paths of the toolkit headless, with fake Picovoice engines and local stand-ins for the web APIs.
+
+Benchmarks:
+    rolling_buffer      Appending one frame to the AudioRingBuffer every read goes through.
+    pcm_decode          Decoding one frame for Porcupine (struct) and for the energy gate (NumPy), as voice_loop does.
+    wake_word_loop      WakeWordDetector.voice_loop per frame: read, rolling buffer update, decode and engine call.
+    recorder_loop       AudioRecorder record loop per frame, recording one utterance per iteration.
+    wav_finalize        Writing a finished recording to its WAV file.
+    whisper             WhisperTranscriber.transcribe_audio against the local stand-in.
+    elevenlabs          ElevenLabsTextToSpeech.synthesize_speech against the local stand-in, without playback.
+    elevenlabs_stream   Streaming synthesized speech in chunks through the first-chunk latency wrapper.
+
+The engines cost --porcupine-cost-us and --cobra-cost-us per call, and the stand-in server answers after
+--http-latency-ms, so the results show the toolkit's own overhead on top of those. Audio is synthetic unless
+--wav names a 16 kHz mono WAV file.
+
+Results are printed as a table and, with --json, written in a machine-readable form. With --baseline the primary
+metric of every benchmark is compared with an earlier result file, and the exit code is 1 if any got slower by
+more than --max-regression.
+
+Usage:
+    python benchmarks/bench_hot_paths.py --json results.json
+    python benchmarks/bench_hot_paths.py --only wake_word_loop recorder_loop --baseline results.json
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import statistics
+import struct
+import sys
+import tempfile
+import time
+import wave
+
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')  # The detector loads its notification sound with pygame
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+# Run from a checkout without installing the package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from VoiceProcessingToolkit.simulation.FakeEngines import FRAME_LENGTH, patch_engines
+from VoiceProcessingToolkit.simulation.MockServer import LatencyDistribution, MockAPIServer
+from VoiceProcessingToolkit.simulation.SimulatedAudio import (SimulatedAudioDataProvider, SimulatedAudioStream,
+                                                              load_wav, split_frames, synthetic_speech)
+from VoiceProcessingToolkit.wake_word_detector.AudioStreamManager import AudioRingBuffer
+
+# Per benchmark, the metric compared with a baseline; lower is better for all of them
+PRIMARY_METRICS = {
+    'rolling_buffer': 'us_per_frame',
+    'pcm_decode': 'struct_us_per_frame',
+    'wake_word_loop': 'overhead_us_per_frame',
+    'recorder_loop': 'overhead_us_per_frame',
+    'wav_finalize': 'mean_ms',
+    'whisper': 'overhead_ms',
+    'elevenlabs': 'overhead_ms',
+    'elevenlabs_stream': 'overhead_ms',
+}
+
+
+def _latency_stats(seconds: list, latency: float) -> dict:
+    """
+    Summarizes request latencies in milliseconds; the overhead is the mean minus the stand-in's latency.
+    """
+    ordered = sorted(seconds)
+    last = len(ordered) - 1
+    mean = statistics.fmean(ordered)
+    return {
+        'requests': len(ordered),
+        'mean_ms': mean * 1e3,
+        'p50_ms': ordered[int(0.5 * last)] * 1e3,
+        'p99_ms': ordered[int(0.99 * last)] * 1e3,
+        'overhead_ms': (mean - latency) * 1e3,
+    }
+
+
+def bench_rolling_buffer(args, audio) -> dict:
+    frames = split_frames(audio)
+    buffer = AudioRingBuffer(int(5.0 * 16000))
+    write = buffer.write
+    count = len(frames)
+    started = time.perf_counter()
+    for i in range(args.frames):
+        write(frames[i % count])
+    elapsed = time.perf_counter() - started
+    return {'frames': args.frames, 'us_per_frame': elapsed / args.frames * 1e6}
+
+
+def bench_pcm_decode(args, audio) -> dict:
+    frame = split_frames(audio)[0]
+    unpack = struct.Struct('h' * FRAME_LENGTH).unpack_from
+    started = time.perf_counter()
+    for _ in range(args.frames):
+        unpack(frame)
+    struct_elapsed = time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in range(args.frames):
+        np.frombuffer(frame, dtype=np.int16)
+    numpy_elapsed = time.perf_counter() - started
+    return {
+        'frames': args.frames,
+        'struct_us_per_frame': struct_elapsed / args.frames * 1e6,
+        'numpy_us_per_frame': numpy_elapsed / args.frames * 1e6,
+    }
+
+
+def bench_wake_word_loop(args, audio) -> dict:
+    from VoiceProcessingToolkit.wake_word_detector.ActionManager import ActionManager
+    from VoiceProcessingToolkit.wake_word_detector.WakeWordDetector import WakeWordDetector
+
+    porcupine_cost = args.porcupine_cost_us / 1e6
+    # The detection on the last frame ends the loop
+    with patch_engines(porcupine_cost=porcupine_cost, detect_every=args.frames):
+        stream = SimulatedAudioStream(audio)
+        detector = WakeWordDetector(access_key='benchmark', wake_word='computer', sensitivity=0.5,
+                                    action_manager=ActionManager(), audio_stream_manager=stream,
+                                    play_notification_sound=False, energy_gate=args.energy_gate)
+        detector.initialize_porcupine()  # Created on first use otherwise, inside the measurement
+        started = time.perf_counter()
+        detector.run_blocking(cleanup=False)
+        elapsed = time.perf_counter() - started
+    frames = stream.frames_read
+    return {
+        'frames': frames,
+        'us_per_frame': elapsed / frames * 1e6,
+        'overhead_us_per_frame': elapsed / frames * 1e6 - args.porcupine_cost_us,
+        'real_time_factor': elapsed / (frames * FRAME_LENGTH / 16000),
+    }
+
+
+def _create_recorder(args, output_directory):
+    from VoiceProcessingToolkit.voice_detection.Voicerecorder import AudioRecorder
+
+    recorder = AudioRecorder(output_directory=output_directory, access_key='benchmark', voice_threshold=0.8,
+                             inactivity_limit=0.5, min_recording_length=0.5, buffer_length=1.0,
+                             energy_gate=args.energy_gate)
+    recorder.initialize_vad()  # Created on first use otherwise, inside the measurement
+    return recorder
+
+
+def bench_recorder_loop(args, audio) -> dict:
+    cobra_cost = args.cobra_cost_us / 1e6
+    with patch_engines(cobra_cost=cobra_cost) as engines, tempfile.TemporaryDirectory() as output_directory:
+        recorder = _create_recorder(args, output_directory)
+        frames = elapsed = saved = 0
+        for _ in range(args.recordings):
+            provider = SimulatedAudioDataProvider(audio)
+            started = time.perf_counter()
+            saved += bool(recorder.perform_recording(provider))
+            elapsed += time.perf_counter() - started
+            frames += provider.frames_read
+        engine_calls = engines['cobra'][0].calls
+    return {
+        'recordings': args.recordings,
+        'saved': saved,
+        'frames': frames,
+        'engine_calls_per_frame': engine_calls / frames,
+        'us_per_frame': elapsed / frames * 1e6,
+        'overhead_us_per_frame': (elapsed - engine_calls * cobra_cost) / frames * 1e6,
+    }
+
+
+def bench_wav_finalize(args, audio) -> dict:
+    with patch_engines(), tempfile.TemporaryDirectory() as output_directory:
+        recorder = _create_recorder(args, output_directory)
+        frames = split_frames(audio)
+        seconds = []
+        for _ in range(args.recordings):
+            started = time.perf_counter()
+            recorder.save_to_wav_file(frames)
+            seconds.append(time.perf_counter() - started)
+    return {
+        'recordings': args.recordings,
+        'audio_seconds': len(frames) * FRAME_LENGTH / 16000,
+        'mean_ms': statistics.fmean(seconds) * 1e3,
+        'max_ms': max(seconds) * 1e3,
+    }
+
+
+def bench_whisper(args, audio, server) -> dict:
+    from VoiceProcessingToolkit.transcription.whisper import WhisperTranscriber
+
+    transcriber = WhisperTranscriber(base_url=server.url + '/v1', api_key='benchmark')
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'utterance.wav')
+        with wave.open(path, 'wb') as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(16000)
+            wf.writeframes(audio.tobytes())
+        transcriber.transcribe_audio(path)  # Warm up: connect and build the client
+        seconds = []
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            transcriber.transcribe_audio(path)
+            seconds.append(time.perf_counter() - started)
+    return _latency_stats(seconds, args.http_latency_ms / 1e3)
+
+
+def bench_elevenlabs(args, audio, server) -> dict:
+    from VoiceProcessingToolkit.text_to_speech import elevenlabs_tts
+
+    config = elevenlabs_tts.ElevenLabsConfig(api_key='benchmark', playback_enabled=False,
+                                             base_url=server.url + '/v1')
+    tts = elevenlabs_tts.ElevenLabsTextToSpeech(config=config)
+    with tempfile.TemporaryDirectory() as directory:
+        tts.synthesize_speech('Warm up.', output_dir=directory)
+        seconds = []
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            tts.synthesize_speech('This is a benchmark sentence.', output_dir=directory)
+            seconds.append(time.perf_counter() - started)
+    return _latency_stats(seconds, args.http_latency_ms / 1e3)
+
+
+def bench_elevenlabs_stream(args, audio, server) -> dict:
+    import requests
+    from VoiceProcessingToolkit.VoiceProcessingManager import _observe_first_chunk
+
+    session = requests.Session()
+    url = server.url + '/v1/text-to-speech/benchmark/stream'
+    session.post(url, json={'text': 'Warm up.'}).content
+    seconds, first_chunk = [], []
+    for _ in range(args.requests):
+        started = time.perf_counter()
+        response = session.post(url, json={'text': 'This is a benchmark sentence.'}, stream=True)
+        for i, _chunk in enumerate(_observe_first_chunk(response.iter_content(chunk_size=None), started)):
+            if i == 0:
+                first_chunk.append(time.perf_counter() - started)
+        seconds.append(time.perf_counter() - started)
+    result = _latency_stats(seconds, args.http_latency_ms / 1e3)
+    result['first_chunk_mean_ms'] = statistics.fmean(first_chunk) * 1e3
+    return result
+
+
+BENCHMARKS = {
+    'rolling_buffer': bench_rolling_buffer,
+    'pcm_decode': bench_pcm_decode,
+    'wake_word_loop': bench_wake_word_loop,
+    'recorder_loop': bench_recorder_loop,
+    'wav_finalize': bench_wav_finalize,
+    'whisper': bench_whisper,
+    'elevenlabs': bench_elevenlabs,
+    'elevenlabs_stream': bench_elevenlabs_stream,
+}
+HTTP_BENCHMARKS = ('whisper', 'elevenlabs', 'elevenlabs_stream')
+
+
+def compare(results: dict, baseline: dict, max_regression: float) -> list:
+    """
+    Returns:
+        list: (benchmark, metric, baseline value, current value) of every benchmark whose primary metric grew by
+        more than max_regression (a fraction) compared with the baseline.
+    """
+    regressions = []
+    for name, result in results.items():
+        metric = PRIMARY_METRICS[name]
+        previous = baseline.get('results', {}).get(name, {}).get(metric)
+        if previous is not None and previous > 0 and result[metric] > previous * (1 + max_regression):
+            regressions.append((name, metric, previous, result[metric]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help="Benchmarks to run; defaults to all")
+    parser.add_argument('--frames', type=int, default=20000, help="Frames per per-frame benchmark")
+    parser.add_argument('--recordings', type=int, default=20, help="Recordings per recorder benchmark")
+    parser.add_argument('--requests', type=int, default=50, help="Requests per API benchmark")
+    parser.add_argument('--porcupine-cost-us', type=float, default=0.0, help="Cost of one fake Porcupine call")
+    parser.add_argument('--cobra-cost-us', type=float, default=0.0, help="Cost of one fake Cobra call")
+    parser.add_argument('--http-latency-ms', type=float, default=0.0, help="Latency of the stand-in API server")
+    parser.add_argument('--energy-gate', action='store_true', help="Enable the energy gate in front of the engines")
+    parser.add_argument('--wav', help="16 kHz mono WAV file to use instead of synthetic speech")
+    parser.add_argument('--json', dest='json_path', help="Write the results as JSON to this file")
+    parser.add_argument('--baseline', help="Earlier JSON results to compare with")
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help="Allowed slowdown of a primary metric over the baseline, as a fraction")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger('VoiceProcessingToolkit').setLevel(logging.ERROR)  # Recordings log on every save
+
+    audio = load_wav(args.wav) if args.wav else synthetic_speech()
+    names = args.only or list(BENCHMARKS)
+    results = {}
+    server = None
+    try:
+        for name in names:
+            if name in HTTP_BENCHMARKS:
+                if server is None:
+                    latency = LatencyDistribution('fixed', args.http_latency_ms / 1e3)
+                    server = MockAPIServer(transcription_latency=latency, speech_latency=latency)
+                results[name] = BENCHMARKS[name](args, audio, server)
+            else:
+                results[name] = BENCHMARKS[name](args, audio)
+            primary = PRIMARY_METRICS[name]
+            print(f"{name:>18}  {primary:>22} = {results[name][primary]:10.3f}")
+    finally:
+        if server is not None:
+            server.stop()
+
+    report = {
+        'suite': 'hot_paths',
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parameters': {key: value for key, value in vars(args).items()
+                       if key not in ('json_path', 'baseline', 'only')},
+        'results': results,
+    }
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        for name, metric, previous, current in regressions:
+            print(f"REGRESSION {name}.{metric}: {previous:.3f} -> {current:.3f}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
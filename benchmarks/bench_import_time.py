@@ -0,0 +1,147 @@
+"""
+Benchmarks the cold import time of the toolkit's entry points, for short-lived processes such as CLI workers.
+
+Every import runs in a fresh interpreter, --repeat times, and the median is reported. Each target also lists the
+heavy third-party backends it loaded; importing the package, the transcriber, the text-to-speech module or the
+manager must not load any of them, since they are imported on first use. The wake word detector is included as a
+reference and may load NumPy.
+
+The run fails (exit code 1) if a target loads a backend it must not, prints anything while being imported (such as
+the pygame banner), or takes longer than --budget-ms. With --top, the slowest modules of every target are listed
+from `python -X importtime`.
+
+Usage:
+    python benchmarks/bench_import_time.py --budget-ms 150 --json import_time.json
+    python benchmarks/bench_import_time.py --top 10
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BACKENDS = ('numpy', 'pyaudio', 'pygame', 'elevenlabs', 'openai', 'requests', 'pvporcupine', 'pvcobra', 'pvkoala')
+
+# Target -> (module imported, backends it may load)
+TARGETS = {
+    'package': ('VoiceProcessingToolkit', ()),
+    'whisper': ('VoiceProcessingToolkit.transcription.whisper', ()),
+    'elevenlabs_tts': ('VoiceProcessingToolkit.text_to_speech.elevenlabs_tts', ()),
+    'manager': ('VoiceProcessingToolkit.VoiceProcessingManager', ()),
+    'wake_word_detector': ('VoiceProcessingToolkit.wake_word_detector.WakeWordDetector', ('numpy',)),
+}
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{'seconds': elapsed, 'loaded': [name for name in {backends!r} if name in sys.modules]}}))
+"""
+
+
+def _environment() -> dict:
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [REPOSITORY, env.get('PYTHONPATH')]))
+    env.pop('PYGAME_HIDE_SUPPORT_PROMPT', None)  # The toolkit must hide the banner itself
+    return env
+
+
+def measure(module: str, repeat: int) -> dict:
+    """
+    Imports a module in `repeat` fresh interpreters.
+
+    Returns:
+        dict: Median and minimum import time in milliseconds, the backends loaded and any other output printed.
+
+    Raises:
+        RuntimeError: If the import fails.
+    """
+    seconds, loaded, printed = [], set(), []
+    for _ in range(repeat):
+        completed = subprocess.run([sys.executable, '-c', _PROBE.format(module=module, backends=BACKENDS)],
+                                   capture_output=True, text=True, env=_environment())
+        if completed.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{completed.stderr}")
+        *output, result = completed.stdout.strip().splitlines()
+        result = json.loads(result)
+        seconds.append(result['seconds'])
+        loaded.update(result['loaded'])
+        printed.extend(line for line in output if line not in printed)
+    return {
+        'median_ms': statistics.median(seconds) * 1e3,
+        'min_ms': min(seconds) * 1e3,
+        'backends_loaded': sorted(loaded),
+        'printed': printed,
+    }
+
+
+def slowest_modules(module: str, count: int) -> list:
+    """
+    Returns:
+        list: (self microseconds, cumulative microseconds, module name) of the modules with the highest self import
+        time, from `python -X importtime`.
+    """
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], capture_output=True,
+                               text=True, env=_environment())
+    timings = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        timings.append((int(own), int(cumulative), name.strip()))
+    return sorted(timings, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', nargs='+', choices=list(TARGETS), help="Targets to measure; defaults to all")
+    parser.add_argument('--repeat', type=int, default=5, help="Fresh interpreters per target")
+    parser.add_argument('--budget-ms', type=float, help="Maximum median import time of every target but the "
+                                                        "wake word detector")
+    parser.add_argument('--top', type=int, default=0, help="List this many of the slowest modules per target")
+    parser.add_argument('--json', dest='json_path', help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    failures = []
+    results = {}
+    for name in args.only or list(TARGETS):
+        module, allowed = TARGETS[name]
+        result = results[name] = measure(module, args.repeat)
+        unexpected = [backend for backend in result['backends_loaded'] if backend not in allowed]
+        print(f"{name:>18}  median {result['median_ms']:8.1f} ms  min {result['min_ms']:8.1f} ms  "
+              f"backends: {', '.join(result['backends_loaded']) or 'none'}")
+        if unexpected:
+            failures.append(f"{name} loaded {', '.join(unexpected)}")
+        if result['printed']:
+            failures.append(f"{name} printed {result['printed']!r}")
+        if args.budget_ms is not None and not allowed and result['median_ms'] > args.budget_ms:
+            failures.append(f"{name} took {result['median_ms']:.1f} ms, over the budget of {args.budget_ms:g} ms")
+        for own, cumulative, module_name in slowest_modules(module, args.top) if args.top else ():
+            print(f"{'':>20}{own / 1e3:8.1f} ms self {cumulative / 1e3:8.1f} ms cumulative  {module_name}")
+
+    if args.json_path:
+        report = {
+            'suite': 'import_time',
+            'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'parameters': {'repeat': args.repeat, 'budget_ms': args.budget_ms},
+            'results': results,
+        }
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
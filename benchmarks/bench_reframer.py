@@ -0,0 +1,85 @@
+"""
+Benchmarks the per-frame loop overhead of the wake word loop against the capture block size.
+
+A synthetic device returns blocks of audio after a configurable fixed cost per read, which stands in for the
+blocking PyAudio read and the GIL handoff. Each engine frame is decoded with struct, as in
+WakeWordDetector.voice_loop, so the numbers show how much loop time is saved by reading larger blocks and
+re-framing them with AudioReframer.
+
+Usage:
+    python benchmarks/bench_reframer.py --frames 20000 --read-cost-us 30 --json reframer.json
+"""
+
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Run from a checkout
+
+import numpy as np
+
+from VoiceProcessingToolkit.wake_word_detector.AudioStreamManager import AudioReframer
+
+FRAME_LENGTH = 512
+
+
+class SyntheticDevice:
+    """
+    Returns blocks of random 16-bit audio, spending a fixed amount of time per read.
+    """
+
+    def __init__(self, block_size: int, read_cost: float):
+        self._block = np.random.default_rng(0).integers(-3000, 3000, block_size, dtype=np.int16).tobytes()
+        self._read_cost = read_cost
+        self.reads = 0
+
+    def read(self) -> bytes:
+        self.reads += 1
+        deadline = time.perf_counter() + self._read_cost
+        while time.perf_counter() < deadline:
+            pass
+        return self._block
+
+
+def run(block_size: int, frames: int, read_cost: float) -> dict:
+    device = SyntheticDevice(block_size, read_cost)
+    if block_size == FRAME_LENGTH:
+        next_frame = device.read
+    else:
+        next_frame = AudioReframer(device.read, FRAME_LENGTH).next_frame
+    unpack = struct.Struct("h" * FRAME_LENGTH).unpack_from
+
+    started = time.perf_counter()
+    for _ in range(frames):
+        unpack(next_frame())
+    elapsed = time.perf_counter() - started
+    return {
+        'block_size': block_size,
+        'frames': frames,
+        'device_reads': device.reads,
+        'us_per_frame': elapsed / frames * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, default=20000)
+    parser.add_argument('--read-cost-us', type=float, default=30.0, help="Simulated cost of one device read")
+    parser.add_argument('--block-sizes', type=int, nargs='+', default=[512, 1024, 2048, 3000, 4096])
+    parser.add_argument('--json', dest='json_path', help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = [run(block_size, args.frames, args.read_cost_us / 1e6) for block_size in args.block_sizes]
+    print(f"{'block size':>10}  {'device reads':>12}  {'us/frame':>9}")
+    for result in results:
+        print(f"{result['block_size']:>10}  {result['device_reads']:>12}  {result['us_per_frame']:>9.2f}")
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump({'read_cost_us': args.read_cost_us, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -61,11 +61,11 @@ user_proxy = autogen.UserProxyAgent(
 )
 
 
-def get_user_input():
+def create_voice_manager():
     """
-    Captures user input via voice, transcribes it, and returns the transcription.
+    Creates the VoiceProcessingManager used to capture user input.
     """
-    vpm = VoiceProcessingManager.create_default_instance(
+    return VoiceProcessingManager.create_default_instance(
         use_wake_word=True,
         play_notification_sound=True,
         wake_word="jarvis",
@@ -73,6 +73,13 @@ def get_user_input():
         inactivity_limit=2.5,
     )
 
+
+def get_user_input():
+    """
+    Captures user input via voice, transcribes it, and returns the transcription.
+    """
+    vpm = create_voice_manager()
+
     logging.info("Say something to Jarvis")
 
     transcription = vpm.run(tts=False, streaming=True)
@@ -108,14 +115,16 @@ def ask_assistant(transcription):
 def initiate_jarvis_loop():
     """
     Continuously interacts with Jarvis by capturing user input, transcribing it, and obtaining responses.
+    The manager is created once and keeps the microphone and wake word engine ready between turns.
     """
-    while True:
-        try:
-            transcription = get_user_input()
+    vpm = create_voice_manager()
+    logging.info("Say something to Jarvis")
+    try:
+        for transcription in vpm.listen_forever(tts=False):
+            logging.info(f"Processed text: {transcription}")
             ask_assistant(transcription)
-        except KeyboardInterrupt:
-            logging.info("Interrupted by user, shutting down.")
-            break
+    except KeyboardInterrupt:
+        logging.info("Interrupted by user, shutting down.")
 
 
 if __name__ == '__main__':
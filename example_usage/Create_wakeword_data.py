@@ -20,6 +20,8 @@ def main():
     This will create a folder called "wake_word_dataset" in the current working directory and save the wake word
     usage during usage. This can be used to create a wake word dataset for the wake word detector, based on normal
     usage as the usage of the wake word detector as it will not be affected by the recording of the wake word.
+    Snippets are written in the background to one subdirectory per day, and every snippet is listed in
+    manifest.jsonl in that folder.
     The script can be terminated early by a KeyboardInterrupt (Ctrl+C).
     """
 
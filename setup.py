@@ -22,9 +22,11 @@ setup(
         "Operating System :: OS Independent",
     ],
     package_dir={"": "."},
-    packages=find_packages(where="."),
+    # The simulation package (fake engines, mock API server, load test) is installed too, so load tests can run
+    # against an installed toolkit; only the tests and benchmarks are left out
+    packages=find_packages(where=".", exclude=["tests", "tests.*", "benchmarks", "benchmarks.*"]),
     include_package_data=True,
-    python_requires=">=3.6",
+    python_requires=">=3.9",
     install_requires=[
         "PyAudio~=0.2.14",
         "openai>=1.10.0,<2.0.0",
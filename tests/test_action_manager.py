@@ -0,0 +1,113 @@
+import threading
+
+import pytest
+
+from VoiceProcessingToolkit.shared_resources import WorkerPool
+from VoiceProcessingToolkit.wake_word_detector.ActionManager import ActionManager
+
+
+def test_actions_run_and_are_timed():
+    manager = ActionManager()
+    calls = []
+    manager.register_action(lambda: calls.append('sync'))
+
+    async def asynchronous():
+        calls.append('async')
+
+    manager.register_action(asynchronous)
+    try:
+        manager.trigger(wait=True, timeout=5)
+    finally:
+        manager.shutdown()
+    assert sorted(calls) == ['async', 'sync']
+    assert sum(stats['count'] for stats in manager.action_stats().values()) == 2
+
+
+def test_shutdown_from_an_action_on_the_loop_does_not_join_its_own_thread():
+    manager = ActionManager()
+    outcome = {}
+    done = threading.Event()
+
+    async def close_from_action():
+        outcome['thread'] = threading.current_thread()
+        try:
+            manager.shutdown()
+            outcome['error'] = None
+        except Exception as e:
+            outcome['error'] = e
+        done.set()
+
+    manager.register_action(close_from_action)
+    manager.trigger()
+    assert done.wait(5)
+    loop_thread = outcome['thread']
+    loop_thread.join(5)
+    assert outcome['error'] is None
+    assert not loop_thread.is_alive()
+
+
+def test_max_workers_is_a_deprecated_alias_for_a_private_pool():
+    with pytest.warns(DeprecationWarning):
+        manager = ActionManager(max_workers=2)
+    assert isinstance(manager._worker_pool, WorkerPool)
+    assert manager._worker_pool.max_workers == 2
+    with pytest.warns(DeprecationWarning):
+        assert ActionManager(3)._worker_pool.max_workers == 3
+    with pytest.warns(DeprecationWarning), pytest.raises(ValueError):
+        ActionManager(max_workers=0)
+
+
+def test_every_registered_action_has_its_own_statistics():
+    manager = ActionManager()
+    first, second = [], []
+    manager.register_action(lambda: first.append(1))
+    manager.register_action(lambda: second.append(1) or 1 / 0)
+    try:
+        manager.trigger(wait=True, timeout=5)
+        manager.trigger(wait=True, timeout=5)
+    finally:
+        manager.shutdown()
+    stats = manager.action_stats()
+    assert len(stats) == 2 and len(first) == 2 and len(second) == 2
+    assert sorted(entry['errors'] for entry in stats.values()) == [0, 2]
+    assert all(entry['count'] == 2 for entry in stats.values())
+
+
+def test_concurrent_registration_and_triggering_keep_every_histogram():
+    manager = ActionManager()
+
+    def register():
+        for _ in range(50):
+            manager.register_action(lambda: None)
+
+    threads = [threading.Thread(target=register) for _ in range(4)]
+    try:
+        for thread in threads:
+            thread.start()
+        for _ in range(5):
+            manager.trigger(wait=True, timeout=5)
+        for thread in threads:
+            thread.join()
+        manager.trigger(wait=True, timeout=5)
+    finally:
+        manager.shutdown()
+    stats = manager.action_stats()
+    assert len(stats) == 200
+    assert all(entry['count'] >= 1 for entry in stats.values())
+
+
+def test_abandoned_actions_do_not_hold_workers_of_the_shared_pool():
+    shared = WorkerPool('shared-test', max_workers=1)
+    manager = ActionManager()
+    manager._worker_pool = shared  # Stands in for the toolkit's shared pool
+    release = threading.Event()
+    manager.register_action(lambda: release.wait(5), timeout=0.05)
+    try:
+        manager.trigger(wait=True, timeout=5)
+        assert shared.submit(lambda: 'free').result(1) == 'free'  # The abandoned action runs elsewhere
+        stats, = manager.action_stats().values()
+        assert stats['timeouts'] == 1
+    finally:
+        release.set()
+        manager.shutdown()
+        shared.shutdown()
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from VoiceProcessingToolkit.wake_word_detector.AudioStreamManager import AudioReframer, AudioRingBuffer
+
+
+def stream_of(count, seed=0):
+    return np.random.default_rng(seed).integers(-32768, 32767, count, dtype=np.int16)
+
+
+@pytest.mark.parametrize('capacity', [1, 7, 512, 1000])
+def test_ring_buffer_round_trip_matches_the_written_stream(capacity):
+    audio = stream_of(5000)
+    rng = np.random.default_rng(1)
+    buffer = AudioRingBuffer(capacity)
+    written = 0
+    while written < len(audio):
+        count = int(rng.integers(0, 3 * capacity + 2))
+        block = audio[written:written + count]
+        buffer.write(block if rng.random() < 0.5 else block.tobytes())
+        written += len(block)
+        assert buffer.position == written
+        held = audio[max(written - capacity, 0):written]
+        assert np.array_equal(buffer.read(0, written), held)
+        assert np.array_equal(buffer.latest(capacity), held)
+        start = int(rng.integers(0, written + 1))
+        assert np.array_equal(buffer.read(start, written), audio[max(start, written - capacity):written])
+
+
+def test_ring_buffer_clamps_ranges_to_the_samples_held():
+    buffer = AudioRingBuffer(4)
+    buffer.write(np.arange(10, dtype=np.int16))
+    assert list(buffer.read(0, 100)) == [6, 7, 8, 9]
+    assert list(buffer.read(8, 9)) == [8]
+    assert len(buffer.read(9, 8)) == 0
+    assert len(buffer.read(20, 30)) == 0
+    assert buffer.read(6, 10).dtype == np.int16
+
+
+def test_ring_buffer_reads_are_copies():
+    buffer = AudioRingBuffer(8)
+    buffer.write(np.arange(4, dtype=np.int16))
+    samples = buffer.read(0, 4)
+    buffer.write(np.full(8, 99, dtype=np.int16))
+    assert list(samples) == [0, 1, 2, 3]
+
+
+def test_ring_buffer_ignores_empty_writes_and_rejects_empty_capacity():
+    buffer = AudioRingBuffer(4)
+    buffer.write(b'')
+    assert buffer.position == 0 and len(buffer.latest(4)) == 0
+    assert buffer.nbytes == 8
+    with pytest.raises(ValueError):
+        AudioRingBuffer(0)
+
+
+def block_reader(audio, block_sizes):
+    blocks = []
+    start = 0
+    for size in block_sizes:
+        blocks.append(audio[start:start + size].tobytes())
+        start += size
+    return iter(blocks).__next__
+
+
+@pytest.mark.parametrize('block_size', [100, 512, 1000, 1536, 4096])
+def test_reframer_frames_concatenate_to_the_block_stream(block_size):
+    audio = stream_of(block_size * 40)
+    reframer = AudioReframer(block_reader(audio, [block_size] * 40), 512)
+    frames = [bytes(reframer.next_frame()) for _ in range(len(audio) // 512)]
+    assert all(len(frame) == 1024 for frame in frames)
+    assert b''.join(frames) == audio[:len(frames) * 512].tobytes()
+    assert reframer.pending_samples == -len(frames) * 512 % block_size  # Blocks are read only when needed
+
+
+def test_reframer_handles_blocks_of_varying_size():
+    rng = np.random.default_rng(2)
+    sizes = [int(size) for size in rng.integers(1, 2000, 200)]
+    audio = stream_of(sum(sizes))
+    reframer = AudioReframer(block_reader(audio, sizes), 480)
+    frames = [bytes(reframer.next_frame()) for _ in range(len(audio) // 480)]
+    assert b''.join(frames) == audio[:len(frames) * 480].tobytes()
+
+
+def test_reframer_reset_discards_pending_samples():
+    audio = stream_of(2000)
+    reframer = AudioReframer(block_reader(audio, [700, 1300]), 512)
+    reframer.next_frame()
+    assert reframer.pending_samples == 188
+    reframer.reset()
+    assert reframer.pending_samples == 0
+    assert bytes(reframer.next_frame()) == audio[700:1212].tobytes()
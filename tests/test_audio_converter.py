@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from VoiceProcessingToolkit.wake_word_detector.AudioConverter import AudioConverter, design_polyphase_filter
+
+AMPLITUDE = 10000
+
+
+def tone(rate, frequency, seconds=1.0, channels=1):
+    t = np.arange(int(rate * seconds)) / rate
+    samples = (np.sin(2 * np.pi * frequency * t) * AMPLITUDE).astype(np.int16)
+    return np.repeat(samples, channels) if channels > 1 else samples
+
+
+def convert_in_blocks(converter, samples, block=4800):
+    return np.frombuffer(b''.join(converter.convert(samples[i:i + block].tobytes())
+                                  for i in range(0, len(samples), block)), dtype=np.int16)
+
+
+def level_db(samples):
+    steady = samples[len(samples) // 4:].astype(np.float64)  # Skip the filter's start-up
+    rms = np.sqrt(np.mean(steady ** 2))
+    return 20 * np.log10(max(rms, 1e-3) / (AMPLITUDE / np.sqrt(2)))
+
+
+@pytest.mark.parametrize('rate', [48000, 44100, 32000, 22050])
+@pytest.mark.parametrize('frequency', [8500, 10000, 11000])
+def test_stopband_attenuation(rate, frequency):
+    output = convert_in_blocks(AudioConverter(rate), tone(rate, frequency))
+    assert level_db(output) < -80
+
+
+@pytest.mark.parametrize('rate', [48000, 44100])
+def test_attenuation_at_output_nyquist(rate):
+    output = convert_in_blocks(AudioConverter(rate), tone(rate, 8000))
+    assert level_db(output) < -60
+
+
+@pytest.mark.parametrize('rate', [48000, 44100, 22050])
+@pytest.mark.parametrize('frequency', [300, 1000, 4000])
+def test_passband_is_flat(rate, frequency):
+    output = convert_in_blocks(AudioConverter(rate), tone(rate, frequency))
+    assert abs(level_db(output)) < 0.1
+
+
+@pytest.mark.parametrize('rate', [48000, 44100, 8000])
+def test_block_size_does_not_change_the_output(rate):
+    samples = tone(rate, 440, seconds=0.1) + tone(rate, 3000, seconds=0.1) // 2
+    whole = convert_in_blocks(AudioConverter(rate), samples, block=len(samples))
+    for block in (1, 17, 441, 1024):
+        assert np.array_equal(convert_in_blocks(AudioConverter(rate), samples, block=block), whole)
+
+
+def test_output_length_follows_the_rate_ratio():
+    output = convert_in_blocks(AudioConverter(44100), tone(44100, 440, seconds=2.0), block=1000)
+    assert abs(len(output) - 32000) <= 1
+
+
+def test_stereo_is_downmixed():
+    rate = 48000
+    left = tone(rate, 1000)
+    stereo = np.column_stack((left, np.zeros_like(left))).ravel()
+    output = convert_in_blocks(AudioConverter(rate, input_channels=2), stereo)
+    assert abs(level_db(output) - 20 * np.log10(0.5)) < 0.2
+
+
+def test_matching_format_is_passed_through():
+    converter = AudioConverter(16000)
+    data = tone(16000, 440).tobytes()
+    assert converter.is_passthrough
+    assert converter.convert(data) is data
+
+
+def test_reset_restarts_the_stream():
+    samples = tone(48000, 440, seconds=0.2)
+    converter = AudioConverter(48000)
+    first = converter.convert(samples.tobytes())
+    converter.reset()
+    assert converter.convert(samples.tobytes()) == first
+
+
+def test_filter_has_unity_dc_gain_per_phase():
+    taps = design_polyphase_filter(160, 441)
+    assert taps.shape[0] == 160
+    assert np.allclose(taps.sum(axis=1), 1.0, atol=0.01)
@@ -0,0 +1,47 @@
+import types
+
+import numpy as np
+
+from VoiceProcessingToolkit.wake_word_detector import AudioStreamManager
+from VoiceProcessingToolkit.wake_word_detector.AudioStreamManager import AudioStream
+
+DEVICE_RATE = 48000
+FRAME_LENGTH = 512
+
+
+class FakeDeviceStream:
+    def __init__(self):
+        self.amplitude = 10000
+        self._phase = 0
+
+    def get_read_available(self):
+        return 4800
+
+    def read(self, count, exception_on_overflow=True):
+        t = np.arange(self._phase, self._phase + count) / DEVICE_RATE
+        self._phase += count
+        return (self.amplitude * np.sin(2 * np.pi * 440 * t)).astype(np.int16).tobytes()
+
+    def is_stopped(self):
+        return False
+
+
+class FakePyAudio:
+    def __init__(self):
+        self.stream = FakeDeviceStream()
+
+    def open(self, **kwargs):
+        return self.stream
+
+
+def test_discard_pending_drops_audio_held_back_by_the_resampler(monkeypatch):
+    fake_pyaudio = types.SimpleNamespace(PyAudio=FakePyAudio, PyAudioError=OSError, paInputOverflowed=-9981)
+    monkeypatch.setattr(AudioStreamManager, 'pyaudio', fake_pyaudio)
+    stream = AudioStream(DEVICE_RATE, 1, 8, FRAME_LENGTH, capture_block_size=1000, output_rate=16000)
+    for _ in range(5):
+        stream.read()
+    stream.get_stream().amplitude = 0  # The device now captures silence
+    stream.discard_pending()
+    frame = np.frombuffer(bytes(stream.read()), dtype=np.int16)
+    assert len(frame) == FRAME_LENGTH
+    assert not frame.any()
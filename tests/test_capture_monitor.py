@@ -0,0 +1,121 @@
+import types
+
+import pytest
+
+from VoiceProcessingToolkit.monitoring import CaptureMonitor as capture_monitor_module
+from VoiceProcessingToolkit.monitoring.CaptureMonitor import CaptureMonitor, RealTimeFactorMonitor
+
+RATE = 16000
+BLOCK = 512
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(capture_monitor_module, 'time', types.SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+def run_reads(monitor, clock, intervals, available=0):
+    """Reads one block per interval from a device whose buffer holds `available` samples before every read."""
+    for interval in intervals:
+        clock.now += interval
+        monitor.before_read(available)
+        monitor.after_read(BLOCK)
+
+
+def test_reads_that_keep_up_report_nothing(clock):
+    alerts = []
+    monitor = CaptureMonitor(RATE, on_alert=alerts.append)
+    run_reads(monitor, clock, [BLOCK / RATE] * 200)
+    assert monitor.stats()['overruns'] == 0 and monitor.dropped_samples == 0
+    assert alerts == []
+
+
+def test_jitter_within_the_tolerance_cancels_out(clock):
+    monitor = CaptureMonitor(RATE)
+    late, early = BLOCK / RATE * 1.5, BLOCK / RATE * 0.5
+    run_reads(monitor, clock, [late, early] * 100)
+    assert monitor.overruns == 0
+
+
+def test_a_stall_is_reported_as_one_overrun_with_the_dropped_samples(clock):
+    alerts = []
+    monitor = CaptureMonitor(RATE, on_alert=alerts.append)
+    run_reads(monitor, clock, [BLOCK / RATE] * 10)
+    run_reads(monitor, clock, [BLOCK / RATE + 0.5])  # Half a second the device could not buffer
+    run_reads(monitor, clock, [BLOCK / RATE] * 10)
+    assert monitor.overruns == 1
+    assert monitor.dropped_samples == pytest.approx(0.5 * RATE, abs=1)
+    assert [alert.kind for alert in alerts] == ['overrun']
+    assert alerts[0].source == 'capture'
+
+
+def test_backlog_alert_fires_once_until_the_backlog_clears(clock):
+    alerts = []
+    monitor = CaptureMonitor(RATE, backlog_alert_seconds=0.5, on_alert=alerts.append)
+    for available in (0, RATE, RATE, RATE // 8, RATE):
+        clock.now += BLOCK / RATE
+        monitor.before_read(available)
+    assert [alert.value for alert in alerts if alert.kind == 'backlog'] == [1.0, 1.0]
+    assert monitor.stats()['max_backlog_seconds'] == 1.0
+    assert monitor.backlog_alerts == 2
+
+
+def test_a_failing_alert_callback_does_not_break_capture(clock):
+    def broken(alert):
+        raise RuntimeError("callback failed")
+
+    monitor = CaptureMonitor(RATE, backlog_alert_seconds=0.1, on_alert=broken)
+    monitor.before_read(RATE)
+    assert monitor.backlog_alerts == 1
+
+
+def test_reset_forgets_the_time_of_the_previous_read(clock):
+    monitor = CaptureMonitor(RATE)
+    run_reads(monitor, clock, [BLOCK / RATE] * 5)
+    monitor.reset()
+    run_reads(monitor, clock, [10.0])  # Audio discarded on purpose while nobody was reading
+    run_reads(monitor, clock, [BLOCK / RATE] * 5)
+    assert monitor.overruns == 0
+
+
+def test_real_time_factor_waits_for_a_full_window_and_alerts_with_hysteresis():
+    alerts = []
+    monitor = RealTimeFactorMonitor('loop', frame_seconds=0.01, window_frames=10, alert_threshold=0.8,
+                                    on_alert=alerts.append)
+    for _ in range(9):
+        monitor.record(0.009)
+    assert alerts == [] and monitor.stats()['max_real_time_factor'] == 0.0
+    monitor.record(0.009)
+    assert len(alerts) == 1 and alerts[0].kind == 'real_time_factor'
+    assert alerts[0].value == pytest.approx(0.9)
+    for _ in range(10):
+        monitor.record(0.0078)  # Below the threshold but above 90 % of it: still alerting
+    for _ in range(10):
+        monitor.record(0.009)
+    assert len(alerts) == 1
+    for _ in range(10):
+        monitor.record(0.001)
+    for _ in range(10):
+        monitor.record(0.009)
+    assert len(alerts) == 2
+    assert monitor.stats()['alerts'] == 2
+
+
+def test_real_time_factor_reset_and_invalid_window():
+    monitor = RealTimeFactorMonitor('loop', frame_seconds=0.01, window_frames=4)
+    monitor.record(0.005)
+    assert monitor.real_time_factor == pytest.approx(0.5)
+    monitor.reset()
+    assert monitor.real_time_factor == 0.0
+    with pytest.raises(ValueError):
+        RealTimeFactorMonitor('loop', frame_seconds=0.01, window_frames=0)
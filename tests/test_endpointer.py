@@ -0,0 +1,80 @@
+import pytest
+
+from VoiceProcessingToolkit.voice_detection.Endpointer import AdaptiveEndpointer
+
+FRAME_SECONDS = 512 / 16000
+
+
+def feed(endpointer, probabilities, threshold=0.8):
+    for probability in probabilities:
+        endpointer.update(probability, probability > threshold)
+
+
+def seconds(value):
+    return int(round(value / FRAME_SECONDS))
+
+
+def test_defaults_derive_the_timeouts_from_the_base():
+    endpointer = AdaptiveEndpointer(2.0)
+    assert endpointer.min_timeout == 0.5 and endpointer.max_timeout == 3.0
+
+
+@pytest.mark.parametrize('timeouts', [(0.0, 1.0), (2.0, 1.0), (-1.0, 1.0)])
+def test_invalid_timeouts_are_rejected(timeouts):
+    with pytest.raises(ValueError):
+        AdaptiveEndpointer(1.0, min_timeout=timeouts[0], max_timeout=timeouts[1])
+
+
+def test_base_timeout_without_adaptation_or_speech():
+    endpointer = AdaptiveEndpointer(2.0)
+    feed(endpointer, [0.99] * seconds(2.0) + [0.0] * 5)
+    assert endpointer.timeout() == 2.0
+    adaptive = AdaptiveEndpointer(2.0, adaptive=True)
+    feed(adaptive, [0.1] * 20)
+    assert not adaptive.has_speech
+    assert adaptive.timeout() == 2.0
+
+
+def test_long_speech_with_a_sharp_drop_ends_quickly():
+    endpointer = AdaptiveEndpointer(2.0, adaptive=True)
+    feed(endpointer, [0.99] * seconds(1.5) + [0.05])
+    assert endpointer.timeout() == endpointer.min_timeout
+
+
+def test_short_bursts_wait_longer():
+    endpointer = AdaptiveEndpointer(2.0, adaptive=True)
+    feed(endpointer, [0.99] * seconds(0.1) + [0.05])
+    assert endpointer.timeout() == endpointer.max_timeout
+
+
+def test_probabilities_just_below_the_threshold_count_as_hesitation():
+    endpointer = AdaptiveEndpointer(2.0, adaptive=True)
+    feed(endpointer, [0.99] * seconds(1.5) + [0.05] + [0.6] * 4)
+    assert endpointer.timeout() == endpointer.max_timeout
+
+
+def test_gradual_fade_keeps_the_base_timeout():
+    endpointer = AdaptiveEndpointer(2.0, adaptive=True)
+    feed(endpointer, [0.99] * seconds(0.5) + [0.7])
+    assert endpointer.timeout() == 2.0
+
+
+def test_reset_clears_the_recording_state_but_keeps_the_statistics():
+    endpointer = AdaptiveEndpointer(2.0, adaptive=True)
+    feed(endpointer, [0.99] * seconds(1.5) + [0.05])
+    endpointer.record_endpoint(0.5)
+    endpointer.reset()
+    assert not endpointer.has_speech
+    assert endpointer.timeout() == 2.0
+    assert endpointer.stats()['count'] == 1
+
+
+def test_stats_report_endpoint_latency_percentiles():
+    endpointer = AdaptiveEndpointer(2.0, max_recorded_endpoints=10)
+    assert endpointer.stats() == {'count': 0, 'mean': None, 'p50': None, 'p90': None, 'max': None}
+    for latency in range(1, 21):
+        endpointer.record_endpoint(latency / 10)
+    stats = endpointer.stats()
+    assert stats['count'] == 10
+    assert stats['max'] == 2.0 and stats['p50'] == 1.5 and stats['p90'] == 1.9
+    assert stats['mean'] == pytest.approx(1.55)
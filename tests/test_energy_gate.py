@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from VoiceProcessingToolkit.simulation.FakeEngines import FakeCobra, FakePorcupine
+from VoiceProcessingToolkit.simulation.SimulatedAudio import split_frames, synthetic_speech
+from VoiceProcessingToolkit.voice_detection.EnergyGate import EnergyGate, GatedEngine, last_result
+
+VOICE_THRESHOLD = 0.8
+
+
+def frames_of(audio):
+    return [np.frombuffer(frame, dtype=np.int16) for frame in split_frames(audio)]
+
+
+def speech_corpus():
+    return [synthetic_speech(silence_before=before, speech=speech, silence_after=after, seed=seed)
+            for seed, (before, speech, after) in enumerate([(0.5, 2.0, 1.5), (1.0, 0.5, 1.0), (0.2, 3.0, 0.2),
+                                                            (2.0, 1.0, 3.0)])]
+
+
+@pytest.mark.parametrize('audio', speech_corpus())
+def test_gated_and_ungated_voice_decisions_match(audio):
+    ungated = FakeCobra()
+    gated = GatedEngine(FakeCobra(), EnergyGate(), silent_result=0.0, combine=last_result)
+    frames = frames_of(audio)
+    expected = [ungated.process(frame) > VOICE_THRESHOLD for frame in frames]
+    actual = [gated.process(frame) > VOICE_THRESHOLD for frame in frames]
+    assert actual == expected
+    assert any(expected)
+    assert gated.gate.frames == len(frames)
+
+
+def test_gate_skips_silence_and_counts_every_frame_once():
+    gate = EnergyGate()
+    silence = np.random.default_rng(0).normal(0, 20, 512 * 50).astype(np.int16)
+    admitted = [gate.admit(frame) for frame in frames_of(silence)]
+    assert all(frames == [] for frames in admitted)
+    assert gate.frames == 50
+    assert gate.stats()['engine_calls_skipped'] == 50
+
+
+def test_onset_replays_lookback_frames_then_hangover_keeps_gate_open():
+    gate = EnergyGate(lookback_frames=3, hangover_frames=2)
+    quiet = np.full(512, 40, dtype=np.int16)
+    loud = (np.sin(np.arange(512) / 5) * 8000).astype(np.int16)
+    for _ in range(5):
+        gate.admit(quiet)
+    admitted = gate.admit(loud)
+    assert len(admitted) == 4 and admitted[-1] is loud
+    assert len(gate.admit(quiet)) == 1
+    assert len(gate.admit(quiet)) == 1
+    assert gate.admit(quiet) == []
+
+
+def test_gated_wake_word_engine_returns_silent_result_for_skipped_frames():
+    engine = GatedEngine(FakePorcupine(detect_every=1), EnergyGate(), silent_result=-1)
+    assert engine.process(np.zeros(512, dtype=np.int16)) == -1
+    assert engine.gate.engine_calls == 0
+
+
+@pytest.mark.parametrize('energy_gate', [False, True])
+def test_recorder_runs_voice_activity_detection_once_per_frame(tmp_path, energy_gate):
+    pytest.importorskip('dotenv')
+    pytest.importorskip('pvcobra')
+    from VoiceProcessingToolkit.simulation.FakeEngines import patch_engines
+    from VoiceProcessingToolkit.simulation.SimulatedAudio import SimulatedAudioDataProvider
+    from VoiceProcessingToolkit.voice_detection.Voicerecorder import AudioRecorder
+
+    audio = synthetic_speech(silence_before=0.5, speech=2.0, silence_after=3.0)
+    with patch_engines() as engines:
+        recorder = AudioRecorder(output_directory=str(tmp_path), min_recording_length=1, energy_gate=energy_gate)
+        provider = SimulatedAudioDataProvider(audio)
+        path = recorder.perform_recording(provider)
+        cobra = engines['cobra'][0]
+    # Frames before and after the onset of speech took the waiting and the recording branch of the record loop
+    assert path is not None and recorder.speech_start_time is not None
+    assert recorder.vad_stats()['frames'] == provider.frames_read
+    if energy_gate:
+        gate = recorder._vad_engine.gate
+        assert gate.frames == provider.frames_read
+        assert gate.engine_calls == cobra.calls < provider.frames_read
+    else:
+        assert cobra.calls == provider.frames_read
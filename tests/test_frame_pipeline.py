@@ -0,0 +1,156 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from VoiceProcessingToolkit.pipeline.FramePipeline import FramePipeline, FunctionStage
+from VoiceProcessingToolkit.pipeline.FrameStages import GainStage
+
+FRAME_LENGTH = 512
+
+
+def numbered_frames(count):
+    return [np.full(FRAME_LENGTH, index, dtype=np.int16).tobytes() for index in range(count)]
+
+
+def list_source(frames):
+    frames = list(frames)
+    return lambda: frames.pop(0) if frames else None
+
+
+def read_all(pipeline, delay=0.0):
+    frames = []
+    while True:
+        frame = pipeline.read(timeout=5)
+        if frame is None:
+            return frames
+        frames.append(np.frombuffer(frame, dtype=np.int16)[0])
+        time.sleep(delay)
+
+
+def test_frames_pass_through_inline_and_threaded_stages_in_order():
+    stages = [GainStage(0.0), FunctionStage(lambda frame: frame + 1, threaded=True)]
+    pipeline = FramePipeline(list_source(numbered_frames(50)), stages)
+    pipeline.start()
+    try:
+        assert read_all(pipeline) == list(range(1, 51))
+    finally:
+        pipeline.stop()
+
+
+def test_read_frames_are_numbered_by_their_source_frame():
+    stages = [FunctionStage(lambda frame: None if frame[0] % 2 else frame, threaded=True)]
+    pipeline = FramePipeline(list_source(numbered_frames(6)), stages)
+    pipeline.start()
+    try:
+        numbers = []
+        while pipeline.read(timeout=5) is not None:
+            numbers.append(pipeline.last_source_frame)
+        assert numbers == [1, 3, 5]  # Frames dropped by a stage still count
+    finally:
+        pipeline.stop()
+
+
+def test_slow_consumer_gets_every_frame_through_backpressure():
+    pipeline = FramePipeline(list_source(numbered_frames(40)), [FunctionStage(lambda frame: frame, threaded=True,
+                                                                              queue_size=2)],
+                             output_queue_size=2)
+    pipeline.start()
+    try:
+        assert read_all(pipeline, delay=0.002) == list(range(40))
+    finally:
+        pipeline.stop()
+    stats = pipeline.stats()
+    assert all(stage['dropped'] == 0 for stage in stats['stages'])
+    assert stats['output']['dropped'] == 0
+
+
+def test_drop_oldest_stage_drops_frames_instead_of_blocking_capture():
+    release = threading.Event()
+
+    def slow(frame):
+        release.wait(5)
+        return frame
+
+    pipeline = FramePipeline(list_source(numbered_frames(20)),
+                             [FunctionStage(slow, threaded=True, queue_size=2, drop_oldest=True)],
+                             output_queue_size=32)
+    pipeline.start()
+    try:
+        deadline = time.monotonic() + 5
+        while pipeline.stats()['capture']['frames'] < 20 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        frames = read_all(pipeline)
+    finally:
+        pipeline.stop()
+    dropped = pipeline.stats()['stages'][0]['dropped']
+    assert dropped > 0
+    assert len(frames) == 20 - dropped
+    assert frames[-1] == 19
+
+
+def test_stop_releases_a_thread_blocked_on_a_full_output_queue():
+    pipeline = FramePipeline(lambda: np.zeros(FRAME_LENGTH, dtype=np.int16).tobytes(), [], output_queue_size=1)
+    pipeline.start()
+    time.sleep(0.05)
+    started = time.monotonic()
+    pipeline.stop(timeout=2)
+    assert time.monotonic() - started < 2
+    assert not pipeline.is_running
+
+
+def test_source_error_is_raised_from_read():
+    def failing_source():
+        raise OSError("device lost")
+
+    pipeline = FramePipeline(failing_source, [])
+    pipeline.start()
+    try:
+        with pytest.raises(RuntimeError):
+            pipeline.read(timeout=5)
+    finally:
+        pipeline.stop()
+
+
+class FakeStream:
+    def __init__(self, frames):
+        self._frames = list(frames)
+
+    def reopen(self):
+        pass
+
+    def read(self):
+        return self._frames.pop(0) if self._frames else None
+
+
+def test_processed_carry_over_bypasses_the_recorder_stages(tmp_path):
+    pytest.importorskip('dotenv')
+    pytest.importorskip('pvcobra')
+    from VoiceProcessingToolkit.simulation.FakeEngines import patch_engines
+    from VoiceProcessingToolkit.voice_detection.Voicerecorder import AudioRecorder, SharedStreamDataProvider
+
+    seen = []
+    stage = FunctionStage(lambda frame: seen.append(int(frame[0])) or frame)
+    carry_over = b''.join(numbered_frames(3))
+    stream_frames = [np.full(FRAME_LENGTH, 100 + index, dtype=np.int16).tobytes() for index in range(5)]
+    with patch_engines():
+        recorder = AudioRecorder(output_directory=str(tmp_path), min_recording_length=0, frame_stages=[stage])
+        provider = SharedStreamDataProvider(FakeStream(stream_frames), carry_over=carry_over,
+                                            frame_length=FRAME_LENGTH, carry_over_processed=True)
+        recorder.perform_recording(provider)
+    assert seen == [100 + index for index in range(5)]
+
+
+def test_detector_runs_carry_over_through_its_stages():
+    pytest.importorskip('dotenv')
+    from VoiceProcessingToolkit.wake_word_detector.WakeWordDetector import WakeWordDetector
+
+    detector = WakeWordDetector.__new__(WakeWordDetector)
+    detector._frame_stages = [FunctionStage(lambda frame: frame * 2),
+                              FunctionStage(lambda frame: None if frame[0] == 4 else frame)]
+    audio = b''.join(numbered_frames(4)) + b'\x00' * 10  # The partial frame at the end is not used
+    processed = detector._process_carry_over(audio)
+    values = np.frombuffer(processed, dtype=np.int16).reshape(-1, FRAME_LENGTH)[:, 0]
+    assert list(values) == [0, 2, 6]
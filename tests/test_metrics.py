@@ -0,0 +1,106 @@
+import urllib.request
+
+import pytest
+
+from VoiceProcessingToolkit.monitoring.Metrics import MetricsRegistry, start_metrics_server
+
+
+def test_metrics_are_created_once_per_name_and_labels():
+    registry = MetricsRegistry()
+    counter = registry.counter('requests_total', 'Requests.', {'api': 'whisper'})
+    assert registry.counter('requests_total', labels={'api': 'whisper'}) is counter
+    assert registry.counter('requests_total', labels={'api': 'tts'}) is not counter
+
+
+def test_a_name_cannot_change_its_kind():
+    registry = MetricsRegistry()
+    registry.counter('frames_total')
+    with pytest.raises(ValueError):
+        registry.gauge('frames_total')
+    with pytest.raises(ValueError):
+        registry.summary('frames_total', labels={'stage': 'vad'})
+
+
+def test_snapshot_has_every_sample():
+    registry = MetricsRegistry()
+    registry.counter('frames_total').inc(3)
+    gauge = registry.gauge('queue_length', labels={'pool': 'a'})
+    gauge.set(5)
+    gauge.dec(2)
+    latency = registry.summary('latency_seconds', labels={'api': 'whisper'})
+    latency.observe(0.25)
+    latency.observe(0.75)
+    assert registry.snapshot() == {
+        'frames_total': 3,
+        'latency_seconds_count{api="whisper"}': 2,
+        'latency_seconds_sum{api="whisper"}': 1.0,
+        'queue_length{pool="a"}': 3,
+    }
+
+
+def test_prometheus_text_describes_each_metric_once_and_escapes_labels():
+    registry = MetricsRegistry()
+    registry.counter('errors_total', 'API errors.', {'api': 'a'}).inc()
+    registry.counter('errors_total', 'Ignored help.', {'api': 'say "hi"\n'}).inc(2)
+    text = registry.prometheus_text()
+    assert text.count('# HELP errors_total API errors.') == 1
+    assert text.count('# TYPE errors_total counter') == 1
+    assert 'errors_total{api="a"} 1' in text
+    assert 'errors_total{api="say \\"hi\\"\\n"} 2' in text
+    assert text.endswith('\n')
+
+
+def test_collectors_run_before_every_snapshot_and_failures_are_contained():
+    registry = MetricsRegistry()
+    calls = []
+
+    def collect(target):
+        calls.append(target)
+        target.gauge('collected').set(len(calls))
+
+    def broken(target):
+        raise RuntimeError("collector failed")
+
+    registry.add_collector(broken)
+    registry.add_collector(collect)
+    assert registry.snapshot()['collected'] == 1
+    assert registry.snapshot()['collected'] == 2
+    assert calls == [registry, registry]
+
+
+def test_metrics_server_serves_the_registry():
+    registry = MetricsRegistry()
+    registry.counter('served_total', 'Served.').inc(7)
+    server = start_metrics_server(port=0, registry=registry)
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{server.port}/metrics', timeout=5) as response:
+            body = response.read().decode('utf-8')
+        assert 'served_total 7' in body
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f'http://127.0.0.1:{server.port}/other', timeout=5)
+    finally:
+        server.stop()
+
+
+def test_concurrent_updates_are_all_counted():
+    import threading
+
+    registry = MetricsRegistry()
+    counter = registry.counter('calls_total')
+    gauge = registry.gauge('in_flight')
+    latency = registry.summary('latency_seconds')
+
+    def work():
+        for _ in range(20000):
+            counter.inc()
+            gauge.inc()
+            gauge.dec()
+            latency.observe(1.0)
+
+    workers = [threading.Thread(target=work) for _ in range(8)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert registry.snapshot() == {'calls_total': 160000, 'in_flight': 0, 'latency_seconds_count': 160000,
+                                   'latency_seconds_sum': 160000.0}
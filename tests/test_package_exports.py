@@ -0,0 +1,35 @@
+import pkgutil
+import subprocess
+import sys
+
+import pytest
+
+import VoiceProcessingToolkit
+
+
+def test_importing_the_package_does_not_load_the_backends():
+    code = ("import sys, VoiceProcessingToolkit; "
+            "print(' '.join(name for name in ('pyaudio', 'openai', 'elevenlabs', 'numpy') if name in sys.modules))")
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    assert result.stdout.split() == []
+
+
+@pytest.mark.parametrize('name', VoiceProcessingToolkit.__all__)
+def test_every_exported_name_resolves(name):
+    try:
+        value = getattr(VoiceProcessingToolkit, name)
+    except ModuleNotFoundError as e:
+        pytest.skip(f"{e.name} is not installed")
+    assert value is getattr(sys.modules[VoiceProcessingToolkit._EXPORTS[name]], name)
+    assert name in dir(VoiceProcessingToolkit)
+
+
+def test_no_export_shares_its_name_with_a_submodule():
+    # Importing the submodule would replace the exported attribute
+    submodules = {module.name for module in pkgutil.iter_modules(VoiceProcessingToolkit.__path__)}
+    assert not submodules & set(VoiceProcessingToolkit.__all__)
+
+
+def test_unknown_names_raise_attribute_error():
+    with pytest.raises(AttributeError):
+        VoiceProcessingToolkit.NotAnExport
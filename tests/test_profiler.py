@@ -0,0 +1,69 @@
+import os
+import threading
+import time
+
+import pytest
+
+from VoiceProcessingToolkit.monitoring.Profiler import SamplingProfiler, profile_settings_from_env
+
+
+def spin(stop):
+    while not stop.is_set():
+        sum(range(100))
+
+
+def test_profile_files_hold_the_stacks_of_the_voice_loop_threads(tmp_path):
+    stop = threading.Event()
+    threads = [threading.Thread(target=spin, args=(stop,), name=name) for name in ('voice-loop-1', 'unrelated')]
+    for thread in threads:
+        thread.start()
+    profiler = SamplingProfiler(str(tmp_path), duration=None, interval=0.005, thread_prefixes=('voice-loop',),
+                                name='test')
+    try:
+        profiler.start()
+        with pytest.raises(RuntimeError):
+            profiler.start()
+        time.sleep(0.2)
+        paths = profiler.stop(timeout=5)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    assert set(paths) == {'folded', 'summary'}
+    assert os.path.basename(paths['folded']).startswith('test-')
+    with open(paths['folded']) as f:
+        lines = f.read().splitlines()
+    assert lines
+    for line in lines:
+        stack, count = line.rsplit(' ', 1)
+        frames = stack.split(';')
+        assert frames[0] == 'voice-loop-1'  # Other threads are not sampled
+        assert int(count) > 0
+    assert any(frame.startswith('spin (test_profiler.py:') for line in lines for frame in line.split(';'))
+    with open(paths['summary']) as f:
+        summary = f.read()
+    assert 'Threads: voice-loop-1\n' in summary
+    assert 'spin (test_profiler.py:' in summary
+    stats = profiler.stats()
+    assert not stats['running'] and stats['ticks'] > 0 and stats['threads'] == ['voice-loop-1']
+
+
+def test_profiler_stops_at_the_end_of_its_window(tmp_path):
+    profiler = SamplingProfiler(str(tmp_path), duration=0.05, interval=0.01)
+    profiler.start()
+    deadline = time.monotonic() + 5
+    while profiler.is_running and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not profiler.is_running
+    assert os.path.isfile(profiler.last_output['folded']) and os.path.isfile(profiler.last_output['summary'])
+
+
+def test_profile_settings_are_read_from_the_environment(monkeypatch):
+    monkeypatch.setenv('VOICE_PROCESSING_PROFILE', '30')
+    monkeypatch.setenv('VOICE_PROCESSING_PROFILE_DIR', '/tmp/profiles')
+    assert profile_settings_from_env() == (30.0, '/tmp/profiles')
+    for value in ('', '0', 'soon'):
+        monkeypatch.setenv('VOICE_PROCESSING_PROFILE', value)
+        assert profile_settings_from_env()[0] is None
+    with pytest.raises(ValueError):
+        SamplingProfiler(interval=0)
@@ -0,0 +1,105 @@
+import os
+import wave
+
+import numpy as np
+import pytest
+
+from VoiceProcessingToolkit.storage.SegmentArchive import SegmentArchive
+
+
+def utterance(count, seed=0):
+    return np.random.default_rng(seed).integers(-2000, 2000, count, dtype=np.int16).tobytes()
+
+
+def test_audio_and_index_entries_round_trip(tmp_path):
+    with SegmentArchive(str(tmp_path), compress=False) as archive:
+        audio = utterance(16000)
+        utterance_id = archive.add(audio, kind='command', created=1000.0, wake_word='jarvis',
+                                   vad_stats={'frames': 31, 'voiced_frames': 20}, metadata={'room': 'kitchen'})
+        assert archive.read_audio(utterance_id) == audio
+        entry = archive.get(utterance_id)
+        assert entry['kind'] == 'command' and entry['wake_word'] == 'jarvis'
+        assert entry['duration'] == 1.0 and entry['created'] == 1000.0
+        assert entry['vad_frames'] == 31 and entry['voiced_frames'] == 20
+        assert entry['metadata'] == {'room': 'kitchen'}
+        assert archive.get(utterance_id + 1) is None
+        with pytest.raises(KeyError):
+            archive.read_audio(utterance_id + 1)
+
+
+def test_find_filters_by_kind_time_and_transcript(tmp_path):
+    with SegmentArchive(str(tmp_path), compress=False) as archive:
+        first = archive.add(utterance(160), kind='command', created=10.0)
+        second = archive.add(utterance(160), kind='wake_word', created=20.0)
+        third = archive.add(utterance(160), kind='command', created=30.0)
+        archive.set_transcript(first, "Turn on the lights")
+        archive.set_transcript(third, "100% volume_up")
+        assert [entry['id'] for entry in archive.find()] == [third, second, first]
+        assert [entry['id'] for entry in archive.find(kind='command')] == [third, first]
+        assert [entry['id'] for entry in archive.find(since=20.0, until=30.0)] == [second]
+        assert [entry['id'] for entry in archive.find(text='LIGHTS')] == [first]
+        assert [entry['id'] for entry in archive.find(text='0% volume_')] == [third]
+        assert [entry['id'] for entry in archive.find(text='_')] == [third]  # Wildcards are matched literally
+        assert len(archive.find(limit=1)) == 1
+
+
+def test_segments_are_sealed_and_compressed_without_changing_the_audio(tmp_path):
+    audios = [utterance(1000, seed) for seed in range(10)]
+    with SegmentArchive(str(tmp_path), segment_bytes=4000) as archive:
+        ids = [archive.add(audio) for audio in audios]
+        archive.compact().result(10)
+        assert [archive.read_audio(utterance_id) for utterance_id in ids] == audios
+        stats = archive.stats()
+        assert stats['utterances'] == 10
+        assert stats['compression_ratio'] < 1.0
+    with SegmentArchive(str(tmp_path), segment_bytes=4000) as archive:
+        assert [archive.read_audio(utterance_id) for utterance_id in ids] == audios
+
+
+def test_compaction_reclaims_deleted_utterances(tmp_path):
+    with SegmentArchive(str(tmp_path), segment_bytes=10 ** 6, compress=False, garbage_ratio=0.5) as archive:
+        ids = [archive.add(utterance(1000, seed)) for seed in range(4)]
+        for utterance_id in ids[:3]:
+            archive.delete(utterance_id)
+        archive.compact().result(10)
+        assert archive.stats()['stored_bytes'] == 2000
+        assert archive.read_audio(ids[3]) == utterance(1000, 3)
+        assert archive.find() == [archive.get(ids[3])]
+
+
+def test_unindexed_bytes_are_truncated_on_reopen(tmp_path):
+    with SegmentArchive(str(tmp_path), compress=False) as archive:
+        utterance_id = archive.add(utterance(100))
+    segment_directory = os.path.join(str(tmp_path), SegmentArchive.SEGMENT_DIRECTORY)
+    path = os.path.join(segment_directory, os.listdir(segment_directory)[0])
+    with open(path, 'ab') as segment:
+        segment.write(b'\x01' * 50)  # Written before a crash, never indexed
+    with SegmentArchive(str(tmp_path), compress=False) as archive:
+        assert os.path.getsize(path) == 200
+        second = archive.add(utterance(100, 1))
+        assert second == utterance_id + 1
+        assert archive.read_audio(second) == utterance(100, 1)
+
+
+def test_export_wav_writes_the_utterance(tmp_path):
+    with SegmentArchive(str(tmp_path / 'archive')) as archive:
+        audio = utterance(800)
+        utterance_id = archive.add(audio, sample_rate=8000)
+        path = archive.export_wav(utterance_id, str(tmp_path / 'export' / 'utterance.wav'))
+    with wave.open(path, 'rb') as wave_file:
+        assert wave_file.getframerate() == 8000 and wave_file.getnchannels() == 1
+        assert wave_file.readframes(wave_file.getnframes()) == audio
+
+
+def test_closed_archive_rejects_writes_and_invalid_settings(tmp_path):
+    archive = SegmentArchive(str(tmp_path))
+    archive.close()
+    archive.close()
+    with pytest.raises(RuntimeError):
+        archive.add(utterance(10))
+    with pytest.raises(RuntimeError):
+        archive.delete(1)
+    with pytest.raises(ValueError):
+        SegmentArchive(str(tmp_path / 'a'), segment_bytes=0)
+    with pytest.raises(ValueError):
+        SegmentArchive(str(tmp_path / 'b'), compression_level=10)
@@ -0,0 +1,125 @@
+import json
+import threading
+import wave
+
+import numpy as np
+import pytest
+
+from VoiceProcessingToolkit.simulation.SimulatedAudio import SimulatedAudioStream
+from VoiceProcessingToolkit.wake_word_detector.SnippetWriter import WakeWordSnippetWriter
+
+RATE = 16000
+FRAME = 512
+
+
+def ramp_stream(real_time=False):
+    """A stream of unique samples, so a snippet shows exactly which part of the audio it holds."""
+    audio = np.arange(60 * FRAME, dtype=np.int16)
+    return SimulatedAudioStream(audio, real_time=real_time, buffer_seconds=2.0), audio
+
+
+def read_frames(stream, count):
+    for _ in range(count):
+        stream.read()
+
+
+def manifest_entries(directory):
+    with open(directory / WakeWordSnippetWriter.MANIFEST_NAME, encoding='utf-8') as manifest:
+        return [json.loads(line) for line in manifest]
+
+
+def read_wav(path):
+    with wave.open(str(path), 'rb') as wave_file:
+        return np.frombuffer(wave_file.readframes(wave_file.getnframes()), dtype=np.int16)
+
+
+def test_snippets_submitted_together_get_unique_files(tmp_path):
+    stream, _ = ramp_stream()
+    read_frames(stream, 40)
+    writer = WakeWordSnippetWriter(stream, str(tmp_path), pre_seconds=0.1, post_seconds=0.1)
+    for _ in range(30):
+        assert writer.submit(stream.position - FRAME * 10)
+    writer.stop()
+    entries = manifest_entries(tmp_path)
+    assert writer.written == 30 and len(entries) == 30
+    assert len({entry['file'] for entry in entries}) == 30
+    assert all((tmp_path / entry['file']).is_file() for entry in entries)
+
+
+def test_manifest_entries_are_appended_in_batches(tmp_path):
+    stream, _ = ramp_stream()
+    read_frames(stream, 40)
+    writer = WakeWordSnippetWriter(stream, str(tmp_path), pre_seconds=0.1, post_seconds=0.1,
+                                   manifest_batch_size=20)
+    release = threading.Event()
+    write_snippet, flush_manifest = writer._write_snippet, writer._flush_manifest
+    batches = []
+
+    def blocked_write(*args):
+        release.wait(5)  # Queue every detection before the first is written
+        write_snippet(*args)
+
+    def counted_flush():
+        if writer._manifest_entries:
+            batches.append(len(writer._manifest_entries))
+        flush_manifest()
+
+    writer._write_snippet, writer._flush_manifest = blocked_write, counted_flush
+    for _ in range(45):
+        writer.submit(stream.position - FRAME * 10)
+    release.set()
+    writer.stop()
+    assert batches == [20, 20, 5]
+    assert len(manifest_entries(tmp_path)) == 45
+
+
+def test_a_full_queue_drops_snippets(tmp_path):
+    stream, _ = ramp_stream()
+    read_frames(stream, 40)
+    writer = WakeWordSnippetWriter(stream, str(tmp_path), pre_seconds=0.1, post_seconds=0.1, max_queue_size=2)
+    release = threading.Event()
+    write_snippet = writer._write_snippet
+    writer._write_snippet = lambda *args: release.wait(5) and write_snippet(*args)
+    position = stream.position - FRAME * 10
+    assert writer.submit(position) and writer.submit(position)
+    assert not writer.submit(position)
+    assert writer.dropped == 1
+    assert writer.capture_end == position + RATE // 10
+    release.set()
+    writer.stop()
+    assert writer.written == 2
+
+
+def test_writer_waits_for_the_post_detection_window(tmp_path):
+    stream, audio = ramp_stream(real_time=True)
+    read_frames(stream, 20)
+    position = stream.position
+    writer = WakeWordSnippetWriter(stream, str(tmp_path), pre_seconds=0.25, post_seconds=0.25)
+    writer.submit(position)
+    reader = threading.Thread(target=read_frames, args=(stream, 12))  # Captures the post window in real time
+    reader.start()
+    reader.join()
+    writer.stop()
+    entry, = manifest_entries(tmp_path)
+    snippet = read_wav(tmp_path / entry['file'])
+    assert np.array_equal(snippet, audio[position - RATE // 4:position + RATE // 4])
+    assert entry['detection_offset'] == 0.25
+
+
+def test_detector_cleanup_captures_the_post_window_before_closing_the_stream(tmp_path):
+    pytest.importorskip('dotenv')
+    pytest.importorskip('pvporcupine')
+    from VoiceProcessingToolkit.simulation.FakeEngines import patch_engines
+    from VoiceProcessingToolkit.wake_word_detector.ActionManager import ActionManager
+    from VoiceProcessingToolkit.wake_word_detector.WakeWordDetector import WakeWordDetector
+
+    stream, audio = ramp_stream()
+    with patch_engines(detect_every=5):
+        detector = WakeWordDetector(access_key='test', wake_word='jarvis', sensitivity=0.5,
+                                    action_manager=ActionManager(), audio_stream_manager=stream,
+                                    play_notification_sound=False, save_audio_directory=str(tmp_path))
+        detector.run_blocking(cleanup=True)  # As run(transcription=False) does
+    entry, = manifest_entries(tmp_path)
+    snippet = read_wav(tmp_path / entry['file'])
+    position = 5 * FRAME
+    assert np.array_equal(snippet, audio[:position + int(1.5 * RATE)])
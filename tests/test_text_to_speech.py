@@ -0,0 +1,53 @@
+import pytest
+
+pytest.importorskip('dotenv')
+
+from VoiceProcessingToolkit import VoiceProcessingManager as manager_module  # noqa: E402
+from VoiceProcessingToolkit.text_to_speech.elevenlabs_tts import ElevenLabsConfig  # noqa: E402
+
+
+class FakeClient:
+    created = []
+
+    def __init__(self, config=None, voice_id=None):
+        self.config = config
+        self.streamed = []
+        self.synthesized = []
+        FakeClient.created.append(self)
+
+    def stream_speech(self, text, voice_id=None):
+        self.streamed.append((text, voice_id))
+        yield b'audio'
+
+    def synthesize_speech(self, text, trace=None):
+        self.synthesized.append(text)
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    FakeClient.created = []
+    monkeypatch.setattr(manager_module, 'ElevenLabsTextToSpeech', FakeClient)
+    monkeypatch.setenv('ELEVENLABS_API_KEY', 'test')
+    manager = manager_module.VoiceProcessingManager.__new__(manager_module.VoiceProcessingManager)
+    manager._tts_clients = {}
+    manager.tts_playback = False
+    manager.elevenlabs_base_url = None
+    return manager
+
+
+@pytest.mark.parametrize('streaming', [True, False])
+def test_every_turn_reuses_one_client(manager, streaming):
+    for text in ('first', 'second', 'third'):
+        manager._speak(text, streaming, api_key=None, voice_id='voice')
+    assert len(FakeClient.created) == 1
+    client = FakeClient.created[0]
+    if streaming:
+        assert client.streamed == [('first', 'voice'), ('second', 'voice'), ('third', 'voice')]
+    else:
+        assert client.synthesized == ['first', 'second', 'third']
+
+
+def test_stream_uses_the_session_of_the_given_client():
+    client = FakeClient(ElevenLabsConfig(api_key='test', playback_enabled=False))
+    manager_module.text_to_speech_stream('hello', client=client)
+    assert client.streamed == [('hello', None)]
@@ -0,0 +1,101 @@
+import threading
+
+from VoiceProcessingToolkit.monitoring.TurnTrace import TurnTrace, TurnTraceAggregator
+
+
+def finished_trace(turn, **marks):
+    trace = TurnTrace(turn, started=0.0)
+    for stage, when in marks.items():
+        trace.mark(stage, when)
+    return trace
+
+
+def test_durations_cover_the_spans_whose_boundaries_were_reached():
+    trace = finished_trace(1, listening=0.5, wake_word=2.0, recording_start=2.1, turn_end=5.0)
+    assert trace.durations() == {'startup': 0.5, 'wake_word': 1.5, 'handoff': 2.1 - 2.0, 'total': 5.0}
+    assert trace.finished
+    data = trace.to_dict()
+    assert data['turn'] == 1 and not data['abandoned']
+    assert list(data['marks']) == ['turn_start', 'listening', 'wake_word', 'recording_start', 'turn_end']
+
+
+def test_marks_reported_before_the_turn_started_are_ignored():
+    trace = TurnTrace(1, started=10.0)
+    trace.mark_since_start('speech_start', 9.0)
+    trace.mark_since_start('speech_end', None)
+    trace.mark_since_start('endpoint', 11.0)
+    assert set(trace.marks) == {'turn_start', 'endpoint'}
+
+
+def test_summary_reports_percentiles_per_span():
+    aggregator = TurnTraceAggregator()
+    for turn in range(1, 101):
+        aggregator.add(finished_trace(turn, turn_end=turn / 100))
+    total = aggregator.summary()['total']
+    assert aggregator.turns == 100
+    assert total['count'] == 100
+    assert total['p50'] == 0.5 and total['p90'] == 0.9 and total['p99'] == 0.99 and total['max'] == 1.0
+
+
+def test_max_turns_keeps_only_the_most_recent_turns():
+    aggregator = TurnTraceAggregator(max_turns=10)
+    for turn in range(1, 51):
+        aggregator.add(finished_trace(turn, turn_end=float(turn)))
+    total = aggregator.summary()['total']
+    assert total['count'] == 10
+    assert total['max'] == 50.0 and total['p50'] == 45.0
+
+
+def test_concurrent_turns_get_distinct_numbers():
+    aggregator = TurnTraceAggregator()
+    numbers = []
+    lock = threading.Lock()
+
+    def start_turns():
+        for _ in range(1000):
+            number = aggregator.next_turn()
+            with lock:
+                numbers.append(number)
+
+    workers = [threading.Thread(target=start_turns) for _ in range(8)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert sorted(numbers) == list(range(1, 8001))
+
+
+def test_concurrent_adds_are_all_counted():
+    aggregator = TurnTraceAggregator(max_turns=100000)
+
+    def add_turns():
+        for _ in range(2000):
+            aggregator.add(finished_trace(aggregator.next_turn(), turn_end=1.0))
+            aggregator.summary()
+
+    workers = [threading.Thread(target=add_turns) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert aggregator.turns == 8000
+    assert aggregator.summary()['total']['count'] == 8000
+
+
+def test_abandoned_turns_are_counted_but_left_out_of_the_spans():
+    aggregator = TurnTraceAggregator()
+    aggregator.add(finished_trace(1, turn_end=1.0))
+    trace = TurnTrace(2)
+    trace.abandon()
+    aggregator.add(trace)
+    assert trace.finished and trace.to_dict()['abandoned']
+    assert aggregator.turns == 1 and aggregator.abandoned == 1
+    assert aggregator.summary()['total']['count'] == 1
+
+
+def test_reset_clears_the_spans_and_restarts_numbering():
+    aggregator = TurnTraceAggregator()
+    aggregator.add(finished_trace(aggregator.next_turn(), turn_end=1.0))
+    aggregator.reset()
+    assert aggregator.turns == 0 and aggregator.summary() == {}
+    assert aggregator.next_turn() == 1
@@ -0,0 +1,160 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('dotenv')
+
+from VoiceProcessingToolkit.VoiceProcessingManager import VoiceProcessingManager  # noqa: E402
+
+
+def test_pipelined_counters_from_concurrent_workers_are_exact():
+    manager = VoiceProcessingManager.__new__(VoiceProcessingManager)
+    manager._pipelined_stats_lock = threading.Lock()
+    manager._pipelined_stats = {'utterances': 0, 'started': time.monotonic(), 'capture_seconds': 0.0,
+                                'captures': 0, 'transcription_seconds': 0.0, 'transcriptions': 0}
+
+    def work():
+        for _ in range(2000):
+            manager._count_pipelined(transcription_seconds=0.5, transcriptions=1)
+
+    workers = [threading.Thread(target=work) for _ in range(8)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    stats = manager.pipelined_stats()
+    assert manager._pipelined_stats['transcriptions'] == 16000
+    assert stats['mean_transcription_seconds'] == 0.5
+
+
+def test_turns_dropped_at_stop_are_abandoned(tmp_path):
+    import concurrent.futures
+    import queue
+
+    from VoiceProcessingToolkit.monitoring.TurnTrace import TurnTrace, TurnTraceAggregator
+
+    manager = VoiceProcessingManager.__new__(VoiceProcessingManager)
+    manager._trace_aggregator = TurnTraceAggregator()
+    pending = queue.Queue()
+    queued, transcribed = concurrent.futures.Future(), concurrent.futures.Future()
+    transcribed.set_result('hello')
+    for future in (queued, transcribed):
+        future.recording_path = str(tmp_path / 'recording.wav')
+        future.trace = TurnTrace(manager._trace_aggregator.next_turn())
+        pending.put(future)
+    manager._discard_pending_recordings(pending)
+    assert queued.cancelled()
+    assert queued.trace.abandoned and transcribed.trace.abandoned
+    assert manager.trace_summary()['abandoned'] == 2
+    assert manager.trace_summary()['turns'] == 0
+
+
+@pytest.mark.parametrize('use_wake_word', [False, True])
+def test_a_simulated_turn_fills_the_speech_spans(tmp_path, use_wake_word):
+    pytest.importorskip('pvcobra')
+    pytest.importorskip('pvporcupine')
+    from VoiceProcessingToolkit.simulation.FakeEngines import patch_engines
+    from VoiceProcessingToolkit.simulation.SimulatedAudio import SimulatedAudioStream, synthetic_speech
+    from VoiceProcessingToolkit.transcription.whisper import WhisperTranscriber
+    from VoiceProcessingToolkit.wake_word_detector.ActionManager import ActionManager
+
+    audio = synthetic_speech(silence_before=0.5, speech=1.5, silence_after=2.5)
+    with patch_engines(detect_every=5):
+        manager = VoiceProcessingManager(
+            transcriber=WhisperTranscriber(api_key='unused'), action_manager=ActionManager(),
+            audio_stream_manager=SimulatedAudioStream(audio), use_wake_word=use_wake_word,
+            play_notification_sound=False, output_directory=str(tmp_path), inactivity_limit=1.0,
+            min_recording_length=1.0, trace_turns=True, tts_playback=False)
+        try:
+            trace = manager._listen_and_record(keep_warm=True)
+        finally:
+            manager.close()
+    assert manager.voice_recorder.last_saved_file
+    durations = trace.durations()
+    for span in ('handoff' if use_wake_word else 'startup', 'speech_onset', 'speech', 'endpointing_tail',
+                 'wav_write'):
+        assert span in durations and durations[span] >= 0
+    marks = trace.marks
+    assert marks['recording_start'] <= marks['speech_start'] <= marks['speech_end'] <= marks['endpoint']
+
+
+def test_closing_one_manager_leaves_the_others_running(tmp_path, monkeypatch):
+    pytest.importorskip('pvcobra')
+    from VoiceProcessingToolkit.shared_resources import shutdown_flag
+    from VoiceProcessingToolkit.simulation.FakeEngines import patch_engines
+    from VoiceProcessingToolkit.simulation.SimulatedAudio import SimulatedAudioStream, synthetic_speech
+    from VoiceProcessingToolkit.wake_word_detector.ActionManager import ActionManager
+
+    class Transcriber:
+        def transcribe_audio(self, path):
+            return 'hello'
+
+    process_shutdowns = []
+    monkeypatch.setattr(shutdown_flag, 'set', lambda: process_shutdowns.append(True))
+    audio = synthetic_speech(silence_before=0.5, speech=1.5, silence_after=2.5)
+    with patch_engines():
+        managers = [VoiceProcessingManager(
+            transcriber=Transcriber(), action_manager=ActionManager(), audio_stream_manager=SimulatedAudioStream(audio),
+            use_wake_word=False, output_directory=str(tmp_path / str(index)), inactivity_limit=1.0,
+            min_recording_length=1.0, tts_playback=False) for index in range(2)]
+        managers[0].close()
+        assert not process_shutdowns  # Other sessions of the process would see the flag
+        conversation = managers[1].listen_forever()
+        assert [next(conversation) for _ in range(2)] == ['hello', 'hello']
+        conversation.close()
+    assert managers[1]._stopping()
+
+
+def test_close_stops_the_metrics_server(tmp_path):
+    pytest.importorskip('pvcobra')
+    import socket
+
+    from VoiceProcessingToolkit.simulation.SimulatedAudio import SimulatedAudioStream
+    from VoiceProcessingToolkit.wake_word_detector.ActionManager import ActionManager
+
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    for _ in range(2):  # The second manager binds the port the first one released
+        manager = VoiceProcessingManager(
+            transcriber=None, action_manager=ActionManager(), audio_stream_manager=SimulatedAudioStream(),
+            use_wake_word=False, output_directory=str(tmp_path), metrics_port=port, tts_playback=False)
+        assert manager.metrics_server.port == port
+        manager.close()
+        assert manager.metrics_server is None
+
+
+@pytest.mark.parametrize('eager_init, created', [
+    (False, set()),
+    (True, {'porcupine', 'cobra'}),
+    (('porcupine',), {'porcupine'}),
+])
+def test_eager_init_creates_only_the_selected_engines(tmp_path, eager_init, created):
+    pytest.importorskip('pvcobra')
+    pytest.importorskip('pvporcupine')
+    from VoiceProcessingToolkit.simulation.FakeEngines import patch_engines
+    from VoiceProcessingToolkit.simulation.SimulatedAudio import SimulatedAudioStream
+    from VoiceProcessingToolkit.wake_word_detector.ActionManager import ActionManager
+
+    with patch_engines(detect_every=5) as engines:
+        manager = VoiceProcessingManager(
+            transcriber=None, action_manager=ActionManager(), audio_stream_manager=SimulatedAudioStream(),
+            play_notification_sound=False, output_directory=str(tmp_path), tts_playback=False,
+            eager_init=eager_init)
+        try:
+            assert {name for name, instances in engines.items() if instances} == created
+            assert (manager._voice_recorder is not None) == ('cobra' in created)
+            manager.run(transcription=False)  # Wake word only: the recorder is never needed
+            assert len(engines['porcupine']) >= 1
+            assert bool(engines['cobra']) == ('cobra' in created)
+        finally:
+            manager.close()
+
+
+def test_eager_init_rejects_unknown_engines(tmp_path):
+    from VoiceProcessingToolkit.wake_word_detector.ActionManager import ActionManager
+
+    with pytest.raises(ValueError):
+        VoiceProcessingManager(transcriber=None, action_manager=ActionManager(), audio_stream_manager=None,
+                               output_directory=str(tmp_path), eager_init=('koala',))
@@ -0,0 +1,53 @@
+import wave
+
+import numpy as np
+import pytest
+
+pytest.importorskip('dotenv')
+pytest.importorskip('pvcobra')
+
+from VoiceProcessingToolkit.simulation.FakeEngines import patch_engines  # noqa: E402
+from VoiceProcessingToolkit.simulation.SimulatedAudio import (SimulatedAudioDataProvider, split_frames,  # noqa: E402
+                                                              synthetic_speech)
+from VoiceProcessingToolkit.voice_detection.Voicerecorder import AudioRecorder  # noqa: E402
+
+RATE = 16000
+FRAME = 512
+
+
+def first_voiced_frame(audio):
+    """The index of the first frame FakeCobra reports as voiced."""
+    frames = [np.frombuffer(frame, dtype=np.int16) for frame in split_frames(audio)]
+    return next(index for index, frame in enumerate(frames) if np.abs(frame).mean() >= 500)
+
+
+def read_wav(path):
+    with wave.open(path, 'rb') as wave_file:
+        return np.frombuffer(wave_file.readframes(wave_file.getnframes()), dtype=np.int16)
+
+
+def test_recording_starts_with_the_pre_roll_before_the_first_voiced_frame(tmp_path):
+    audio = synthetic_speech(silence_before=2.0, speech=1.5, silence_after=3.0)
+    with patch_engines():
+        recorder = AudioRecorder(output_directory=str(tmp_path), inactivity_limit=1, min_recording_length=1,
+                                 buffer_length=0.5)
+        path = recorder.perform_recording(SimulatedAudioDataProvider(audio))
+    # The leading silence is longer than the inactivity limit, yet the speech after it is recorded
+    assert path is not None
+    saved = read_wav(path)
+    onset = first_voiced_frame(audio) * FRAME
+    pre_roll = int(0.5 * RATE)
+    assert np.array_equal(saved[:pre_roll + FRAME], audio[onset - pre_roll:onset + FRAME])
+    assert len(saved) < pre_roll + int((1.5 + 1.2) * RATE)
+    assert recorder.speech_start_time is not None
+
+
+def test_recording_ends_without_a_file_when_no_speech_starts(tmp_path):
+    audio = np.zeros(RATE, dtype=np.int16)
+    with patch_engines():
+        recorder = AudioRecorder(output_directory=str(tmp_path), speech_timeout=0.5)
+        provider = SimulatedAudioDataProvider(audio)
+        assert recorder.perform_recording(provider) is None
+    assert provider.frames_read == int(0.5 * RATE / FRAME) + 1
+    assert recorder.speech_start_time is None
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,191 @@
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pytest
+
+pytest.importorskip('dotenv')
+pytest.importorskip('pvporcupine')
+
+from VoiceProcessingToolkit.pipeline.FramePipeline import FunctionStage  # noqa: E402
+from VoiceProcessingToolkit.simulation.FakeEngines import patch_engines  # noqa: E402
+from VoiceProcessingToolkit.simulation.SimulatedAudio import SimulatedAudioStream  # noqa: E402
+from VoiceProcessingToolkit.wake_word_detector.ActionManager import ActionManager  # noqa: E402
+from VoiceProcessingToolkit.wake_word_detector.WakeWordDetector import WakeWordDetector  # noqa: E402
+
+
+class CheckedStream(SimulatedAudioStream):
+    """Records reads made after the stream was cleaned up."""
+
+    def __init__(self):
+        super().__init__(real_time=True)
+        self.closed = False
+        self.reads_after_cleanup = 0
+
+    def read(self):
+        if self.closed:
+            self.reads_after_cleanup += 1
+        return super().read()
+
+    def cleanup(self):
+        self.closed = True
+        super().cleanup()
+
+
+def create_detector(stream, frame_stages=None):
+    return WakeWordDetector(access_key='test', wake_word='jarvis', sensitivity=0.5, action_manager=ActionManager(),
+                            audio_stream_manager=stream, play_notification_sound=False, frame_stages=frame_stages)
+
+
+async def cancel_arun(detector, delay):
+    task = asyncio.create_task(detector.arun(cleanup=False))
+    await asyncio.sleep(delay)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+
+def test_cancelled_arun_waits_for_the_loop_before_cleanup():
+    stream = CheckedStream()
+    with patch_engines() as engines:
+        detector = create_detector(stream)
+        asyncio.run(cancel_arun(detector, 0.2))
+        assert not detector.is_running
+        detector.cleanup()
+    assert stream.frames_read > 0
+    assert stream.reads_after_cleanup == 0
+    assert engines['porcupine'][0].calls == stream.frames_read
+
+
+def test_cancellation_before_the_loop_starts_is_not_lost():
+    release = threading.Event()
+    stream = CheckedStream()
+
+    async def main():
+        prepare = detector._prepare
+
+        def slow_prepare():
+            release.wait(5)  # The capture thread has started the run but not re-armed the detector yet
+            prepare()
+
+        detector._prepare = slow_prepare
+        task = asyncio.create_task(detector.arun(cleanup=False))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.sleep(0.05)  # The task handles the cancellation before the detector is re-armed
+        release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0.2)  # A loop that missed the stop would be reading frames now
+
+    with patch_engines():
+        detector = create_detector(stream)
+        asyncio.run(main())
+        assert not detector.is_running
+        detector.cleanup()
+    assert stream.frames_read == 0
+    assert stream.reads_after_cleanup == 0
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Timed out"
+        time.sleep(0.01)
+
+
+def test_continuous_mode_reports_every_detection_in_order_on_the_callback_thread():
+    detections, threads = [], set()
+
+    def callback(detection):
+        threads.add(threading.current_thread().name)
+        detections.append(detection)
+
+    with patch_engines(detect_every=10) as engines:
+        detector = create_detector(SimulatedAudioStream())
+        detector.start_continuous(callback)
+        wait_for(lambda: len(detections) >= 5)
+        detector.stop()
+        detector.cleanup()
+    # One engine serves every detection, and the loop re-arms after each one
+    assert len(engines['porcupine']) == 1
+    assert [detection.frame_index for detection in detections[:5]] == [10, 20, 30, 40, 50]
+    assert len(threads) == 1 and threads.pop().startswith('WakeWordDetector-callbacks')
+
+
+def test_a_slow_callback_does_not_stall_detection():
+    release = threading.Event()
+    detections = []
+
+    def callback(detection):
+        release.wait(5)
+        detections.append(detection)
+
+    with patch_engines(detect_every=10):
+        detector = create_detector(SimulatedAudioStream())
+        detector.start_continuous(callback)
+        wait_for(lambda: detector.detection_count >= 5)  # The first callback is still blocked
+        assert not detections
+        release.set()
+        detector.stop()
+        detector.cleanup()  # Runs the callbacks already queued
+    frame_indexes = [detection.frame_index for detection in detections]
+    assert len(frame_indexes) >= 5 and frame_indexes == sorted(frame_indexes)
+
+
+def test_a_full_detection_queue_drops_the_oldest_detections():
+    with patch_engines(detect_every=10):
+        detector = create_detector(SimulatedAudioStream())
+        detector.start_continuous(max_queued_detections=3)
+        wait_for(lambda: detector.detection_count >= 20)
+        detector.stop()
+        count = detector.detection_count
+        queued = [detector._detection_queue.get_nowait() for _ in range(detector._detection_queue.qsize())]
+        detector.cleanup()
+    assert [detection.frame_index for detection in queued] == [10 * (count - 2), 10 * (count - 1), 10 * count]
+
+
+def test_cleanup_shuts_down_the_detector_threads_and_a_later_run_starts_new_ones():
+    detections = []
+    with patch_engines(detect_every=10):
+        detector = create_detector(SimulatedAudioStream())
+        detector.start_continuous(detections.append)
+        wait_for(lambda: detections)
+        capture_pool, callback_pool = detector._capture_pool, detector._callback_pool
+        detector.cleanup()
+        assert capture_pool.stats()['workers'] == 0 and callback_pool.stats()['workers'] == 0
+        with pytest.raises(RuntimeError):
+            capture_pool.submit(print)
+        count = len(detections)
+        detector.start_continuous(detections.append)
+        wait_for(lambda: len(detections) > count)
+        detector.cleanup()
+
+
+def test_run_blocking_returns_as_soon_as_the_wake_word_is_detected():
+    with patch_engines(detect_every=5):
+        detector = create_detector(SimulatedAudioStream())
+        started = time.monotonic()
+        detector.run_blocking(cleanup=True)
+        elapsed = time.monotonic() - started
+    assert detector.detection_count == 1
+    assert elapsed < 0.4
+
+
+@pytest.mark.parametrize('threaded_stage', [False, True], ids=['direct', 'frame_pipeline'])
+def test_audio_after_the_wake_word_is_handed_to_the_recorder_without_gaps_or_duplicates(threaded_stage):
+    frame = 512
+    audio = np.arange(40 * frame, dtype=np.int16)  # Every sample is unique, so gaps and repeats show up
+    stream = SimulatedAudioStream(audio)  # Unpaced, so a frame pipeline reads ahead of detection
+    stages = [FunctionStage(lambda samples: samples, threaded=True)] if threaded_stage else None
+    with patch_engines(detect_every=5):
+        detector = create_detector(stream, stages)
+        detector.run_blocking(cleanup=False)
+        for _ in range(3):
+            stream.read()  # Captured after the detection, before the recorder takes over
+        provider = detector.get_handoff_provider()
+        provider.start_stream()
+        handed_over = np.frombuffer(b''.join(provider.get_next_frame() for _ in range(10)), dtype=np.int16)
+        detector.cleanup()
+    assert np.array_equal(handed_over, audio[5 * frame:15 * frame])
@@ -0,0 +1,77 @@
+import wave
+
+import numpy as np
+
+from VoiceProcessingToolkit.wake_word_detector.WakeWordEvaluator import WakeWordEvaluator, merge_detections
+
+SAMPLE_RATE = 16000
+
+
+class BurstDetector:
+    """
+    Stateful stand-in for Porcupine: reports a detection on the third consecutive loud frame.
+    """
+
+    frame_length = 512
+
+    def __init__(self, sensitivity):
+        self.loud_frames = 0
+
+    def process(self, pcm):
+        self.loud_frames = self.loud_frames + 1 if np.abs(pcm.astype(np.int32)).mean() > 5000 else 0
+        return 0 if self.loud_frames == 3 else -1
+
+    def delete(self):
+        pass
+
+
+def write_wav(path, samples):
+    with wave.open(str(path), 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(SAMPLE_RATE)
+        wav_file.writeframes(samples.tobytes())
+
+
+def bursts(path, starts, length=2560, seconds=10):
+    samples = np.zeros(SAMPLE_RATE * seconds, dtype=np.int16)
+    for start in starts:
+        samples[start:start + length] = 10000
+    write_wav(path, samples)
+    return str(path)
+
+
+def evaluate(paths, overlap_seconds):
+    evaluator = WakeWordEvaluator(workers=1, chunk_seconds=5.0, overlap_seconds=overlap_seconds,
+                                  engine_factory=BurstDetector)
+    return evaluator.evaluate(paths, []).detections_per_file
+
+
+def test_wake_word_across_chunk_boundary_is_detected_with_overlap(tmp_path):
+    # Chunks are 80000 samples; the middle burst has two frames on each side of the boundary
+    path = bursts(tmp_path / 'boundary.wav', [16000, 64000, 79000, 128000], length=2000)
+    assert evaluate([path], overlap_seconds=0.0)[path] == [3]
+    assert evaluate([path], overlap_seconds=2.0)[path] == [4]
+
+
+def test_detection_in_overlap_is_counted_once(tmp_path):
+    path = bursts(tmp_path / 'before_boundary.wav', [76000])
+    assert evaluate([path], overlap_seconds=2.0)[path] == [1]
+
+
+def test_engine_state_does_not_carry_over_between_files(tmp_path):
+    # Each file ends with two loud frames; a shared engine would detect on the first frame of the next file
+    first = tmp_path / 'first.wav'
+    second = tmp_path / 'second.wav'
+    samples = np.zeros(SAMPLE_RATE, dtype=np.int16)
+    samples[-1024:] = 10000
+    write_wav(first, samples)
+    write_wav(second, np.concatenate([np.full(512, 10000, dtype=np.int16), np.zeros(SAMPLE_RATE, np.int16)]))
+    detections = evaluate([str(first), str(second)], overlap_seconds=0.0)
+    assert detections == {str(first): [0], str(second): [0]}
+
+
+def test_merge_detections_drops_duplicates_of_neighbouring_chunks_only():
+    assert merge_detections([(0, [1000, 80000]), (80000, [80512])], window=8000) == [1000, 80000]
+    assert merge_detections([(0, [1000, 1512])], window=8000) == [1000, 1512]
+    assert merge_detections([(0, [70000]), (80000, [90000])], window=8000) == [70000, 90000]
@@ -0,0 +1,84 @@
+import struct
+import wave
+
+import numpy as np
+import pytest
+
+from VoiceProcessingToolkit.wake_word_detector.WavFileSource import (MappedWavFile, WavFileDataProvider,
+                                                                      WavFileStream)
+
+RATE = 16000
+
+
+def write_wav(path, samples, sample_rate=RATE, channels=1):
+    with wave.open(str(path), 'wb') as wave_file:
+        wave_file.setnchannels(channels)
+        wave_file.setsampwidth(2)
+        wave_file.setframerate(sample_rate)
+        wave_file.writeframes(samples.tobytes())
+    return str(path)
+
+
+@pytest.fixture
+def samples():
+    return np.arange(RATE * 2, dtype=np.int16)
+
+
+def test_mapped_samples_match_the_file(tmp_path, samples):
+    with MappedWavFile(write_wav(tmp_path / 'a.wav', samples)) as mapped:
+        assert np.array_equal(mapped.samples, samples)
+        assert mapped.duration == 2.0 and len(mapped) == len(samples)
+        assert np.array_equal(mapped.slice(0.5, 1.0), samples[RATE // 2:RATE])
+        assert mapped.sample_index(-1) == 0 and mapped.sample_index(10) == len(samples)
+        frames = mapped.frames(500, start=10, end=1020)
+        assert frames.shape == (2, 500) and frames[1, 0] == 510
+        mapped.release(0, len(samples))  # Only drops pages, the data stays readable
+        assert mapped.samples[-1] == samples[-1]
+        del frames  # Views keep the mapping alive
+    assert mapped.closed
+
+
+def test_extra_chunks_and_unfinalized_headers_are_handled(tmp_path, samples):
+    data = samples[:1000].tobytes()
+    fmt = struct.pack('<HHIIHH', 1, 1, RATE, RATE * 2, 2, 16)
+    body = b'WAVE' + b'fmt ' + struct.pack('<I', 16) + fmt + b'LIST' + struct.pack('<I', 3) + b'abc\x00'
+    body += b'data' + struct.pack('<I', 0xFFFFFFFF) + data  # Size never written, e.g. after a crash
+    path = tmp_path / 'b.wav'
+    path.write_bytes(b'RIFF' + struct.pack('<I', 0) + body)
+    with MappedWavFile(str(path)) as mapped:
+        assert np.array_equal(mapped.samples, samples[:1000])
+
+
+def test_invalid_files_are_rejected(tmp_path, samples):
+    (tmp_path / 'text.wav').write_bytes(b'not audio at all')
+    with pytest.raises(ValueError):
+        MappedWavFile(str(tmp_path / 'text.wav'))
+    with pytest.raises(ValueError):
+        MappedWavFile(write_wav(tmp_path / 'stereo.wav', samples, channels=2))
+    with pytest.raises(ValueError):
+        MappedWavFile(write_wav(tmp_path / 'rate.wav', samples, sample_rate=8000), sample_rate=RATE)
+
+
+def test_stream_reads_complete_frames_and_seeks(tmp_path, samples):
+    path = write_wav(tmp_path / 'c.wav', samples[:RATE + 100])
+    with WavFileStream(path, frame_length=512, release_seconds=0.1) as stream:
+        frames = []
+        while (frame := stream.read()) is not None:
+            frames.append(frame.copy())
+        assert len(frames) == (RATE + 100) // 512 and stream.at_end
+        assert np.array_equal(np.concatenate(frames), samples[:len(frames) * 512])
+        assert stream.rolling_buffer.position == len(frames) * 512
+        assert np.array_equal(stream.rolling_buffer.latest(10), samples[len(frames) * 512 - 10:len(frames) * 512])
+        stream.seek(0.5)
+        assert stream.tell() == 0.5
+        assert stream.read()[0] == samples[RATE // 2]
+        assert stream.get_audio_since(RATE // 2) == samples[RATE // 2:RATE // 2 + 512].tobytes()
+
+
+def test_data_provider_shares_a_mapping_without_closing_it(tmp_path, samples):
+    with MappedWavFile(write_wav(tmp_path / 'd.wav', samples)) as mapped:
+        with WavFileDataProvider(mapped, frame_length=256, start_seconds=1.0) as provider:
+            provider.start_stream()
+            assert provider.get_next_frame()[0] == samples[RATE]
+            assert provider.frames_read == 1
+        assert not mapped.closed
@@ -0,0 +1,134 @@
+import threading
+import time
+
+import pytest
+
+from VoiceProcessingToolkit.shared_resources import WorkerPool, lazy_import
+
+
+def test_results_and_errors_are_delivered_through_futures():
+    pool = WorkerPool('test-results', max_workers=2)
+    try:
+        assert pool.submit(sum, [1, 2, 3]).result(5) == 6
+        with pytest.raises(ZeroDivisionError):
+            pool.submit(lambda: 1 / 0).result(5)
+    finally:
+        pool.shutdown()
+    stats = pool.stats()
+    assert stats['tasks_submitted'] == 2 and stats['tasks_completed'] == 2 and stats['tasks_failed'] == 1
+
+
+def test_workers_are_bounded_and_reused():
+    pool = WorkerPool('test-bounded', max_workers=3)
+    running = 0
+    peak = 0
+    lock = threading.Lock()
+    names = set()
+
+    def task():
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+            names.add(threading.current_thread().name)
+        time.sleep(0.005)
+        with lock:
+            running -= 1
+
+    try:
+        for future in [pool.submit(task) for _ in range(60)]:
+            future.result(5)
+    finally:
+        pool.shutdown()
+    assert peak <= 3
+    assert len(names) <= 3
+    assert all(name.startswith('test-bounded-') for name in names)
+
+
+def test_single_worker_runs_tasks_in_order_on_one_thread():
+    pool = WorkerPool('test-serial', max_workers=1)
+    order = []
+    threads = set()
+
+    def task(index):
+        order.append(index)
+        threads.add(threading.current_thread())
+
+    try:
+        for future in [pool.submit(task, index) for index in range(50)]:
+            future.result(5)
+    finally:
+        pool.shutdown()
+    assert order == list(range(50))
+    assert len(threads) == 1
+
+
+def test_full_queue_rejects_new_tasks():
+    pool = WorkerPool('test-bounded-queue', max_workers=1, max_queued_tasks=2)
+    release = threading.Event()
+    try:
+        pool.submit(release.wait, 5)
+        time.sleep(0.05)  # The worker has taken the first task
+        pool.submit(lambda: None)
+        pool.submit(lambda: None)
+        with pytest.raises(RuntimeError):
+            pool.submit(lambda: None)
+        assert pool.stats()['tasks_rejected'] == 1
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+def test_idle_workers_exit_and_are_restarted_on_demand():
+    pool = WorkerPool('test-idle', max_workers=2, idle_timeout=0.05)
+    try:
+        pool.submit(lambda: None).result(5)
+        deadline = time.monotonic() + 5
+        while pool.stats()['workers'] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert pool.stats()['workers'] == 0
+        assert pool.submit(lambda: 42).result(5) == 42
+    finally:
+        pool.shutdown()
+
+
+def test_in_worker_identifies_the_pool_threads():
+    pool = WorkerPool('test-in-worker', max_workers=1)
+    try:
+        assert not pool.in_worker()
+        assert pool.submit(pool.in_worker).result(5)
+    finally:
+        pool.shutdown()
+
+
+def test_shutdown_can_cancel_queued_tasks_and_rejects_new_ones():
+    pool = WorkerPool('test-shutdown', max_workers=1)
+    release = threading.Event()
+    running = pool.submit(release.wait, 5)
+    time.sleep(0.05)
+    queued = pool.submit(lambda: None)
+    release.set()
+    pool.shutdown(cancel_futures=True)
+    assert running.result(5)
+    assert queued.cancelled()
+    with pytest.raises(RuntimeError):
+        pool.submit(lambda: None)
+
+
+def test_shutdown_from_a_worker_does_not_join_itself():
+    pool = WorkerPool('test-self-shutdown', max_workers=1)
+    assert pool.submit(pool.shutdown).result(5) is None
+
+
+def test_invalid_worker_counts_are_rejected():
+    for max_workers in (0, -1, 1.5):
+        with pytest.raises(ValueError):
+            WorkerPool('test-invalid', max_workers=max_workers)
+
+
+def test_lazy_import_loads_the_module_on_first_use():
+    json = lazy_import('json')
+    assert json.dumps([1]) == '[1]'
+    missing = lazy_import('module_that_does_not_exist')
+    with pytest.raises(ImportError):
+        missing.anything